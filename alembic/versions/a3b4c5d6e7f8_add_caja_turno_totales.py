@@ -0,0 +1,72 @@
+"""add caja_turno_totales (totales acumulados por turno de caja)
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-17
+
+Una fila por turno con cobros por método y egresos en efectivo; la app la mantiene en la
+misma transacción que cada pago, gasto y pago a proveedor / cuenta manual. Aquí se llena
+para los turnos existentes. Auditoría: python scripts/auditar_totales_caja.py
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "a3b4c5d6e7f8"
+down_revision: Union[str, None] = "f2a3b4c5d6e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_MONTO = sa.Numeric(12, 2)
+
+# Copia congelada de app.services.caja_totales_service.calcular_totales, por turno
+_RELLENAR = """
+INSERT INTO caja_turno_totales (
+    id_turno, cobros_efectivo, cobros_tarjeta, cobros_transferencia, cantidad_cobros,
+    gastos, pagos_proveedor_efectivo, pagos_cuentas_manuales_efectivo, version
+)
+SELECT
+    t.id_turno,
+    COALESCE((SELECT SUM(p.monto) FROM pagos p WHERE p.id_turno = t.id_turno AND p.metodo = 'EFECTIVO'), 0),
+    COALESCE((SELECT SUM(p.monto) FROM pagos p WHERE p.id_turno = t.id_turno AND p.metodo = 'TARJETA'), 0),
+    COALESCE((SELECT SUM(p.monto) FROM pagos p WHERE p.id_turno = t.id_turno AND p.metodo = 'TRANSFERENCIA'), 0),
+    (SELECT COUNT(*) FROM pagos p WHERE p.id_turno = t.id_turno),
+    COALESCE((SELECT SUM(g.monto) FROM gastos_operativos g WHERE g.id_turno = t.id_turno), 0),
+    COALESCE(
+        (SELECT SUM(po.monto) FROM pagos_orden_compra po WHERE po.id_turno = t.id_turno AND po.metodo = 'EFECTIVO'),
+        0
+    ),
+    COALESCE(
+        (
+            SELECT SUM(pm.monto) FROM pagos_cuenta_pagar_manual pm
+            WHERE pm.id_turno = t.id_turno AND pm.metodo = 'EFECTIVO'
+        ),
+        0
+    ),
+    1
+FROM caja_turnos t
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "caja_turno_totales",
+        sa.Column("id_turno", sa.Integer(), nullable=False),
+        sa.Column("cobros_efectivo", _MONTO, nullable=False, server_default="0"),
+        sa.Column("cobros_tarjeta", _MONTO, nullable=False, server_default="0"),
+        sa.Column("cobros_transferencia", _MONTO, nullable=False, server_default="0"),
+        sa.Column("cantidad_cobros", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("gastos", _MONTO, nullable=False, server_default="0"),
+        sa.Column("pagos_proveedor_efectivo", _MONTO, nullable=False, server_default="0"),
+        sa.Column("pagos_cuentas_manuales_efectivo", _MONTO, nullable=False, server_default="0"),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("actualizado_en", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=True),
+        sa.ForeignKeyConstraint(["id_turno"], ["caja_turnos.id_turno"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id_turno"),
+    )
+    op.execute(_RELLENAR)
+
+
+def downgrade() -> None:
+    op.drop_table("caja_turno_totales")
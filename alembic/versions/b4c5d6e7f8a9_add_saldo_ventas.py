@@ -0,0 +1,43 @@
+"""add total_pagado y saldo materializados en ventas
+
+Revision ID: b4c5d6e7f8a9
+Revises: a3b4c5d6e7f8
+Create Date: 2026-10-17
+
+La app los mantiene en la misma transacción que cada pago (app/services/saldos_venta_service.py);
+aquí se llenan para las ventas existentes. ix_ventas_estado_saldo convierte "estado = PENDIENTE
+y saldo > 0" en un rango indexado. Auditoría: python scripts/auditar_saldos_ventas.py
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "b4c5d6e7f8a9"
+down_revision: Union[str, None] = "a3b4c5d6e7f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Dos sentencias: saldo se calcula con total_pagado ya escrito
+_RELLENAR_PAGADO = """
+UPDATE ventas SET total_pagado = COALESCE(
+    (SELECT SUM(p.monto) FROM pagos p WHERE p.id_venta = ventas.id_venta), 0
+)
+"""
+_RELLENAR_SALDO = """
+UPDATE ventas SET saldo = CASE WHEN total > total_pagado THEN total - total_pagado ELSE 0 END
+"""
+
+
+def upgrade() -> None:
+    op.add_column("ventas", sa.Column("total_pagado", sa.DECIMAL(10, 2), nullable=False, server_default="0"))
+    op.add_column("ventas", sa.Column("saldo", sa.DECIMAL(10, 2), nullable=False, server_default="0"))
+    op.execute(_RELLENAR_PAGADO)
+    op.execute(_RELLENAR_SALDO)
+    op.create_index("ix_ventas_estado_saldo", "ventas", ["estado", "saldo"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ventas_estado_saldo", table_name="ventas")
+    op.drop_column("ventas", "saldo")
+    op.drop_column("ventas", "total_pagado")
@@ -0,0 +1,53 @@
+"""add notificaciones_salientes (outbox de email / WhatsApp)
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-17
+
+Enviar orden de compra, recuperar contraseña y crear cita insertan aquí el aviso en su misma
+transacción; el despachador de app/services/notificaciones_service.py lo envía con reintentos.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "c5d6e7f8a9b0"
+down_revision: Union[str, None] = "b4c5d6e7f8a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notificaciones_salientes",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("clave_idempotencia", sa.String(length=120), nullable=False),
+        sa.Column("canal", sa.String(length=20), nullable=False),
+        sa.Column("destino", sa.String(length=255), nullable=False),
+        sa.Column("asunto", sa.String(length=255), nullable=True),
+        sa.Column("contenido", sa.Text(), nullable=False),
+        sa.Column("estado", sa.String(length=20), nullable=False, server_default="PENDIENTE"),
+        sa.Column("intentos", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_intentos", sa.Integer(), nullable=False),
+        sa.Column("proximo_intento_en", sa.DateTime(), nullable=False),
+        sa.Column("ultimo_error", sa.String(length=500), nullable=True),
+        sa.Column("referencia_tipo", sa.String(length=40), nullable=True),
+        sa.Column("referencia_id", sa.Integer(), nullable=True),
+        sa.Column("id_usuario", sa.Integer(), nullable=True),
+        sa.Column("creado_en", sa.DateTime(), nullable=False),
+        sa.Column("enviado_en", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["id_usuario"], ["usuarios.id_usuario"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("clave_idempotencia"),
+    )
+    op.create_index(op.f("ix_notificaciones_salientes_id"), "notificaciones_salientes", ["id"])
+    op.create_index(
+        "ix_notificaciones_salientes_estado_proximo", "notificaciones_salientes", ["estado", "proximo_intento_en"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notificaciones_salientes_estado_proximo", table_name="notificaciones_salientes")
+    op.drop_index(op.f("ix_notificaciones_salientes_id"), table_name="notificaciones_salientes")
+    op.drop_table("notificaciones_salientes")
@@ -0,0 +1,34 @@
+"""add ventas_utilidad (libro de costos por venta)
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17
+
+Costo de refacciones y merma por venta para reportes de utilidad.
+Después de migrar, poblar con: python scripts/backfill_ventas_utilidad.py
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "c9d0e1f2a3b4"
+down_revision: Union[str, None] = "b8c9d0e1f2a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ventas_utilidad",
+        sa.Column("id_venta", sa.Integer(), nullable=False),
+        sa.Column("costo", sa.Numeric(12, 2), nullable=False, server_default="0"),
+        sa.Column("perdidas_mer", sa.Numeric(12, 2), nullable=False, server_default="0"),
+        sa.Column("actualizado_en", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=True),
+        sa.ForeignKeyConstraint(["id_venta"], ["ventas.id_venta"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id_venta"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ventas_utilidad")
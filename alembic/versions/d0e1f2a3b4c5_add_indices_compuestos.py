@@ -0,0 +1,45 @@
+"""add índices compuestos para filtros frecuentes
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-17
+
+Índices para los filtros y ordenamientos de reportes, dashboards y bandejas:
+kardex por repuesto, salidas por OT/venta, pagos por venta/turno/fecha y
+listados por (estado, fecha) de citas y ventas.
+Verificación: tests/test_planes_consultas.py (EXPLAIN de los endpoints principales).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "d0e1f2a3b4c5"
+down_revision: Union[str, None] = "c9d0e1f2a3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = (
+    ("ix_movimientos_inventario_repuesto_fecha", "movimientos_inventario", ["id_repuesto", "fecha_movimiento"]),
+    ("ix_movimientos_inventario_referencia_tipo", "movimientos_inventario", ["referencia", "tipo_movimiento"]),
+    ("ix_movimientos_inventario_venta_tipo", "movimientos_inventario", ["id_venta", "tipo_movimiento"]),
+    ("ix_movimientos_inventario_tipo_fecha", "movimientos_inventario", ["tipo_movimiento", "fecha_movimiento"]),
+    ("ix_pagos_venta_monto", "pagos", ["id_venta", "monto"]),
+    ("ix_pagos_turno_metodo", "pagos", ["id_turno", "metodo"]),
+    ("ix_pagos_fecha", "pagos", ["fecha"]),
+    ("ix_citas_estado_fecha_hora", "citas", ["estado", "fecha_hora"]),
+    ("ix_ventas_estado_fecha", "ventas", ["estado", "fecha"]),
+    ("ix_ventas_fecha", "ventas", ["fecha"]),
+    ("ix_ventas_orden_estado", "ventas", ["id_orden", "estado"]),
+    ("ix_ventas_cliente_fecha", "ventas", ["id_cliente", "fecha"]),
+    ("ix_ventas_vehiculo_fecha", "ventas", ["id_vehiculo", "fecha"]),
+)
+
+
+def upgrade() -> None:
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas)
+
+
+def downgrade() -> None:
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, tabla)
@@ -0,0 +1,35 @@
+"""add contadores_operativos (métricas A0 precalculadas)
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-17
+
+Contadores del fast path de /operaciones/resumen con versión y fecha de actualización.
+La tabla nace vacía (el fast path cuenta en vivo); la llena el reconciliador al arrancar
+la app o con: python scripts/reconciliar_contadores_operativos.py
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "e1f2a3b4c5d6"
+down_revision: Union[str, None] = "d0e1f2a3b4c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "contadores_operativos",
+        sa.Column("clave", sa.String(64), nullable=False),
+        sa.Column("ambito", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("valor", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("actualizado_en", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=True),
+        sa.PrimaryKeyConstraint("clave", "ambito"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("contadores_operativos")
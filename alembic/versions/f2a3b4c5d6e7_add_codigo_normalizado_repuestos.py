@@ -0,0 +1,46 @@
+"""add codigo_normalizado a repuestos (búsqueda indexada de códigos en entrada masiva)
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-17
+
+La entrada masiva resolvía cada fila con ilike sobre repuestos.codigo (sin índice utilizable).
+La columna guarda el código en mayúsculas, sin espacios y sin el sufijo _ELIM_<id> del soft
+delete; la app la mantiene al asignar codigo. Aquí se rellena para los repuestos existentes.
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "f2a3b4c5d6e7"
+down_revision: Union[str, None] = "e1f2a3b4c5d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_LOTE = 1000
+
+
+def _normalizar(codigo):
+    """Copia congelada de app.utils.codigo_repuesto.normalizar_codigo_repuesto."""
+    limpio = re.sub(r"\s+", "", str(codigo or "")).upper()
+    return re.sub(r"_ELIM_\d+$", "", limpio) or None
+
+
+def upgrade() -> None:
+    op.add_column("repuestos", sa.Column("codigo_normalizado", sa.String(50), nullable=True))
+
+    conn = op.get_bind()
+    filas = conn.execute(sa.text("SELECT id_repuesto, codigo FROM repuestos")).fetchall()
+    valores = [{"id": id_repuesto, "cod": _normalizar(codigo)} for id_repuesto, codigo in filas]
+    actualizar = sa.text("UPDATE repuestos SET codigo_normalizado = :cod WHERE id_repuesto = :id")
+    for i in range(0, len(valores), _LOTE):
+        conn.execute(actualizar, valores[i : i + _LOTE])
+
+    op.create_index("ix_repuestos_codigo_normalizado", "repuestos", ["codigo_normalizado"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_repuestos_codigo_normalizado", table_name="repuestos")
+    op.drop_column("repuestos", "codigo_normalizado")
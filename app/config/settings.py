@@ -63,12 +63,33 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", _SECRET_KEY_DEFAULT)
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_EXPIRE_MINUTES: int = int(os.getenv("JWT_EXPIRE_MINUTES", "480"))
+    # Caché en proceso de usuarios autenticados (0 = desactivada)
+    AUTH_CACHE_TTL_SEGUNDOS: int = int(os.getenv("AUTH_CACHE_TTL_SEGUNDOS", "30"))
+    AUTH_CACHE_MAX_USUARIOS: int = int(os.getenv("AUTH_CACHE_MAX_USUARIOS", "512"))
 
     # Aplicación
     APP_NAME: str = os.getenv("APP_NAME", "MEDINAAUTODIAG API")
     APP_VERSION: str = os.getenv("APP_VERSION", "1.0.0")
     DEBUG_MODE: bool = os.getenv("DEBUG_MODE", "False").lower() == "true"
 
+    # Contadores operativos A0: cada cuántos segundos se reconcilian contra SQL (0 = nunca)
+    CONTADORES_RECONCILIAR_SEGUNDOS: int = int(os.getenv("CONTADORES_RECONCILIAR_SEGUNDOS", "300"))
+
+    # Alertas de stock: ventana (ms) para agrupar repuestos movidos, tamaño de lote y reintentos de un lote fallido
+    ALERTAS_STOCK_ESPERA_MS: int = int(os.getenv("ALERTAS_STOCK_ESPERA_MS", "500"))
+    ALERTAS_STOCK_LOTE: int = int(os.getenv("ALERTAS_STOCK_LOTE", "500"))
+    ALERTAS_STOCK_MAX_INTENTOS: int = int(os.getenv("ALERTAS_STOCK_MAX_INTENTOS", "3"))
+
+    # Telemetría por petición (middleware de logging); Server-Timing expone tiempos y sentencias de BD,
+    # por defecto solo con DEBUG_MODE
+    TELEMETRIA_SERVER_TIMING: bool = os.getenv("TELEMETRIA_SERVER_TIMING", str(DEBUG_MODE)).lower() == "true"
+    # Sentencias SQL iguales (normalizadas) por petición a partir de las cuales se marca N+1 (0 = apagado)
+    TELEMETRIA_N_MAS_UNO_UMBRAL: int = int(os.getenv("TELEMETRIA_N_MAS_UNO_UMBRAL", "10"))
+
+    # Caché en disco de PDFs (cotización OT, hoja técnico, cotización refacción); 0 MB = desactivada
+    PDF_CACHE_DIR: str = os.getenv("PDF_CACHE_DIR", str(_PROJECT_ROOT / "cache" / "pdf"))
+    PDF_CACHE_MAX_MB: int = int(os.getenv("PDF_CACHE_MAX_MB", "200"))
+
     # CORS
     ALLOWED_ORIGINS: List[str] = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
 
@@ -89,6 +110,8 @@ class Settings:
     AZURE_CLIENT_ID: str | None = os.getenv("AZURE_CLIENT_ID")
     AZURE_CLIENT_SECRET: str | None = os.getenv("AZURE_CLIENT_SECRET")
     AZURE_SEND_AS_EMAIL: str | None = os.getenv("AZURE_SEND_AS_EMAIL")  # Buzón desde el que enviar
+    AZURE_LOGIN_URL: str = os.getenv("AZURE_LOGIN_URL", "https://login.microsoftonline.com").rstrip("/")
+    AZURE_GRAPH_URL: str = os.getenv("AZURE_GRAPH_URL", "https://graph.microsoft.com").rstrip("/")
 
     # SMTP para envío de órdenes de compra a proveedores (fallback si Graph no está)
     SMTP_HOST: str | None = os.getenv("SMTP_HOST")  # Si no está, no se envía email
@@ -102,6 +125,7 @@ class Settings:
     WHATSAPP_ENABLED: bool = os.getenv("WHATSAPP_ENABLED", "false").lower() == "true"
     WHATSAPP_PHONE_NUMBER_ID: str | None = os.getenv("WHATSAPP_PHONE_NUMBER_ID") or None
     WHATSAPP_ACCESS_TOKEN: str | None = os.getenv("WHATSAPP_ACCESS_TOKEN") or None
+    WHATSAPP_API_URL: str = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com").rstrip("/")
     WHATSAPP_API_VERSION: str = os.getenv("WHATSAPP_API_VERSION", "v21.0").strip() or "v21.0"
     WHATSAPP_TEMPLATE_LANGUAGE: str = (os.getenv("WHATSAPP_TEMPLATE_LANGUAGE", "es") or "es").strip()
     WHATSAPP_TEMPLATE_ORDEN_COMPRA: str = (
@@ -111,6 +135,16 @@ class Settings:
         os.getenv("WHATSAPP_TEMPLATE_CONFIRMACION_CITA", "confirmacion_cita") or "confirmacion_cita"
     ).strip()
 
+    # Notificaciones salientes (email / WhatsApp): se encolan en notificaciones_salientes y las envía
+    # un hilo de fondo. Intervalo de sondeo, filas por lote, envíos simultáneos, timeout por envío,
+    # intentos máximos y espera base del reintento (se duplica en cada intento, tope 1 h).
+    NOTIFICACIONES_INTERVALO_S: float = float(os.getenv("NOTIFICACIONES_INTERVALO_S", "5"))
+    NOTIFICACIONES_LOTE: int = int(os.getenv("NOTIFICACIONES_LOTE", "20"))
+    NOTIFICACIONES_HILOS: int = int(os.getenv("NOTIFICACIONES_HILOS", "4"))
+    NOTIFICACIONES_TIMEOUT_S: float = float(os.getenv("NOTIFICACIONES_TIMEOUT_S", "15"))
+    NOTIFICACIONES_MAX_INTENTOS: int = int(os.getenv("NOTIFICACIONES_MAX_INTENTOS", "6"))
+    NOTIFICACIONES_REINTENTO_BASE_S: int = int(os.getenv("NOTIFICACIONES_REINTENTO_BASE_S", "30"))
+
     # URL pública de la aplicación (para enlaces en emails, ej. recuperación de contraseña)
     APP_PUBLIC_URL: str = os.getenv("APP_PUBLIC_URL", "http://localhost:5173")
 
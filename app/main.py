@@ -3,6 +3,7 @@ Aplicación principal FastAPI - MedinaAutoDiag
 Sistema de gestión para taller mecánico
 """
 
+import asyncio
 import logging
 import traceback
 from contextlib import asynccontextmanager
@@ -55,6 +56,9 @@ from app.routers.test import router as test_router
 # Importar routers
 from app.routers.usuarios import router as usuarios_router
 from app.routers.vehiculos import router as vehiculos_router
+from app.services.alertas_stock_service import cola_alertas_stock
+from app.services.notificaciones_service import despachador_notificaciones
+from app.utils.pdf_recursos import precargar_recursos_pdf
 
 # Configurar logging
 setup_logging(debug=settings.DEBUG_MODE)
@@ -85,6 +89,20 @@ def _exempt_decorator(f):
     return _limiter.exempt(f) if _limiter is not None else f
 
 
+async def _reconciliar_contadores_periodicamente(cada_segundos: int) -> None:
+    """Puebla contadores_operativos al arrancar y corrige desfases cada `cada_segundos`."""
+    from app.services.contadores_operativos_service import reconciliar_y_guardar
+
+    while True:
+        try:
+            desfases = await asyncio.to_thread(reconciliar_y_guardar)
+            if desfases:
+                logger.info(f"Contadores operativos reconciliados: {len(desfases)} fila(s) corregidas/creadas")
+        except Exception as e:
+            logger.warning(f"No se pudieron reconciliar contadores operativos: {e}")
+        await asyncio.sleep(cada_segundos)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -115,10 +133,24 @@ async def lifespan(app: FastAPI):
             raise
         logger.warning("La app arranca sin BD; corrige DATABASE_URL y reinicia.")
 
+    precargar_recursos_pdf()
+    cola_alertas_stock.iniciar()
+    despachador_notificaciones.iniciar()
+
+    tarea_contadores = None
+    if settings.CONTADORES_RECONCILIAR_SEGUNDOS > 0:
+        tarea_contadores = asyncio.create_task(
+            _reconciliar_contadores_periodicamente(settings.CONTADORES_RECONCILIAR_SEGUNDOS)
+        )
+
     yield
 
     # CIERRE
     logger.info("Cerrando aplicación...")
+    if tarea_contadores is not None:
+        tarea_contadores.cancel()
+    cola_alertas_stock.detener()
+    despachador_notificaciones.detener()
 
 
 # Docs: en debug siempre; en producción si DOCS_ENABLED
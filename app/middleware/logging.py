@@ -1,61 +1,174 @@
 """
 Middleware de logging para registrar todas las peticiones
+
+ASGI puro (sin BaseHTTPMiddleware). Por cada petición mide, además del tiempo total:
+- sentencias SQL, tiempo en BD y filas (eventos de cursor sobre app.database.engine),
+- bytes del cuerpo de la respuesta.
+
+Las métricas salen en el header Server-Timing y en una línea JSON de log. Un detector
+marca las peticiones que repiten la misma sentencia (normalizada) más de
+TELEMETRIA_N_MAS_UNO_UMBRAL veces: patrón N+1 típico de un loop con consulta por fila.
 """
 
+import json
 import logging
+import re
 import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine
 
 logger = logging.getLogger(__name__)
 
+_LONGITUD_SENTENCIA_LOG = 300
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware que registra información de cada petición HTTP
-    """
+# Listas de parámetros expandidas (IN (?, ?, ?)) y literales numéricos cuentan como la misma sentencia
+_RE_LISTA_PARAMETROS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        """
-        Procesa cada petición y registra información
-        """
-        # Tiempo de inicio
-        start_time = time.time()
 
-        # Información de la petición
-        method = request.method
-        url = request.url.path
-        client_host = request.client.host if request.client else "unknown"
+def normalizar_sentencia(sentencia: str) -> str:
+    """Forma canónica de una sentencia SQL para agrupar repeticiones (N+1)."""
+    s = _RE_LISTA_PARAMETROS.sub("(?)", sentencia)
+    s = _RE_NUMERO.sub("?", s)
+    return _RE_ESPACIOS.sub(" ", s).strip()
 
-        # Log de entrada
-        logger.info(f"→ {method} {url} from {client_host}")
 
-        try:
-            # Procesar petición
-            response = await call_next(request)
+@dataclass
+class MetricasPeticion:
+    """Acumulador de métricas SQL y de respuesta de una petición HTTP."""
+
+    sentencias: int = 0
+    db_segundos: float = 0.0
+    filas: int = 0
+    bytes_respuesta: int = 0
+    por_sentencia: Counter = field(default_factory=Counter)
+
+    def sospechas_n_mas_uno(self, umbral: int) -> list[dict]:
+        """Sentencias repetidas más de `umbral` veces (0 = detector apagado)."""
+        if umbral <= 0:
+            return []
+        return [
+            {"sentencia": s[:_LONGITUD_SENTENCIA_LOG], "veces": n}
+            for s, n in self.por_sentencia.most_common()
+            if n > umbral
+        ]
+
+
+# Métricas de la petición en curso. El threadpool de Starlette copia el contexto,
+# así que los endpoints síncronos acumulan sobre el mismo objeto.
+_metricas_actuales: ContextVar[Optional[MetricasPeticion]] = ContextVar("metricas_peticion", default=None)
+
+
+def metricas_actuales() -> Optional[MetricasPeticion]:
+    """Métricas de la petición en curso (None fuera de una petición HTTP)."""
+    return _metricas_actuales.get()
+
 
-            # Tiempo de procesamiento
-            process_time = time.time() - start_time
+@event.listens_for(engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _metricas_actuales.get() is not None:
+        context._telemetria_inicio = time.perf_counter()
 
-            # Log de salida (4xx/5xx en WARNING para que destaquen en logs)
-            status_code = response.status_code
-            msg = f"← {method} {url} - Status: {status_code} - Time: {process_time:.3f}s"
-            if status_code >= 500:
-                logger.error(msg)
-            elif status_code >= 400:
-                logger.warning(msg)
-            else:
-                logger.info(msg)
 
-            # Agregar header con tiempo de procesamiento
-            response.headers["X-Process-Time"] = str(process_time)
+@event.listens_for(engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    metricas = _metricas_actuales.get()
+    inicio = getattr(context, "_telemetria_inicio", None)
+    if metricas is None or inicio is None:
+        return
+    metricas.db_segundos += time.perf_counter() - inicio
+    metricas.sentencias += 1
+    metricas.por_sentencia[normalizar_sentencia(statement)] += 1
+    # Solo sentencias que devuelven filas; rowcount de SELECT depende del driver (PyMySQL sí lo reporta)
+    if cursor.description is not None and cursor.rowcount > 0:
+        metricas.filas += cursor.rowcount
 
-            return response
 
+def _server_timing(metricas: MetricasPeticion, app_segundos: float) -> bytes:
+    return (
+        f'app;dur={app_segundos * 1000:.1f}, '
+        f'db;dur={metricas.db_segundos * 1000:.1f};desc="{metricas.sentencias} sentencias, {metricas.filas} filas"'
+    ).encode("latin-1")
+
+
+class LoggingMiddleware:
+    """
+    Middleware que registra información de cada petición HTTP
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        metricas = MetricasPeticion()
+        token = _metricas_actuales.set(metricas)
+        status_code = 500
+
+        async def send_con_metricas(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(process_time).encode("latin-1")))
+                if settings.TELEMETRIA_SERVER_TIMING:
+                    headers.append((b"server-timing", _server_timing(metricas, process_time)))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                metricas.bytes_respuesta += len(message.get("body", b""))
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_con_metricas)
         except Exception as e:
-            # Log de error
-            process_time = time.time() - start_time
-            logger.error(f"✗ {method} {url} - Error: {str(e)} - " f"Time: {process_time:.3f}s")
+            error = str(e)
             raise
+        finally:
+            _metricas_actuales.reset(token)
+            self._registrar(scope, metricas, status_code, time.perf_counter() - start_time, error)
+
+    @staticmethod
+    def _registrar(scope, metricas: MetricasPeticion, status_code: int, process_time: float, error) -> None:
+        """Una línea JSON por petición; 4xx/5xx en WARNING/ERROR para que destaquen en logs."""
+        route = scope.get("route")
+        client = scope.get("client")
+        registro = {
+            "evento": "peticion",
+            "metodo": scope["method"],
+            "ruta": scope["path"],
+            "endpoint": getattr(route, "path", None),
+            "cliente": client[0] if client else "unknown",
+            "status": status_code,
+            "duracion_ms": round(process_time * 1000, 1),
+            "db_sentencias": metricas.sentencias,
+            "db_ms": round(metricas.db_segundos * 1000, 1),
+            "db_filas": metricas.filas,
+            "bytes_respuesta": metricas.bytes_respuesta,
+        }
+        sospechas = metricas.sospechas_n_mas_uno(settings.TELEMETRIA_N_MAS_UNO_UMBRAL)
+        if sospechas:
+            registro["n_mas_uno"] = sospechas
+        if error is not None:
+            registro["error"] = error
+
+        msg = json.dumps(registro, ensure_ascii=False)
+        if error is not None or status_code >= 500:
+            logger.error(msg)
+        elif status_code >= 400 or sospechas:
+            logger.warning(msg)
+        else:
+            logger.info(msg)
@@ -31,6 +31,7 @@ from .caja_alerta import CajaAlerta
 
 # Caja y gastos
 from .caja_turno import CajaTurno
+from .caja_turno_total import CajaTurnoTotal
 from .cancelacion_producto import CancelacionProducto
 
 # Órdenes de compra
@@ -39,6 +40,7 @@ from .categoria_repuesto import CategoriaRepuesto
 from .cita import Cita, EstadoCita, TipoCita
 from .cita_estado_historial import CitaEstadoHistorial
 from .cliente import Cliente
+from .contador_operativo import ContadorOperativo
 from .cuenta_pagar_manual import CuentaPagarManual, PagoCuentaPagarManual
 from .detalle_venta import DetalleVenta
 from .estante import Estante
@@ -46,6 +48,7 @@ from .fila import Fila
 from .gasto_operativo import GastoOperativo
 from .movimiento_inventario import MovimientoInventario, TipoMovimiento
 from .nivel import Nivel
+from .notificacion_saliente import NotificacionSaliente
 from .orden_compra import DetalleOrdenCompra, OrdenCompra
 from .pago import Pago
 from .pago_orden_compra import PagoOrdenCompra
@@ -58,3 +61,4 @@ from .usuario import Usuario
 from .usuario_bodega import UsuarioBodega
 from .vehiculo import Vehiculo
 from .venta import Venta
+from .venta_utilidad import VentaUtilidad
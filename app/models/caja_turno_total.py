@@ -0,0 +1,33 @@
+"""
+Totales acumulados por turno de caja (una fila por turno).
+
+Se actualizan en la misma transacción que cada cobro, gasto y pago a proveedor o cuenta
+manual del turno (app/services/caja_totales_service.py); corte, cierre e histórico los leen
+en lugar de sumar Pago / GastoOperativo / PagoOrdenCompra. El auditor los recalcula desde
+las filas originales (scripts/auditar_totales_caja.py).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class CajaTurnoTotal(Base):
+    __tablename__ = "caja_turno_totales"
+
+    id_turno = Column(Integer, ForeignKey("caja_turnos.id_turno", ondelete="CASCADE"), primary_key=True)
+
+    # Cobros (Pago) por método
+    cobros_efectivo = Column(Numeric(12, 2), nullable=False, default=0)
+    cobros_tarjeta = Column(Numeric(12, 2), nullable=False, default=0)
+    cobros_transferencia = Column(Numeric(12, 2), nullable=False, default=0)
+    cantidad_cobros = Column(Integer, nullable=False, default=0)
+
+    # Egresos que salen del efectivo del turno
+    gastos = Column(Numeric(12, 2), nullable=False, default=0)  # GastoOperativo (todos salen de caja)
+    pagos_proveedor_efectivo = Column(Numeric(12, 2), nullable=False, default=0)
+    pagos_cuentas_manuales_efectivo = Column(Numeric(12, 2), nullable=False, default=0)
+
+    version = Column(Integer, nullable=False, default=1)
+    actualizado_en = Column(DateTime, server_default=func.now(), nullable=True)
@@ -3,7 +3,7 @@
 import datetime
 import enum
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
@@ -27,6 +27,7 @@ class EstadoCita(str, enum.Enum):
 
 class Cita(Base):
     __tablename__ = "citas"
+    __table_args__ = (Index("ix_citas_estado_fecha_hora", "estado", "fecha_hora"),)  # Bandejas y agenda por estado
 
     id_cita = Column(Integer, primary_key=True, index=True, autoincrement=True)
     id_cliente = Column(Integer, ForeignKey("clientes.id_cliente"), nullable=False, index=True)
@@ -0,0 +1,22 @@
+"""
+Contadores operativos precalculados para el fast path A0 (incluir_items=false).
+
+Una fila por (clave, ámbito): ámbito 0 = todo el taller; ámbito = id_usuario para los
+contadores de OT por técnico. Cada cambio sube `version`. Se mantienen por eventos de
+dominio y un reconciliador los recalcula desde cero (app/services/contadores_operativos_service.py).
+"""
+
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ContadorOperativo(Base):
+    __tablename__ = "contadores_operativos"
+
+    clave = Column(String(64), primary_key=True)  # Métrica A0 (p. ej. ot_pendientes_cobro)
+    ambito = Column(Integer, primary_key=True, default=0)  # 0 = global; id_usuario = por técnico
+    valor = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=1)
+    actualizado_en = Column(DateTime, server_default=func.now(), nullable=True)
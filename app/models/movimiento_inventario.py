@@ -1,7 +1,7 @@
 import datetime
 import enum
 
-from sqlalchemy import DECIMAL, TIMESTAMP, Column, Date, Enum, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import DECIMAL, TIMESTAMP, Column, Date, Enum, ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -17,6 +17,12 @@ class TipoMovimiento(str, enum.Enum):
 
 class MovimientoInventario(Base):
     __tablename__ = "movimientos_inventario"
+    __table_args__ = (
+        Index("ix_movimientos_inventario_repuesto_fecha", "id_repuesto", "fecha_movimiento"),  # Kardex
+        Index("ix_movimientos_inventario_referencia_tipo", "referencia", "tipo_movimiento"),  # Salidas por OT
+        Index("ix_movimientos_inventario_venta_tipo", "id_venta", "tipo_movimiento"),  # Salidas por venta
+        Index("ix_movimientos_inventario_tipo_fecha", "tipo_movimiento", "fecha_movimiento"),  # Listados/devoluciones
+    )
 
     id_movimiento = Column(Integer, primary_key=True, index=True)
 
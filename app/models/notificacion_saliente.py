@@ -0,0 +1,50 @@
+"""
+Notificaciones salientes (outbox de email / WhatsApp).
+
+Se insertan en la misma transacción que el hecho que las origina (orden enviada, token de
+recuperación, cita creada) y las envía el despachador de app/services/notificaciones_service.py
+fuera de la petición, con reintentos. clave_idempotencia evita encolar dos veces el mismo aviso.
+"""
+
+import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.database import Base
+
+CANAL_EMAIL = "EMAIL"
+CANAL_WHATSAPP = "WHATSAPP"
+
+ESTADO_PENDIENTE = "PENDIENTE"
+ESTADO_ENVIANDO = "ENVIANDO"
+ESTADO_ENVIADA = "ENVIADA"
+ESTADO_FALLIDA = "FALLIDA"
+
+
+class NotificacionSaliente(Base):
+    __tablename__ = "notificaciones_salientes"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    clave_idempotencia = Column(String(120), nullable=False, unique=True)
+
+    canal = Column(String(20), nullable=False)  # EMAIL, WHATSAPP
+    destino = Column(String(255), nullable=False)  # email o teléfono
+    asunto = Column(String(255), nullable=True)  # email: subject; WhatsApp: nombre de plantilla
+    contenido = Column(Text, nullable=False)  # JSON: {"cuerpo"} o {"parametros"}
+
+    # PENDIENTE → ENVIANDO → ENVIADA | FALLIDA (o PENDIENTE otra vez si el error es reintentable)
+    estado = Column(String(20), nullable=False, default=ESTADO_PENDIENTE)
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False)
+    # PENDIENTE: cuándo intentar; ENVIANDO: hasta cuándo es del despachador que la tomó
+    proximo_intento_en = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    ultimo_error = Column(String(500), nullable=True)
+
+    referencia_tipo = Column(String(40), nullable=True)  # ORDEN_COMPRA, CITA, PASSWORD_RESET
+    referencia_id = Column(Integer, nullable=True)
+    id_usuario = Column(Integer, ForeignKey("usuarios.id_usuario", ondelete="SET NULL"), nullable=True)
+
+    creado_en = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    enviado_en = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_notificaciones_salientes_estado_proximo", "estado", "proximo_intento_en"),)
@@ -1,12 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import DECIMAL, TIMESTAMP, Column, Enum, ForeignKey, Integer, String
+from sqlalchemy import DECIMAL, TIMESTAMP, Column, Enum, ForeignKey, Index, Integer, String
 
 from app.database import Base
 
 
 class Pago(Base):
     __tablename__ = "pagos"
+    __table_args__ = (
+        Index("ix_pagos_venta_monto", "id_venta", "monto"),  # Total pagado por venta (cubre SUM(monto))
+        Index("ix_pagos_turno_metodo", "id_turno", "metodo"),  # Cobros del turno por método
+        Index("ix_pagos_fecha", "fecha"),  # Reportes de ingresos por rango
+    )
 
     id_pago = Column(Integer, primary_key=True, index=True)
 
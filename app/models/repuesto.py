@@ -1,9 +1,10 @@
 import datetime
 
 from sqlalchemy import DECIMAL, TIMESTAMP, Boolean, Column, ForeignKey, Integer, Numeric, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from app.database import Base
+from app.utils.codigo_repuesto import normalizar_codigo_repuesto
 
 
 class Repuesto(Base):
@@ -11,6 +12,8 @@ class Repuesto(Base):
 
     id_repuesto = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(50), unique=True, nullable=False, index=True)
+    # Forma normalizada del código (ver app.utils.codigo_repuesto); se asigna al escribir codigo
+    codigo_normalizado = Column(String(50), nullable=True, index=True)
     nombre = Column(String(200), nullable=False)
     descripcion = Column(Text)
 
@@ -67,6 +70,11 @@ class Repuesto(Base):
     detalles_orden = relationship("DetalleRepuestoOrden", back_populates="repuesto")
     compatibilidades = relationship("RepuestoCompatibilidad", back_populates="repuesto", cascade="all, delete-orphan")
 
+    @validates("codigo")
+    def _sincronizar_codigo_normalizado(self, key, codigo):
+        self.codigo_normalizado = normalizar_codigo_repuesto(codigo) or None
+        return codigo
+
     @property
     def categoria_nombre(self):
         return self.categoria.nombre if self.categoria else ""
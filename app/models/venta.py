@@ -1,12 +1,23 @@
 import datetime
 
-from sqlalchemy import DECIMAL, TIMESTAMP, Boolean, Column, DateTime, Enum, ForeignKey, Integer, Text
+from sqlalchemy import DECIMAL, TIMESTAMP, Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, Text
 
 from app.database import Base
 
+# Equivale a estado != "CANCELADA" pero permite usar ix_ventas_estado_fecha
+ESTADOS_VENTA_ACTIVA = ("PAGADA", "PENDIENTE")
+
 
 class Venta(Base):
     __tablename__ = "ventas"
+    __table_args__ = (
+        Index("ix_ventas_estado_fecha", "estado", "fecha"),  # Listados y bandejas por estado
+        Index("ix_ventas_fecha", "fecha"),  # Reportes por rango (utilidad, dashboard)
+        Index("ix_ventas_orden_estado", "id_orden", "estado"),  # Venta activa por OT (bandejas A0)
+        Index("ix_ventas_cliente_fecha", "id_cliente", "fecha"),  # Historial de cliente
+        Index("ix_ventas_vehiculo_fecha", "id_vehiculo", "fecha"),  # Historial de vehículo
+        Index("ix_ventas_estado_saldo", "estado", "saldo"),  # Cuentas por cobrar (saldo > 0 por estado)
+    )
 
     id_venta = Column(Integer, primary_key=True, index=True)
     id_cliente = Column(Integer, ForeignKey("clientes.id_cliente"), nullable=True)
@@ -17,6 +28,9 @@ class Venta(Base):
     )  # Comisiones: quien cobra por la venta
     fecha = Column(TIMESTAMP, default=datetime.datetime.utcnow)
     total = Column(DECIMAL(10, 2), nullable=False)
+    # Materializados por app/services/saldos_venta_service.py (misma transacción que cada Pago)
+    total_pagado = Column(DECIMAL(10, 2), nullable=False, default=0, server_default="0")
+    saldo = Column(DECIMAL(10, 2), nullable=False, default=0, server_default="0")  # max(0, total - total_pagado)
     estado = Column(Enum("PAGADA", "PENDIENTE", "CANCELADA"), default="PENDIENTE")
     requiere_factura = Column(Boolean, default=False, nullable=True)  # Si aplica 8% IVA
     motivo_cancelacion = Column(Text, nullable=True)
@@ -0,0 +1,22 @@
+"""
+Libro de costos por venta para el reporte de utilidad.
+
+Una fila por venta con el costo de refacciones (CMV) y la pérdida por merma al cancelar.
+Ingresos, fecha y estado se leen de ventas; así el reporte es un solo SELECT agregado
+sobre el rango de fechas, sin recorrer movimientos de inventario por venta.
+Se mantiene en app/services/utilidad_ventas_service.py.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class VentaUtilidad(Base):
+    __tablename__ = "ventas_utilidad"
+
+    id_venta = Column(Integer, ForeignKey("ventas.id_venta", ondelete="CASCADE"), primary_key=True)
+    costo = Column(Numeric(12, 2), nullable=False, default=0)  # Salidas de inventario atribuidas a la venta
+    perdidas_mer = Column(Numeric(12, 2), nullable=False, default=0)  # Merma registrada al cancelar
+    actualizado_en = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=True)
@@ -7,12 +7,12 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.auditoria import Auditoria
 from app.utils.fechas import condiciones_rango_taller, isoformat_utc
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 
 router = APIRouter(prefix="/auditoria", tags=["Auditoría"])
@@ -40,12 +40,15 @@ def listar_auditoria(
     id_usuario: Optional[int] = Query(None, description="Filtrar por usuario"),
     skip: int = Query(0, ge=0, description="Registros a saltar (paginación)"),
     limit: int = Query(50, ge=1, le=500, description="Registros por página"),
+    cursor: Optional[str] = Query(
+        None, description="Paginación keyset: vacío = primera página, luego siguiente_cursor"
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
     """
     Lista registros de auditoría (acciones de usuarios sobre módulos).
-    Solo ADMIN o CAJA. Soporta paginación con skip/limit.
+    Solo ADMIN o CAJA. Soporta paginación con skip/limit o keyset con ?cursor=.
     """
     query = db.query(Auditoria)
     for cond in condiciones_rango_taller(Auditoria.fecha, fecha_desde, fecha_hasta):
@@ -54,10 +57,15 @@ def listar_auditoria(
         query = query.filter(Auditoria.modulo.ilike(f"%{modulo}%"))
     if id_usuario:
         query = query.filter(Auditoria.id_usuario == id_usuario)
-    total = query.count()
-    registros = query.order_by(desc(Auditoria.fecha)).offset(skip).limit(limit).all()
+    pagina = paginar(
+        query,
+        [(Auditoria.fecha, True), (Auditoria.id_auditoria, True)],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
     items = []
-    for r in registros:
+    for r in pagina.items:
         u = r.usuario if hasattr(r, "usuario") and r.usuario else None
         datos = _parse_descripcion(r.descripcion)
         item = {
@@ -73,10 +81,4 @@ def listar_auditoria(
         if datos is not None:
             item["datos"] = datos
         items.append(item)
-    return {
-        "registros": items,
-        "total": total,
-        "pagina": skip // limit + 1 if limit > 0 else 1,
-        "total_paginas": (total + limit - 1) // limit if limit > 0 else 1,
-        "limit": limit,
-    }
+    return pagina.respuesta("registros", skip, limit, cursor, items)
@@ -1,5 +1,5 @@
+import logging
 import secrets
-import threading
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -12,11 +12,14 @@ from app.database import get_db
 from app.models.password_reset_token import PasswordResetToken
 from app.models.usuario import Usuario
 from app.schemas.auth import TokenResponse
-from app.services.email_service import enviar_email_simple
+from app.services.email_service import email_esta_configurado
+from app.services.notificaciones_service import encolar_email
+from app.utils.cache_usuarios import invalidar_usuario
 from app.utils.jwt import create_access_token
 from app.utils.security import hash_password, verify_password
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
+logger = logging.getLogger(__name__)
 
 
 class RegistroBody(BaseModel):
@@ -87,7 +90,7 @@ class OlvideContrasenaBody(BaseModel):
 def olvide_contrasena(body: OlvideContrasenaBody, db: Session = Depends(get_db)):
     """
     Solicita recuperación de contraseña. Si el email existe y el correo está configurado,
-    envía un link. Siempre devuelve éxito para no revelar si el email está registrado.
+    encola el email con el link. Siempre devuelve éxito para no revelar si el email está registrado.
     """
     email = body.email.strip().lower()
     usuario = db.query(Usuario).filter(Usuario.email == email).first()
@@ -101,7 +104,7 @@ def olvide_contrasena(body: OlvideContrasenaBody, db: Session = Depends(get_db))
     expira = datetime.utcnow() + timedelta(hours=1)
     pr = PasswordResetToken(email=email, token=token, expira_en=expira)
     db.add(pr)
-    db.commit()
+    db.flush()
 
     base_url = settings.APP_PUBLIC_URL.rstrip("/")
     link = f"{base_url}/restablecer-contrasena?token={token}"
@@ -121,20 +124,12 @@ Saludos,
 Medina AutoDiag
 """
 
-    def _enviar_en_background():
-        import logging
-
-        log = logging.getLogger(__name__)
-        try:
-            ok, err = enviar_email_simple(email, subject, cuerpo)
-            if not ok:
-                log.warning(f"Recuperacion contrasena: email no enviado a {email}: {err}")
-            else:
-                log.info(f"Recuperacion contrasena: email enviado a {email}")
-        except Exception as e:
-            log.exception(f"Recuperacion contrasena: error al enviar email: {e}")
-
-    threading.Thread(target=_enviar_en_background, daemon=True).start()
+    # Se encola con el token (mismo commit); lo envía el despachador de notificaciones
+    if email_esta_configurado():
+        encolar_email(db, email, subject, cuerpo, clave=f"password_reset.{pr.id}", referencia_tipo="PASSWORD_RESET")
+    else:
+        logger.warning("Recuperacion contrasena: correo no configurado, no se envía el enlace")
+    db.commit()
     return {"mensaje": "Si el email está registrado, recibirás un enlace para restablecer tu contraseña."}
 
 
@@ -182,5 +177,6 @@ def restablecer_contrasena(body: RestablecerContrasenaBody, db: Session = Depend
     usuario.password_hash = hash_password(body.nueva_password)
     db.delete(pr)
     db.commit()
+    invalidar_usuario(usuario.id_usuario)
 
     return {"mensaje": "Contraseña actualizada. Ya puedes iniciar sesión."}
@@ -2,12 +2,12 @@ from datetime import date, datetime
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models.caja_alerta import CajaAlerta
 from app.models.caja_turno import CajaTurno
+from app.models.caja_turno_total import CajaTurnoTotal
 from app.models.gasto_operativo import GastoOperativo
 from app.models.pago import Pago
 from app.models.pago_orden_compra import PagoOrdenCompra
@@ -15,6 +15,7 @@ from app.schemas.caja_turno import TurnoAbrir, TurnoCerrar, TurnoOut
 from app.services.auditoria_service import registrar as registrar_auditoria
 from app.services.caja_alertas import generar_alerta_turno_largo
 from app.services.caja_service import cerrar_turno as cerrar_turno_service
+from app.services.caja_totales_service import TotalesTurno, leer_totales
 from app.utils.fechas import aplicar_filtro_rango_taller, isoformat_utc
 from app.utils.roles import require_roles
 
@@ -119,37 +120,17 @@ def corte_diario(
     if not turno:
         raise HTTPException(status_code=400, detail="No tienes un turno de caja abierto")
 
-    resultados = (
-        db.query(Pago.metodo, func.sum(Pago.monto).label("total"))
-        .filter(Pago.id_turno == turno.id_turno)
-        .group_by(Pago.metodo)
-        .all()
-    )
-
-    total_general = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_turno == turno.id_turno).scalar()
-
-    total_gastos = (
-        db.query(func.coalesce(func.sum(GastoOperativo.monto), 0))
-        .filter(GastoOperativo.id_turno == turno.id_turno)
-        .scalar()
-    )
-
-    total_pagos_proveedores = (
-        db.query(func.coalesce(func.sum(PagoOrdenCompra.monto), 0))
-        .filter(
-            PagoOrdenCompra.id_turno == turno.id_turno,
-            PagoOrdenCompra.metodo == "EFECTIVO",
-        )
-        .scalar()
-    )
+    totales = leer_totales(db, turno.id_turno)
 
     return {
         "fecha": fecha,
         "id_turno": turno.id_turno,
-        "totales_por_metodo": [{"metodo": metodo, "total": float(total)} for metodo, total in resultados],
-        "total_general": float(total_general),
-        "total_gastos": float(total_gastos),
-        "total_pagos_proveedores": float(total_pagos_proveedores),
+        "totales_por_metodo": totales.por_metodo(),
+        "total_general": float(totales.total_cobros),
+        "total_gastos": float(totales.gastos),
+        "total_pagos_proveedores": float(totales.pagos_proveedor_efectivo),
+        "total_pagos_cuentas_manuales": float(totales.pagos_cuentas_manuales_efectivo),
+        "efectivo_esperado": float(totales.efectivo_esperado(turno.monto_apertura)),
     }
 
 
@@ -160,10 +141,17 @@ def corte_diario(
 def historico_turnos(
     fecha_desde: str | None = Query(None, description="Fecha desde (YYYY-MM-DD)"),
     fecha_hasta: str | None = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
-    query = db.query(CajaTurno).filter(CajaTurno.estado == "CERRADO").options(joinedload(CajaTurno.usuario))
+    query = (
+        db.query(CajaTurno, CajaTurnoTotal)
+        .outerjoin(CajaTurnoTotal, CajaTurnoTotal.id_turno == CajaTurno.id_turno)
+        .filter(CajaTurno.estado == "CERRADO")
+        .options(joinedload(CajaTurno.usuario))
+    )
     fecha_desde_d = datetime.strptime(fecha_desde[:10], "%Y-%m-%d").date() if fecha_desde else None
     fecha_hasta_d = datetime.strptime(fecha_hasta[:10], "%Y-%m-%d").date() if fecha_hasta else None
     for cond in aplicar_filtro_rango_taller(CajaTurno.fecha_cierre, fecha_desde_d, fecha_hasta_d):
@@ -173,22 +161,27 @@ def historico_turnos(
     if rol == "CAJA":
         query = query.filter(CajaTurno.id_usuario == current_user.id_usuario)
 
-    turnos = query.order_by(CajaTurno.fecha_cierre.desc()).all()
+    filas = query.order_by(CajaTurno.fecha_cierre.desc(), CajaTurno.id_turno.desc()).offset(skip).limit(limit).all()
 
-    return [
-        {
-            "id_turno": t.id_turno,
-            "id_usuario": t.id_usuario,
-            "usuario_nombre": t.usuario.nombre if t.usuario else None,
-            "fecha_apertura": isoformat_utc(t.fecha_apertura),
-            "fecha_cierre": isoformat_utc(t.fecha_cierre),
-            "monto_apertura": float(t.monto_apertura),
-            "monto_cierre": float(t.monto_cierre),
-            "diferencia": float(t.diferencia) if t.diferencia is not None else None,
-            "estado": t.estado,
-        }
-        for t in turnos
-    ]
+    resultado = []
+    for t, fila_totales in filas:
+        totales = TotalesTurno.desde_fila(fila_totales) if fila_totales else None
+        resultado.append(
+            {
+                "id_turno": t.id_turno,
+                "id_usuario": t.id_usuario,
+                "usuario_nombre": t.usuario.nombre if t.usuario else None,
+                "fecha_apertura": isoformat_utc(t.fecha_apertura),
+                "fecha_cierre": isoformat_utc(t.fecha_cierre),
+                "monto_apertura": float(t.monto_apertura),
+                "monto_cierre": float(t.monto_cierre),
+                "diferencia": float(t.diferencia) if t.diferencia is not None else None,
+                "estado": t.estado,
+                "total_cobros": float(totales.total_cobros) if totales else None,
+                "efectivo_esperado": float(totales.efectivo_esperado(t.monto_apertura)) if totales else None,
+            }
+        )
+    return resultado
 
 
 # ======================================================
@@ -206,19 +199,7 @@ def detalle_turno(id_turno: int, db: Session = Depends(get_db), current_user=Dep
         raise HTTPException(status_code=403, detail="No tienes permiso para ver este turno")
 
     pagos = db.query(Pago).filter(Pago.id_turno == turno.id_turno).all()
-
-    totales = (
-        db.query(Pago.metodo, func.sum(Pago.monto).label("total"))
-        .filter(Pago.id_turno == turno.id_turno)
-        .group_by(Pago.metodo)
-        .all()
-    )
-
-    total_general = sum(float(p.monto) for p in pagos)
-
     gastos = db.query(GastoOperativo).filter(GastoOperativo.id_turno == turno.id_turno).all()
-    total_gastos = sum(float(g.monto) for g in gastos)
-
     pagos_proveedores = (
         db.query(PagoOrdenCompra)
         .filter(
@@ -228,10 +209,9 @@ def detalle_turno(id_turno: int, db: Session = Depends(get_db), current_user=Dep
         .order_by(PagoOrdenCompra.fecha.desc())
         .all()
     )
-    total_pagos_proveedores = sum(float(p.monto) for p in pagos_proveedores)
 
-    efectivo_ingresos = next((float(t) for m, t in totales if m == "EFECTIVO"), 0.0)
-    efectivo_esperado = float(turno.monto_apertura or 0) + efectivo_ingresos - total_pagos_proveedores - total_gastos
+    totales = leer_totales(db, turno.id_turno)
+    efectivo_esperado = float(totales.efectivo_esperado(turno.monto_apertura))
     diferencia = float(turno.diferencia) if turno.diferencia is not None else None
 
     return {
@@ -257,8 +237,8 @@ def detalle_turno(id_turno: int, db: Session = Depends(get_db), current_user=Dep
             }
             for p in pagos
         ],
-        "totales_por_metodo": [{"metodo": metodo, "total": float(total)} for metodo, total in totales],
-        "total_general": total_general,
+        "totales_por_metodo": totales.por_metodo(),
+        "total_general": float(totales.total_cobros),
         "gastos": [
             {
                 "id_gasto": g.id_gasto,
@@ -269,7 +249,7 @@ def detalle_turno(id_turno: int, db: Session = Depends(get_db), current_user=Dep
             }
             for g in gastos
         ],
-        "total_gastos": total_gastos,
+        "total_gastos": float(totales.gastos),
         "pagos_proveedores": [
             {
                 "id_pago": p.id_pago,
@@ -280,7 +260,8 @@ def detalle_turno(id_turno: int, db: Session = Depends(get_db), current_user=Dep
             }
             for p in pagos_proveedores
         ],
-        "total_pagos_proveedores": total_pagos_proveedores,
+        "total_pagos_proveedores": float(totales.pagos_proveedor_efectivo),
+        "total_pagos_cuentas_manuales": float(totales.pagos_cuentas_manuales_efectivo),
     }
 
 
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
+from app.config import settings
 from app.database import get_db
 from app.models.cita import Cita, EstadoCita, TipoCita
 from app.models.cliente import Cliente
@@ -27,6 +28,7 @@ from app.services.cita_estado_service import (
     registrar_auditoria_correccion,
     registrar_evento_creacion,
 )
+from app.services.notificaciones_service import encolar_whatsapp, notificacion_a_dict
 from app.services.recepcion_ot_service import (
     construir_motivo_desde_cita,
     crear_ot_minima_pendiente,
@@ -34,13 +36,14 @@ from app.services.recepcion_ot_service import (
     validar_cita_convertible,
     vincular_cita_a_orden,
 )
-from app.services.whatsapp_service import enviar_confirmacion_cita_whatsapp, whatsapp_esta_configurado
+from app.services.whatsapp_service import parametros_confirmacion_cita, whatsapp_esta_configurado
 from app.utils.fechas import (
     ahora_local,
     condiciones_rango_local_naive,
     isoformat_local_naive_taller,
     isoformat_utc,
 )
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 from app.utils.transaction import transaction
 
@@ -96,22 +99,27 @@ def listar_citas(
     fecha_desde: str | None = Query(None, description="YYYY-MM-DD"),
     fecha_hasta: str | None = Query(None, description="YYYY-MM-DD"),
     orden: str = Query("asc", description="asc = próximas primero, desc = más recientes"),
+    cursor: str | None = Query(None, description="Paginación keyset: vacío = primera página, luego siguiente_cursor"),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO", "CAJA")),
 ):
-    query = db.query(Cita).options(
-        joinedload(Cita.cliente),
-        joinedload(Cita.vehiculo),
-    )
+    query = db.query(Cita)
     if id_cliente:
         query = query.filter(Cita.id_cliente == id_cliente)
     if estado:
         query = query.filter(Cita.estado == estado)
     for cond in condiciones_rango_local_naive(Cita.fecha_hora, fecha_desde, fecha_hasta):
         query = query.filter(cond)
-    total = query.count()
-    order_col = Cita.fecha_hora.asc() if (orden or "asc").lower() == "asc" else Cita.fecha_hora.desc()
-    citas = query.order_by(order_col).offset(skip).limit(limit).all()
+    descendente = (orden or "asc").lower() != "asc"
+    pagina = paginar(
+        query,
+        [(Cita.fecha_hora, descendente), (Cita.id_cita, descendente)],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        opciones=(joinedload(Cita.cliente), joinedload(Cita.vehiculo)),
+    )
+    citas = pagina.items
     ahora = ahora_local()
     items = []
     for c in citas:
@@ -136,12 +144,7 @@ def listar_citas(
                 **flags_ligeros_estado(c, current_user.rol),
             }
         )
-    return {
-        "citas": items,
-        "total": total,
-        "pagina": skip // limit + 1 if limit > 0 else 1,
-        "total_paginas": (total + limit - 1) // limit if limit > 0 else 1,
-    }
+    return pagina.respuesta("citas", skip, limit, cursor, items)
 
 
 @router.get("/alertas")
@@ -331,35 +334,39 @@ def crear_cita(
     db.add(cita)
     db.flush()
     registrar_evento_creacion(db, cita, current_user.id_usuario)
-    db.commit()
-    db.refresh(cita)
-    est = cita.estado.value if hasattr(cita.estado, "value") else str(cita.estado)
     tip = cita.tipo.value if hasattr(cita.tipo, "value") else str(cita.tipo)
-    whatsapp_enviado = False
-    mensaje_whatsapp = None
+    # Confirmación por WhatsApp: se encola con la cita; la envía el despachador de notificaciones
+    notificacion = None
     if whatsapp_esta_configurado() and cita.fecha_hora and cliente.telefono and str(cliente.telefono).strip():
         fh = cita.fecha_hora
-        fecha_txt = fh.strftime("%d/%m/%Y")
-        hora_txt = fh.strftime("%H:%M")
         motivo_txt = (cita.motivo or "").strip() or tip.replace("_", " ")
-        w_ok, w_err = enviar_confirmacion_cita_whatsapp(
-            telefono=cliente.telefono,
-            nombre_cliente=cliente.nombre or "",
-            fecha_txt=fecha_txt,
-            hora_txt=hora_txt,
-            motivo_o_servicio=motivo_txt,
+        notificacion = encolar_whatsapp(
+            db,
+            cliente.telefono,
+            settings.WHATSAPP_TEMPLATE_CONFIRMACION_CITA,
+            parametros_confirmacion_cita(
+                nombre_cliente=cliente.nombre or "",
+                fecha_txt=fh.strftime("%d/%m/%Y"),
+                hora_txt=fh.strftime("%H:%M"),
+                motivo_o_servicio=motivo_txt,
+            ),
+            clave=f"cita.{cita.id_cita}.confirmacion.whatsapp",
+            referencia_tipo="CITA",
+            referencia_id=cita.id_cita,
+            id_usuario=current_user.id_usuario,
         )
-        whatsapp_enviado = w_ok
-        mensaje_whatsapp = None if w_ok else w_err
+    db.commit()
+    db.refresh(cita)
+    est = cita.estado.value if hasattr(cita.estado, "value") else str(cita.estado)
     out = {
         "id_cita": cita.id_cita,
         "fecha_hora": isoformat_local_naive_taller(cita.fecha_hora),
         "tipo": tip,
         "estado": est,
-        "whatsapp_enviado": whatsapp_enviado,
+        "whatsapp_encolado": notificacion is not None,
     }
-    if mensaje_whatsapp:
-        out["mensaje_whatsapp"] = mensaje_whatsapp
+    if notificacion is not None:
+        out["notificacion_whatsapp"] = notificacion_a_dict(notificacion)
     return out
 
 
@@ -2,18 +2,23 @@ import json
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.cita import Cita
 from app.models.cliente import Cliente
 from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
 from app.models.registro_eliminacion_cliente import RegistroEliminacionCliente
 from app.models.vehiculo import Vehiculo
 from app.models.venta import Venta
 from app.schemas.cliente import ClienteCreate, ClienteOut, ClienteUpdate
+from app.services.historial_service import (
+    LIMITE_SECCION,
+    SECCIONES_CLIENTE,
+    armar_secciones,
+    resumen_cliente,
+    seccion_cliente,
+)
 from app.utils.cliente_telefono import buscar_cliente_por_telefono, normalizar_telefono
 from app.utils.roles import require_roles
 
@@ -116,29 +121,23 @@ def verificar_telefono_cliente(
 
 @router.get("/{id_cliente}/historial")
 def obtener_historial_cliente(
-    id_cliente: int, db: Session = Depends(get_db), current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO"))
+    id_cliente: int,
+    limit: int = Query(LIMITE_SECCION, ge=1, le=100, description="Elementos por sección"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO")),
 ):
+    """
+    Historial 360: resumen agregado (ventas, pagado, saldo, conteos) y la primera página de cada
+    sección. `paginacion[seccion].siguiente_cursor` se usa con /historial/{seccion} para cargar más.
+    """
     cliente = db.query(Cliente).filter(Cliente.id_cliente == id_cliente).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    vehiculos = db.query(Vehiculo).filter(Vehiculo.id_cliente == id_cliente).all()
-    ventas = db.query(Venta).filter(Venta.id_cliente == id_cliente).all()
-    ordenes = (
-        db.query(OrdenTrabajo)
-        .options(joinedload(OrdenTrabajo.vehiculo))
-        .filter(OrdenTrabajo.cliente_id == id_cliente)
-        .order_by(OrdenTrabajo.fecha_ingreso.desc())
-        .all()
-    )
-    citas = db.query(Cita).filter(Cita.id_cliente == id_cliente).order_by(Cita.fecha_hora.desc()).limit(50).all()
-
-    total_ventas = sum(float(v.total) for v in ventas)
-    total_pagado_ventas = {}
-    for v in ventas:
-        pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        total_pagado_ventas[v.id_venta] = float(pagado or 0)
-
+    resumen = resumen_cliente(db, id_cliente)
+    secciones = {
+        seccion: seccion_cliente(db, id_cliente, seccion, limit, con_total=False) for seccion in SECCIONES_CLIENTE
+    }
     return {
         "cliente": {
             "id_cliente": cliente.id_cliente,
@@ -148,50 +147,29 @@ def obtener_historial_cliente(
             "direccion": cliente.direccion,
             "rfc": getattr(cliente, "rfc", None),
         },
-        "resumen": {
-            "cantidad_ventas": len(ventas),
-            "total_ventas": total_ventas,
-            "cantidad_ordenes": len(ordenes),
-            "cantidad_citas": len(citas),
-            "cantidad_vehiculos": len(vehiculos),
-        },
-        "vehiculos": [
-            {"id_vehiculo": v.id_vehiculo, "marca": v.marca, "modelo": v.modelo, "anio": v.anio, "vin": v.vin}
-            for v in vehiculos
-        ],
-        "ventas": [
-            {
-                "id_venta": v.id_venta,
-                "fecha": v.fecha.isoformat() if v.fecha else None,
-                "total": float(v.total),
-                "total_pagado": total_pagado_ventas.get(v.id_venta, 0),
-                "estado": v.estado.value if hasattr(v.estado, "value") else str(v.estado),
-            }
-            for v in ventas
-        ],
-        "ordenes_trabajo": [
-            {
-                "id": o.id,
-                "numero_orden": o.numero_orden,
-                "vehiculo": f"{o.vehiculo.marca} {o.vehiculo.modelo}" if o.vehiculo else None,
-                "estado": o.estado.value if hasattr(o.estado, "value") else str(o.estado),
-                "total": float(o.total),
-            }
-            for o in ordenes
-        ],
-        "citas": [
-            {
-                "id_cita": c.id_cita,
-                "fecha_hora": c.fecha_hora.isoformat() if c.fecha_hora else None,
-                "tipo": c.tipo.value if hasattr(c.tipo, "value") else str(c.tipo),
-                "estado": c.estado.value if hasattr(c.estado, "value") else str(c.estado),
-                "motivo": c.motivo,
-            }
-            for c in citas
-        ],
+        "resumen": resumen,
+        **armar_secciones(resumen, secciones),
     }
 
 
+@router.get("/{id_cliente}/historial/{seccion}")
+def obtener_seccion_historial_cliente(
+    id_cliente: int,
+    seccion: str,
+    limit: int = Query(LIMITE_SECCION, ge=1, le=100),
+    cursor: str = Query("", description="siguiente_cursor de la página anterior (vacío = primera página)"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO")),
+):
+    """Carga incremental de una sección del historial del cliente (keyset)."""
+    if seccion not in SECCIONES_CLIENTE:
+        raise HTTPException(status_code=404, detail="Sección de historial no válida")
+    if not db.query(Cliente.id_cliente).filter(Cliente.id_cliente == id_cliente).first():
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    pagina = seccion_cliente(db, id_cliente, seccion, limit, cursor)
+    return pagina.respuesta(seccion, 0, limit, cursor)
+
+
 @router.get("/{id_cliente}", response_model=ClienteOut)
 def obtener_cliente(
     id_cliente: int,
@@ -7,15 +7,12 @@ from __future__ import annotations
 import math
 from datetime import date, datetime
 from decimal import Decimal
-from io import BytesIO
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, joinedload
 
-from app.config import settings
 from app.database import get_db
 from app.models.cliente import Cliente
 from app.models.cotizacion_refaccion_especial import (
@@ -44,12 +41,10 @@ from app.schemas.cotizacion_refaccion import (
     OpcionCreate,
     OpcionUpdate,
 )
-from app.services.cotizacion_refaccion_calculo import (
-    costo_unitario_mxn_opcion,
-    ganancia_estimada,
-    precio_sugerido_con_iva,
-)
-from app.services.cotizacion_refaccion_pdf import generar_pdf_cotizacion_refaccion
+from app.services.cotizacion_refaccion_detalle import cargar_cotizacion, cotizacion_a_detalle
+from app.services.cotizacion_refaccion_pdf import preparar_pdf_cotizacion_refaccion
+from app.utils.cache_pdf import respuesta_pdf
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 
 router = APIRouter(prefix="/cotizaciones-refaccion", tags=["Cotizaciones refacción especial"])
@@ -75,191 +70,11 @@ def _generar_numero(db: Session) -> str:
     return prefix + str(suf).zfill(4)
 
 
-def _margen_decimal(cot: CotizacionRefaccionEspecial) -> Optional[Decimal]:
-    if cot.margen_objetivo_pct is None:
-        return None
-    return Decimal(str(cot.margen_objetivo_pct))
-
-
-def _tc_cot_decimal(cot: CotizacionRefaccionEspecial) -> Optional[Decimal]:
-    if cot.tc_referencia_usd_mxn is None:
-        return None
-    return Decimal(str(cot.tc_referencia_usd_mxn))
-
-
-def _serialize_opcion(
-    opcion: OpcionCompraLineaCotizacion,
-    linea: LineaCotizacionRefaccion,
-    cot: CotizacionRefaccionEspecial,
-) -> dict[str, Any]:
-    tc_cot = _tc_cot_decimal(cot)
-    margen = _margen_decimal(cot)
-    cant = Decimal(str(linea.cantidad or 1))
-    d: dict[str, Any] = {
-        "id": opcion.id,
-        "id_linea": opcion.id_linea,
-        "origen_nombre": opcion.origen_nombre,
-        "url_compra": opcion.url_compra,
-        "moneda": opcion.moneda.value if hasattr(opcion.moneda, "value") else str(opcion.moneda),
-        "monto_unitario": Decimal(str(opcion.monto_unitario)),
-        "tipo_cambio_a_mxn": Decimal(str(opcion.tipo_cambio_a_mxn)) if opcion.tipo_cambio_a_mxn is not None else None,
-        "otros_costos_mxn": Decimal(str(opcion.otros_costos_mxn or 0)),
-        "dias_estimados_entrega": opcion.dias_estimados_entrega,
-        "notas": opcion.notas,
-        "es_preferida": bool(opcion.es_preferida),
-        "costo_unitario_mxn": None,
-        "precio_sugerido_linea": None,
-        "ganancia_estimada_linea": None,
-        "costo_error": None,
-    }
-    try:
-        cu = costo_unitario_mxn_opcion(opcion, tc_cot)
-        d["costo_unitario_mxn"] = cu.quantize(Decimal("0.01"))
-        ps = precio_sugerido_con_iva(cu, cant, margen, Decimal(str(settings.IVA_PORCENTAJE)))
-        d["precio_sugerido_linea"] = ps
-        d["ganancia_estimada_linea"] = ganancia_estimada(ps, cu, cant)
-    except ValueError as e:
-        d["costo_error"] = str(e)
-    return d
-
-
-def _serialize_linea(linea: LineaCotizacionRefaccion, cot: CotizacionRefaccionEspecial) -> dict[str, Any]:
-    opciones = sorted(linea.opciones or [], key=lambda o: o.id)
-    return {
-        "id": linea.id,
-        "id_cotizacion": linea.id_cotizacion,
-        "n_linea": linea.n_linea,
-        "descripcion": linea.descripcion,
-        "cantidad": Decimal(str(linea.cantidad)),
-        "posicion_lado": linea.posicion_lado,
-        "observaciones": linea.observaciones,
-        "opciones": [_serialize_opcion(o, linea, cot) for o in opciones],
-    }
-
-
-def _totales_cotizacion(cot: CotizacionRefaccionEspecial) -> dict[str, Any]:
-    precio_total = Decimal("0")
-    costo_total = Decimal("0")
-    ganancia_total = Decimal("0")
-    lineas_detail: List[dict] = []
-    for ln in sorted(cot.lineas or [], key=lambda x: x.n_linea):
-        pref = [o for o in (ln.opciones or []) if o.es_preferida]
-        op_usar = pref[0] if len(pref) == 1 else (pref[0] if pref else None)
-        if not op_usar and ln.opciones:
-            op_usar = sorted(ln.opciones, key=lambda x: x.id)[0]
-        if not op_usar:
-            lineas_detail.append({"id_linea": ln.id, "subtotal_precio_sugerido": None, "costo_error": "Sin opciones"})
-            continue
-        ser = _serialize_opcion(op_usar, ln, cot)
-        ps = ser.get("precio_sugerido_linea")
-        cu = ser.get("costo_unitario_mxn")
-        ge = ser.get("ganancia_estimada_linea")
-        err = ser.get("costo_error")
-        if err:
-            lineas_detail.append({"id_linea": ln.id, "subtotal_precio_sugerido": None, "costo_error": err})
-            continue
-        if ps is not None:
-            precio_total += ps
-        if cu is not None:
-            cant = Decimal(str(ln.cantidad or 1))
-            costo_total += cu * cant
-        if ge is not None:
-            ganancia_total += ge
-        lineas_detail.append(
-            {
-                "id_linea": ln.id,
-                "subtotal_precio_sugerido": ps,
-                "ganancia_estimada_linea": ge,
-            }
-        )
-    return {
-        "precio_sugerido_total": precio_total.quantize(Decimal("0.01")),
-        "costo_estimado_total_mxn": costo_total.quantize(Decimal("0.01")),
-        "ganancia_estimada_total": ganancia_total.quantize(Decimal("0.01")),
-        "lineas": lineas_detail,
-    }
-
-
-def _cotizacion_to_detail(db: Session, cot: CotizacionRefaccionEspecial) -> dict[str, Any]:
-    cli = db.query(Cliente).filter(Cliente.id_cliente == cot.id_cliente).first()
-    cre = db.query(Usuario).filter(Usuario.id_usuario == cot.id_usuario_creo).first()
-    veh_txt = None
-    if cot.id_vehiculo:
-        v = db.query(Vehiculo).filter(Vehiculo.id_vehiculo == cot.id_vehiculo).first()
-        if v:
-            veh_txt = (
-                " ".join(
-                    filter(
-                        None,
-                        [
-                            getattr(v, "marca", None) or "",
-                            getattr(v, "modelo", None) or "",
-                            str(getattr(v, "anio", "") or ""),
-                        ],
-                    )
-                ).strip()
-                or None
-            )
-
-    comentarios_out: List[dict] = []
-    for c in sorted(cot.comentarios or [], key=lambda x: x.creado_en or datetime.min):
-        u = db.query(Usuario).filter(Usuario.id_usuario == c.id_usuario).first()
-        comentarios_out.append(
-            {
-                "id": c.id,
-                "id_cotizacion": c.id_cotizacion,
-                "id_usuario": c.id_usuario,
-                "usuario_nombre": u.nombre if u else None,
-                "mensaje": c.mensaje,
-                "creado_en": c.creado_en,
-            }
-        )
-
-    compras_out: List[dict] = []
-    for cp in sorted(cot.compras_ejecutadas or [], key=lambda x: x.fecha_pago or datetime.min):
-        compras_out.append(
-            {
-                "id": cp.id,
-                "id_cotizacion": cp.id_cotizacion,
-                "id_linea": cp.id_linea,
-                "id_opcion": cp.id_opcion,
-                "monto_pagado": cp.monto_pagado,
-                "moneda": cp.moneda.value if hasattr(cp.moneda, "value") else str(cp.moneda),
-                "tipo_cambio_aplicado": cp.tipo_cambio_aplicado,
-                "metodo": cp.metodo.value if hasattr(cp.metodo, "value") else str(cp.metodo),
-                "comprobante_url": cp.comprobante_url,
-                "notas": cp.notas,
-                "fecha_pago": cp.fecha_pago,
-                "id_usuario_registro": cp.id_usuario_registro,
-            }
-        )
-
-    lineas_out = [_serialize_linea(ln, cot) for ln in sorted(cot.lineas or [], key=lambda x: x.n_linea)]
-
-    return {
-        "id": cot.id,
-        "numero": cot.numero,
-        "id_cliente": cot.id_cliente,
-        "cliente_nombre": cli.nombre if cli else None,
-        "id_vehiculo": cot.id_vehiculo,
-        "vehiculo_texto": veh_txt,
-        "id_orden_trabajo": cot.id_orden_trabajo,
-        "id_usuario_creo": cot.id_usuario_creo,
-        "creador_nombre": cre.nombre if cre else None,
-        "estado": cot.estado.value if hasattr(cot.estado, "value") else str(cot.estado),
-        "notas_generales": cot.notas_generales,
-        "tc_referencia_usd_mxn": cot.tc_referencia_usd_mxn,
-        "margen_objetivo_pct": cot.margen_objetivo_pct,
-        "congelada": bool(cot.congelada),
-        "id_usuario_aceptacion": cot.id_usuario_aceptacion,
-        "fecha_aceptacion_cliente": cot.fecha_aceptacion_cliente,
-        "creado_en": cot.creado_en,
-        "actualizado_en": cot.actualizado_en,
-        "lineas": lineas_out,
-        "comentarios": comentarios_out,
-        "compras_ejecutadas": compras_out,
-        "totales": _totales_cotizacion(cot),
-    }
+def _detalle(db: Session, cotizacion_id: int) -> dict[str, Any]:
+    cot = cargar_cotizacion(db, cotizacion_id)
+    if not cot:
+        raise HTTPException(404, detail="Cotización no encontrada")
+    return cotizacion_a_detalle(cot)
 
 
 def _validar_cliente_vehiculo_orden(
@@ -285,6 +100,15 @@ def _validar_cliente_vehiculo_orden(
             raise HTTPException(400, detail="La orden de trabajo no corresponde al cliente")
 
 
+def _desmarcar_otras_preferidas(db: Session, op: OpcionCompraLineaCotizacion) -> None:
+    """Un solo UPDATE para las demás opciones de la línea (el detalle se recarga después con populate_existing)."""
+    db.query(OpcionCompraLineaCotizacion).filter(
+        OpcionCompraLineaCotizacion.id_linea == op.id_linea,
+        OpcionCompraLineaCotizacion.id != op.id,
+        OpcionCompraLineaCotizacion.es_preferida.is_(True),
+    ).update({OpcionCompraLineaCotizacion.es_preferida: False}, synchronize_session=False)
+
+
 def _puede_editar_contenido(cot: CotizacionRefaccionEspecial) -> bool:
     return cot.estado == EstadoCotizacionRefaccion.BORRADOR
 
@@ -298,7 +122,7 @@ def listar(
     pagina: int = Query(1, ge=1),
     limite: int = Query(20, ge=1, le=100),
 ):
-    q = db.query(CotizacionRefaccionEspecial).order_by(CotizacionRefaccionEspecial.creado_en.desc())
+    q = db.query(CotizacionRefaccionEspecial)
     if estado:
         try:
             est = EstadoCotizacionRefaccion(estado)
@@ -313,25 +137,28 @@ def listar(
             flt.append(CotizacionRefaccionEspecial.id_cliente.in_(ids_clientes))
         q = q.filter(or_(*flt))
 
-    total = q.count()
+    pag = paginar(
+        q,
+        [(CotizacionRefaccionEspecial.creado_en, True), (CotizacionRefaccionEspecial.id, True)],
+        skip=(pagina - 1) * limite,
+        limit=limite,
+        opciones=(joinedload(CotizacionRefaccionEspecial.cliente),),
+    )
+    total = pag.total
     total_paginas = max(1, math.ceil(total / limite)) if total else 1
-    offset = (pagina - 1) * limite
-    rows = q.offset(offset).limit(limite).all()
-
-    items: List[CotizacionListaItem] = []
-    for cot in rows:
-        cli = db.query(Cliente).filter(Cliente.id_cliente == cot.id_cliente).first()
-        items.append(
-            CotizacionListaItem(
-                id=cot.id,
-                numero=cot.numero,
-                id_cliente=cot.id_cliente,
-                cliente_nombre=cli.nombre if cli else None,
-                estado=cot.estado.value if hasattr(cot.estado, "value") else str(cot.estado),
-                creado_en=cot.creado_en,
-                actualizado_en=cot.actualizado_en,
-            )
+
+    items: List[CotizacionListaItem] = [
+        CotizacionListaItem(
+            id=cot.id,
+            numero=cot.numero,
+            id_cliente=cot.id_cliente,
+            cliente_nombre=cot.cliente.nombre if cot.cliente else None,
+            estado=cot.estado.value if hasattr(cot.estado, "value") else str(cot.estado),
+            creado_en=cot.creado_en,
+            actualizado_en=cot.actualizado_en,
         )
+        for cot in pag.items
+    ]
     return ListaResponse(items=items, total=total, pagina=pagina, total_paginas=total_paginas)
 
 
@@ -357,18 +184,7 @@ def crear(
     )
     db.add(cot)
     db.commit()
-    db.refresh(cot)
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cot.id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cot.id)
 
 
 @router.get("/{cotizacion_id}", response_model=CotizacionRefaccionDetail)
@@ -377,37 +193,22 @@ def obtener(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_roles(*ROLES_TODOS)),
 ):
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    if not cot:
-        raise HTTPException(404, detail="Cotización no encontrada")
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.get("/{cotizacion_id}/pdf")
 def descargar_pdf_cotizacion(
     cotizacion_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_roles(*ROLES_TODOS)),
 ):
     """PDF formal para cliente / archivo (misma autenticación que el detalle)."""
     try:
-        pdf_bytes, filename = generar_pdf_cotizacion_refaccion(db, cotizacion_id)
+        clave, generar, filename = preparar_pdf_cotizacion_refaccion(db, cotizacion_id)
     except ValueError:
         raise HTTPException(status_code=404, detail="Cotización no encontrada")
-    return StreamingResponse(
-        BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return respuesta_pdf(request, clave, generar, f'attachment; filename="{filename}"')
 
 
 @router.put("/{cotizacion_id}", response_model=CotizacionRefaccionDetail)
@@ -441,18 +242,7 @@ def actualizar_cabecera(
     if data.margen_objetivo_pct is not None:
         cot.margen_objetivo_pct = data.margen_objetivo_pct
     db.commit()
-    db.refresh(cot)
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/lineas", response_model=CotizacionRefaccionDetail)
@@ -485,18 +275,7 @@ def agregar_linea(
     )
     db.add(ln)
     db.commit()
-    db.refresh(cot)
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.put("/lineas/{linea_id}", response_model=CotizacionRefaccionDetail)
@@ -521,17 +300,7 @@ def actualizar_linea(
     if data.observaciones is not None:
         ln.observaciones = data.observaciones
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cot.id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cot.id)
 
 
 @router.delete("/lineas/{linea_id}", response_model=CotizacionRefaccionDetail)
@@ -549,17 +318,7 @@ def eliminar_linea(
     cid = cot.id
     db.delete(ln)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cid)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cid)
 
 
 @router.post("/lineas/{linea_id}/opciones", response_model=CotizacionRefaccionDetail)
@@ -591,22 +350,9 @@ def agregar_opcion(
     db.add(op)
     db.flush()
     if data.es_preferida:
-        for o in db.query(OpcionCompraLineaCotizacion).filter(
-            OpcionCompraLineaCotizacion.id_linea == ln.id, OpcionCompraLineaCotizacion.id != op.id
-        ):
-            o.es_preferida = False
+        _desmarcar_otras_preferidas(db, op)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cot.id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cot.id)
 
 
 @router.put("/opciones/{opcion_id}", response_model=CotizacionRefaccionDetail)
@@ -642,23 +388,9 @@ def actualizar_opcion(
     if data.es_preferida is not None:
         op.es_preferida = data.es_preferida
         if data.es_preferida:
-            for o in db.query(OpcionCompraLineaCotizacion).filter(
-                OpcionCompraLineaCotizacion.id_linea == op.id_linea,
-                OpcionCompraLineaCotizacion.id != op.id,
-            ):
-                o.es_preferida = False
+            _desmarcar_otras_preferidas(db, op)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cot.id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cot.id)
 
 
 @router.post("/opciones/{opcion_id}/marcar-preferida", response_model=CotizacionRefaccionDetail)
@@ -675,23 +407,9 @@ def marcar_opcion_preferida(
     if not cot or not _puede_editar_contenido(cot):
         raise HTTPException(400, detail="Solo en BORRADOR")
     op.es_preferida = True
-    for o in db.query(OpcionCompraLineaCotizacion).filter(
-        OpcionCompraLineaCotizacion.id_linea == op.id_linea,
-        OpcionCompraLineaCotizacion.id != op.id,
-    ):
-        o.es_preferida = False
+    _desmarcar_otras_preferidas(db, op)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cot.id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cot.id)
 
 
 @router.delete("/opciones/{opcion_id}", response_model=CotizacionRefaccionDetail)
@@ -710,17 +428,7 @@ def eliminar_opcion(
     cid = cot.id
     db.delete(op)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cid)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cid)
 
 
 @router.post("/{cotizacion_id}/comentarios", response_model=CotizacionRefaccionDetail)
@@ -742,17 +450,7 @@ def agregar_comentario(
     )
     db.add(c)
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/enviar", response_model=CotizacionRefaccionDetail)
@@ -779,17 +477,7 @@ def enviar_cotizacion(
     cot.estado = EstadoCotizacionRefaccion.ENVIADA
     cot.congelada = True
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/aceptar-cliente", response_model=CotizacionRefaccionDetail)
@@ -807,17 +495,7 @@ def aceptar_cliente(
     cot.id_usuario_aceptacion = current_user.id_usuario
     cot.fecha_aceptacion_cliente = datetime.utcnow()
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/registrar-compra", response_model=CotizacionRefaccionDetail)
@@ -876,17 +554,7 @@ def registrar_compra(
     db.add(cp)
     cot.estado = EstadoCotizacionRefaccion.EN_COMPRA
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/marcar-recibida", response_model=CotizacionRefaccionDetail)
@@ -902,17 +570,7 @@ def marcar_recibida(
         raise HTTPException(400, detail="Solo desde EN_COMPRA")
     cot.estado = EstadoCotizacionRefaccion.RECIBIDA
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/marcar-entregada", response_model=CotizacionRefaccionDetail)
@@ -928,17 +586,7 @@ def marcar_entregada(
         raise HTTPException(400, detail="Solo desde RECIBIDA")
     cot.estado = EstadoCotizacionRefaccion.ENTREGADA
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
 
 
 @router.post("/{cotizacion_id}/cancelar", response_model=CotizacionRefaccionDetail)
@@ -954,14 +602,4 @@ def cancelar(
         raise HTTPException(400, detail="No se puede cancelar")
     cot.estado = EstadoCotizacionRefaccion.CANCELADA
     db.commit()
-    cot = (
-        db.query(CotizacionRefaccionEspecial)
-        .options(
-            joinedload(CotizacionRefaccionEspecial.lineas).joinedload(LineaCotizacionRefaccion.opciones),
-            joinedload(CotizacionRefaccionEspecial.comentarios),
-            joinedload(CotizacionRefaccionEspecial.compras_ejecutadas),
-        )
-        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
-        .first()
-    )
-    return _cotizacion_to_detail(db, cot)
+    return _detalle(db, cotizacion_id)
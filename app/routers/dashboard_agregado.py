@@ -19,11 +19,9 @@ from app.config import settings
 from app.database import get_db
 from app.models.alerta_inventario import AlertaInventario
 from app.models.caja_alerta import CajaAlerta
-from app.models.cancelacion_producto import CancelacionProducto
 from app.models.cliente import Cliente
 from app.models.cuenta_pagar_manual import CuentaPagarManual
 from app.models.gasto_operativo import GastoOperativo
-from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
 from app.models.orden_compra import EstadoOrdenCompra, OrdenCompra
 from app.models.orden_trabajo import OrdenTrabajo
 from app.models.pago import Pago
@@ -35,6 +33,7 @@ from app.routers.dashboard_operativa import construir_bloque_operativa
 from app.services.devoluciones_service import query_devoluciones
 from app.services.gastos_service import query_gastos
 from app.services.inventario_service import InventarioService
+from app.services.utilidad_ventas_service import resumen_utilidad
 from app.utils.decimal_utils import money_round, to_decimal
 from app.utils.dependencies import get_current_user
 from app.utils.fechas import (
@@ -148,60 +147,16 @@ def _build_finanzas(db: Session, periodo: str, current_user: Usuario, es_admin:
         q_facturado = q_facturado.filter(cond)
     total_facturado = float(q_facturado.scalar() or 0)
 
-    q_ventas = db.query(func.coalesce(func.sum(Venta.total), 0)).filter(Venta.estado != "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        q_ventas = q_ventas.filter(cond)
-    total_ventas_periodo = float(q_ventas.scalar() or 0)
+    # Utilidad desde el libro ventas_utilidad (un SELECT agregado; incluye el total de ventas del período)
+    resumen = resumen_utilidad(db, fecha_desde, fecha_hasta)
+    total_ventas_periodo = float(resumen["total_ingresos"])
 
     q_g = query_gastos(db, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta)
     total_gastos = float(q_g.with_entities(func.coalesce(func.sum(GastoOperativo.monto), 0)).scalar() or 0)
 
-    # Utilidad N+1 — solo en bloque finanzas
-    from app.models.orden_trabajo import OrdenTrabajo as OT
-
-    query_ventas = db.query(Venta).filter(Venta.estado != "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query_ventas = query_ventas.filter(cond)
-    ventas = query_ventas.all()
-    total_ingresos = Decimal("0")
-    total_costo = Decimal("0")
-    for v in ventas:
-        total_ingresos += to_decimal(v.total)
-        if v.id_orden:
-            orden = db.query(OT).filter(OT.id == v.id_orden).first()
-            if orden and not getattr(orden, "cliente_proporciono_refacciones", False):
-                res = (
-                    db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                    .filter(
-                        MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                        MovimientoInventario.referencia == orden.numero_orden,
-                    )
-                    .scalar()
-                )
-                total_costo += to_decimal(res or 0)
-        else:
-            res = (
-                db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                .filter(
-                    MovimientoInventario.id_venta == v.id_venta,
-                    MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                )
-                .scalar()
-            )
-            total_costo += to_decimal(res or 0)
-
-    query_cancel = db.query(Venta).filter(Venta.estado == "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query_cancel = query_cancel.filter(cond)
-    ids_cancel = [x.id_venta for x in query_cancel.all()]
-    perdidas_mer = Decimal("0")
-    if ids_cancel:
-        res_mer = (
-            db.query(func.coalesce(func.sum(CancelacionProducto.costo_total_mer), 0))
-            .filter(CancelacionProducto.id_venta.in_(ids_cancel))
-            .scalar()
-        )
-        perdidas_mer = to_decimal(res_mer or 0)
+    total_ingresos = resumen["total_ingresos"]
+    total_costo = resumen["total_costo"]
+    perdidas_mer = resumen["perdidas_mer"]
     utilidad_bruta = money_round(total_ingresos - total_costo - perdidas_mer)
     utilidad_neta = float(money_round(utilidad_bruta - to_decimal(total_gastos)))
 
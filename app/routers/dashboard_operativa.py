@@ -29,21 +29,20 @@ from app.config.dashboard_prioridades import (
     VER_TODAS_FAMILIA,
 )
 from app.models.caja_alerta import CajaAlerta
-from app.models.caja_turno import CajaTurno
 from app.models.cita import Cita, EstadoCita
 from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
 from app.models.pago import Pago
 from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
-from app.models.venta import Venta
+from app.models.venta import ESTADOS_VENTA_ACTIVA, Venta
+from app.services.acciones_operativas_service import turno_abierto_usuario
 from app.services.operaciones_service import (
     SALDO_EPSILON,
-    _ids_ordenes_ot_pendientes_cobro,
-    _iter_ot_pendientes_cobro,
+    _columnas_saldo,
+    _query_clasificador_ot_cobro,
     _resumen_inventario_alertas,
-    _venta_activa_por_orden,
+    _saldo_desde_totales,
     _venta_pertenece_v1,
-    calcular_saldo_venta,
 )
 from app.utils.fechas import ahora_local, condiciones_rango_taller, hoy_taller, ingreso_ot_en_dia_taller
 
@@ -62,6 +61,73 @@ class CandidatoOperativo:
     explicacion_extra: list[str] = field(default_factory=list)
 
 
+# Ventanas de cada familia (mismas que las consultas por familia previas)
+LIMITE_OT_ENTREGAS = 100
+LIMITE_VENTAS_COBROS = 200
+LIMITE_VENTAS_RESUMEN = 300
+
+
+@dataclass
+class InstantaneaCobros:
+    """
+    OT COMPLETADA y ventas activas leídas una sola vez por request.
+
+    Candidatos de cobros/entregas y el por_cobrar del resumen se derivan de aquí con la
+    misma regla O1/O2/V1 del clasificador; el número de consultas no depende del volumen.
+    """
+
+    ot_pendientes_cobro: list[tuple[OrdenTrabajo, Optional[float]]]  # O1, fecha_finalizacion DESC
+    ot_listas_entrega: list[OrdenTrabajo]  # O2 dentro de las LIMITE_OT_ENTREGAS completadas más recientes
+    ids_o1: frozenset[int]
+    ventas_activas: list[tuple[Venta, float]]  # (venta, saldo), fecha DESC
+
+    def ventas_v1(self, limite: int) -> list[tuple[Venta, float]]:
+        """Ventas con saldo > ε fuera de O1 entre las `limite` activas más recientes."""
+        return [
+            (venta, saldo)
+            for venta, saldo in self.ventas_activas[:limite]
+            if saldo > SALDO_EPSILON and _venta_pertenece_v1(venta, self.ids_o1)
+        ]
+
+
+def cargar_instantanea_cobros(db: Session) -> InstantaneaCobros:
+    """Dos consultas: clasificador de OT COMPLETADA (con cliente) y ventas activas con total pagado."""
+    filas = (
+        _query_clasificador_ot_cobro(db, None)
+        .add_entity(OrdenTrabajo)
+        .options(joinedload(OrdenTrabajo.cliente))
+        .order_by(OrdenTrabajo.fecha_finalizacion.desc(), OrdenTrabajo.id.desc())
+        .all()
+    )
+    ot_o1: list[tuple[OrdenTrabajo, Optional[float]]] = []
+    ot_o2: list[OrdenTrabajo] = []
+    for posicion, fila in enumerate(filas):
+        orden = fila.OrdenTrabajo
+        if fila.id_venta_activa is None:
+            ot_o1.append((orden, None))
+            continue
+        saldo = _saldo_desde_totales(fila.total_venta, fila.total_pagado)
+        if saldo > SALDO_EPSILON:
+            ot_o1.append((orden, saldo))
+        elif posicion < LIMITE_OT_ENTREGAS:
+            ot_o2.append(orden)
+
+    total_pagado, _ = _columnas_saldo(Venta)
+    ventas = (
+        db.query(Venta, total_pagado)
+        .filter(Venta.estado.in_(ESTADOS_VENTA_ACTIVA))
+        .order_by(Venta.fecha.desc(), Venta.id_venta.desc())
+        .limit(max(LIMITE_VENTAS_COBROS, LIMITE_VENTAS_RESUMEN))
+        .all()
+    )
+    return InstantaneaCobros(
+        ot_pendientes_cobro=ot_o1,
+        ot_listas_entrega=ot_o2,
+        ids_o1=frozenset(orden.id for orden, _ in ot_o1),
+        ventas_activas=[(venta, _saldo_desde_totales(venta.total, pagado)) for venta, pagado in ventas],
+    )
+
+
 def _factor_por_umbrales(valor: float, umbrales: tuple[tuple[float, float], ...]) -> float:
     for umbral, factor in umbrales:
         if valor <= umbral:
@@ -152,9 +218,9 @@ def _candidato_a_item(candidato: CandidatoOperativo) -> dict:
     }
 
 
-def _extraer_candidatos_cobros(db: Session) -> list[CandidatoOperativo]:
+def _extraer_candidatos_cobros(instantanea: InstantaneaCobros) -> list[CandidatoOperativo]:
     items: list[CandidatoOperativo] = []
-    for orden, venta, saldo in _iter_ot_pendientes_cobro(db):
+    for orden, saldo in instantanea.ot_pendientes_cobro:
         ref_dt = orden.fecha_finalizacion or orden.fecha_ingreso
         monto = float(saldo or orden.total or 0)
         cliente = orden.cliente.nombre if orden.cliente else "Cliente"
@@ -171,18 +237,7 @@ def _extraer_candidatos_cobros(db: Session) -> list[CandidatoOperativo]:
             )
         )
 
-    ids_o1 = _ids_ordenes_ot_pendientes_cobro(db)
-    ventas = (
-        db.query(Venta)
-        .filter(Venta.estado != "CANCELADA")
-        .order_by(Venta.fecha.desc())
-        .limit(200)
-        .all()
-    )
-    for venta in ventas:
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo <= SALDO_EPSILON or not _venta_pertenece_v1(venta, ids_o1):
-            continue
+    for venta, saldo in instantanea.ventas_v1(LIMITE_VENTAS_COBROS):
         items.append(
             CandidatoOperativo(
                 grupo="cobros",
@@ -198,23 +253,9 @@ def _extraer_candidatos_cobros(db: Session) -> list[CandidatoOperativo]:
     return items
 
 
-def _extraer_candidatos_entregas(db: Session) -> list[CandidatoOperativo]:
+def _extraer_candidatos_entregas(instantanea: InstantaneaCobros) -> list[CandidatoOperativo]:
     items: list[CandidatoOperativo] = []
-    ordenes = (
-        db.query(OrdenTrabajo)
-        .options(joinedload(OrdenTrabajo.cliente))
-        .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .order_by(OrdenTrabajo.fecha_finalizacion.desc())
-        .limit(100)
-        .all()
-    )
-    for orden in ordenes:
-        venta = _venta_activa_por_orden(db, orden.id)
-        if not venta:
-            continue
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo > SALDO_EPSILON:
-            continue
+    for orden in instantanea.ot_listas_entrega:
         ref_dt = orden.fecha_finalizacion or orden.fecha_ingreso
         cliente = orden.cliente.nombre if orden.cliente else "Cliente"
         items.append(
@@ -326,14 +367,17 @@ def _extraer_candidatos_citas(db: Session) -> list[CandidatoOperativo]:
         .limit(20)
         .all()
     )
+    vistas = {i.item_id for i in items}
     for cita in citas_convertibles:
-        if any(i.item_id == f"cita-{cita.id_cita}" for i in items):
+        item_id = f"cita-{cita.id_cita}"
+        if item_id in vistas:
             continue
+        vistas.add(item_id)
         nombre = cita.cliente.nombre if cita.cliente else "Cliente"
         items.append(
             CandidatoOperativo(
                 grupo="citas",
-                item_id=f"cita-{cita.id_cita}",
+                item_id=item_id,
                 titulo=f"Cita convertible — {nombre}",
                 subtitulo="Convertir a orden de trabajo",
                 to=RUTA_FAMILIA["citas"],
@@ -384,11 +428,7 @@ def _extraer_candidatos_inventario(db: Session) -> list[CandidatoOperativo]:
 
 def _extraer_candidatos_caja(db: Session, usuario: Usuario) -> list[CandidatoOperativo]:
     items: list[CandidatoOperativo] = []
-    turno = (
-        db.query(CajaTurno)
-        .filter(CajaTurno.id_usuario == usuario.id_usuario, CajaTurno.estado == "ABIERTO")
-        .first()
-    )
+    turno = turno_abierto_usuario(db, usuario)
     if turno and turno.fecha_apertura:
         minutos = _minutos_desde_utc(turno.fecha_apertura)
         if minutos >= 12 * 60:
@@ -426,10 +466,14 @@ def _extraer_candidatos_caja(db: Session, usuario: Usuario) -> list[CandidatoOpe
     return items
 
 
-def extraer_candidatos(db: Session, usuario: Usuario) -> list[CandidatoOperativo]:
+def extraer_candidatos(
+    db: Session, usuario: Usuario, instantanea: Optional[InstantaneaCobros] = None
+) -> list[CandidatoOperativo]:
+    if instantanea is None:
+        instantanea = cargar_instantanea_cobros(db)
     candidatos: list[CandidatoOperativo] = []
-    candidatos.extend(_extraer_candidatos_cobros(db))
-    candidatos.extend(_extraer_candidatos_entregas(db))
+    candidatos.extend(_extraer_candidatos_cobros(instantanea))
+    candidatos.extend(_extraer_candidatos_entregas(instantanea))
     candidatos.extend(_extraer_candidatos_autorizaciones(db))
     candidatos.extend(_extraer_candidatos_citas(db))
     candidatos.extend(_extraer_candidatos_inventario(db))
@@ -559,7 +603,9 @@ def construir_salud_operativa(candidatos: list[CandidatoOperativo]) -> dict:
     return {"global": global_estado, "mensaje": mensaje, "areas": areas}
 
 
-def construir_resumen_ligero(db: Session, usuario: Usuario) -> dict:
+def construir_resumen_ligero(db: Session, usuario: Usuario, instantanea: Optional[InstantaneaCobros] = None) -> dict:
+    if instantanea is None:
+        instantanea = cargar_instantanea_cobros(db)
     hoy = hoy_taller()
     hoy_str = hoy.isoformat()
 
@@ -570,7 +616,6 @@ def construir_resumen_ligero(db: Session, usuario: Usuario) -> dict:
     )
     for cond in condiciones_rango_taller(Pago.fecha, hoy_str, hoy_str):
         cobrado_hoy = cobrado_hoy.filter(cond)
-    cobrado_val = float(cobrado_hoy.scalar() or 0)
 
     ventas_hoy = (
         db.query(func.coalesce(func.sum(Venta.total), 0))
@@ -578,51 +623,40 @@ def construir_resumen_ligero(db: Session, usuario: Usuario) -> dict:
     )
     for cond in condiciones_rango_taller(Venta.fecha, hoy_str, hoy_str):
         ventas_hoy = ventas_hoy.filter(cond)
-    ventas_val = float(ventas_hoy.scalar() or 0)
 
-    ot_activas = (
-        db.query(func.count(OrdenTrabajo.id))
-        .filter(
-            OrdenTrabajo.estado.in_(
-                [
-                    EstadoOrden.PENDIENTE,
-                    EstadoOrden.EN_PROCESO,
-                    EstadoOrden.ESPERANDO_AUTORIZACION,
-                    EstadoOrden.ESPERANDO_REPUESTOS,
-                ]
-            )
+    ot_activas = db.query(func.count(OrdenTrabajo.id)).filter(
+        OrdenTrabajo.estado.in_(
+            [
+                EstadoOrden.PENDIENTE,
+                EstadoOrden.EN_PROCESO,
+                EstadoOrden.ESPERANDO_AUTORIZACION,
+                EstadoOrden.ESPERANDO_REPUESTOS,
+            ]
         )
-        .scalar()
-        or 0
     )
 
     ahora = ahora_local()
-    citas_24h = (
-        db.query(func.count(Cita.id_cita))
-        .filter(
-            Cita.estado == EstadoCita.CONFIRMADA,
-            Cita.fecha_hora >= ahora,
-            Cita.fecha_hora <= ahora + timedelta(hours=24),
-        )
-        .scalar()
-        or 0
+    citas_24h = db.query(func.count(Cita.id_cita)).filter(
+        Cita.estado == EstadoCita.CONFIRMADA,
+        Cita.fecha_hora >= ahora,
+        Cita.fecha_hora <= ahora + timedelta(hours=24),
     )
 
+    # Los cuatro agregados en un solo round-trip
+    cobrado_val, ventas_val, ot_activas_val, citas_24h_val = db.query(
+        cobrado_hoy.scalar_subquery(),
+        ventas_hoy.scalar_subquery(),
+        ot_activas.scalar_subquery(),
+        citas_24h.scalar_subquery(),
+    ).one()
+
     por_cobrar = 0.0
-    for _orden, _venta, saldo in _iter_ot_pendientes_cobro(db):
+    for _orden, saldo in instantanea.ot_pendientes_cobro:
         por_cobrar += float(saldo or 0)
-    ids_o1 = _ids_ordenes_ot_pendientes_cobro(db)
-    ventas_pend = db.query(Venta).filter(Venta.estado != "CANCELADA").limit(300).all()
-    for venta in ventas_pend:
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo > SALDO_EPSILON and _venta_pertenece_v1(venta, ids_o1):
-            por_cobrar += saldo
-
-    turno = (
-        db.query(CajaTurno)
-        .filter(CajaTurno.id_usuario == usuario.id_usuario, CajaTurno.estado == "ABIERTO")
-        .first()
-    )
+    for _venta, saldo in instantanea.ventas_v1(LIMITE_VENTAS_RESUMEN):
+        por_cobrar += saldo
+
+    turno = turno_abierto_usuario(db, usuario)
     caja_resumen = (
         {"turno_abierto": True, "id_turno": turno.id_turno}
         if turno
@@ -631,20 +665,21 @@ def construir_resumen_ligero(db: Session, usuario: Usuario) -> dict:
 
     return {
         "caja": caja_resumen,
-        "cobrado_hoy": cobrado_val,
-        "ventas_hoy": ventas_val,
-        "ot_activas": int(ot_activas),
-        "citas_proximas_24h": int(citas_24h),
+        "cobrado_hoy": float(cobrado_val or 0),
+        "ventas_hoy": float(ventas_val or 0),
+        "ot_activas": int(ot_activas_val or 0),
+        "citas_proximas_24h": int(citas_24h_val or 0),
         "por_cobrar": round(por_cobrar, 2),
     }
 
 
 def construir_bloque_operativa(db: Session, usuario: Usuario) -> dict:
-    candidatos = extraer_candidatos(db, usuario)
+    instantanea = cargar_instantanea_cobros(db)
+    candidatos = extraer_candidatos(db, usuario, instantanea)
     return {
         "recomendacion_inteligente": seleccionar_recomendacion_inteligente(candidatos),
         "salud_operativa": construir_salud_operativa(candidatos),
         "prioridades_agrupadas": construir_prioridades_agrupadas(candidatos),
-        "resumen": construir_resumen_ligero(db, usuario),
+        "resumen": construir_resumen_ligero(db, usuario, instantanea),
         "acciones_frecuentes": list(ACCIONES_FRECUENTES),
     }
@@ -3,12 +3,8 @@ Router para exportar reportes a Excel.
 """
 
 from datetime import date, datetime
-from io import BytesIO
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
 from sqlalchemy import func, or_
 from sqlalchemy.orm import Session, joinedload
 
@@ -16,6 +12,7 @@ from app.database import get_db
 from app.models.asistencia import Asistencia
 from app.models.auditoria import Auditoria
 from app.models.caja_turno import CajaTurno
+from app.models.caja_turno_total import CajaTurnoTotal
 from app.models.cliente import Cliente
 from app.models.comision_devengada import ComisionDevengada
 from app.models.cuenta_pagar_manual import CuentaPagarManual
@@ -24,18 +21,23 @@ from app.models.estante import Estante
 from app.models.gasto_operativo import GastoOperativo
 from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
 from app.models.orden_compra import EstadoOrdenCompra, OrdenCompra
-from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
-from app.models.pago_orden_compra import PagoOrdenCompra
-from app.models.proveedor import Proveedor
 from app.models.repuesto import Repuesto
 from app.models.servicio import Servicio
 from app.models.ubicacion import Ubicacion
 from app.models.usuario import Usuario
 from app.models.vehiculo import Vehiculo
 from app.models.venta import Venta
+from app.services.caja_totales_service import TotalesTurno
 from app.services.devoluciones_service import query_devoluciones
+from app.services.exportacion_fuentes import (
+    VEHICULOS_POR_CLIENTE,
+    VENTAS_POR_CLIENTE,
+    con_agregados,
+)
 from app.services.gastos_service import CATEGORIAS_VALIDAS, query_gastos
+from app.services.ordenes_compra_service import calcular_total_a_pagar, precargar_relaciones
+from app.services.utilidad_ventas_service import costo_venta_columna, query_ventas_utilidad, resumen_utilidad
+from app.utils.exportacion_excel import LIMITE_MAXIMO_STREAMING, TAMANO_LOTE, respuesta_xlsx
 from app.utils.fechas import (
     aplicar_filtro_rango_taller,
     condiciones_rango_fecha_solo,
@@ -49,18 +51,10 @@ from app.utils.roles import require_roles
 router = APIRouter(prefix="/exportaciones", tags=["Exportaciones"])
 
 
-def _encabezado(ws, titulos: list):
-    """Estilo de encabezado."""
-    for col, titulo in enumerate(titulos, 1):
-        cell = ws.cell(row=1, column=col, value=titulo)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center")
-
-
 @router.get("/clientes")
 def exportar_clientes(
     buscar: str | None = Query(None, description="Filtrar por nombre, teléfono, email, RFC"),
-    limit: int = Query(5000, ge=1, le=10000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO", "CAJA")),
 ):
@@ -77,39 +71,32 @@ def exportar_clientes(
         if hasattr(Cliente, "rfc"):
             filters.append(Cliente.rfc.like(term))
         query = query.filter(or_(*filters))
-    clientes = query.order_by(Cliente.nombre.asc()).limit(limit).all()
-
-    # Contar ventas y vehículos por cliente
-    ventas_count = {}
-    vehiculos_count = {}
-    for c in clientes:
-        ventas_count[c.id_cliente] = db.query(Venta).filter(Venta.id_cliente == c.id_cliente).count()
-        vehiculos_count[c.id_cliente] = db.query(Vehiculo).filter(Vehiculo.id_cliente == c.id_cliente).count()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Clientes"
-    _encabezado(ws, ["ID", "Nombre", "Teléfono", "Email", "Dirección", "RFC", "Ventas", "Vehículos", "Fecha alta"])
-
-    for row, c in enumerate(clientes, 2):
-        ws.cell(row=row, column=1, value=c.id_cliente)
-        ws.cell(row=row, column=2, value=c.nombre or "")
-        ws.cell(row=row, column=3, value=c.telefono or "")
-        ws.cell(row=row, column=4, value=c.email or "")
-        ws.cell(row=row, column=5, value=(c.direccion or "")[:200])
-        ws.cell(row=row, column=6, value=getattr(c, "rfc", None) or "")
-        ws.cell(row=row, column=7, value=ventas_count.get(c.id_cliente, 0))
-        ws.cell(row=row, column=8, value=vehiculos_count.get(c.id_cliente, 0))
-        ws.cell(row=row, column=9, value=c.creado_en.strftime("%Y-%m-%d %H:%M") if c.creado_en else "")
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"clientes_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    # Ventas y vehículos por cliente como agregados unidos (sin COUNT por fila)
+    query = con_agregados(
+        query,
+        [(VENTAS_POR_CLIENTE, Cliente.id_cliente), (VEHICULOS_POR_CLIENTE, Cliente.id_cliente)],
+    )
+    clientes = query.order_by(Cliente.nombre.asc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    filas = (
+        (
+            c.id_cliente,
+            c.nombre or "",
+            c.telefono or "",
+            c.email or "",
+            (c.direccion or "")[:200],
+            getattr(c, "rfc", None) or "",
+            n_ventas,
+            n_vehiculos,
+            c.creado_en.strftime("%Y-%m-%d %H:%M") if c.creado_en else "",
+        )
+        for c, n_ventas, n_vehiculos in clientes
+    )
+    return respuesta_xlsx(
+        "clientes",
+        "Clientes",
+        ["ID", "Nombre", "Teléfono", "Email", "Dirección", "RFC", "Ventas", "Vehículos", "Fecha alta"],
+        filas,
     )
 
 
@@ -117,40 +104,30 @@ def exportar_clientes(
 def exportar_ventas(
     fecha_desde: str | None = Query(None),
     fecha_hasta: str | None = Query(None),
-    limit: int = Query(1000, ge=1, le=5000),
+    limit: int = Query(1000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA")),
 ):
-    query = db.query(Venta)
+    query = db.query(Venta, Cliente.nombre).outerjoin(Cliente, Cliente.id_cliente == Venta.id_cliente)
     for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
         query = query.filter(cond)
-    ventas = query.order_by(Venta.fecha.desc()).limit(limit).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ventas"
-    _encabezado(ws, ["ID", "Fecha", "Cliente", "Total", "Saldo pendiente", "Estado"])
-
-    for row, v in enumerate(ventas, 2):
-        cliente = db.query(Cliente).filter(Cliente.id_cliente == v.id_cliente).first() if v.id_cliente else None
-        total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        saldo = max(0, float(v.total) - float(total_pagado or 0))
-        estado = v.estado.value if hasattr(v.estado, "value") else str(v.estado)
-        ws.cell(row=row, column=1, value=v.id_venta)
-        ws.cell(row=row, column=2, value=formatear_taller(v.fecha))
-        ws.cell(row=row, column=3, value=cliente.nombre if cliente else "-")
-        ws.cell(row=row, column=4, value=float(v.total))
-        ws.cell(row=row, column=5, value=round(saldo, 2))
-        ws.cell(row=row, column=6, value=estado)
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"ventas_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    ventas = query.order_by(Venta.fecha.desc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for v, cliente_nombre in ventas:
+            saldo = float(v.saldo or 0)
+            estado = v.estado.value if hasattr(v.estado, "value") else str(v.estado)
+            yield (
+                v.id_venta,
+                formatear_taller(v.fecha),
+                cliente_nombre if cliente_nombre is not None else "-",
+                float(v.total),
+                round(saldo, 2),
+                estado,
+            )
+
+    return respuesta_xlsx(
+        "ventas", "Ventas", ["ID", "Fecha", "Cliente", "Total", "Saldo pendiente", "Estado"], _filas()
     )
 
 
@@ -158,7 +135,7 @@ def exportar_ventas(
 def exportar_productos_vendidos(
     fecha_desde: str | None = Query(None),
     fecha_hasta: str | None = Query(None),
-    limit: int = Query(1000, ge=1, le=5000),
+    limit: int = Query(1000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA")),
 ):
@@ -178,28 +155,10 @@ def exportar_productos_vendidos(
         subq.group_by(DetalleVenta.id_item, DetalleVenta.descripcion)
         .order_by(func.sum(DetalleVenta.cantidad).desc())
         .limit(limit)
-        .all()
-    )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Productos más vendidos"
-    _encabezado(ws, ["Producto", "Cantidad", "Monto"])
-
-    for row, r in enumerate(rows, 2):
-        ws.cell(row=row, column=1, value=r.descripcion or f"ID {r.id_item}")
-        ws.cell(row=row, column=2, value=float(r.cantidad or 0))
-        ws.cell(row=row, column=3, value=float(r.monto or 0))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"productos_vendidos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        .yield_per(TAMANO_LOTE)
     )
+    filas = ((r.descripcion or f"ID {r.id_item}", float(r.cantidad or 0), float(r.monto or 0)) for r in rows)
+    return respuesta_xlsx("productos_vendidos", "Productos más vendidos", ["Producto", "Cantidad", "Monto"], filas)
 
 
 @router.get("/inventario")
@@ -209,7 +168,7 @@ def exportar_inventario(
     stock_bajo: bool = Query(False, description="Solo repuestos con stock bajo"),
     activo: bool | None = Query(None, description="Filtrar por activo/inactivo"),
     incluir_eliminados: bool = Query(False, description="Incluir productos eliminados"),
-    limit: int = Query(5000, ge=1, le=10000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO", "CAJA")),
 ):
@@ -239,13 +198,33 @@ def exportar_inventario(
         query = query.filter(Repuesto.stock_actual <= Repuesto.stock_minimo)
     if activo is not None:
         query = query.filter(Repuesto.activo == activo)
-    repuestos = query.order_by(Repuesto.codigo.asc()).limit(limit).all()
+    repuestos = query.order_by(Repuesto.codigo.asc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for r in repuestos:
+            estado = "Eliminado" if getattr(r, "eliminado", False) else ("Activo" if r.activo else "Inactivo")
+            yield (
+                r.id_repuesto,
+                r.codigo or "",
+                r.nombre or "",
+                r.categoria.nombre if r.categoria else "",
+                r.proveedor.nombre if r.proveedor else "",
+                getattr(r, "bodega_nombre", "") or "",
+                getattr(r, "ubicacion_nombre", "") or r.ubicacion or "",
+                r.stock_actual or 0,
+                r.stock_minimo or 0,
+                r.stock_maximo or 0,
+                float(r.precio_compra or 0),
+                float(r.precio_venta or 0),
+                r.marca or "",
+                r.unidad_medida or "PZA",
+                estado,
+                "Sí" if getattr(r, "eliminado", False) else "",
+            )
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Inventario"
-    _encabezado(
-        ws,
+    return respuesta_xlsx(
+        "inventario",
+        "Inventario",
         [
             "ID",
             "Código",
@@ -264,39 +243,7 @@ def exportar_inventario(
             "Estado",
             "Eliminado",
         ],
-    )
-
-    for row, r in enumerate(repuestos, 2):
-        cat_nombre = r.categoria.nombre if r.categoria else ""
-        prov_nombre = r.proveedor.nombre if r.proveedor else ""
-        bodega_nom = getattr(r, "bodega_nombre", "") or ""
-        ubi_nom = getattr(r, "ubicacion_nombre", "") or r.ubicacion or ""
-        estado = "Eliminado" if getattr(r, "eliminado", False) else ("Activo" if r.activo else "Inactivo")
-        ws.cell(row=row, column=1, value=r.id_repuesto)
-        ws.cell(row=row, column=2, value=r.codigo or "")
-        ws.cell(row=row, column=3, value=r.nombre or "")
-        ws.cell(row=row, column=4, value=cat_nombre)
-        ws.cell(row=row, column=5, value=prov_nombre)
-        ws.cell(row=row, column=6, value=bodega_nom)
-        ws.cell(row=row, column=7, value=ubi_nom)
-        ws.cell(row=row, column=8, value=r.stock_actual or 0)
-        ws.cell(row=row, column=9, value=r.stock_minimo or 0)
-        ws.cell(row=row, column=10, value=r.stock_maximo or 0)
-        ws.cell(row=row, column=11, value=float(r.precio_compra or 0))
-        ws.cell(row=row, column=12, value=float(r.precio_venta or 0))
-        ws.cell(row=row, column=13, value=r.marca or "")
-        ws.cell(row=row, column=14, value=r.unidad_medida or "PZA")
-        ws.cell(row=row, column=15, value=estado)
-        ws.cell(row=row, column=16, value="Sí" if getattr(r, "eliminado", False) else "")
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"inventario_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        _filas(),
     )
 
 
@@ -305,7 +252,7 @@ def exportar_servicios(
     buscar: str | None = Query(None, description="Buscar en código o nombre"),
     categoria: int | None = Query(None, description="Filtrar por id de categoría"),
     activo: bool | None = Query(None, description="Filtrar por activo/inactivo"),
-    limit: int = Query(5000, ge=1, le=10000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO", "CAJA")),
 ):
@@ -318,13 +265,29 @@ def exportar_servicios(
         query = query.filter(Servicio.id_categoria == categoria)
     if activo is not None:
         query = query.filter(Servicio.activo == activo)
-    servicios = query.options(joinedload(Servicio.categoria)).order_by(Servicio.codigo.asc()).limit(limit).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Servicios"
-    _encabezado(
-        ws,
+    servicios = (
+        query.options(joinedload(Servicio.categoria))
+        .order_by(Servicio.codigo.asc())
+        .limit(limit)
+        .yield_per(TAMANO_LOTE)
+    )
+    filas = (
+        (
+            s.id,
+            s.codigo or "",
+            s.nombre or "",
+            s.categoria.nombre if s.categoria else "",
+            (s.descripcion or "")[:200],
+            float(s.precio_base or 0),
+            s.tiempo_estimado_minutos or 0,
+            "Sí" if s.requiere_repuestos else "No",
+            "Activo" if s.activo else "Inactivo",
+        )
+        for s in servicios
+    )
+    return respuesta_xlsx(
+        "servicios",
+        "Servicios",
         [
             "ID",
             "Código",
@@ -336,28 +299,7 @@ def exportar_servicios(
             "Requiere repuestos",
             "Estado",
         ],
-    )
-
-    for row, s in enumerate(servicios, 2):
-        cat_nombre = s.categoria.nombre if s.categoria else ""
-        ws.cell(row=row, column=1, value=s.id)
-        ws.cell(row=row, column=2, value=s.codigo or "")
-        ws.cell(row=row, column=3, value=s.nombre or "")
-        ws.cell(row=row, column=4, value=cat_nombre)
-        ws.cell(row=row, column=5, value=(s.descripcion or "")[:200])
-        ws.cell(row=row, column=6, value=float(s.precio_base or 0))
-        ws.cell(row=row, column=7, value=s.tiempo_estimado_minutos or 0)
-        ws.cell(row=row, column=8, value="Sí" if s.requiere_repuestos else "No")
-        ws.cell(row=row, column=9, value="Activo" if s.activo else "Inactivo")
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"servicios_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        filas,
     )
 
 
@@ -365,12 +307,12 @@ def exportar_servicios(
 def exportar_vehiculos(
     buscar: str | None = Query(None, description="Buscar en marca, modelo, VIN"),
     id_cliente: int | None = Query(None, description="Filtrar por cliente"),
-    limit: int = Query(5000, ge=1, le=10000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO", "CAJA")),
 ):
     """Exporta el listado completo de vehículos a Excel."""
-    query = db.query(Vehiculo)
+    query = db.query(Vehiculo, Cliente.nombre).outerjoin(Cliente, Cliente.id_cliente == Vehiculo.id_cliente)
     if id_cliente:
         query = query.filter(Vehiculo.id_cliente == id_cliente)
     if buscar and buscar.strip():
@@ -384,7 +326,7 @@ def exportar_vehiculos(
         if hasattr(Vehiculo, "color"):
             filters.append(Vehiculo.color.like(term))
         query = query.filter(or_(*filters))
-    vehiculos = query.order_by(Vehiculo.id_vehiculo.desc()).limit(limit).all()
+    vehiculos = query.order_by(Vehiculo.id_vehiculo.desc()).limit(limit).yield_per(TAMANO_LOTE)
 
     def _color_display(v):
         c = getattr(v, "color", None)
@@ -395,32 +337,25 @@ def exportar_vehiculos(
             return m
         return None
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Vehículos"
-    _encabezado(ws, ["ID", "Cliente", "Marca", "Modelo", "Año", "Color", "VIN", "Motor", "Fecha alta"])
-
-    for row, v in enumerate(vehiculos, 2):
-        cliente = db.query(Cliente).filter(Cliente.id_cliente == v.id_cliente).first() if v.id_cliente else None
-        color_val = _color_display(v)
-        ws.cell(row=row, column=1, value=v.id_vehiculo)
-        ws.cell(row=row, column=2, value=cliente.nombre if cliente else "")
-        ws.cell(row=row, column=3, value=v.marca or "")
-        ws.cell(row=row, column=4, value=v.modelo or "")
-        ws.cell(row=row, column=5, value=v.anio or "")
-        ws.cell(row=row, column=6, value=color_val or "")
-        ws.cell(row=row, column=7, value=v.vin or "")
-        ws.cell(row=row, column=8, value=v.motor or "")
-        ws.cell(row=row, column=9, value=v.creado_en.strftime("%Y-%m-%d %H:%M") if v.creado_en else "")
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"vehiculos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    def _filas():
+        for v, cliente_nombre in vehiculos:
+            yield (
+                v.id_vehiculo,
+                cliente_nombre or "",
+                v.marca or "",
+                v.modelo or "",
+                v.anio or "",
+                _color_display(v) or "",
+                v.vin or "",
+                v.motor or "",
+                v.creado_en.strftime("%Y-%m-%d %H:%M") if v.creado_en else "",
+            )
+
+    return respuesta_xlsx(
+        "vehiculos",
+        "Vehículos",
+        ["ID", "Cliente", "Marca", "Modelo", "Año", "Color", "VIN", "Motor", "Fecha alta"],
+        _filas(),
     )
 
 
@@ -432,35 +367,28 @@ def exportar_clientes_frecuentes(
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA")),
 ):
-    subq = db.query(
-        Venta.id_cliente,
-        func.count(Venta.id_venta).label("ventas"),
-        func.sum(Venta.total).label("total"),
-    ).filter(Venta.estado != "CANCELADA", Venta.id_cliente.isnot(None))
+    subq = (
+        db.query(
+            Venta.id_cliente,
+            Cliente.nombre,
+            func.count(Venta.id_venta).label("ventas"),
+            func.sum(Venta.total).label("total"),
+        )
+        .outerjoin(Cliente, Cliente.id_cliente == Venta.id_cliente)
+        .filter(Venta.estado != "CANCELADA", Venta.id_cliente.isnot(None))
+    )
     for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
         subq = subq.filter(cond)
-    rows = subq.group_by(Venta.id_cliente).order_by(func.count(Venta.id_venta).desc()).limit(limit).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Clientes frecuentes"
-    _encabezado(ws, ["Cliente", "Ventas", "Total"])
-
-    for row, r in enumerate(rows, 2):
-        c = db.query(Cliente).filter(Cliente.id_cliente == r.id_cliente).first()
-        ws.cell(row=row, column=1, value=c.nombre if c else f"Cliente #{r.id_cliente}")
-        ws.cell(row=row, column=2, value=r.ventas)
-        ws.cell(row=row, column=3, value=float(r.total or 0))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"clientes_frecuentes_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    rows = (
+        subq.group_by(Venta.id_cliente, Cliente.nombre)
+        .order_by(func.count(Venta.id_venta).desc())
+        .limit(limit)
+        .yield_per(TAMANO_LOTE)
     )
+    filas = (
+        (r.nombre if r.nombre is not None else f"Cliente #{r.id_cliente}", r.ventas, float(r.total or 0)) for r in rows
+    )
+    return respuesta_xlsx("clientes_frecuentes", "Clientes frecuentes", ["Cliente", "Ventas", "Total"], filas)
 
 
 @router.get("/cuentas-por-cobrar")
@@ -470,46 +398,27 @@ def exportar_cuentas_por_cobrar(
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA")),
 ):
-    query = db.query(Venta).filter(Venta.estado == "PENDIENTE")
+    query = (
+        db.query(Venta, Cliente.nombre)
+        .outerjoin(Cliente, Cliente.id_cliente == Venta.id_cliente)
+        .filter(Venta.estado == "PENDIENTE", Venta.saldo > 0)
+    )
     for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
         query = query.filter(cond)
-    ventas = query.order_by(Venta.fecha.desc()).all()
-
-    items = []
-    for v in ventas:
-        total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        saldo = max(0, float(v.total) - float(total_pagado or 0))
-        if saldo <= 0:
-            continue
-        cliente = db.query(Cliente).filter(Cliente.id_cliente == v.id_cliente).first() if v.id_cliente else None
-        items.append(
-            {
-                "id_venta": v.id_venta,
-                "nombre_cliente": cliente.nombre if cliente else "-",
-                "total": float(v.total),
-                "saldo_pendiente": round(saldo, 2),
-            }
-        )
+    ventas = query.order_by(Venta.fecha.desc()).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for v, cliente_nombre in ventas:
+            saldo = float(v.saldo)
+            yield (
+                v.id_venta,
+                cliente_nombre if cliente_nombre is not None else "-",
+                float(v.total),
+                round(saldo, 2),
+            )
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Cuentas por cobrar"
-    _encabezado(ws, ["ID", "Cliente", "Total", "Saldo pendiente"])
-
-    for row, it in enumerate(items, 2):
-        ws.cell(row=row, column=1, value=it["id_venta"])
-        ws.cell(row=row, column=2, value=it["nombre_cliente"])
-        ws.cell(row=row, column=3, value=it["total"])
-        ws.cell(row=row, column=4, value=it["saldo_pendiente"])
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"cuentas_por_cobrar_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    return respuesta_xlsx(
+        "cuentas_por_cobrar", "Cuentas por cobrar", ["ID", "Cliente", "Total", "Saldo pendiente"], _filas()
     )
 
 
@@ -520,62 +429,12 @@ def exportar_utilidad(
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
-    """Exporta reporte de utilidad (ingresos - costo) a Excel."""
-    query = db.query(Venta).filter(Venta.estado != "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query = query.filter(cond)
-    ventas = query.order_by(Venta.fecha.asc()).all()
-
-    from app.models.cancelacion_producto import CancelacionProducto
-
-    total_ingresos = 0.0
-    total_costo = 0.0
-    filas = []
-
-    for v in ventas:
-        ingresos = float(v.total)
-        costo = 0.0
-        if v.id_orden:
-            orden = db.query(OrdenTrabajo).filter(OrdenTrabajo.id == v.id_orden).first()
-            if orden and not getattr(orden, "cliente_proporciono_refacciones", False):
-                res = (
-                    db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                    .filter(
-                        MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                        MovimientoInventario.referencia == orden.numero_orden,
-                    )
-                    .scalar()
-                )
-                costo = float(res or 0)
-        else:
-            res = (
-                db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                .filter(
-                    MovimientoInventario.id_venta == v.id_venta,
-                    MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                )
-                .scalar()
-            )
-            costo = float(res or 0)
-        utilidad = ingresos - costo
-        total_ingresos += ingresos
-        total_costo += costo
-        filas.append((v.id_venta, formatear_taller(v.fecha, "%Y-%m-%d") if v.fecha else "", ingresos, costo, utilidad))
-
-    perdidas_mer = 0.0
-    query_cancel = db.query(Venta).filter(Venta.estado == "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query_cancel = query_cancel.filter(cond)
-    ids_canceladas = [v.id_venta for v in query_cancel.all()]
-    if ids_canceladas:
-        res_mer = (
-            db.query(func.coalesce(func.sum(CancelacionProducto.costo_total_mer), 0))
-            .filter(CancelacionProducto.id_venta.in_(ids_canceladas))
-            .scalar()
-        )
-        perdidas_mer = float(res_mer or 0)
-
-    utilidad_bruta = total_ingresos - total_costo - perdidas_mer
+    """Exporta reporte de utilidad (ingresos - costo) a Excel. Costos desde el libro ventas_utilidad."""
+    # Totales generales antes de abrir el cursor de ventas
+    resumen = resumen_utilidad(db, fecha_desde, fecha_hasta)
+    total_ingresos = float(resumen["total_ingresos"])
+    total_costo = float(resumen["total_costo"])
+    perdidas_mer = float(resumen["perdidas_mer"])
 
     total_gastos = 0.0
     q_gastos = db.query(GastoOperativo)
@@ -584,53 +443,51 @@ def exportar_utilidad(
     res_gastos = q_gastos.with_entities(func.coalesce(func.sum(GastoOperativo.monto), 0)).scalar()
     total_gastos = float(res_gastos or 0)
 
-    utilidad_neta = utilidad_bruta - total_gastos
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Utilidad"
-    _encabezado(ws, ["ID Venta", "Fecha", "Ingresos", "Costo", "Utilidad"])
-    for row, (id_v, fch, ing, cos, util) in enumerate(filas, 2):
-        ws.cell(row=row, column=1, value=id_v)
-        ws.cell(row=row, column=2, value=fch)
-        ws.cell(row=row, column=3, value=round(ing, 2))
-        ws.cell(row=row, column=4, value=round(cos, 2))
-        ws.cell(row=row, column=5, value=round(util, 2))
-    row_total = len(filas) + 2
-    ws.cell(row=row_total, column=1, value="SUBTOTAL VENTAS")
-    ws.cell(row=row_total, column=3, value=round(total_ingresos, 2))
-    ws.cell(row=row_total, column=4, value=round(total_costo, 2))
-    ws.cell(row=row_total, column=5, value=round(total_ingresos - total_costo, 2))
-    row_total += 1
-    ws.cell(row=row_total, column=1, value="Pérdidas por merma (cancelaciones)")
-    ws.cell(row=row_total, column=5, value=round(-perdidas_mer, 2))
-    row_total += 1
-    ws.cell(row=row_total, column=1, value="UTILIDAD BRUTA")
-    ws.cell(row=row_total, column=5, value=round(utilidad_bruta, 2))
-    row_total += 1
-    ws.cell(row=row_total, column=1, value="Gastos operativos")
-    ws.cell(row=row_total, column=5, value=round(-total_gastos, 2))
-    row_total += 1
-    ws.cell(row=row_total, column=1, value="UTILIDAD NETA")
-    ws.cell(row=row_total, column=5, value=round(utilidad_neta, 2))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"utilidad_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    ventas = (
+        query_ventas_utilidad(
+            db,
+            Venta.id_venta,
+            Venta.fecha,
+            Venta.total,
+            costo_venta_columna(),
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+        )
+        .filter(Venta.estado != "CANCELADA")
+        .order_by(Venta.fecha.asc())
+        .yield_per(TAMANO_LOTE)
     )
 
+    def _filas():
+        for id_venta, fecha, total, costo in ventas:
+            ingresos = float(total)
+            costo = float(costo or 0)
+            fch = formatear_taller(fecha, "%Y-%m-%d") if fecha else ""
+            yield (id_venta, fch, round(ingresos, 2), round(costo, 2), round(ingresos - costo, 2))
+
+        utilidad_bruta = total_ingresos - total_costo - perdidas_mer
+        utilidad_neta = utilidad_bruta - total_gastos
+        yield (
+            "SUBTOTAL VENTAS",
+            None,
+            round(total_ingresos, 2),
+            round(total_costo, 2),
+            round(total_ingresos - total_costo, 2),
+        )
+        yield ("Pérdidas por merma (cancelaciones)", None, None, None, round(-perdidas_mer, 2))
+        yield ("UTILIDAD BRUTA", None, None, None, round(utilidad_bruta, 2))
+        yield ("Gastos operativos", None, None, None, round(-total_gastos, 2))
+        yield ("UTILIDAD NETA", None, None, None, round(utilidad_neta, 2))
+
+    return respuesta_xlsx("utilidad", "Utilidad", ["ID Venta", "Fecha", "Ingresos", "Costo", "Utilidad"], _filas())
+
 
 @router.get("/comisiones")
 def exportar_comisiones(
     fecha_desde: str | None = Query(None),
     fecha_hasta: str | None = Query(None),
     id_usuario: int | None = Query(None),
-    limit: int = Query(5000, ge=1, le=50000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA", "EMPLEADO", "TECNICO")),
 ):
@@ -643,7 +500,8 @@ def exportar_comisiones(
         ComisionDevengada.porcentaje,
         ComisionDevengada.monto_comision,
         ComisionDevengada.fecha_venta,
-    )
+        Usuario.nombre.label("usuario_nombre"),
+    ).outerjoin(Usuario, Usuario.id_usuario == ComisionDevengada.id_usuario)
     if current_user.rol in ("EMPLEADO", "TECNICO"):
         q = q.filter(ComisionDevengada.id_usuario == current_user.id_usuario)
     elif id_usuario:
@@ -652,56 +510,31 @@ def exportar_comisiones(
         q = q.filter(ComisionDevengada.fecha_venta >= fecha_desde)
     if fecha_hasta:
         q = q.filter(ComisionDevengada.fecha_venta <= fecha_hasta)
-    rows = q.order_by(ComisionDevengada.fecha_venta.desc(), ComisionDevengada.id_venta).limit(limit).all()
-
-    usuarios_cache = {}
-
-    def _nombre(id_u):
-        if id_u not in usuarios_cache:
-            u = db.query(Usuario).filter(Usuario.id_usuario == id_u).first()
-            usuarios_cache[id_u] = u.nombre if u else f"Usuario #{id_u}"
-        return usuarios_cache[id_u]
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Comisiones"
-    _encabezado(ws, ["Empleado", "ID Venta", "Tipo base", "Base ($)", " % ", "Comisión ($)", "Fecha"])
-    for row, r in enumerate(rows, 2):
-        ws.cell(row=row, column=1, value=_nombre(r.id_usuario))
-        ws.cell(row=row, column=2, value=r.id_venta)
-        ws.cell(row=row, column=3, value=str(r.tipo_base))
-        ws.cell(row=row, column=4, value=float(r.base_monto or 0))
-        ws.cell(row=row, column=5, value=float(r.porcentaje or 0))
-        ws.cell(row=row, column=6, value=float(r.monto_comision or 0))
-        ws.cell(row=row, column=7, value=r.fecha_venta.strftime("%Y-%m-%d") if r.fecha_venta else "")
-
-    total = sum(float(r.monto_comision or 0) for r in rows)
-    row_total = len(rows) + 2
-    ws.cell(row=row_total, column=1, value="TOTAL")
-    ws.cell(row=row_total, column=6, value=round(total, 2))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"comisiones_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    rows = (
+        q.order_by(ComisionDevengada.fecha_venta.desc(), ComisionDevengada.id_venta).limit(limit).yield_per(TAMANO_LOTE)
     )
 
+    def _filas():
+        total = 0.0
+        for r in rows:
+            total += float(r.monto_comision or 0)
+            yield (
+                r.usuario_nombre if r.usuario_nombre is not None else f"Usuario #{r.id_usuario}",
+                r.id_venta,
+                str(r.tipo_base),
+                float(r.base_monto or 0),
+                float(r.porcentaje or 0),
+                float(r.monto_comision or 0),
+                r.fecha_venta.strftime("%Y-%m-%d") if r.fecha_venta else "",
+            )
+        yield ("TOTAL", None, None, None, None, round(total, 2))
 
-def _calcular_total_a_pagar_oc(oc):
-    """Total a pagar de una orden de compra."""
-    from decimal import Decimal
-
-    total = Decimal("0")
-    for d in oc.detalles:
-        if d.cantidad_recibida <= 0:
-            continue
-        precio = d.precio_unitario_real if d.precio_unitario_real is not None else d.precio_unitario_estimado
-        total += Decimal(str(d.cantidad_recibida)) * Decimal(str(precio))
-    return float(total)
+    return respuesta_xlsx(
+        "comisiones",
+        "Comisiones",
+        ["Empleado", "ID Venta", "Tipo base", "Base ($)", " % ", "Comisión ($)", "Fecha"],
+        _filas(),
+    )
 
 
 @router.get("/cuentas-por-pagar")
@@ -724,15 +557,16 @@ def exportar_cuentas_por_pagar(
     if id_proveedor:
         query = query.filter(OrdenCompra.id_proveedor == id_proveedor)
     ordenes = query.order_by(OrdenCompra.fecha.desc()).all()
+    # Detalles, proveedores y pagos de todas las órdenes: un IN por tabla
+    relaciones = precargar_relaciones(db, ordenes)
 
     filas = []
     total_saldo = 0.0
     for oc in ordenes:
-        total_a_pagar = _calcular_total_a_pagar_oc(oc)
+        total_a_pagar = float(calcular_total_a_pagar(oc))
         if total_a_pagar <= 0:
             continue
-        pagos = db.query(PagoOrdenCompra).filter(PagoOrdenCompra.id_orden_compra == oc.id_orden_compra).all()
-        total_pagado = sum(float(p.monto) for p in pagos)
+        total_pagado = sum(float(p.monto) for p in relaciones.pagos.get(oc.id_orden_compra, []))
         saldo = max(0, total_a_pagar - total_pagado)
         if saldo <= 0:
             continue
@@ -744,7 +578,7 @@ def exportar_cuentas_por_pagar(
                 continue
             if fecha_hasta and fch_rec > datetime.strptime(fecha_hasta[:10], "%Y-%m-%d").date():
                 continue
-        prov = db.query(Proveedor).filter(Proveedor.id_proveedor == oc.id_proveedor).first()
+        prov = relaciones.proveedores.get(oc.id_proveedor)
         hoy = date.today()
         dias = (hoy - fch_rec).days if fch_rec else None
         if dias is not None:
@@ -765,11 +599,14 @@ def exportar_cuentas_por_pagar(
         )
         total_saldo += saldo
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Cuentas por pagar"
-    _encabezado(
-        ws,
+    def _filas():
+        yield from filas
+        yield ("TOTAL", None, None, None, round(total_saldo, 2))
+        yield ("Cuentas", None, None, None, len(filas))
+
+    return respuesta_xlsx(
+        "cuentas_por_pagar",
+        "Cuentas por pagar",
         [
             "Orden",
             "Proveedor",
@@ -780,30 +617,7 @@ def exportar_cuentas_por_pagar(
             "Días desde recepción",
             "Antigüedad",
         ],
-    )
-    for row, (num, prov, tot, pag, sal, fch, dias, ant) in enumerate(filas, 2):
-        ws.cell(row=row, column=1, value=num)
-        ws.cell(row=row, column=2, value=prov)
-        ws.cell(row=row, column=3, value=tot)
-        ws.cell(row=row, column=4, value=pag)
-        ws.cell(row=row, column=5, value=sal)
-        ws.cell(row=row, column=6, value=fch)
-        ws.cell(row=row, column=7, value=dias)
-        ws.cell(row=row, column=8, value=ant)
-    row_total = len(filas) + 2
-    ws.cell(row=row_total, column=1, value="TOTAL")
-    ws.cell(row=row_total, column=5, value=round(total_saldo, 2))
-    ws.cell(row=row_total + 1, column=1, value="Cuentas")
-    ws.cell(row=row_total + 1, column=5, value=len(filas))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"cuentas_por_pagar_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        _filas(),
     )
 
 
@@ -859,11 +673,15 @@ def exportar_cuentas_pagar_manuales(
             )
         )
         total_saldo += saldo
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Cuentas por pagar manuales"
-    _encabezado(
-        ws,
+
+    def _filas():
+        yield from filas
+        yield ("TOTAL", None, None, None, None, round(total_saldo, 2))
+        yield ("Cuentas", None, None, None, None, len(filas))
+
+    return respuesta_xlsx(
+        "cuentas_pagar_manuales",
+        "Cuentas por pagar manuales",
         [
             "Concepto",
             "Proveedor/Acreedor",
@@ -876,23 +694,7 @@ def exportar_cuentas_pagar_manuales(
             "Días",
             "Antigüedad",
         ],
-    )
-    for row, tup in enumerate(filas, 2):
-        for col, val in enumerate(tup, 1):
-            ws.cell(row=row, column=col, value=val)
-    r = len(filas) + 2
-    ws.cell(row=r, column=1, value="TOTAL")
-    ws.cell(row=r, column=6, value=round(total_saldo, 2))
-    ws.cell(row=r + 1, column=1, value="Cuentas")
-    ws.cell(row=r + 1, column=6, value=len(filas))
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"cuentas_pagar_manuales_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        _filas(),
     )
 
 
@@ -902,7 +704,7 @@ def exportar_auditoria(
     fecha_hasta: str | None = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
     modulo: str | None = Query(None, description="Filtrar por módulo"),
     id_usuario: int | None = Query(None, description="Filtrar por usuario"),
-    limit: int = Query(2000, ge=1, le=10000),
+    limit: int = Query(2000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
@@ -914,29 +716,25 @@ def exportar_auditoria(
         query = query.filter(Auditoria.modulo.ilike(f"%{modulo}%"))
     if id_usuario:
         query = query.filter(Auditoria.id_usuario == id_usuario)
-    registros = query.order_by(Auditoria.fecha.desc()).limit(limit).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Auditoría"
-    _encabezado(ws, ["Fecha", "Usuario", "Módulo", "Acción", "ID Referencia", "Descripción"])
-    for row, r in enumerate(registros, 2):
-        u = r.usuario if hasattr(r, "usuario") and r.usuario else None
-        usu_nombre = (u.nombre or u.email or "") if u else ""
-        ws.cell(row=row, column=1, value=formatear_taller(r.fecha, "%Y-%m-%d %H:%M:%S"))
-        ws.cell(row=row, column=2, value=usu_nombre)
-        ws.cell(row=row, column=3, value=r.modulo or "")
-        ws.cell(row=row, column=4, value=r.accion or "")
-        ws.cell(row=row, column=5, value=r.id_referencia)
-        ws.cell(row=row, column=6, value=(r.descripcion or "")[:500])
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"auditoria_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    registros = query.order_by(Auditoria.fecha.desc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for r in registros:
+            u = r.usuario if hasattr(r, "usuario") and r.usuario else None
+            yield (
+                formatear_taller(r.fecha, "%Y-%m-%d %H:%M:%S"),
+                (u.nombre or u.email or "") if u else "",
+                r.modulo or "",
+                r.accion or "",
+                r.id_referencia,
+                (r.descripcion or "")[:500],
+            )
+
+    return respuesta_xlsx(
+        "auditoria",
+        "Auditoría",
+        ["Fecha", "Usuario", "Módulo", "Acción", "ID Referencia", "Descripción"],
+        _filas(),
     )
 
 
@@ -945,7 +743,7 @@ def exportar_ajustes_inventario(
     fecha_desde: str | None = Query(None, description="Fecha desde (YYYY-MM-DD)"),
     fecha_hasta: str | None = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
     id_usuario: int | None = Query(None, description="Filtrar por usuario"),
-    limit: int = Query(5000, ge=1, le=20000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
@@ -965,13 +763,28 @@ def exportar_ajustes_inventario(
     if id_usuario:
         query = query.filter(MovimientoInventario.id_usuario == id_usuario)
 
-    movimientos = query.order_by(MovimientoInventario.fecha_movimiento.desc()).limit(limit).all()
+    movimientos = query.order_by(MovimientoInventario.fecha_movimiento.desc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for m in movimientos:
+            costo = float(m.costo_total) if m.costo_total is not None else 0
+            ref_motivo = (m.referencia or "") + (" – " + m.motivo if m.motivo else "")
+            yield (
+                formatear_taller(m.fecha_movimiento),
+                m.repuesto.nombre if m.repuesto else "",
+                m.repuesto.codigo if m.repuesto else "",
+                m.tipo_movimiento.value if m.tipo_movimiento else "",
+                m.cantidad,
+                m.stock_anterior,
+                m.stock_nuevo,
+                round(costo, 2),
+                m.usuario.nombre if m.usuario else "",
+                ref_motivo[:500],
+            )
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ajustes inventario"
-    _encabezado(
-        ws,
+    return respuesta_xlsx(
+        "ajustes_inventario",
+        "Ajustes inventario",
         [
             "Fecha",
             "Repuesto",
@@ -984,33 +797,7 @@ def exportar_ajustes_inventario(
             "Usuario",
             "Referencia / Motivo",
         ],
-    )
-
-    for row, m in enumerate(movimientos, 2):
-        rep_nombre = m.repuesto.nombre if m.repuesto else ""
-        rep_codigo = m.repuesto.codigo if m.repuesto else ""
-        usu_nombre = m.usuario.nombre if m.usuario else ""
-        costo = float(m.costo_total) if m.costo_total is not None else 0
-        ref_motivo = (m.referencia or "") + (" – " + m.motivo if m.motivo else "")
-        ws.cell(row=row, column=1, value=formatear_taller(m.fecha_movimiento))
-        ws.cell(row=row, column=2, value=rep_nombre)
-        ws.cell(row=row, column=3, value=rep_codigo)
-        ws.cell(row=row, column=4, value=m.tipo_movimiento.value if m.tipo_movimiento else "")
-        ws.cell(row=row, column=5, value=m.cantidad)
-        ws.cell(row=row, column=6, value=m.stock_anterior)
-        ws.cell(row=row, column=7, value=m.stock_nuevo)
-        ws.cell(row=row, column=8, value=round(costo, 2))
-        ws.cell(row=row, column=9, value=usu_nombre)
-        ws.cell(row=row, column=10, value=ref_motivo[:500])
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"ajustes_inventario_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        _filas(),
     )
 
 
@@ -1023,7 +810,7 @@ def exportar_devoluciones(
         None,
         description="Filtrar: venta (devolución por venta) u orden (cancelación de orden)",
     ),
-    limit: int = Query(5000, ge=1, le=20000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA", "TECNICO")),
 ):
@@ -1042,34 +829,21 @@ def exportar_devoluciones(
         )
         .order_by(MovimientoInventario.fecha_movimiento.desc())
         .limit(limit)
-        .all()
+        .yield_per(TAMANO_LOTE)
     )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Devoluciones"
-    _encabezado(ws, ["Fecha", "Repuesto", "Código", "Cantidad", "Motivo", "Referencia"])
-
-    for row, m in enumerate(movimientos, 2):
-        rep_nombre = m.repuesto.nombre if m.repuesto else ""
-        rep_codigo = m.repuesto.codigo if m.repuesto else ""
-        fecha = formatear_taller(m.fecha_movimiento)
-        ref = f"Venta #{m.id_venta}" if m.id_venta else (m.referencia or "")
-        ws.cell(row=row, column=1, value=fecha)
-        ws.cell(row=row, column=2, value=rep_nombre)
-        ws.cell(row=row, column=3, value=rep_codigo)
-        ws.cell(row=row, column=4, value=m.cantidad)
-        ws.cell(row=row, column=5, value=(m.motivo or "")[:500])
-        ws.cell(row=row, column=6, value=ref)
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"devoluciones_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    filas = (
+        (
+            formatear_taller(m.fecha_movimiento),
+            m.repuesto.nombre if m.repuesto else "",
+            m.repuesto.codigo if m.repuesto else "",
+            m.cantidad,
+            (m.motivo or "")[:500],
+            f"Venta #{m.id_venta}" if m.id_venta else (m.referencia or ""),
+        )
+        for m in movimientos
+    )
+    return respuesta_xlsx(
+        "devoluciones", "Devoluciones", ["Fecha", "Repuesto", "Código", "Cantidad", "Motivo", "Referencia"], filas
     )
 
 
@@ -1079,7 +853,7 @@ def exportar_gastos(
     fecha_hasta: str | None = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
     categoria: str | None = Query(None, description="RENTA, SERVICIOS, MATERIAL, NOMINA, OTROS, DEVOLUCION_VENTA"),
     buscar: str | None = Query(None, description="Buscar en concepto"),
-    limit: int = Query(5000, ge=1, le=20000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
@@ -1096,7 +870,7 @@ def exportar_gastos(
         categoria=categoria,
         buscar=buscar,
     )
-    gastos = query.order_by(GastoOperativo.fecha.desc()).limit(limit).all()
+    gastos = query.order_by(GastoOperativo.fecha.desc()).limit(limit).yield_per(TAMANO_LOTE)
 
     CAT_LABELS = {
         "RENTA": "Renta",
@@ -1107,31 +881,21 @@ def exportar_gastos(
         "OTROS": "Otros",
     }
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Gastos operativos"
-    _encabezado(ws, ["Fecha", "Concepto", "Categoría", "Monto", "Observaciones"])
-
-    for row, g in enumerate(gastos, 2):
-        ws.cell(row=row, column=1, value=g.fecha.strftime("%Y-%m-%d") if g.fecha else "")
-        ws.cell(row=row, column=2, value=(g.concepto or "")[:200])
-        ws.cell(row=row, column=3, value=CAT_LABELS.get(g.categoria, g.categoria))
-        ws.cell(row=row, column=4, value=round(float(g.monto or 0), 2))
-        ws.cell(row=row, column=5, value=(g.observaciones or "")[:500])
-
-    row_total = len(gastos) + 2
-    total_monto = sum(float(g.monto or 0) for g in gastos)
-    ws.cell(row=row_total, column=1, value="TOTAL")
-    ws.cell(row=row_total, column=4, value=round(total_monto, 2))
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"gastos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    def _filas():
+        total_monto = 0.0
+        for g in gastos:
+            total_monto += float(g.monto or 0)
+            yield (
+                g.fecha.strftime("%Y-%m-%d") if g.fecha else "",
+                (g.concepto or "")[:200],
+                CAT_LABELS.get(g.categoria, g.categoria),
+                round(float(g.monto or 0), 2),
+                (g.observaciones or "")[:500],
+            )
+        yield ("TOTAL", None, None, round(total_monto, 2))
+
+    return respuesta_xlsx(
+        "gastos", "Gastos operativos", ["Fecha", "Concepto", "Categoría", "Monto", "Observaciones"], _filas()
     )
 
 
@@ -1140,7 +904,7 @@ def exportar_asistencia(
     fecha_desde: str = Query(..., description="Fecha desde (YYYY-MM-DD)"),
     fecha_hasta: str = Query(..., description="Fecha hasta (YYYY-MM-DD)"),
     id_usuario: int | None = Query(None, description="Filtrar por empleado"),
-    limit: int = Query(5000, ge=1, le=20000),
+    limit: int = Query(5000, ge=1, le=LIMITE_MAXIMO_STREAMING),
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA", "TECNICO", "EMPLEADO")),
 ):
@@ -1157,13 +921,14 @@ def exportar_asistencia(
     if id_usuario is not None:
         query = query.filter(Asistencia.id_usuario == id_usuario)
 
-    registros = query.order_by(Asistencia.fecha, Asistencia.id_usuario).limit(limit).all()
-
-    usuarios_ids = list({r.id_usuario for r in registros})
-    usuarios_map = {}
-    if usuarios_ids:
-        usrs = db.query(Usuario).filter(Usuario.id_usuario.in_(usuarios_ids)).all()
-        usuarios_map = {u.id_usuario: u.nombre or "" for u in usrs}
+    # Nombres antes de abrir el cursor: empleados con registros en el rango (acotado por plantilla)
+    usuarios_map = {
+        id_u: nombre or ""
+        for id_u, nombre in db.query(Usuario.id_usuario, Usuario.nombre)
+        .filter(Usuario.id_usuario.in_(query.with_entities(Asistencia.id_usuario).distinct()))
+        .all()
+    }
+    registros = query.order_by(Asistencia.fecha, Asistencia.id_usuario).limit(limit).yield_per(TAMANO_LOTE)
 
     TIPO_LABELS = {
         "TRABAJO": "Trabajo",
@@ -1175,29 +940,24 @@ def exportar_asistencia(
         "FALTA": "Falta",
     }
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Asistencia"
-    _encabezado(ws, ["Fecha", "Empleado", "Tipo", "Horas trab.", "Turno completo", "Aplica bono", "Observaciones"])
-
-    for row, r in enumerate(registros, 2):
-        tipo_str = getattr(r.tipo, "value", None) or str(r.tipo)
-        ws.cell(row=row, column=1, value=r.fecha.strftime("%Y-%m-%d") if r.fecha else "")
-        ws.cell(row=row, column=2, value=usuarios_map.get(r.id_usuario, str(r.id_usuario)))
-        ws.cell(row=row, column=3, value=TIPO_LABELS.get(tipo_str, tipo_str))
-        ws.cell(row=row, column=4, value=round(float(r.horas_trabajadas or 0), 2))
-        ws.cell(row=row, column=5, value="Sí" if r.turno_completo else "No")
-        ws.cell(row=row, column=6, value="Sí" if r.aplica_bono_puntualidad else "No")
-        ws.cell(row=row, column=7, value=(r.observaciones or "")[:500])
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"asistencia_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    def _filas():
+        for r in registros:
+            tipo_str = getattr(r.tipo, "value", None) or str(r.tipo)
+            yield (
+                r.fecha.strftime("%Y-%m-%d") if r.fecha else "",
+                usuarios_map.get(r.id_usuario, str(r.id_usuario)),
+                TIPO_LABELS.get(tipo_str, tipo_str),
+                round(float(r.horas_trabajadas or 0), 2),
+                "Sí" if r.turno_completo else "No",
+                "Sí" if r.aplica_bono_puntualidad else "No",
+                (r.observaciones or "")[:500],
+            )
+
+    return respuesta_xlsx(
+        "asistencia",
+        "Asistencia",
+        ["Fecha", "Empleado", "Tipo", "Horas trab.", "Turno completo", "Aplica bono", "Observaciones"],
+        _filas(),
     )
 
 
@@ -1219,67 +979,51 @@ def exportar_turnos_caja(
     for cond in aplicar_filtro_rango_taller(CajaTurno.fecha_cierre, fecha_desde_d, fecha_hasta_d):
         query = query.filter(cond)
 
-    turnos = query.order_by(CajaTurno.fecha_cierre.desc()).limit(limit).all()
-
-    filas = []
-    for t in turnos:
-        totales = (
-            db.query(Pago.metodo, func.sum(Pago.monto).label("total"))
-            .filter(Pago.id_turno == t.id_turno)
-            .group_by(Pago.metodo)
-            .all()
-        )
-        efectivo = next((float(tot) for m, tot in totales if m == "EFECTIVO"), 0.0)
-        tarjeta = next((float(tot) for m, tot in totales if m == "TARJETA"), 0.0)
-        transferencia = next((float(tot) for m, tot in totales if m == "TRANSFERENCIA"), 0.0)
-        total_cobros = efectivo + tarjeta + transferencia
-
-        total_gastos = float(
-            db.query(func.coalesce(func.sum(GastoOperativo.monto), 0))
-            .filter(GastoOperativo.id_turno == t.id_turno)
-            .scalar()
-            or 0
-        )
-        total_pagos_prov = float(
-            db.query(func.coalesce(func.sum(PagoOrdenCompra.monto), 0))
-            .filter(
-                PagoOrdenCompra.id_turno == t.id_turno,
-                PagoOrdenCompra.metodo == "EFECTIVO",
-            )
-            .scalar()
-            or 0
-        )
-        efectivo_esperado = float(t.monto_apertura or 0) + efectivo - total_pagos_prov - total_gastos
-        monto_cierre = float(t.monto_cierre or 0)
-        diferencia = float(t.diferencia) if t.diferencia is not None else None
-
-        usuario_nom = t.usuario.nombre if t.usuario else f"#{t.id_usuario}"
-        fecha_cierre_str = formatear_taller(t.fecha_cierre)
-        fecha_apertura_str = formatear_taller(t.fecha_apertura)
-
-        filas.append(
-            {
-                "fecha_cierre": fecha_cierre_str,
-                "fecha_apertura": fecha_apertura_str,
-                "usuario": usuario_nom,
-                "apertura": float(t.monto_apertura or 0),
-                "efectivo": efectivo,
-                "tarjeta": tarjeta,
-                "transferencia": transferencia,
-                "total_cobros": total_cobros,
-                "gastos": total_gastos,
-                "pagos_proveedores": total_pagos_prov,
-                "efectivo_esperado": efectivo_esperado,
-                "monto_contado": monto_cierre,
-                "diferencia": diferencia,
-            }
+    # Totales materializados por turno (caja_turno_totales): un join por PK en lugar de 5 agregados
+    query = query.outerjoin(CajaTurnoTotal, CajaTurnoTotal.id_turno == CajaTurno.id_turno).add_entity(CajaTurnoTotal)
+    turnos = query.order_by(CajaTurno.fecha_cierre.desc()).limit(limit).yield_per(TAMANO_LOTE)
+
+    def _fila_turno(t, fila_totales) -> dict:
+        totales = TotalesTurno.desde_fila(fila_totales) if fila_totales else TotalesTurno()
+        return {
+            "fecha_cierre": formatear_taller(t.fecha_cierre),
+            "fecha_apertura": formatear_taller(t.fecha_apertura),
+            "usuario": t.usuario.nombre if t.usuario else f"#{t.id_usuario}",
+            "apertura": float(t.monto_apertura or 0),
+            "efectivo": float(totales.cobros_efectivo),
+            "tarjeta": float(totales.cobros_tarjeta),
+            "transferencia": float(totales.cobros_transferencia),
+            "total_cobros": float(totales.total_cobros),
+            "gastos": float(totales.gastos),
+            "pagos_proveedores": float(totales.pagos_proveedor_efectivo),
+            "efectivo_esperado": float(totales.efectivo_esperado(t.monto_apertura)),
+            "monto_contado": float(t.monto_cierre or 0),
+            "diferencia": float(t.diferencia) if t.diferencia is not None else None,
+        }
+
+    filas = (_fila_turno(*fila) for fila in turnos)
+
+    filas_xlsx = (
+        (
+            f["fecha_cierre"],
+            f["fecha_apertura"],
+            f["usuario"],
+            round(f["apertura"], 2),
+            round(f["efectivo"], 2),
+            round(f["tarjeta"], 2),
+            round(f["transferencia"], 2),
+            round(f["total_cobros"], 2),
+            round(f["gastos"], 2),
+            round(f["pagos_proveedores"], 2),
+            round(f["efectivo_esperado"], 2),
+            round(f["monto_contado"], 2),
+            round(f["diferencia"], 2) if f["diferencia"] is not None else "",
         )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Turnos de caja"
-    _encabezado(
-        ws,
+        for f in filas
+    )
+    return respuesta_xlsx(
+        "turnos_caja",
+        "Turnos de caja",
         [
             "Fecha cierre",
             "Fecha apertura",
@@ -1295,31 +1039,7 @@ def exportar_turnos_caja(
             "Monto contado",
             "Diferencia",
         ],
-    )
-
-    for row, f in enumerate(filas, 2):
-        ws.cell(row=row, column=1, value=f["fecha_cierre"])
-        ws.cell(row=row, column=2, value=f["fecha_apertura"])
-        ws.cell(row=row, column=3, value=f["usuario"])
-        ws.cell(row=row, column=4, value=round(f["apertura"], 2))
-        ws.cell(row=row, column=5, value=round(f["efectivo"], 2))
-        ws.cell(row=row, column=6, value=round(f["tarjeta"], 2))
-        ws.cell(row=row, column=7, value=round(f["transferencia"], 2))
-        ws.cell(row=row, column=8, value=round(f["total_cobros"], 2))
-        ws.cell(row=row, column=9, value=round(f["gastos"], 2))
-        ws.cell(row=row, column=10, value=round(f["pagos_proveedores"], 2))
-        ws.cell(row=row, column=11, value=round(f["efectivo_esperado"], 2))
-        ws.cell(row=row, column=12, value=round(f["monto_contado"], 2))
-        ws.cell(row=row, column=13, value=round(f["diferencia"], 2) if f["diferencia"] is not None else "")
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"turnos_caja_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        filas_xlsx,
     )
 
 
@@ -1344,38 +1064,29 @@ def exportar_sugerencia_compra(
         query = query.filter(Repuesto.stock_actual <= Repuesto.stock_minimo * 1.2)
     else:
         query = query.filter(Repuesto.stock_actual < Repuesto.stock_minimo)
-    repuestos = query.order_by(Repuesto.id_proveedor.asc(), Repuesto.nombre.asc()).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Sugerencia compra"
-    _encabezado(
-        ws, ["Proveedor", "Código", "Nombre", "Stock", "Mín.", "Máx.", "Cant. sugerida", "P. compra", "Costo estimado"]
-    )
+    repuestos = query.order_by(Repuesto.id_proveedor.asc(), Repuesto.nombre.asc()).yield_per(TAMANO_LOTE)
+
+    def _filas():
+        for r in repuestos:
+            cant_min = max(0, r.stock_minimo - r.stock_actual)
+            cant_max = max(0, r.stock_maximo - r.stock_actual)
+            cant_sug = cant_max if cant_max > 0 else cant_min
+            precio = float(r.precio_compra or 0)
+            yield (
+                r.proveedor.nombre if r.proveedor else "Sin proveedor",
+                r.codigo,
+                r.nombre,
+                r.stock_actual,
+                r.stock_minimo,
+                r.stock_maximo,
+                cant_sug,
+                round(precio, 2),
+                round(precio * cant_sug, 2),
+            )
 
-    for row, r in enumerate(repuestos, 2):
-        prov = r.proveedor.nombre if r.proveedor else "Sin proveedor"
-        cant_min = max(0, r.stock_minimo - r.stock_actual)
-        cant_max = max(0, r.stock_maximo - r.stock_actual)
-        cant_sug = cant_max if cant_max > 0 else cant_min
-        precio = float(r.precio_compra or 0)
-        costo = round(precio * cant_sug, 2)
-        ws.cell(row=row, column=1, value=prov)
-        ws.cell(row=row, column=2, value=r.codigo)
-        ws.cell(row=row, column=3, value=r.nombre)
-        ws.cell(row=row, column=4, value=r.stock_actual)
-        ws.cell(row=row, column=5, value=r.stock_minimo)
-        ws.cell(row=row, column=6, value=r.stock_maximo)
-        ws.cell(row=row, column=7, value=cant_sug)
-        ws.cell(row=row, column=8, value=round(precio, 2))
-        ws.cell(row=row, column=9, value=costo)
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    fn = f"sugerencia_compra_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+    return respuesta_xlsx(
+        "sugerencia_compra",
+        "Sugerencia compra",
+        ["Proveedor", "Código", "Nombre", "Stock", "Mín.", "Máx.", "Cant. sugerida", "P. compra", "Costo estimado"],
+        _filas(),
     )
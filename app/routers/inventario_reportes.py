@@ -364,9 +364,9 @@ def verificar_productos_sin_movimiento(
 
     Requiere rol: ADMIN
     """
-    InventarioService.verificar_productos_sin_movimiento(db, dias)
+    resultado = InventarioService.verificar_productos_sin_movimiento(db, dias)
 
-    return {"mensaje": f"Verificación completada para productos sin movimiento en {dias} días"}
+    return {"mensaje": f"Verificación completada para productos sin movimiento en {dias} días", **resultado}
 
 
 # ========== REPORTES ==========
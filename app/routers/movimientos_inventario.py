@@ -24,9 +24,11 @@ from app.models.proveedor import Proveedor
 from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
 from app.schemas.movimiento_inventario import AjusteInventario, MovimientoInventarioCreate, MovimientoInventarioOut
-from app.services.inventario_service import InventarioService
-from app.utils.fechas import condiciones_rango_taller, parse_fecha_calendario
+from app.services.inventario_service import InventarioService, MovimientoLoteError
+from app.utils.codigo_repuesto import normalizar_codigo_repuesto
 from app.utils.dependencies import get_current_user
+from app.utils.fechas import condiciones_rango_taller, parse_fecha_calendario
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 from app.utils.upload import read_file_with_limit
 
@@ -41,6 +43,7 @@ MAX_SIZE_MB = 5
 ALLOWED_ENTRADA_MASIVA = {".xlsx", ".csv"}
 MAX_ENTRADA_MASIVA_MB = 10
 MAX_FILAS_ENTRADA_MASIVA = 500
+MAX_FILAS_VALIDACION_ENTRADA_MASIVA = 5000  # dry_run: solo lectura
 
 
 @router.post("/upload-comprobante")
@@ -172,6 +175,97 @@ def _parsear_filas_entrada_masiva(contenido: bytes, nombre_archivo: str) -> List
     return filas
 
 
+def _validar_filas_entrada_masiva(
+    db: Session, filas: List[dict], id_proveedor: Optional[int], referencia_global: Optional[str]
+) -> tuple[list[MovimientoInventarioCreate], list[tuple[int, str]], list[dict], list[dict]]:
+    """
+    Valida todas las filas antes de escribir: formato, códigos desconocidos, inactivos y eliminados.
+
+    Los códigos se normalizan y se resuelven con un solo IN sobre repuestos.codigo_normalizado
+    (indexado). Retorna (movimientos, origen, errores, duplicados): origen[i] = (fila, código)
+    del movimiento i; duplicados son códigos repetidos en el archivo (aviso, no bloquean).
+    """
+    errores = []
+    validas = []
+    for item in filas:
+        codigo = (item.get("codigo") or "").strip()
+        cantidad_str = (item.get("cantidad") or "").strip()
+        fila_num = item.get("fila", 0)
+        if not codigo:
+            errores.append({"fila": fila_num, "codigo": "(vacío)", "error": "Código vacío"})
+            continue
+        if not cantidad_str:
+            errores.append({"fila": fila_num, "codigo": codigo, "error": "Cantidad vacía"})
+            continue
+        try:
+            cantidad = float(cantidad_str)
+        except (ValueError, TypeError):
+            errores.append({"fila": fila_num, "codigo": codigo, "error": f"Cantidad inválida: {cantidad_str}"})
+            continue
+        if cantidad < 0.001:
+            errores.append({"fila": fila_num, "codigo": codigo, "error": "Cantidad debe ser al menos 0.001"})
+            continue
+        validas.append((item, codigo, normalizar_codigo_repuesto(codigo), cantidad))
+
+    filas_por_codigo: dict[str, list[int]] = {}
+    for item, _, normalizado, _ in validas:
+        filas_por_codigo.setdefault(normalizado, []).append(item.get("fila", 0))
+    duplicados = [{"codigo": cod, "filas": nums} for cod, nums in filas_por_codigo.items() if len(nums) > 1]
+
+    # Un solo SELECT por índice para todos los códigos (incluye eliminados para poder informarlos)
+    candidatos: dict[str, list[Repuesto]] = {}
+    if filas_por_codigo:
+        for r in db.query(Repuesto).filter(Repuesto.codigo_normalizado.in_(filas_por_codigo)):
+            candidatos.setdefault(r.codigo_normalizado, []).append(r)
+
+    movimientos = []
+    origen = []
+    fecha_adquisicion = datetime.utcnow().date()
+    for item, codigo, normalizado, cantidad in validas:
+        fila_num = item.get("fila", 0)
+        vigentes = [r for r in candidatos.get(normalizado, []) if not r.eliminado]
+        if len(vigentes) > 1:
+            errores.append(
+                {"fila": fila_num, "codigo": codigo, "error": "Código ambiguo: coincide con varios repuestos"}
+            )
+            continue
+        if not vigentes:
+            error = "Repuesto eliminado" if normalizado in candidatos else "Repuesto no encontrado"
+            errores.append({"fila": fila_num, "codigo": codigo, "error": error})
+            continue
+        repuesto = vigentes[0]
+        if not repuesto.activo:
+            errores.append({"fila": fila_num, "codigo": codigo, "error": "Repuesto inactivo"})
+            continue
+        precio_val = None
+        if item.get("precio_unitario"):
+            try:
+                precio_val = Decimal(str(item["precio_unitario"]).replace(",", "."))
+                if precio_val < 0:
+                    precio_val = None
+            except (ValueError, Exception):
+                pass
+        ref = item.get("referencia") or referencia_global
+        motivo = item.get("observaciones")
+        mov_data = {
+            "id_repuesto": repuesto.id_repuesto,
+            "tipo_movimiento": TipoMovimiento.ENTRADA,
+            "cantidad": cantidad,
+            "precio_unitario": precio_val or repuesto.precio_compra,
+            "referencia": ref or None,
+            "motivo": motivo or None,
+            "id_proveedor": id_proveedor,
+            "fecha_adquisicion": fecha_adquisicion,
+        }
+        try:
+            movimientos.append(MovimientoInventarioCreate(**mov_data))
+            origen.append((fila_num, codigo))
+        except Exception as e:
+            errores.append({"fila": fila_num, "codigo": codigo, "error": str(e)[:200]})
+    errores.sort(key=lambda e: e["fila"])
+    return movimientos, origen, errores, duplicados
+
+
 @router.post("/entrada-masiva")
 def entrada_masiva(
     archivo: UploadFile = File(
@@ -180,6 +274,7 @@ def entrada_masiva(
     id_proveedor: Optional[int] = Query(None, description="Proveedor por defecto para todas las filas"),
     referencia_global: Optional[str] = Query(None, description="Referencia por defecto (ej: factura)"),
     transaccional: bool = Query(False, description="Si True, falla todo ante el primer error (todo o nada)"),
+    dry_run: bool = Query(False, description="Si True, solo valida el archivo y retorna el reporte sin mover stock"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_roles("ADMIN", "CAJA", "TECNICO")),
 ):
@@ -187,6 +282,8 @@ def entrada_masiva(
     Registra entradas masivas desde Excel o CSV.
     Columnas esperadas: codigo, cantidad, precio_unitario (opc), referencia (opc), observaciones (opc).
     Máximo 500 filas. Si transaccional=True, falla todo ante el primer error (todo o nada).
+    Con dry_run=True valida hasta 5000 filas (códigos desconocidos, duplicados, inactivos y
+    eliminados) y retorna el reporte completo sin escribir nada.
     """
     ext = Path(archivo.filename or "").suffix.lower()
     if ext not in ALLOWED_ENTRADA_MASIVA:
@@ -206,10 +303,11 @@ def entrada_masiva(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El archivo no contiene filas válidas. Verifica que tenga encabezados: codigo, cantidad",
         )
-    if len(filas) > MAX_FILAS_ENTRADA_MASIVA:
+    max_filas = MAX_FILAS_VALIDACION_ENTRADA_MASIVA if dry_run else MAX_FILAS_ENTRADA_MASIVA
+    if len(filas) > max_filas:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"El archivo tiene {len(filas)} filas. Máximo permitido: {MAX_FILAS_ENTRADA_MASIVA}. "
+            detail=f"El archivo tiene {len(filas)} filas. Máximo permitido: {max_filas}. "
             f"Divida el archivo o procese en lotes.",
         )
     if id_proveedor:
@@ -228,83 +326,41 @@ def entrada_masiva(
                 detail=f"Error en fila {fila} (código {codigo or '(vacío)'}): {msg}",
             )
 
-    procesados = 0
-    errores = []
-    for item in filas:
-        codigo = (item.get("codigo") or "").strip()
-        cantidad_str = (item.get("cantidad") or "").strip()
-        fila_num = item.get("fila", 0)
-        if not codigo:
-            _fallar_si_transaccional("Código vacío", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo or "(vacío)", "error": "Código vacío"})
-            continue
-        if not cantidad_str:
-            _fallar_si_transaccional("Cantidad vacía", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo, "error": "Cantidad vacía"})
-            continue
-        try:
-            cantidad = float(cantidad_str)
-        except (ValueError, TypeError):
-            _fallar_si_transaccional(f"Cantidad inválida: {cantidad_str}", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo, "error": f"Cantidad inválida: {cantidad_str}"})
-            continue
-        if cantidad < 0.001:
-            _fallar_si_transaccional("Cantidad debe ser al menos 0.001", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo, "error": "Cantidad debe ser al menos 0.001"})
-            continue
-        repuesto = db.query(Repuesto).filter(Repuesto.codigo.ilike(codigo), not Repuesto.eliminado).first()
-        if not repuesto:
-            _fallar_si_transaccional("Repuesto no encontrado", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo, "error": "Repuesto no encontrado"})
-            continue
-        if not repuesto.activo:
-            _fallar_si_transaccional("Repuesto inactivo", fila_num, codigo)
-            errores.append({"fila": fila_num, "codigo": codigo, "error": "Repuesto inactivo"})
-            continue
-        precio_val = None
-        if item.get("precio_unitario"):
-            try:
-                precio_val = Decimal(str(item["precio_unitario"]).replace(",", "."))
-                if precio_val < 0:
-                    precio_val = None
-            except (ValueError, Exception):
-                pass
-        ref = item.get("referencia") or referencia_global
-        motivo = item.get("observaciones")
-        mov_data = {
-            "id_repuesto": repuesto.id_repuesto,
-            "tipo_movimiento": TipoMovimiento.ENTRADA,
-            "cantidad": cantidad,
-            "precio_unitario": precio_val or repuesto.precio_compra,
-            "referencia": ref or None,
-            "motivo": motivo or None,
-            "id_proveedor": id_proveedor,
-            "fecha_adquisicion": datetime.utcnow().date(),
+    movimientos, origen, errores, duplicados = _validar_filas_entrada_masiva(db, filas, id_proveedor, referencia_global)
+    if dry_run:
+        return {
+            "mensaje": f"Validación: {len(movimientos)} filas listas para registrar, {len(errores)} con error",
+            "dry_run": True,
+            "procesados": 0,
+            "validas": len(movimientos),
+            "total_filas": len(filas),
+            "errores": errores,
+            "duplicados": duplicados,
         }
-        try:
-            movimiento = MovimientoInventarioCreate(**mov_data)
-            InventarioService.registrar_movimiento(
-                db=db,
-                movimiento=movimiento,
-                id_usuario=current_user.id_usuario,
-                autocommit=not transaccional,
-            )
-            procesados += 1
-        except Exception as e:
-            if transaccional:
-                db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Error en fila {item.get('fila', 0)} (código {codigo}): {str(e)[:200]}",
-                )
-            errores.append({"fila": item.get("fila", 0), "codigo": codigo, "error": str(e)[:200]})
-    if transaccional and procesados > 0:
-        db.commit()
+    if errores:
+        primero = errores[0]
+        _fallar_si_transaccional(primero["error"], primero["fila"], primero["codigo"])
+
+    # Un bloqueo, un INSERT y un commit para todas las filas válidas
+    try:
+        resultado = InventarioService.registrar_movimientos_lote(
+            db, movimientos, current_user.id_usuario, transaccional=transaccional
+        )
+    except MovimientoLoteError as e:
+        fila_num, codigo = origen[e.indice]
+        _fallar_si_transaccional(str(e)[:200], fila_num, codigo)
+        raise
+    for indice, error in resultado.errores:
+        fila_num, codigo = origen[indice]
+        errores.append({"fila": fila_num, "codigo": codigo, "error": error[:200]})
+    errores.sort(key=lambda e: e["fila"])
+    procesados = len(resultado.procesados)
     return {
         "mensaje": f"Procesadas {procesados} entradas",
         "procesados": procesados,
         "total_filas": len(filas),
         "errores": errores,
+        "duplicados": duplicados,
     }
 
 
@@ -378,11 +434,15 @@ def listar_movimientos(
     fecha_desde: Optional[datetime] = Query(None, description="Fecha desde (YYYY-MM-DD)"),
     fecha_hasta: Optional[datetime] = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
     id_usuario: Optional[int] = Query(None, description="Filtrar por usuario"),
+    cursor: Optional[str] = Query(
+        None, description="Paginación keyset: vacío = primera página, luego siguiente_cursor"
+    ),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user),
 ):
     """
     Lista todos los movimientos de inventario con filtros opcionales.
+    Paginación con skip/limit o, con ?cursor=, keyset por fecha (sin OFFSET).
 
     Filtros disponibles:
     - id_repuesto: Movimientos de un repuesto específico
@@ -410,26 +470,18 @@ def listar_movimientos(
     if id_usuario:
         query = query.filter(MovimientoInventario.id_usuario == id_usuario)
 
-    # Ordenar por fecha descendente y cargar relaciones para respuesta
-    total = query.count()
-    movimientos = (
-        query.options(
-            joinedload(MovimientoInventario.repuesto),
-            joinedload(MovimientoInventario.usuario),
-        )
-        .order_by(MovimientoInventario.fecha_movimiento.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    # Ordenar por fecha descendente; relaciones solo para los movimientos de la página
+    pagina = paginar(
+        query,
+        [(MovimientoInventario.fecha_movimiento, True), (MovimientoInventario.id_movimiento, True)],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        opciones=(joinedload(MovimientoInventario.repuesto), joinedload(MovimientoInventario.usuario)),
+    )
+    return pagina.respuesta(
+        "movimientos", skip, limit, cursor, [MovimientoInventarioOut.model_validate(m) for m in pagina.items]
     )
-
-    return {
-        "movimientos": [MovimientoInventarioOut.model_validate(m) for m in movimientos],
-        "total": total,
-        "pagina": skip // limit + 1 if limit > 0 else 1,
-        "total_paginas": (total + limit - 1) // limit if limit > 0 else 1,
-        "limit": limit,
-    }
 
 
 @router.get("/repuesto/{id_repuesto}", response_model=List[MovimientoInventarioOut])
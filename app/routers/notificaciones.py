@@ -1,22 +1,25 @@
 """
 Router unificado de notificaciones/alertas.
 Agrega alertas de caja, inventario y órdenes de compra en una sola respuesta.
+También expone el estado de entrega de emails / WhatsApp encolados (envios/{id}).
 """
 
 from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models.alerta_inventario import AlertaInventario, TipoAlertaInventario
 from app.models.caja_alerta import CajaAlerta
+from app.models.notificacion_saliente import NotificacionSaliente
 from app.models.orden_compra import EstadoOrdenCompra, OrdenCompra
 from app.models.proveedor import Proveedor
 from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
+from app.services.notificaciones_service import notificacion_a_dict
 from app.utils.dependencies import get_current_user
 from app.utils.fechas import hoy_taller, isoformat_utc
 
@@ -254,3 +257,21 @@ def count_notificaciones(
 
     total = count_caja + count_inventario + (1 if count_ordenes > 0 else 0)
     return {"total_alertas": total}
+
+
+@router.get("/envios/{id_notificacion}")
+def estado_envio(
+    id_notificacion: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """
+    Estado de entrega de un email / WhatsApp encolado (PENDIENTE, ENVIANDO, ENVIADA, FALLIDA).
+    El id lo devuelven enviar orden de compra y crear cita; se sondea hasta ENVIADA o FALLIDA.
+    Solo ADMIN o el usuario que lo encoló; los correos de recuperación de contraseña no se exponen.
+    """
+    n = db.query(NotificacionSaliente).filter(NotificacionSaliente.id == id_notificacion).first()
+    rol = current_user.rol.value if hasattr(current_user.rol, "value") else str(current_user.rol)
+    if not n or n.referencia_tipo == "PASSWORD_RESET" or (rol != "ADMIN" and n.id_usuario != current_user.id_usuario):
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    return notificacion_a_dict(n)
@@ -24,6 +24,7 @@ def obtener_resumen_operativo(
     incluir_items: bool = Query(True),
     grupo: Optional[str] = Query(None),
     bandejas: Optional[str] = Query(None),
+    verificar_contadores: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user),
 ):
@@ -32,6 +33,8 @@ def obtener_resumen_operativo(
     Solo lectura; mutaciones delegadas a routers existentes.
 
     UX-1B.0: params opcionales grupo / bandejas activan slice A0 v2.1.
+    verificar_contadores=true (con incluir_items=false): métricas por SQL en vivo en lugar de
+    contadores_operativos, para comparar.
     """
     try:
         validar_params_slice(grupo, bandejas, incluir_items)
@@ -45,4 +48,5 @@ def obtener_resumen_operativo(
         incluir_items=incluir_items,
         grupo=grupo,
         bandejas=bandejas,
+        verificar_contadores=verificar_contadores,
     )
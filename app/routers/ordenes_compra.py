@@ -9,7 +9,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from sqlalchemy import desc, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.config import settings
 from app.database import get_db
@@ -17,12 +17,12 @@ from app.models.caja_turno import CajaTurno
 from app.models.catalogo_vehiculo import CatalogoVehiculo
 from app.models.detalle_orden import DetalleRepuestoOrden
 from app.models.movimiento_inventario import TipoMovimiento
+from app.models.notificacion_saliente import CANAL_EMAIL, CANAL_WHATSAPP
 from app.models.orden_compra import DetalleOrdenCompra, EstadoOrdenCompra, OrdenCompra
 from app.models.orden_trabajo import OrdenTrabajo
 from app.models.pago_orden_compra import PagoOrdenCompra
 from app.models.proveedor import Proveedor
 from app.models.repuesto import Repuesto
-from app.models.vehiculo import Vehiculo
 from app.schemas.movimiento_inventario import MovimientoInventarioCreate
 from app.schemas.orden_compra import (
     ItemsOrdenCompra,
@@ -32,12 +32,16 @@ from app.schemas.orden_compra import (
     RecepcionMercanciaRequest,
 )
 from app.services.auditoria_service import registrar as registrar_auditoria
-from app.services.email_service import enviar_orden_compra_a_proveedor
+from app.services.email_service import armar_email_orden_compra, email_esta_configurado
 from app.services.inventario_service import InventarioService
-from app.services.whatsapp_service import (
-    enviar_orden_compra_proveedor_whatsapp,
-    whatsapp_esta_configurado,
+from app.services.notificaciones_service import encolar_email, encolar_whatsapp, notificacion_a_dict
+from app.services.ordenes_compra_service import (
+    calcular_total_a_pagar,
+    orden_a_dict,
+    ordenes_a_dict,
+    precargar_relaciones,
 )
+from app.services.whatsapp_service import parametros_orden_compra_proveedor, whatsapp_esta_configurado
 from app.utils.decimal_utils import money_round, to_decimal, to_float_money
 from app.utils.fechas import condiciones_rango_taller, hoy_taller, isoformat_utc
 from app.utils.roles import require_roles
@@ -139,7 +143,7 @@ def crear_orden(
     db.commit()
     db.refresh(oc)
     registrar_auditoria(db, current_user.id_usuario, "CREAR", "ORDEN_COMPRA", oc.id_orden_compra, {})
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 class GenerarOCDesdeOrdenRequest(BaseModel):
@@ -252,7 +256,7 @@ def generar_oc_desde_orden_trabajo(
         oc.id_orden_compra,
         {"origen": "orden_trabajo", "id_orden_trabajo": orden_id},
     )
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.get("/")
@@ -283,8 +287,8 @@ def listar_ordenes(
     if id_proveedor:
         query = query.filter(OrdenCompra.id_proveedor == id_proveedor)
     total = query.count()
-    ordenes = query.options(joinedload(OrdenCompra.detalles)).offset(skip).limit(limit).all()
-    items = [_orden_a_dict(db, o) for o in ordenes]
+    ordenes = query.options(selectinload(OrdenCompra.detalles)).offset(skip).limit(limit).all()
+    items = ordenes_a_dict(db, ordenes)
     return {
         "ordenes": items,
         "total": total,
@@ -399,17 +403,6 @@ def alertas_ordenes_sin_recibir(
     }
 
 
-def _calcular_total_a_pagar(oc: OrdenCompra) -> Decimal:
-    """Total a pagar = suma de (cantidad_recibida * precio_real_o_estimado) por detalle."""
-    total = Decimal("0")
-    for d in oc.detalles:
-        if d.cantidad_recibida <= 0:
-            continue
-        precio = d.precio_unitario_real if d.precio_unitario_real is not None else d.precio_unitario_estimado
-        total += Decimal(str(d.cantidad_recibida)) * Decimal(str(precio))
-    return total
-
-
 @router.get("/cuentas-por-pagar")
 def listar_cuentas_por_pagar(
     id_proveedor: Optional[int] = Query(None),
@@ -448,7 +441,7 @@ def listar_cuentas_por_pagar(
 
     items = []
     for oc in ordenes:
-        total_a_pagar = _calcular_total_a_pagar(oc)
+        total_a_pagar = calcular_total_a_pagar(oc)
         if total_a_pagar <= 0:
             continue
         total_pagado = sum(to_decimal(p.monto) for p in oc.pagos)
@@ -542,7 +535,7 @@ def obtener_orden(
     oc = db.query(OrdenCompra).filter(OrdenCompra.id_orden_compra == id_orden).first()
     if not oc:
         raise HTTPException(404, detail="Orden de compra no encontrada")
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.put("/{id_orden}")
@@ -605,7 +598,7 @@ def actualizar_orden(
             setattr(oc, k, v)
     db.commit()
     db.refresh(oc)
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.post("/{id_orden}/autorizar")
@@ -632,7 +625,7 @@ def autorizar_orden(
     db.commit()
     db.refresh(oc)
     registrar_auditoria(db, current_user.id_usuario, "AUTORIZAR", "ORDEN_COMPRA", id_orden, {})
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.post("/{id_orden}/enviar")
@@ -641,7 +634,10 @@ def enviar_orden(
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "CAJA")),
 ):
-    """Cambia estado a ENVIADA y envía email al proveedor (si tiene email y SMTP está configurado)."""
+    """
+    Cambia estado a ENVIADA y encola email (si el proveedor tiene email y hay correo configurado)
+    y WhatsApp al proveedor. No espera al envío: el estado se consulta en GET /notificaciones/envios/{id}.
+    """
     oc = db.query(OrdenCompra).filter(OrdenCompra.id_orden_compra == id_orden).first()
     if not oc:
         raise HTTPException(404, detail="Orden de compra no encontrada")
@@ -652,60 +648,47 @@ def enviar_orden(
         )
 
     prov = db.query(Proveedor).filter(Proveedor.id_proveedor == oc.id_proveedor).first()
-    email_enviado = False
     mensaje_email = None
-    whatsapp_enviado = False
-    mensaje_whatsapp = None
+    notificaciones = []
 
     oc.estado = EstadoOrdenCompra.ENVIADA
     oc.fecha_envio = datetime.utcnow()
-    db.commit()
-    db.refresh(oc)
 
-    # Intentar enviar email al proveedor
+    # Email y WhatsApp al proveedor: se encolan en la misma transacción; los envía el despachador
+    relaciones = precargar_relaciones(db, [oc], con_pagos=False)
+    referencia = {"referencia_tipo": "ORDEN_COMPRA", "referencia_id": oc.id_orden_compra}
     if prov and prov.email and prov.email.strip():
-        cv = (
-            db.query(CatalogoVehiculo).filter(CatalogoVehiculo.id == oc.id_catalogo_vehiculo).first()
-            if getattr(oc, "id_catalogo_vehiculo", None)
-            else None
-        )
-        vh = (
-            db.query(Vehiculo).filter(Vehiculo.id_vehiculo == oc.id_vehiculo).first()
-            if getattr(oc, "id_vehiculo", None)
-            else None
-        )
-        vehiculo_info = None
-        if cv:
-            vehiculo_info = " ".join(filter(None, [cv.marca, cv.modelo, str(cv.anio), cv.version_trim, cv.motor]))
-        elif vh:
-            vehiculo_info = f"{vh.marca} {vh.modelo} {vh.anio}"
-
-        lineas = []
-        for d in oc.detalles:
-            if d.id_repuesto is not None:
-                rep = db.query(Repuesto).filter(Repuesto.id_repuesto == d.id_repuesto).first()
-                nombre_repuesto = rep.nombre if rep else ""
-                codigo_repuesto = rep.codigo if rep else ""
-            else:
-                nombre_repuesto = d.nombre_nuevo or ""
-                codigo_repuesto = d.codigo_nuevo or ""
-            lineas.append(
-                {
-                    "nombre_repuesto": nombre_repuesto or codigo_repuesto,
-                    "codigo_repuesto": codigo_repuesto,
-                    "cantidad_solicitada": d.cantidad_solicitada,
-                }
+        if email_esta_configurado():
+            lineas = []
+            for d in oc.detalles:
+                nombre_repuesto, codigo_repuesto = relaciones.nombre_codigo(d)
+                lineas.append(
+                    {
+                        "nombre_repuesto": nombre_repuesto or codigo_repuesto,
+                        "codigo_repuesto": codigo_repuesto,
+                        "cantidad_solicitada": d.cantidad_solicitada,
+                    }
+                )
+            subject, cuerpo = armar_email_orden_compra(
+                nombre_proveedor=prov.nombre,
+                numero_orden=oc.numero,
+                lineas=lineas,
+                observaciones=oc.observaciones,
+                vehiculo_info=relaciones.vehiculo_info(oc),
             )
-        ok, err = enviar_orden_compra_a_proveedor(
-            email_destino=prov.email,
-            nombre_proveedor=prov.nombre,
-            numero_orden=oc.numero,
-            lineas=lineas,
-            observaciones=oc.observaciones,
-            vehiculo_info=vehiculo_info,
-        )
-        email_enviado = ok
-        mensaje_email = None if ok else err
+            notificaciones.append(
+                encolar_email(
+                    db,
+                    prov.email,
+                    subject,
+                    cuerpo,
+                    clave=f"orden_compra.{oc.id_orden_compra}.envio.email",
+                    id_usuario=current_user.id_usuario,
+                    **referencia,
+                )
+            )
+        else:
+            mensaje_email = "Servidor de correo no configurado. Configure Azure (Graph API) o SMTP en .env"
 
     if prov and whatsapp_esta_configurado() and prov.telefono and str(prov.telefono).strip():
         t_est = oc.total_estimado
@@ -714,23 +697,29 @@ def enviar_orden(
                 to_decimal(d.cantidad_solicitada) * to_decimal(d.precio_unitario_estimado or 0)
                 for d in (oc.detalles or [])
             )
-        total_txt = str(money_round(to_decimal(t_est)))
-        w_ok, w_err = enviar_orden_compra_proveedor_whatsapp(
-            telefono=prov.telefono,
-            nombre_proveedor=prov.nombre or "",
-            numero_orden=oc.numero or "",
-            total_estimado_texto=total_txt,
+        notificaciones.append(
+            encolar_whatsapp(
+                db,
+                prov.telefono,
+                settings.WHATSAPP_TEMPLATE_ORDEN_COMPRA,
+                parametros_orden_compra_proveedor(
+                    nombre_proveedor=prov.nombre or "",
+                    numero_orden=oc.numero or "",
+                    total_estimado_texto=str(money_round(to_decimal(t_est))),
+                ),
+                clave=f"orden_compra.{oc.id_orden_compra}.envio.whatsapp",
+                id_usuario=current_user.id_usuario,
+                **referencia,
+            )
         )
-        whatsapp_enviado = w_ok
-        mensaje_whatsapp = None if w_ok else w_err
+    db.commit()
 
-    result = _orden_a_dict(db, oc)
-    result["email_enviado"] = email_enviado
+    result = orden_a_dict(db, oc, relaciones)
+    result["email_encolado"] = any(n.canal == CANAL_EMAIL for n in notificaciones)
     if mensaje_email:
         result["mensaje_email"] = mensaje_email
-    result["whatsapp_enviado"] = whatsapp_enviado
-    if mensaje_whatsapp:
-        result["mensaje_whatsapp"] = mensaje_whatsapp
+    result["whatsapp_encolado"] = any(n.canal == CANAL_WHATSAPP for n in notificaciones)
+    result["notificaciones"] = [notificacion_a_dict(n) for n in notificaciones]
     return result
 
 
@@ -763,6 +752,7 @@ def recibir_mercancia(
         oc.referencia_proveedor = data.referencia_proveedor
 
     ids_detalle = {d.id: d for d in oc.detalles}
+    movimientos = []
     for item in data.items:
         if item.id_detalle not in ids_detalle:
             raise HTTPException(400, detail=f"Detalle {item.id_detalle} no pertenece a esta orden")
@@ -823,29 +813,30 @@ def recibir_mercancia(
             det.codigo_nuevo = None
             det.nombre_nuevo = None
 
-        try:
-            InventarioService.registrar_movimiento(
-                db,
-                MovimientoInventarioCreate(
-                    id_repuesto=id_repuesto,
-                    tipo_movimiento=TipoMovimiento.ENTRADA,
-                    cantidad=item.cantidad_recibida,
-                    precio_unitario=Decimal(str(precio)),
-                    referencia=oc.numero,
-                    motivo=f"Recepción orden compra {oc.numero}",
-                    id_proveedor=oc.id_proveedor,
-                    imagen_comprobante_url=(oc.comprobante_url or "").strip() or None,
-                ),
-                current_user.id_usuario,
+        movimientos.append(
+            MovimientoInventarioCreate(
+                id_repuesto=id_repuesto,
+                tipo_movimiento=TipoMovimiento.ENTRADA,
+                cantidad=item.cantidad_recibida,
+                precio_unitario=Decimal(str(precio)),
+                referencia=oc.numero,
+                motivo=f"Recepción orden compra {oc.numero}",
+                id_proveedor=oc.id_proveedor,
+                imagen_comprobante_url=(oc.comprobante_url or "").strip() or None,
             )
-        except ValueError as e:
-            raise HTTPException(400, detail=str(e))
+        )
         det.cantidad_recibida += item.cantidad_recibida
         precio_dec = to_decimal(precio)
         estimado_dec = to_decimal(det.precio_unitario_estimado or 0)
         if abs(precio_dec - estimado_dec) >= Decimal("0.01"):
             det.precio_unitario_real = to_float_money(precio_dec)
 
+    # Entradas de todas las líneas en un lote: un bloqueo de repuestos y todo en la misma transacción
+    try:
+        InventarioService.registrar_movimientos_lote(db, movimientos, current_user.id_usuario, autocommit=False)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
     # Actualizar estado
     total_solicitado = sum(d.cantidad_solicitada for d in oc.detalles)
     total_recibido = sum(d.cantidad_recibida for d in oc.detalles)
@@ -857,7 +848,7 @@ def recibir_mercancia(
     db.commit()
     db.refresh(oc)
     registrar_auditoria(db, current_user.id_usuario, "ACTUALIZAR", "ORDEN_COMPRA", id_orden, {"accion": "recibir"})
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.post("/{id_orden}/items")
@@ -902,7 +893,7 @@ def agregar_items(
     oc.total_estimado = (oc.total_estimado or 0) + total_extra
     db.commit()
     db.refresh(oc)
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.delete("/{id_orden}/items/{id_detalle}")
@@ -933,7 +924,7 @@ def quitar_item(
     db.delete(det)
     db.commit()
     db.refresh(oc)
-    return _orden_a_dict(db, oc)
+    return orden_a_dict(db, oc)
 
 
 @router.post("/{id_orden}/pagar")
@@ -950,7 +941,7 @@ def registrar_pago(
     if oc.estado not in (EstadoOrdenCompra.RECIBIDA, EstadoOrdenCompra.RECIBIDA_PARCIAL):
         raise HTTPException(400, detail="Solo se pueden registrar pagos en órdenes RECIBIDA o RECIBIDA_PARCIAL")
 
-    total_a_pagar = _calcular_total_a_pagar(oc)
+    total_a_pagar = calcular_total_a_pagar(oc)
     pagos_existentes = db.query(PagoOrdenCompra).filter(PagoOrdenCompra.id_orden_compra == id_orden).all()
     total_pagado = sum(to_decimal(p.monto) for p in pagos_existentes)
     saldo = total_a_pagar - total_pagado
@@ -1034,111 +1025,4 @@ def cancelar_orden(
     registrar_auditoria(
         db, current_user.id_usuario, "CANCELAR", "ORDEN_COMPRA", id_orden, {"motivo": body.motivo.strip()[:200]}
     )
-    return _orden_a_dict(db, oc)
-
-
-def _orden_a_dict(db: Session, oc: OrdenCompra) -> dict:
-    detalles = []
-    for d in oc.detalles:
-        if d.id_repuesto is not None:
-            rep = db.query(Repuesto).filter(Repuesto.id_repuesto == d.id_repuesto).first()
-            nombre_repuesto = rep.nombre if rep else ""
-            codigo_repuesto = rep.codigo if rep else ""
-        else:
-            nombre_repuesto = d.nombre_nuevo or ""
-            codigo_repuesto = d.codigo_nuevo or ""
-        detalles.append(
-            {
-                "id": d.id,
-                "id_repuesto": d.id_repuesto,
-                "codigo_nuevo": d.codigo_nuevo,
-                "nombre_nuevo": d.nombre_nuevo,
-                "nombre_repuesto": nombre_repuesto,
-                "codigo_repuesto": codigo_repuesto,
-                "cantidad_solicitada": d.cantidad_solicitada,
-                "cantidad_recibida": d.cantidad_recibida,
-                "cantidad_pendiente": d.cantidad_solicitada - d.cantidad_recibida,
-                "precio_unitario_estimado": float(d.precio_unitario_estimado),
-                "precio_unitario_real": float(d.precio_unitario_real) if d.precio_unitario_real else None,
-            }
-        )
-    prov = db.query(Proveedor).filter(Proveedor.id_proveedor == oc.id_proveedor).first()
-    cv = (
-        db.query(CatalogoVehiculo).filter(CatalogoVehiculo.id == oc.id_catalogo_vehiculo).first()
-        if getattr(oc, "id_catalogo_vehiculo", None)
-        else None
-    )
-    vh = (
-        db.query(Vehiculo).filter(Vehiculo.id_vehiculo == oc.id_vehiculo).first()
-        if getattr(oc, "id_vehiculo", None)
-        else None
-    )
-    fecha_est = getattr(oc, "fecha_estimada_entrega", None)
-    hoy = hoy_taller()
-    vencida = False
-    if fecha_est and oc.estado in (EstadoOrdenCompra.ENVIADA, EstadoOrdenCompra.RECIBIDA_PARCIAL):
-        try:
-            fecha_est_date = fecha_est.date() if hasattr(fecha_est, "date") else fecha_est
-            vencida = fecha_est_date < hoy
-        except (AttributeError, TypeError):
-            pass
-
-    saldo_pendiente = Decimal("0")
-    total_a_pagar = Decimal("0")
-    pagos_list = []
-    if oc.estado in (EstadoOrdenCompra.RECIBIDA, EstadoOrdenCompra.RECIBIDA_PARCIAL):
-        total_a_pagar = _calcular_total_a_pagar(oc)
-        pagos = (
-            db.query(PagoOrdenCompra)
-            .filter(PagoOrdenCompra.id_orden_compra == oc.id_orden_compra)
-            .order_by(PagoOrdenCompra.fecha.desc())
-            .all()
-        )
-        total_pagado = sum(to_decimal(p.monto) for p in pagos)
-        saldo_pendiente = money_round(max(Decimal("0"), total_a_pagar - total_pagado))
-        pagos_list = [
-            {
-                "id_pago": p.id_pago,
-                "monto": float(p.monto),
-                "metodo": p.metodo.value if hasattr(p.metodo, "value") else str(p.metodo),
-                "referencia": p.referencia,
-                "fecha": isoformat_utc(p.fecha),
-            }
-            for p in pagos
-        ]
-
-    result = {
-        "id_orden_compra": oc.id_orden_compra,
-        "numero": oc.numero,
-        "id_proveedor": oc.id_proveedor,
-        "nombre_proveedor": prov.nombre if prov else "",
-        "email_proveedor": prov.email if prov and prov.email else None,
-        "estado": oc.estado.value if hasattr(oc.estado, "value") else str(oc.estado),
-        "saldo_pendiente": float(saldo_pendiente),
-        "total_estimado": float(oc.total_estimado or 0),
-        "fecha": isoformat_utc(oc.fecha),
-        "fecha_envio": isoformat_utc(oc.fecha_envio),
-        "fecha_recepcion": isoformat_utc(oc.fecha_recepcion),
-        "fecha_estimada_entrega": fecha_est.isoformat()[:10] if fecha_est else None,
-        "vencida": vencida,
-        "observaciones": oc.observaciones,
-        "id_catalogo_vehiculo": getattr(oc, "id_catalogo_vehiculo", None),
-        "vehiculo_info": (
-            " ".join(filter(None, [cv.marca, cv.modelo, str(cv.anio), cv.version_trim, cv.motor]))
-            if cv
-            else (f"{vh.marca} {vh.modelo} {vh.anio}" if vh else None)
-        ),
-        "referencia_proveedor": oc.referencia_proveedor,
-        "comprobante_url": getattr(oc, "comprobante_url", None),
-        "motivo_cancelacion": getattr(oc, "motivo_cancelacion", None),
-        "evidencia_cancelacion_url": getattr(oc, "evidencia_cancelacion_url", None),
-        "fecha_cancelacion": isoformat_utc(oc.fecha_cancelacion) if getattr(oc, "fecha_cancelacion", None) else None,
-        "id_usuario_cancelacion": getattr(oc, "id_usuario_cancelacion", None),
-        "detalles": detalles,
-    }
-    if oc.estado in (EstadoOrdenCompra.RECIBIDA, EstadoOrdenCompra.RECIBIDA_PARCIAL):
-        result["total_a_pagar"] = float(total_a_pagar)
-        result["total_pagado"] = float(total_pagado)
-        if pagos_list:
-            result["pagos"] = pagos_list
-    return result
+    return orden_a_dict(db, oc)
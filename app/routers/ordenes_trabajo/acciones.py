@@ -28,6 +28,7 @@ from app.schemas.orden_trabajo_schema import (
 from app.services.auditoria_service import registrar as registrar_auditoria
 from app.services.inventario_service import InventarioService
 from app.services.ot_acciones_service import asegurar_accion_ot_permitida
+from app.services.utilidad_ventas_service import recalcular_ventas
 from app.utils.decimal_utils import money_round, to_decimal
 from app.utils.roles import require_roles
 from app.utils.transaction import transaction
@@ -440,6 +441,7 @@ def cancelar_orden_trabajo(
                 logger.info(f"Venta {id_venta} desvinculada, ítems devueltos eliminados")
         elif usar_logica_por_repuesto and ids_detalle_usados:
             id_venta_nueva = _crear_venta_repuestos_utilizados(db, orden, ids_detalle_usados, current_user.id_usuario)
+        recalcular_ventas(db, [venta_vinculada.id_venta if venta_vinculada else None, id_venta_nueva])
 
     db.refresh(orden)
     logger.info(f"Orden cancelada: {orden.numero_orden}")
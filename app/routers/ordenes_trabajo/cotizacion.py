@@ -2,10 +2,8 @@
 
 import logging
 from io import BytesIO
-from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
 from reportlab.lib.colors import HexColor
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
@@ -16,7 +14,10 @@ from app.config import settings
 from app.database import get_db
 from app.models.detalle_orden import DetalleRepuestoOrden
 from app.models.orden_trabajo import OrdenTrabajo
+from app.utils.cache_pdf import clave_pdf, respuesta_pdf
 from app.utils.fechas import isoformat_fecha_ingreso_ot
+from app.utils.pdf_layout import CanvasTotalPaginasDiferido, ancho_texto, partir_lineas
+from app.utils.pdf_recursos import BLANCO, GRIS_LINEA, GRIS_PIZARRA, GRIS_SUAVE, NEGRO, dibujar_logo
 from app.utils.roles import require_roles
 
 router = APIRouter()
@@ -29,11 +30,14 @@ _COLOR_GRIS_BORDE = HexColor("#d1d5db")
 _COLOR_GRIS_SUAVE = HexColor("#6b7280")
 _COLOR_GRIS_CLARO = HexColor("#f9fafb")
 
-_LOGO_PATH = Path(__file__).resolve().parent.parent.parent.parent / "static" / "logo_medina_autodiag.png"
 
 # Límite inferior antes de nueva página (reportlab: y=0 abajo)
 _Y_MIN = 1.15 * 72
 
+# Parte de la clave de la caché de PDFs: subir al cambiar el layout o los textos fijos
+_VERSION_PLANTILLA_COTIZACION = "1"
+_VERSION_PLANTILLA_HOJA_TECNICO = "1"
+
 _COTIZACION_VIGENCIA_DEFAULT = "7 días naturales"
 
 # Filas mínimas de relleno en tablas (compacto)
@@ -48,39 +52,6 @@ _TALLER_DIRECCION = "Ave. Lauro Villar #930A Col. Las Palmas C.P. 87420 Matamoro
 _TALLER_CORREO = "recepcion@medinamedinaautodiag.com"
 
 
-def _wrap_text(p, text, max_width, font="Helvetica", size=9):
-    """Divide texto en líneas que caben en max_width."""
-    if not text or not str(text).strip():
-        return [""]
-    text = str(text).strip()
-    words = text.split()
-    lines = []
-    current = []
-    for w in words:
-        test = " ".join(current + [w]) if current else w
-        if p.stringWidth(test, font, size) <= max_width:
-            current.append(w)
-        else:
-            if current:
-                lines.append(" ".join(current))
-            current = []
-            if p.stringWidth(w, font, size) <= max_width:
-                current = [w]
-            else:
-                while w:
-                    for k in range(len(w), 0, -1):
-                        if p.stringWidth(w[:k], font, size) <= max_width:
-                            lines.append(w[:k])
-                            w = w[k:]
-                            break
-                    else:
-                        lines.append(w[:25])
-                        w = w[25:]
-    if current:
-        lines.append(" ".join(current))
-    return lines if lines else [""]
-
-
 def _ensure_y(p, y, needed, h, margin):
     """Salta de página si no hay espacio vertical suficiente."""
     if y - needed < _Y_MIN:
@@ -92,7 +63,7 @@ def _ensure_y(p, y, needed, h, margin):
 def _draw_wrapped_block(p, text, x, y, max_width, font="Helvetica", size=9, line_h=0.17 * inch):
     """Dibuja párrafo con wrap; retorna nueva posición y."""
     p.setFont(font, size)
-    for ln in _wrap_text(p, text, max_width, font, size):
+    for ln in partir_lineas(text, max_width, font, size):
         p.drawString(x, y, ln)
         y -= line_h
     return y
@@ -156,28 +127,27 @@ def _barra_roja(p, x, y, ancho, alto, texto, font="Helvetica-Bold", size=9):
     """Barra roja con texto blanco (secciones cotización compacta)."""
     p.setFillColor(_COLOR_ROJO)
     p.rect(x, y - alto, ancho, alto, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont(font, size)
     p.drawString(x + 0.08 * inch, y - alto + 0.055 * inch, texto)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - alto
 
 
 def _barra_header_negra(p, x, y, ancho, alto, texto, size=8):
     p.setFillColor(_COLOR_HEADER_BG)
     p.rect(x, y - alto, ancho, alto, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont("Helvetica-Bold", size)
     p.drawString(x + 0.08 * inch, y - alto + 0.05 * inch, texto)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - alto
 
 
 def _draw_header_compacto(p, w, y, margin, ancho_util):
     """Logo izquierda, título COTIZACIÓN derecha, línea roja."""
     logo_w, logo_h = 2.35 * inch, 0.48 * inch
-    if _LOGO_PATH.exists():
-        p.drawImage(str(_LOGO_PATH), margin, y - logo_h, width=logo_w, height=logo_h, mask="auto")
+    dibujar_logo(p, margin, y - logo_h, logo_w, logo_h, mask="auto")
     title_x = w - margin
     p.setFont("Helvetica-Bold", 20)
     p.drawRightString(title_x, y - 0.22 * inch, "COTIZACIÓN")
@@ -187,7 +157,7 @@ def _draw_header_compacto(p, w, y, margin, ancho_util):
     p.setStrokeColor(_COLOR_ROJO)
     p.setLineWidth(2)
     p.line(margin, y, w - margin, y)
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.5)
     return y - 0.14 * inch
 
@@ -220,7 +190,7 @@ def _draw_caja_datos(p, x, y, ancho, titulo, lineas: list[tuple[str, str]], *, b
     total_h = header_h + body_h
     p.setStrokeColor(_COLOR_GRIS_BORDE)
     p.setLineWidth(0.5)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.rect(x, y - total_h, ancho, total_h, fill=1, stroke=1)
     _barra_header_negra(p, x, y, ancho, header_h, titulo, size=7.5)
     p.setFont("Helvetica", 7.5)
@@ -228,7 +198,7 @@ def _draw_caja_datos(p, x, y, ancho, titulo, lineas: list[tuple[str, str]], *, b
     for label, valor in lineas:
         p.setFillColor(_COLOR_GRIS_SUAVE)
         p.drawString(x + 0.08 * inch, yy, f"{label}:")
-        p.setFillColor(HexColor("#000000"))
+        p.setFillColor(NEGRO)
         p.drawString(x + 0.72 * inch, yy, (valor or "-")[:42])
         yy -= line_h
     return y - total_h
@@ -263,7 +233,7 @@ def _cols_tabla(w, margin):
 def _draw_header_en_celda(p, x_left, width, text, y, *, align="center", font="Helvetica-Bold", size=7.5):
     """Dibuja encabezado de columna centrado o alineado dentro de su celda."""
     p.setFont(font, size)
-    tw = p.stringWidth(text, font, size)
+    tw = ancho_texto(text, font, size)
     if align == "right":
         x = x_left + width - tw
     elif align == "center":
@@ -292,9 +262,9 @@ def _draw_fila_tabla(p, y, cols, desc, cant, pu, sub, vacia=False):
         p.drawRightString(cols["cant"], y, "—")
         p.drawRightString(cols["punit"], y, "—")
         p.drawRightString(cols["total"], y, "—")
-        p.setFillColor(HexColor("#000000"))
+        p.setFillColor(NEGRO)
     else:
-        desc_lines = _wrap_text(p, desc, cols["desc_max"], "Helvetica", 8)
+        desc_lines = partir_lineas(desc, cols["desc_max"], "Helvetica", 8)
         first = True
         for dl in desc_lines[:2]:
             p.drawString(cols["desc"], y, (dl or "")[:52])
@@ -373,7 +343,7 @@ def _draw_seccion_tabla(
     p.drawRightString(cols["total_left"] - 0.08 * inch, y, total_label)
     p.setFillColor(_COLOR_ROJO)
     p.drawRightString(cols["total"], y, f"${total_val:.2f}")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - 0.14 * inch
 
 
@@ -401,12 +371,12 @@ def _draw_comentarios_y_resumen(
 
     # --- Comentarios (izquierda) ---
     p.setStrokeColor(_COLOR_GRIS_BORDE)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.rect(x_left, y_top - box_h, col_w, box_h, fill=1, stroke=1)
     yy = _barra_header_negra(p, x_left, y_top, col_w, 0.22 * inch, "COMENTARIOS", size=7.5)
     p.setFont("Helvetica", 8)
     yy -= 0.12 * inch
-    for ln in _wrap_text(p, comentarios, col_w - 0.2 * inch, "Helvetica", 8)[:4]:
+    for ln in partir_lineas(comentarios, col_w - 0.2 * inch, "Helvetica", 8)[:4]:
         p.drawString(x_left + 0.08 * inch, yy, ln)
         yy -= 0.15 * inch
     yy = y_top - box_h + 0.28 * inch
@@ -415,7 +385,7 @@ def _draw_comentarios_y_resumen(
     p.drawString(x_left + 0.08 * inch, yy, f"{marca} Cliente proporcionó refacciones")
 
     # --- Resumen (derecha) ---
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.rect(x_right, y_top - box_h, col_w, box_h, fill=1, stroke=1)
     yy = _barra_header_negra(p, x_right, y_top, col_w, 0.22 * inch, "RESUMEN DE INVERSIÓN", size=7.5)
     lh = 0.17 * inch
@@ -445,12 +415,12 @@ def _draw_comentarios_y_resumen(
     total_h = 0.3 * inch
     p.setFillColor(_COLOR_HEADER_BG)
     p.rect(x_right + 0.08 * inch, yy - total_h + 0.06 * inch, col_w - 0.16 * inch, total_h, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont("Helvetica-Bold", 8)
     p.drawString(x_right + 0.14 * inch, yy - 0.08 * inch, "TOTAL ESTIMADO A PAGAR:")
     p.setFont("Helvetica-Bold", 11)
     p.drawRightString(x_val, yy - 0.1 * inch, f"${total:.2f}")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
 
     return y_top - box_h - 0.12 * inch
 
@@ -460,7 +430,7 @@ def _draw_autorizacion_compacta(p, y, w, h, margin, ancho_util):
     p.setFont("Helvetica-Bold", 9)
     p.setFillColor(_COLOR_ROJO)
     p.drawString(margin, y, "AUTORIZACIÓN DEL CLIENTE")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     y -= 0.16 * inch
     auth_text = (
         "Autorizo la realización de los trabajos descritos en esta cotización, " "conforme al total estimado a pagar."
@@ -481,14 +451,14 @@ def _draw_pie_comercial(p, y, w, margin, ancho_util):
     p.line(margin, y, w - margin, y)
     y -= 0.16 * inch
     p.setFont("Helvetica", 7.5)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawCentredString(
         w / 2,
         y,
         f"Tel: {_TALLER_TELEFONO}  |  WhatsApp: {_TALLER_WHATSAPP}  |  {_TALLER_CORREO}",
     )
     y -= 0.14 * inch
-    for ln in _wrap_text(p, _TALLER_DIRECCION, ancho_util - 0.2 * inch, "Helvetica", 7.5):
+    for ln in partir_lineas(_TALLER_DIRECCION, ancho_util - 0.2 * inch, "Helvetica", 7.5):
         p.drawCentredString(w / 2, y, ln)
         y -= 0.13 * inch
     return y
@@ -499,51 +469,22 @@ def _barra_naranja(p, x, y, ancho, alto, texto, font="Helvetica-Bold", size=10):
     return _barra_roja(p, x, y, ancho, alto, texto, font=font, size=size)
 
 
-class _CotizacionPaginationCanvas(canvas.Canvas):
-    """Añade «Página X de Y» antes de cerrar cada página (cotización cliente)."""
-
-    def __init__(self, *args, total_pages: int = 1, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._total_pages_for_pagination = total_pages
-
-    def showPage(self):
-        self._draw_paginacion()
-        super().showPage()
+class _CotizacionPaginationCanvas(CanvasTotalPaginasDiferido):
+    """Añade «Página X de Y» al emitir cada página (cotización cliente), en una sola pasada."""
 
-    def _draw_paginacion(self):
+    def dibujar_pie(self, pagina: int, total: int) -> None:
         w, _ = self._pagesize
         margin = inch
         self.setFont("Helvetica", 8)
-        self.setFillColor(HexColor("#64748b"))
-        text = f"Página {self._pageNumber} de {self._total_pages_for_pagination}"
-        self.drawRightString(w - margin, 0.4 * inch, text)
-        self.setFillColor(HexColor("#000000"))
+        self.setFillColor(GRIS_PIZARRA)
+        self.drawRightString(w - margin, 0.4 * inch, f"Página {pagina} de {total}")
+        self.setFillColor(NEGRO)
 
 
-def _generar_pdf_cotizacion(
-    orden_data: dict,
-    app_name: str = "MedinaAutoDiag",
-    *,
-    _pagination_total: int | None = None,
-) -> bytes:
+def _generar_pdf_cotizacion(orden_data: dict, app_name: str = "MedinaAutoDiag") -> bytes:
     """Genera PDF de cotización compacta (P5.4 Fase 2) para el cliente."""
-    page_count: dict[str, int] = {}
-
-    if _pagination_total is None:
-
-        class _CountingCanvas(canvas.Canvas):
-            def save(self):
-                page_count["total"] = self._pageNumber
-                canvas.Canvas.save(self)
-
-        canvas_cls = _CountingCanvas
-        canvas_kwargs: dict = {}
-    else:
-        canvas_cls = _CotizacionPaginationCanvas
-        canvas_kwargs = {"total_pages": _pagination_total}
-
     buf = BytesIO()
-    p = canvas_cls(buf, pagesize=letter, **canvas_kwargs)
+    p = _CotizacionPaginationCanvas(buf, pagesize=letter)
     w, h = letter
     margin = 0.65 * inch
     ancho_util = w - 2 * margin
@@ -661,9 +602,6 @@ def _generar_pdf_cotizacion(
     y = _draw_pie_comercial(p, y, w, margin, ancho_util)
 
     p.save()
-    if _pagination_total is None:
-        total_pages = page_count.get("total", p._pageNumber) or 1
-        return _generar_pdf_cotizacion(orden_data, app_name=app_name, _pagination_total=total_pages)
     buf.seek(0)
     return buf.read()
 
@@ -671,6 +609,7 @@ def _generar_pdf_cotizacion(
 @router.get("/{orden_id}/cotizacion")
 def descargar_cotizacion(
     orden_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA", "TECNICO")),
 ):
@@ -753,12 +692,12 @@ def descargar_cotizacion(
         }
 
         app_name = settings.APP_NAME.replace(" API", "")
-        pdf_bytes = _generar_pdf_cotizacion(orden_data, app_name=app_name)
         filename = f"cotizacion-{orden.numero_orden.replace(' ', '-')}.pdf"
-        return StreamingResponse(
-            BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        return respuesta_pdf(
+            request,
+            clave_pdf("cotizacion_ot", _VERSION_PLANTILLA_COTIZACION, app_name, orden_data),
+            lambda: _generar_pdf_cotizacion(orden_data, app_name=app_name),
+            f"attachment; filename={filename}",
         )
     except HTTPException:
         raise
@@ -770,18 +709,19 @@ def descargar_cotizacion(
 # --- Hoja de trabajo para técnico (verde) ---
 _COLOR_VERDE = HexColor("#16a34a")
 _COLOR_VERDE_CLARO = HexColor("#dcfce7")
+_COLOR_VERDE_OSCURO = HexColor("#1e3a2f")
 
 
 def _barra_verde(p, x, y, ancho, alto, texto, font="Helvetica-Bold", size=10):
     """Dibuja barra verde con texto blanco centrado (hoja técnico)."""
     p.setFillColor(_COLOR_VERDE)
     p.rect(x, y - alto, ancho, alto, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont(font, size)
     centro_x = x + ancho / 2
     texto_y = y - alto + 0.06 * inch
     p.drawCentredString(centro_x, texto_y, texto)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - alto
 
 
@@ -797,8 +737,7 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
 
     # Logo centrado: más ancho y delgado
     logo_w, logo_h = 3.4 * inch, 0.6 * inch
-    if _LOGO_PATH.exists():
-        p.drawImage(str(_LOGO_PATH), w / 2 - logo_w / 2, y - logo_h, width=logo_w, height=logo_h)
+    dibujar_logo(p, w / 2 - logo_w / 2, y - logo_h, logo_w, logo_h)
     y -= logo_h + 0.2 * inch
     p.setFont("Helvetica", 12)
     p.drawCentredString(w / 2, y, "HOJA DE TRABAJO")
@@ -806,7 +745,7 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
     p.setFont("Helvetica", 10)
     p.drawCentredString(w / 2, y, "SERVICIO Y DIAGNÓSTICO AUTOMOTRIZ")
     y -= 0.22 * inch
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.5)
     p.line(margin, y, w - margin, y)
     y -= 0.25 * inch
@@ -820,7 +759,7 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
 
     alto_caja = 0.5 * inch
     p.setFillColor(_COLOR_VERDE_CLARO)
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.25)
     p.rect(margin, y - alto_caja, ancho_util, alto_caja, fill=1, stroke=1)
     y_linea1 = y - 0.14 * inch
@@ -832,7 +771,7 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
     p.setFillColor(_COLOR_VERDE)
     p.drawString(x_izq, y_linea1, "FECHA")
     p.setFont("Helvetica", 10)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_izq + p.stringWidth("FECHA ", "Helvetica-Bold", 10), y_linea1, fecha_str)
     num_orden = (numero_orden or "-")[:25]
     p.setFont("Helvetica-Bold", 10)
@@ -840,13 +779,13 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
     lbl_orden = "ORDEN # "
     p.drawString(right_x - p.stringWidth(lbl_orden + num_orden, "Helvetica", 10), y_linea1, lbl_orden)
     p.setFont("Helvetica", 10)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawRightString(right_x, y_linea1, num_orden)
     p.setFont("Helvetica-Bold", 10)
     p.setFillColor(_COLOR_VERDE)
     p.drawString(x_izq, y_linea2, "TÉCNICO")
     p.setFont("Helvetica", 10)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     tecnico_val = (orden_data.get("tecnico_nombre") or "-")[:28]
     prioridad_val = orden_data.get("prioridad", "-")
     p.drawString(
@@ -883,57 +822,57 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
         return txt or "-"
 
     p.setFillColor(_COLOR_VERDE_CLARO)
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.2)
     p.rect(margin, y - alto_bloque, ancho_util, alto_bloque, fill=1, stroke=1)
     # Línea vertical separando columnas
-    p.setStrokeColor(HexColor("#9ca3af"))
+    p.setStrokeColor(GRIS_SUAVE)
     p.setLineWidth(0.5)
     p.line(margin + col_ancho, y - alto_bloque, margin + col_ancho, y)
-    p.setStrokeColor(HexColor("#000000"))
-    p.setFillColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
+    p.setFillColor(NEGRO)
     y -= 0.15 * inch
     p.setFont("Helvetica-Bold", 9)
     p.drawString(x_label_izq, y, "CLIENTE")
     p.drawString(x_label_der, y, "VEHÍCULO")
     y -= line_h
     p.setFont("Helvetica", 9)
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_izq, y, "NOMBRE:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_izq, y, _truncar(p, cliente.get("nombre"), x_val_izq, x_fin_izq))
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_der, y, "MARCA:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_der, y, (veh.get("marca") or "-")[:18])
     y -= line_h
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_izq, y, "TEL:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_izq, y, _truncar(p, cliente.get("telefono"), x_val_izq, x_fin_izq))
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_der, y, "MODELO:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_der, y, (veh.get("modelo") or "-")[:18])
     y -= line_h
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_izq, y, "DIRECCIÓN:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_izq, y, _truncar(p, cliente.get("direccion"), x_val_izq, x_fin_izq))
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_der, y, "AÑO:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_der, y, str(veh.get("anio") or "-")[:10])
     y -= line_h
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_der, y, "VIN:")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_der, y, (veh.get("vin") or "-")[:18])
     y -= line_h
-    p.setFillColor(HexColor("#1e3a2f"))
+    p.setFillColor(_COLOR_VERDE_OSCURO)
     p.drawString(x_label_der, y, "KM:")
     km_val = orden_data.get("kilometraje")
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.drawString(x_val_der, y, str(km_val) if km_val is not None and km_val != "" else "-")
     y -= line_h + 0.15 * inch
 
@@ -1004,15 +943,15 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
         p.drawString(margin, y, "Hallazgos durante el servicio:")
         y -= 0.25 * inch
         for _ in range(3):
-            p.setStrokeColor(HexColor("#cccccc"))
+            p.setStrokeColor(GRIS_LINEA)
             p.line(margin, y, w - margin, y)
             y -= 0.28 * inch
         y -= 0.1 * inch
-        p.setFillColor(HexColor("#000000"))
+        p.setFillColor(NEGRO)
         p.drawString(margin, y, "Recomendaciones al cliente:")
         y -= 0.25 * inch
         for _ in range(2):
-            p.setStrokeColor(HexColor("#cccccc"))
+            p.setStrokeColor(GRIS_LINEA)
             p.line(margin, y, w - margin, y)
             y -= 0.28 * inch
         y -= 0.1 * inch
@@ -1029,6 +968,7 @@ def _generar_pdf_hoja_tecnico(orden_data: dict, app_name: str = "MedinaAutoDiag"
 @router.get("/{orden_id}/hoja-tecnico")
 def descargar_hoja_tecnico(
     orden_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA", "TECNICO")),
 ):
@@ -1108,12 +1048,12 @@ def descargar_hoja_tecnico(
         }
 
         app_name = settings.APP_NAME.replace(" API", "")
-        pdf_bytes = _generar_pdf_hoja_tecnico(orden_data, app_name=app_name)
         filename = f"hoja-tecnico-{orden.numero_orden.replace(' ', '-')}.pdf"
-        return StreamingResponse(
-            BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        return respuesta_pdf(
+            request,
+            clave_pdf("hoja_tecnico", _VERSION_PLANTILLA_HOJA_TECNICO, app_name, orden_data),
+            lambda: _generar_pdf_hoja_tecnico(orden_data, app_name=app_name),
+            f"attachment; filename={filename}",
         )
     except HTTPException:
         raise
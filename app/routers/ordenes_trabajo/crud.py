@@ -5,7 +5,6 @@ from decimal import Decimal
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -25,14 +24,16 @@ from app.schemas.orden_trabajo_schema import (
     RecepcionRapidaCreate,
 )
 from app.services.auditoria_service import registrar as registrar_auditoria
-from app.services.ot_acciones_service import acciones_a_dict, evaluar_acciones_ot
+from app.services.ot_acciones_service import acciones_a_dict, evaluar_acciones_ot_lote
 from app.services.recepcion_ot_service import (
     crear_ot_minima_pendiente,
     validar_cita_para_vinculo_recepcion,
     vincular_cita_a_orden,
 )
+from app.services.utilidad_ventas_service import recalcular_ventas_orden
 from app.utils.dependencies import get_current_user
 from app.utils.fechas import ahora_local_naive, isoformat_fecha_ingreso_ot, validar_fecha_promesa_vs_ingreso
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 from app.utils.transaction import transaction
 
@@ -325,10 +326,13 @@ def listar_ordenes_trabajo(
     fecha_desde: Optional[datetime] = Query(None, description="Fecha de ingreso desde"),
     fecha_hasta: Optional[datetime] = Query(None, description="Fecha de ingreso hasta"),
     buscar: Optional[str] = Query(None, description="Buscar en número de orden"),
+    cursor: Optional[str] = Query(
+        None, description="Paginación keyset: vacío = primera página, luego siguiente_cursor"
+    ),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user),
 ):
-    """Listar órdenes de trabajo con filtros."""
+    """Listar órdenes de trabajo con filtros (skip/limit o ?cursor= por fecha de ingreso)."""
     query = db.query(OrdenTrabajo)
     if estado:
         query = query.filter(OrdenTrabajo.estado == estado)
@@ -347,24 +351,22 @@ def listar_ordenes_trabajo(
     if current_user.rol == "TECNICO":
         query = query.filter(OrdenTrabajo.tecnico_id == current_user.id_usuario)
 
-    total = query.count()
-    ordenes = (
-        query.options(
-            joinedload(OrdenTrabajo.cliente),
-            joinedload(OrdenTrabajo.vehiculo),
-        )
-        .order_by(OrdenTrabajo.fecha_ingreso.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    pagina = paginar(
+        query,
+        [(OrdenTrabajo.fecha_ingreso, True), (OrdenTrabajo.id, True)],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        opciones=(joinedload(OrdenTrabajo.cliente), joinedload(OrdenTrabajo.vehiculo)),
     )
+    ordenes = pagina.items
 
     ids_orden = [o.id for o in ordenes]
     ventas_por_orden = {}
     saldos_por_id_venta = {}
     if ids_orden:
         ventas_link = (
-            db.query(Venta.id_orden, Venta.id_venta, Venta.total)
+            db.query(Venta.id_orden, Venta.id_venta, Venta.saldo)
             .filter(
                 Venta.id_orden.in_(ids_orden),
                 Venta.estado != "CANCELADA",
@@ -372,19 +374,7 @@ def listar_ordenes_trabajo(
             .all()
         )
         ventas_por_orden = {r[0]: r[1] for r in ventas_link}
-        ids_venta = [r[1] for r in ventas_link]
-        venta_totales = {r[1]: float(r[2]) for r in ventas_link}
-        if ids_venta:
-            rows = (
-                db.query(Pago.id_venta, func.coalesce(func.sum(Pago.monto), 0).label("total_pagado"))
-                .filter(Pago.id_venta.in_(ids_venta))
-                .group_by(Pago.id_venta)
-                .all()
-            )
-            pagos_por_venta = {r[0]: float(r[1]) for r in rows}
-            for vid, vtotal in venta_totales.items():
-                pagado = pagos_por_venta.get(vid, 0)
-                saldos_por_id_venta[vid] = max(0, vtotal - pagado)
+        saldos_por_id_venta = {r[1]: float(r[2] or 0) for r in ventas_link}
 
     resultado = []
     for o in ordenes:
@@ -409,12 +399,7 @@ def listar_ordenes_trabajo(
         }
         resultado.append(item)
 
-    return {
-        "ordenes": resultado,
-        "total": total,
-        "pagina": skip // limit + 1 if limit > 0 else 1,
-        "total_paginas": (total + limit - 1) // limit if limit > 0 else 1,
-    }
+    return pagina.respuesta("ordenes", skip, limit, cursor, resultado)
 
 
 @router.get("/{orden_id}")
@@ -463,8 +448,7 @@ def obtener_orden_trabajo(
     usuario_cobro = None
     usuario_creacion_venta = None
     if venta:
-        total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
-        venta_saldo_pendiente = max(0, float(venta.total) - float(total_pagado or 0))
+        venta_saldo_pendiente = float(venta.saldo or 0)
         if venta.fecha:
             usr_venta = (
                 db.query(Usuario).filter(Usuario.id_usuario == venta.id_usuario).first() if venta.id_usuario else None
@@ -590,7 +574,7 @@ def obtener_orden_trabajo(
             }
             for oc in (orden.ordenes_compra or [])
         ],
-        "acciones": acciones_a_dict(evaluar_acciones_ot(db, orden, current_user)),
+        "acciones": acciones_a_dict(evaluar_acciones_ot_lote(db, [orden], current_user)[orden.id]),
     }
 
 
@@ -641,6 +625,8 @@ def actualizar_orden_trabajo(
 
         for field, value in update_data.items():
             setattr(orden, field, value)
+        if "cliente_proporciono_refacciones" in update_data:
+            recalcular_ventas_orden(db, orden.id)
         if orden_data.autorizado is not None and orden_data.autorizado and not orden.fecha_autorizacion:
             orden.fecha_autorizacion = datetime.utcnow()
 
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.caja_turno import CajaTurno
 from app.models.pago import Pago
-from app.models.venta import Venta
 from app.schemas.pago import PagoCreate
 from app.services.comisiones_service import calcular_y_registrar_comisiones
+from app.services.saldos_venta_service import bloquear_venta
 from app.utils.decimal_utils import to_float_money
 from app.utils.liquidacion_pago import evaluar_pago_contra_total
 from app.utils.roles import require_roles
@@ -34,7 +33,8 @@ def registrar_pago(
     # ======================================================
     # 1️⃣ VALIDAR VENTA
     # ======================================================
-    venta = db.query(Venta).filter(Venta.id_venta == data.id_venta).first()
+    # Fila bloqueada hasta el commit: dos cobros a la misma venta no validan contra el mismo saldo
+    venta = bloquear_venta(db, data.id_venta)
 
     if not venta:
         raise HTTPException(status_code=404, detail="La venta no existe")
@@ -42,7 +42,7 @@ def registrar_pago(
     # ======================================================
     # 2️⃣ CALCULAR TOTAL YA PAGADO
     # ======================================================
-    total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
+    total_pagado = venta.total_pagado
 
     excede, liquida, nuevo_redondeado, total_venta_rd, nuevo_total = evaluar_pago_contra_total(
         total_pagado, data.monto, venta.total
@@ -21,7 +21,7 @@ from app.schemas.prestamo_empleado import (
     PrestamoEmpleadoUpdate,
 )
 from app.services.auditoria_service import registrar as registrar_auditoria
-from app.services.nomina_service import DIAS_PERIODO, calcular_nomina
+from app.services.nomina_service import DIAS_PERIODO, calcular_nomina, calcular_resumenes_nomina
 from app.utils.jwt import get_current_user
 from app.utils.roles import require_roles
 
@@ -277,6 +277,19 @@ def admin_resumen_nominas_empleados(
             d_ini = d_fin = None
 
     empleados = db.query(Usuario).filter(Usuario.activo).order_by(Usuario.nombre).all()
+    (resumenes,) = calcular_resumenes_nomina(
+        db,
+        empleados,
+        fecha_referencia=ref_date,
+        offsets_periodos=(offset_periodos,),
+        fecha_inicio=d_ini,
+        fecha_fin=d_fin,
+    )
+    return _resumen_general_nominas(empleados, resumenes)
+
+
+def _resumen_general_nominas(empleados: List[Usuario], resumenes: dict) -> dict:
+    """Filas por empleado y totales; el periodo mostrado es el del primer empleado."""
     resultados = []
     total_bruto_gral = Decimal("0")
     total_neto_gral = Decimal("0")
@@ -285,74 +298,15 @@ def admin_resumen_nominas_empleados(
     tipo_periodo = "SEMANAL"
 
     for u in empleados:
-        if d_ini is not None and d_fin is not None and d_ini <= d_fin:
-            nomina = calcular_nomina(db, u.id_usuario, fecha_inicio=d_ini, fecha_fin=d_fin)
-        else:
-            nomina = calcular_nomina(
-                db,
-                u.id_usuario,
-                fecha_referencia=ref_date,
-                offset_periodos=offset_periodos,
-            )
-        if "error" in nomina:
-            continue
-
+        resumen = resumenes[u.id_usuario]
+        nomina = resumen.nomina
         if periodo_inicio is None:
             periodo_inicio = nomina.get("periodo_inicio")
             periodo_fin = nomina.get("periodo_fin")
             tipo_periodo = nomina.get("tipo_periodo", "SEMANAL")
 
-        if tipo_periodo == "PERSONALIZADO" and periodo_inicio and periodo_fin:
-            try:
-                p_ini = date.fromisoformat(periodo_inicio) if isinstance(periodo_inicio, str) else periodo_inicio
-                p_fin = date.fromisoformat(periodo_fin) if isinstance(periodo_fin, str) else periodo_fin
-                dias_vista = (p_fin - p_ini).days + 1
-            except (ValueError, TypeError):
-                dias_vista = 7
-        else:
-            dias_vista = DIAS_PERIODO.get(tipo_periodo, 7)
-        salario_prop = nomina.get("salario_proporcional", 0) or 0
-        bono = nomina.get("bono_puntualidad", 0) or 0
-
-        # Préstamos activos
-        prestamos = (
-            db.query(PrestamoEmpleado)
-            .filter(
-                PrestamoEmpleado.id_usuario == u.id_usuario,
-                PrestamoEmpleado.estado == "ACTIVO",
-            )
-            .all()
-        )
-        total_descuento = Decimal("0")
-        for p in prestamos:
-            saldo = _saldo_pendiente(p, db)
-            if saldo > 0:
-                periodo_prestamo = getattr(p.periodo_descuento, "value", None) or str(p.periodo_descuento)
-                dias_prestamo = DIAS_PERIODO.get(periodo_prestamo, 7)
-                factor = Decimal(dias_vista) / Decimal(dias_prestamo)
-                total_descuento += Decimal(str(p.descuento_por_periodo)) * factor
-
-        # Comisiones del periodo
-        comisiones = Decimal("0")
-        if periodo_inicio and periodo_fin:
-            try:
-                d_ini = date.fromisoformat(periodo_inicio) if isinstance(periodo_inicio, str) else periodo_inicio
-                d_fin = date.fromisoformat(periodo_fin) if isinstance(periodo_fin, str) else periodo_fin
-                suma = (
-                    db.query(func.coalesce(func.sum(ComisionDevengada.monto_comision), 0))
-                    .filter(
-                        ComisionDevengada.id_usuario == u.id_usuario,
-                        ComisionDevengada.fecha_venta >= d_ini,
-                        ComisionDevengada.fecha_venta <= d_fin,
-                    )
-                    .scalar()
-                )
-                comisiones = Decimal(str(suma)) if suma is not None else Decimal("0")
-            except (ValueError, TypeError):
-                pass
-
-        bruto = Decimal(str(salario_prop)) + Decimal(str(bono)) + comisiones
-        neto = bruto - total_descuento
+        bruto = resumen.total_bruto
+        neto = resumen.total_neto
         total_bruto_gral += bruto
         total_neto_gral += neto
 
@@ -362,10 +316,10 @@ def admin_resumen_nominas_empleados(
                 "nombre": u.nombre,
                 "dias_pagados": nomina.get("dias_pagados"),
                 "dias_esperados": nomina.get("dias_esperados"),
-                "salario_proporcional": float(salario_prop),
-                "bono_puntualidad": float(bono),
-                "comisiones_periodo": float(comisiones),
-                "total_descuento_este_periodo": float(total_descuento),
+                "salario_proporcional": float(nomina.get("salario_proporcional", 0) or 0),
+                "bono_puntualidad": float(nomina.get("bono_puntualidad", 0) or 0),
+                "comisiones_periodo": float(resumen.comisiones),
+                "total_descuento_este_periodo": float(resumen.total_descuento),
                 "total_bruto_estimado": float(bruto),
                 "total_neto_estimado": float(neto),
             }
@@ -381,6 +335,34 @@ def admin_resumen_nominas_empleados(
     }
 
 
+@router.get("/admin/tendencia-nominas", response_model=dict)
+def admin_tendencia_nominas(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(require_roles("ADMIN")),
+    periodos: int = Query(12, ge=1, le=13, description="Periodos hacia atrás, incluyendo el actual"),
+    fecha_referencia: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    """
+    Solo ADMIN. Totales de nómina de los empleados activos en los últimos N periodos
+    (mismo cálculo que resumen-nominas con offset 0, -1, ...), del más reciente al más antiguo.
+    """
+    ref_date = None
+    if fecha_referencia:
+        try:
+            ref_date = date.fromisoformat(fecha_referencia)
+        except ValueError:
+            ref_date = date.today()
+    empleados = db.query(Usuario).filter(Usuario.activo).order_by(Usuario.nombre).all()
+    offsets = [-i for i in range(periodos)]
+    por_periodo = calcular_resumenes_nomina(db, empleados, fecha_referencia=ref_date, offsets_periodos=offsets)
+    serie = []
+    for offset, resumenes in zip(offsets, por_periodo):
+        general = _resumen_general_nominas(empleados, resumenes)
+        del general["empleados"]
+        serie.append({"offset_periodos": offset, **general})
+    return {"periodos": serie}
+
+
 @router.get("/admin/resumen-nomina/{id_usuario}", response_model=dict)
 def admin_resumen_nomina_empleado(
     id_usuario: int,
@@ -36,6 +36,7 @@ from app.schemas.repuesto import (
 )
 from app.services.inventario_service import InventarioService
 from app.utils.dependencies import get_current_user
+from app.utils.paginacion import paginar
 from app.utils.roles import require_roles
 from app.utils.upload import read_file_with_limit
 
@@ -201,8 +202,9 @@ def crear_repuesto(
 
 class RepuestoListResponse(BaseModel):
     repuestos: List[RepuestoOut]
-    total: int
-    total_paginas: int
+    total: Optional[int] = None
+    total_paginas: Optional[int] = None
+    siguiente_cursor: Optional[str] = None
 
 
 @router.get("/", response_model=RepuestoListResponse)
@@ -217,21 +219,18 @@ def listar_repuestos(
     stock_bajo: Optional[bool] = Query(None, description="Solo repuestos con stock bajo"),
     buscar: Optional[str] = Query(None, description="Buscar por código, nombre o marca"),
     incluir_eliminados: Optional[bool] = Query(False, description="Incluir repuestos eliminados (solo ADMIN)"),
+    cursor: Optional[str] = Query(
+        None, description="Paginación keyset: vacío = primera página, luego siguiente_cursor"
+    ),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user),
 ):
     """
     Lista repuestos con filtros y paginación.
     Por defecto excluye repuestos marcados como eliminados (soft delete).
+    Con ?cursor= pagina por código sin OFFSET (ver app.utils.paginacion).
     """
-    query = db.query(Repuesto).options(
-        joinedload(Repuesto.categoria),
-        joinedload(Repuesto.proveedor),
-        joinedload(Repuesto.ubicacion_obj).joinedload(Ubicacion.bodega),
-        joinedload(Repuesto.estante).joinedload(Estante.ubicacion).joinedload(Ubicacion.bodega),
-        joinedload(Repuesto.nivel),
-        joinedload(Repuesto.fila),
-    )
+    query = db.query(Repuesto)
 
     # Aliases para poder filtrar por bodega tanto en ubicaciones directas como en estantes
     ubi_directa = aliased(Ubicacion)
@@ -295,17 +294,22 @@ def listar_repuestos(
                 Repuesto.marca.like(term),
             )
         )
-    total = query.count()
-    repuestos = query.order_by(Repuesto.codigo).offset(skip).limit(limit).all()
-    total_paginas = (total + limit - 1) // limit if limit > 0 else 1
-    pagina = skip // limit + 1 if limit > 0 else 1
-    return {
-        "repuestos": repuestos,
-        "total": total,
-        "total_paginas": total_paginas,
-        "pagina": pagina,
-        "limit": limit,
-    }
+    pagina = paginar(
+        query,
+        [(Repuesto.codigo, False), (Repuesto.id_repuesto, False)],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        opciones=(
+            joinedload(Repuesto.categoria),
+            joinedload(Repuesto.proveedor),
+            joinedload(Repuesto.ubicacion_obj).joinedload(Ubicacion.bodega),
+            joinedload(Repuesto.estante).joinedload(Estante.ubicacion).joinedload(Ubicacion.bodega),
+            joinedload(Repuesto.nivel),
+            joinedload(Repuesto.fila),
+        ),
+    )
+    return pagina.respuesta("repuestos", skip, limit, cursor)
 
 
 @router.get("/buscar-codigo/{codigo}", response_model=RepuestoOut)
@@ -10,6 +10,7 @@ from app.models.usuario import Usuario
 from app.models.usuario_bodega import UsuarioBodega
 from app.schemas.usuario import UsuarioCreate, UsuarioOut, UsuarioUpdate
 from app.services.auditoria_service import registrar as registrar_auditoria
+from app.utils.cache_usuarios import cache_usuarios, invalidar_usuario
 from app.utils.roles import require_roles
 from app.utils.security import hash_password
 
@@ -99,6 +100,8 @@ def actualizar_usuario(
     if "checa_entrada_salida" in payload:
         usuario.checa_entrada_salida = data.checa_entrada_salida
     db.commit()
+    # Rol, activo y contraseña deben aplicar desde el siguiente request
+    invalidar_usuario(id_usuario)
     db.refresh(usuario)
     registrar_auditoria(
         db,
@@ -124,6 +127,12 @@ def listar_usuarios(
     return db.query(Usuario).all()
 
 
+@router.get("/cache-autenticacion")
+def estadisticas_cache_autenticacion(current_user=Depends(require_roles("ADMIN"))):
+    """Aciertos/fallos de la caché de usuario autenticado de este proceso."""
+    return cache_usuarios.resumen()
+
+
 @router.get("/{id_usuario}/bodegas-permitidas")
 def obtener_bodegas_permitidas(
     id_usuario: int, db: Session = Depends(get_db), current_user=Depends(require_roles("ADMIN"))
@@ -2,7 +2,6 @@ import json
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -10,12 +9,17 @@ from app.models.cita import Cita
 from app.models.cliente import Cliente
 from app.models.orden_compra import OrdenCompra
 from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
 from app.models.registro_eliminacion_vehiculo import RegistroEliminacionVehiculo
 from app.models.vehiculo import Vehiculo
 from app.models.venta import Venta
 from app.schemas.vehiculo import VehiculoCreate, VehiculoCreateSinCliente, VehiculoOut, VehiculoUpdate
-from app.utils.fechas import isoformat_fecha_ingreso_ot
+from app.services.historial_service import (
+    LIMITE_SECCION,
+    SECCIONES_VEHICULO,
+    armar_secciones,
+    resumen_vehiculo,
+    seccion_vehiculo,
+)
 from app.utils.roles import require_roles
 
 router = APIRouter(prefix="/vehiculos", tags=["Vehículos"])
@@ -212,65 +216,60 @@ def obtener_vehiculo(
 
 @router.get("/{id_vehiculo}/historial")
 def historial_vehiculo(
-    id_vehiculo: int, db: Session = Depends(get_db), current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO"))
+    id_vehiculo: int,
+    limit: int = Query(LIMITE_SECCION, ge=1, le=100, description="Elementos por sección"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO")),
 ):
-    """Historial del vehículo: datos, órdenes de trabajo y ventas asociadas."""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id_vehiculo == id_vehiculo).first()
-    if not vehiculo:
-        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
-
-    cliente = db.query(Cliente).filter(Cliente.id_cliente == vehiculo.id_cliente).first()
-    ordenes = (
-        db.query(OrdenTrabajo)
-        .filter(OrdenTrabajo.vehiculo_id == id_vehiculo)
-        .order_by(OrdenTrabajo.fecha_ingreso.desc())
-        .all()
+    """Historial del vehículo: datos, resumen agregado y primera página de órdenes de trabajo y ventas."""
+    fila = (
+        db.query(Vehiculo, Cliente.nombre)
+        .outerjoin(Cliente, Cliente.id_cliente == Vehiculo.id_cliente)
+        .filter(Vehiculo.id_vehiculo == id_vehiculo)
+        .first()
     )
-    ventas = db.query(Venta).filter(Venta.id_vehiculo == id_vehiculo).all()
-    total_pagado_ventas = {}
-    for v in ventas:
-        pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        total_pagado_ventas[v.id_venta] = float(pagado or 0)
+    if not fila:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    vehiculo, cliente_nombre = fila
 
-    color_val = _color_display(vehiculo)
+    resumen = resumen_vehiculo(db, id_vehiculo)
+    secciones = {
+        seccion: seccion_vehiculo(db, id_vehiculo, seccion, limit, con_total=False) for seccion in SECCIONES_VEHICULO
+    }
     return {
         "vehiculo": {
             "id_vehiculo": vehiculo.id_vehiculo,
             "marca": vehiculo.marca,
             "modelo": vehiculo.modelo,
             "anio": vehiculo.anio,
-            "color": color_val,
+            "color": _color_display(vehiculo),
             "motor": vehiculo.motor,
             "vin": vehiculo.vin,
-            "cliente_nombre": cliente.nombre if cliente else None,
+            "cliente_nombre": cliente_nombre,
         },
-        "resumen": {
-            "cantidad_ordenes": len(ordenes),
-            "cantidad_ventas": len(ventas),
-        },
-        "ordenes_trabajo": [
-            {
-                "id": o.id,
-                "numero_orden": o.numero_orden,
-                "fecha_ingreso": isoformat_fecha_ingreso_ot(o.fecha_ingreso),
-                "estado": o.estado.value if hasattr(o.estado, "value") else str(o.estado),
-                "total": float(o.total),
-            }
-            for o in ordenes
-        ],
-        "ventas": [
-            {
-                "id_venta": v.id_venta,
-                "fecha": v.fecha.isoformat() if v.fecha else None,
-                "total": float(v.total),
-                "total_pagado": total_pagado_ventas.get(v.id_venta, 0),
-                "estado": v.estado.value if hasattr(v.estado, "value") else str(v.estado),
-            }
-            for v in ventas
-        ],
+        "resumen": resumen,
+        **armar_secciones(resumen, secciones),
     }
 
 
+@router.get("/{id_vehiculo}/historial/{seccion}")
+def historial_vehiculo_seccion(
+    id_vehiculo: int,
+    seccion: str,
+    limit: int = Query(LIMITE_SECCION, ge=1, le=100),
+    cursor: str = Query("", description="siguiente_cursor de la página anterior (vacío = primera página)"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles("ADMIN", "EMPLEADO", "TECNICO")),
+):
+    """Carga incremental de una sección del historial del vehículo (keyset)."""
+    if seccion not in SECCIONES_VEHICULO:
+        raise HTTPException(status_code=404, detail="Sección de historial no válida")
+    if not db.query(Vehiculo.id_vehiculo).filter(Vehiculo.id_vehiculo == id_vehiculo).first():
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    pagina = seccion_vehiculo(db, id_vehiculo, seccion, limit, cursor)
+    return pagina.respuesta(seccion, 0, limit, cursor)
+
+
 @router.put("/{id_vehiculo}", response_model=VehiculoOut)
 def actualizar_vehiculo(
     id_vehiculo: int,
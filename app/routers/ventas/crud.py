@@ -1,7 +1,6 @@
 """Endpoints CRUD de ventas: listar, obtener, actualizar, crear."""
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -51,15 +50,13 @@ def listar_ventas(
     resultado = []
     for v in ventas:
         cliente = db.query(Cliente).filter(Cliente.id_cliente == v.id_cliente).first() if v.id_cliente else None
-        total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        saldo = float(v.total) - float(total_pagado or 0)
         resultado.append(
             {
                 "id_venta": v.id_venta,
                 "fecha": isoformat_utc(v.fecha),
                 "nombre_cliente": cliente.nombre if cliente else None,
                 "total": float(v.total),
-                "saldo_pendiente": max(0, saldo),
+                "saldo_pendiente": float(v.saldo or 0),
                 "estado": v.estado.value if hasattr(v.estado, "value") else str(v.estado),
             }
         )
@@ -81,7 +78,6 @@ def obtener_venta(
     if not venta:
         raise HTTPException(status_code=404, detail="Venta no encontrada")
     cliente = db.query(Cliente).filter(Cliente.id_cliente == venta.id_cliente).first() if venta.id_cliente else None
-    total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
     detalles = db.query(DetalleVenta).filter(DetalleVenta.id_venta == id_venta).all()
     pagos = db.query(Pago).filter(Pago.id_venta == id_venta).order_by(Pago.fecha.asc()).all()
     orden_vinculada = None
@@ -116,7 +112,7 @@ def obtener_venta(
         "id_vehiculo": venta.id_vehiculo,
         "nombre_cliente": cliente.nombre if cliente else None,
         "total": float(venta.total),
-        "saldo_pendiente": max(0, float(venta.total) - float(total_pagado or 0)),
+        "saldo_pendiente": float(venta.saldo or 0),
         "estado": venta.estado.value if hasattr(venta.estado, "value") else str(venta.estado),
         "requiere_factura": bool(getattr(venta, "requiere_factura", False)),
         "comentarios": getattr(venta, "comentarios", None),
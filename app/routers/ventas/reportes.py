@@ -5,16 +5,14 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.cancelacion_producto import CancelacionProducto
 from app.models.cliente import Cliente
 from app.models.comision_devengada import ComisionDevengada
 from app.models.detalle_venta import DetalleVenta
 from app.models.gasto_operativo import GastoOperativo
-from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
-from app.models.orden_trabajo import OrdenTrabajo
 from app.models.pago import Pago
 from app.models.usuario import Usuario
 from app.models.venta import Venta
+from app.services.utilidad_ventas_service import costo_venta_columna, query_ventas_utilidad, resumen_utilidad
 from app.utils.decimal_utils import money_round, to_decimal, to_float_money
 from app.utils.fechas import condiciones_rango_fecha_solo, condiciones_rango_taller, isoformat_utc
 from app.utils.roles import require_roles
@@ -127,16 +125,14 @@ def reporte_cuentas_por_cobrar(
     db: Session = Depends(get_db),
     current_user=Depends(require_roles("ADMIN", "EMPLEADO", "CAJA", "TECNICO")),
 ):
-    query = db.query(Venta).filter(Venta.estado == "PENDIENTE")
+    # Rango sobre ix_ventas_estado_saldo: solo ventas con saldo materializado > 0
+    query = db.query(Venta).filter(Venta.estado == "PENDIENTE", Venta.saldo > 0)
     for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
         query = query.filter(cond)
     ventas = query.order_by(Venta.fecha.desc()).all()
     items = []
     for v in ventas:
-        total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == v.id_venta).scalar()
-        saldo = max(0, float(v.total) - float(total_pagado or 0))
-        if saldo <= 0:
-            continue
+        saldo = float(v.saldo)
         cliente = db.query(Cliente).filter(Cliente.id_cliente == v.id_cliente).first() if v.id_cliente else None
         items.append(
             {
@@ -213,69 +209,39 @@ def reporte_utilidad(
     Reporte de utilidad: Ingresos - Costo (CMV) - Pérdidas por merma - Gastos operativos.
     Utilidad bruta = Total ventas - CMV - Pérdidas por merma.
     Utilidad neta = Utilidad bruta - Gastos operativos.
+    Costos desde el libro ventas_utilidad (un SELECT agregado para totales y uno para el detalle).
     """
-    query = db.query(Venta).filter(Venta.estado != "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query = query.filter(cond)
-    ventas = query.order_by(Venta.fecha.asc()).all()
-
-    total_ingresos = to_decimal(0)
-    total_costo = to_decimal(0)
     detalle = []
-
-    for v in ventas:
-        ingresos = to_decimal(v.total)
-        costo = to_decimal(0)
-
-        if v.id_orden:
-            orden = db.query(OrdenTrabajo).filter(OrdenTrabajo.id == v.id_orden).first()
-            if orden and not getattr(orden, "cliente_proporciono_refacciones", False):
-                res = (
-                    db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                    .filter(
-                        MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                        MovimientoInventario.referencia == orden.numero_orden,
-                    )
-                    .scalar()
-                )
-                costo = to_decimal(res or 0)
-        else:
-            res = (
-                db.query(func.coalesce(func.sum(MovimientoInventario.costo_total), 0))
-                .filter(
-                    MovimientoInventario.id_venta == v.id_venta,
-                    MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,
-                )
-                .scalar()
-            )
-            costo = to_decimal(res or 0)
-
-        utilidad = money_round(ingresos - costo)
-        total_ingresos += ingresos
-        total_costo += costo
+    filas = (
+        query_ventas_utilidad(
+            db,
+            Venta.id_venta,
+            Venta.fecha,
+            Venta.total,
+            costo_venta_columna(),
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+        )
+        .filter(Venta.estado != "CANCELADA")
+        .order_by(Venta.fecha.asc())
+    )
+    for id_venta, fecha, total, costo in filas:
+        ingresos = to_decimal(total)
+        costo = to_decimal(costo or 0)
         detalle.append(
             {
-                "id_venta": v.id_venta,
-                "fecha": isoformat_utc(v.fecha) if v.fecha else None,
+                "id_venta": id_venta,
+                "fecha": isoformat_utc(fecha) if fecha else None,
                 "ingresos": to_float_money(ingresos),
                 "costo": to_float_money(costo),
-                "utilidad": to_float_money(utilidad),
+                "utilidad": to_float_money(money_round(ingresos - costo)),
             }
         )
 
-    perdidas_mer = to_decimal(0)
-    query_cancel = db.query(Venta).filter(Venta.estado == "CANCELADA")
-    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
-        query_cancel = query_cancel.filter(cond)
-    ids_canceladas = [v.id_venta for v in query_cancel.all()]
-    if ids_canceladas:
-        res_mer = (
-            db.query(func.coalesce(func.sum(CancelacionProducto.costo_total_mer), 0))
-            .filter(CancelacionProducto.id_venta.in_(ids_canceladas))
-            .scalar()
-        )
-        perdidas_mer = to_decimal(res_mer or 0)
-
+    resumen = resumen_utilidad(db, fecha_desde, fecha_hasta)
+    total_ingresos = resumen["total_ingresos"]
+    total_costo = resumen["total_costo"]
+    perdidas_mer = resumen["perdidas_mer"]
     total_utilidad_bruta = money_round(total_ingresos - total_costo - perdidas_mer)
 
     total_gastos = to_decimal(0)
@@ -297,7 +263,7 @@ def reporte_utilidad(
         "total_utilidad_bruta": to_float_money(total_utilidad_bruta),
         "total_utilidad_neta": to_float_money(total_utilidad_neta),
         "total_utilidad": to_float_money(total_utilidad_neta),
-        "cantidad_ventas": len(ventas),
+        "cantidad_ventas": resumen["cantidad_ventas"],
         "detalle": detalle,
     }
 
@@ -2,7 +2,6 @@
 
 import logging
 from io import BytesIO
-from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
@@ -10,22 +9,20 @@ from reportlab.lib.colors import HexColor
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import get_db
 from app.models.cliente import Cliente
 from app.models.detalle_venta import DetalleVenta
-from app.models.pago import Pago
 from app.models.vehiculo import Vehiculo
 from app.models.venta import Venta
+from app.utils.pdf_recursos import BLANCO, NEGRO, dibujar_logo
 from app.utils.roles import require_roles
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-_LOGO_PATH = Path(__file__).resolve().parent.parent.parent.parent / "static" / "logo_medina_autodiag.png"
 
 _COLOR_BARRA = HexColor("#1e40af")
 _COLOR_AZUL_CLARO = HexColor("#93c5fd")
@@ -38,12 +35,12 @@ def _barra_azul(p, x, y, ancho, alto, texto, font="Helvetica-Bold", size=10):
     """Dibuja barra azul con texto blanco centrado."""
     p.setFillColor(_COLOR_BARRA)
     p.rect(x, y - alto, ancho, alto, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont(font, size)
     centro_x = x + ancho / 2
     texto_y = y - alto + 0.06 * inch
     p.drawCentredString(centro_x, texto_y, texto)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - alto
 
 
@@ -59,13 +56,12 @@ def _generar_pdf_ticket(venta_data: dict, tipo: str, app_name: str = "MedinaAuto
 
     # Logo centrado: más ancho y delgado
     logo_w, logo_h = 3.4 * inch, 0.6 * inch
-    if _LOGO_PATH.exists():
-        p.drawImage(str(_LOGO_PATH), w / 2 - logo_w / 2, y - logo_h, width=logo_w, height=logo_h)
+    dibujar_logo(p, w / 2 - logo_w / 2, y - logo_h, logo_w, logo_h)
     y -= logo_h + 0.2 * inch
     p.setFont("Helvetica", 11)
     p.drawCentredString(w / 2, y, "SERVICIO Y DIAGNOSTICO AUTOMOTRIZ")
     y -= 0.2 * inch
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.5)
     p.line(margin, y, w - margin, y)
     y -= 0.25 * inch
@@ -74,10 +70,10 @@ def _generar_pdf_ticket(venta_data: dict, tipo: str, app_name: str = "MedinaAuto
     id_venta = venta_data.get("id_venta", "")
     alto_caja = 0.36 * inch
     p.setFillColor(_COLOR_AZUL_CLARO)
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.25)
     p.rect(margin, y - alto_caja, ancho_util, alto_caja, fill=1, stroke=1)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.setFont("Helvetica", 10)
     y_texto = y - 0.14 * inch
     p.drawString(margin + 0.15 * inch, y_texto, f"FECHA: {fecha_str}")
@@ -177,7 +173,7 @@ def _generar_pdf_ticket(venta_data: dict, tipo: str, app_name: str = "MedinaAuto
     p.setFont("Helvetica-Oblique", 9)
     comentarios = (venta_data.get("comentarios") or "").strip()
     if comentarios:
-        p.setFillColor(HexColor("#000000"))
+        p.setFillColor(NEGRO)
         p.setFont("Helvetica", 9)
         for line in comentarios.split("\n")[:6]:
             if line.strip():
@@ -186,7 +182,7 @@ def _generar_pdf_ticket(venta_data: dict, tipo: str, app_name: str = "MedinaAuto
     else:
         p.setFillColor(_COLOR_GRIS_SUAVE)
         p.drawString(margin, y, "(Sin comentarios)")
-        p.setFillColor(HexColor("#000000"))
+        p.setFillColor(NEGRO)
     y -= 0.4 * inch
 
     total = float(venta_data.get("total", 0) or 0)
@@ -252,12 +248,10 @@ def descargar_ticket(
         vehiculo = (
             db.query(Vehiculo).filter(Vehiculo.id_vehiculo == venta.id_vehiculo).first() if venta.id_vehiculo else None
         )
-        total_pagado = float(
-            db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar() or 0
-        )
+        total_pagado = float(venta.total_pagado or 0)
         detalles = db.query(DetalleVenta).filter(DetalleVenta.id_venta == id_venta).all()
         total = float(venta.total)
-        saldo = max(0, total - total_pagado)
+        saldo = float(venta.saldo or 0)
         estado_val = venta.estado.value if hasattr(venta.estado, "value") else str(venta.estado)
 
         def _d(r):
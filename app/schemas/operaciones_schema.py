@@ -42,6 +42,7 @@ class MetaResumenOut(BaseModel):
     grupo: Optional[str] = None
     bandejas_solicitadas: Optional[list[str]] = None
     bandejas_hidratadas: Optional[list[str]] = None
+    fuente_metricas: Optional[str] = None  # Fast path: "contadores" (contadores_operativos) o "sql"
 
 
 class UsuarioResumenOut(BaseModel):
@@ -9,16 +9,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.caja_turno import CajaTurno
 from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
+from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
 from app.models.venta import Venta
+from app.services.contexto_consultas import contexto_de
 from app.utils.liquidacion_pago import evaluar_pago_contra_total
 
 SALDO_EPSILON = 0.001
@@ -87,13 +87,21 @@ def venta_es_activa(venta: Optional[Venta]) -> bool:
 
 
 def calcular_saldo_venta(db: Session, venta: Venta) -> float:
-    """Mismo cálculo que operaciones_service / pagos: total - sum(pagos), mínimo 0."""
-    total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
-    return max(0.0, float(venta.total) - float(total_pagado or 0))
+    """
+    Saldo materializado de la venta (ventas.saldo = max(0, total - total_pagado)), sin consulta.
+    El flush aplica los pagos pendientes de la sesión: saldos_venta_service actualiza la columna y
+    expira el atributo, así que la lectura trae el valor nuevo.
+    """
+    if db.autoflush:
+        db.flush()
+    return float(venta.saldo or 0)
 
 
 def turno_abierto_usuario(db: Session, usuario: Usuario) -> Optional[CajaTurno]:
     """Misma consulta que app/routers/pagos.py — turno ABIERTO del usuario."""
+    ctx = contexto_de(db)
+    if ctx is not None:
+        return ctx.turno_abierto(usuario.id_usuario)
     return (
         db.query(CajaTurno)
         .filter(
@@ -105,6 +113,9 @@ def turno_abierto_usuario(db: Session, usuario: Usuario) -> Optional[CajaTurno]:
 
 
 def _venta_activa_por_orden(db: Session, orden_id: int) -> Optional[Venta]:
+    ctx = contexto_de(db)
+    if ctx is not None:
+        return ctx.venta_activa_por_orden(orden_id)
     return (
         db.query(Venta)
         .filter(Venta.id_orden == orden_id, Venta.estado != "CANCELADA")
@@ -113,6 +124,145 @@ def _venta_activa_por_orden(db: Session, orden_id: int) -> Optional[Venta]:
     )
 
 
+class FuenteDatosAcciones:
+    """
+    Lecturas que consumen los evaluadores: venta activa por OT, saldo, turno abierto y repuesto.
+
+    Implementación directa: una consulta por llamada (evaluación de un solo ítem / mutaciones).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def venta_activa_por_orden(self, orden_id: int) -> Optional[Venta]:
+        return _venta_activa_por_orden(self.db, orden_id)
+
+    def saldo_venta(self, venta: Venta) -> float:
+        return calcular_saldo_venta(self.db, venta)
+
+    def turno_abierto(self, usuario: Usuario) -> Optional[CajaTurno]:
+        return turno_abierto_usuario(self.db, usuario)
+
+    def repuesto(self, id_repuesto: int) -> Optional[Repuesto]:
+        return self.db.query(Repuesto).filter(Repuesto.id_repuesto == id_repuesto).first()
+
+
+class FuenteDatosPrecargada(FuenteDatosAcciones):
+    """
+    Fuente para evaluación por lote (bandejas A0, detalle OT).
+
+    Cada conjunto (ventas activas, pagos, turnos, repuestos) se carga una sola vez para
+    todas las órdenes/ventas del lote con consultas IN, al primer acceso. Las reglas de los
+    evaluadores no cambian; solo la forma de leer. Claves fuera del lote se resuelven igual
+    que FuenteDatosAcciones y quedan en memoria para el resto del lote.
+
+    Con un ContextoConsultas en la sesión, lo ya resuelto en el request se reutiliza y lo
+    cargado por lote se siembra ahí para los demás servicios.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        ordenes: Iterable[OrdenTrabajo] = (),
+        ventas: Iterable[Venta] = (),
+    ):
+        super().__init__(db)
+        self._ctx = contexto_de(db)
+        self._ordenes: dict[int, OrdenTrabajo] = {o.id: o for o in ordenes}
+        self._ventas: dict[int, Venta] = {v.id_venta: v for v in ventas}
+        self._ventas_activas: dict[int, Optional[Venta]] = {}
+        self._ventas_activas_cargadas = False
+        self._saldos: dict[int, float] = {}
+        self._turnos: dict[int, Optional[CajaTurno]] = {}
+        self._repuestos: dict[int, Optional[Repuesto]] = {}
+        self._repuestos_cargados = False
+
+    def registrar_venta_activa(self, orden_id: int, venta: Optional[Venta], saldo: Optional[float] = None) -> None:
+        """Siembra un resultado ya conocido (p. ej. del clasificador O1/O2) para no re-consultarlo."""
+        self._ventas_activas[orden_id] = venta
+        if venta is not None:
+            self._ventas[venta.id_venta] = venta
+            if saldo is not None:
+                self._saldos[venta.id_venta] = saldo
+
+    def registrar_saldo(self, venta: Venta, saldo: float) -> None:
+        self._ventas[venta.id_venta] = venta
+        self._saldos[venta.id_venta] = saldo
+
+    def venta_activa_por_orden(self, orden_id: int) -> Optional[Venta]:
+        if orden_id not in self._ventas_activas:
+            if self._ctx is not None and self._ctx.tiene_venta_activa(orden_id):
+                self._ventas_activas[orden_id] = self._ctx.venta_activa_por_orden(orden_id)
+                return self._ventas_activas[orden_id]
+            self._cargar_ventas_activas(orden_id)
+        return self._ventas_activas.get(orden_id)
+
+    def saldo_venta(self, venta: Venta) -> float:
+        if venta.id_venta not in self._saldos:
+            self._cargar_saldos(venta)
+        return self._saldos[venta.id_venta]
+
+    def turno_abierto(self, usuario: Usuario) -> Optional[CajaTurno]:
+        if usuario.id_usuario not in self._turnos:
+            self._turnos[usuario.id_usuario] = turno_abierto_usuario(self.db, usuario)
+        return self._turnos[usuario.id_usuario]
+
+    def repuesto(self, id_repuesto: int) -> Optional[Repuesto]:
+        if id_repuesto not in self._repuestos:
+            self._cargar_repuestos(id_repuesto)
+        return self._repuestos.get(id_repuesto)
+
+    def _cargar_ventas_activas(self, orden_id: int) -> None:
+        """Venta activa = max(id_venta) no cancelada por OT — misma regla que _venta_activa_por_orden."""
+        if self._ventas_activas_cargadas:
+            ids = [orden_id]
+        else:
+            ids = [oid for oid in self._ordenes if oid not in self._ventas_activas]
+            if self._ctx is not None:
+                ids = [oid for oid in ids if not self._ctx.tiene_venta_activa(oid)]
+            if orden_id not in self._ordenes:
+                ids.append(orden_id)
+            self._ventas_activas_cargadas = True
+        ventas = (
+            self.db.query(Venta)
+            .filter(Venta.id_orden.in_(ids), Venta.estado != "CANCELADA")
+            .order_by(Venta.id_venta.desc())
+            .all()
+        )
+        for oid in ids:
+            self._ventas_activas.setdefault(oid, None)
+        for venta in ventas:
+            oid = int(venta.id_orden)
+            if self._ventas_activas.get(oid) is None:
+                self._ventas_activas[oid] = venta
+                self._ventas[venta.id_venta] = venta
+        if self._ctx is not None:
+            for oid in ids:
+                self._ctx.sembrar_venta_activa(oid, self._ventas_activas[oid])
+
+    def _cargar_saldos(self, venta: Venta) -> None:
+        # Las ventas ya están cargadas: el saldo materializado viene en la fila, sin consulta extra
+        pendientes = {vid: v for vid, v in self._ventas.items() if vid not in self._saldos}
+        pendientes[venta.id_venta] = venta
+        for vid, v in pendientes.items():
+            self._saldos[vid] = float(v.saldo or 0)
+
+    def _cargar_repuestos(self, id_repuesto: int) -> None:
+        ids = {id_repuesto}
+        if not self._repuestos_cargados:
+            self._repuestos_cargados = True
+            for orden in self._ordenes.values():
+                if getattr(orden, "cliente_proporciono_refacciones", False):
+                    continue
+                ids.update(d.repuesto_id for d in (orden.detalles_repuesto or []) if d.repuesto_id)
+        ids.difference_update(self._repuestos)
+        for rid in ids:
+            self._repuestos[rid] = None
+        for repuesto in self.db.query(Repuesto).filter(Repuesto.id_repuesto.in_(list(ids))).all():
+            self._repuestos[repuesto.id_repuesto] = repuesto
+
+
 def accion_global_item_only(accion: str) -> AccionEvaluada:
     """Política Opción A: mutación financiero-operativa nunca permitida en global."""
     motivo = MOTIVO_ITEM_ONLY.get(
@@ -153,6 +303,7 @@ def evaluar_registrar_pago(
     usuario: Usuario,
     *,
     monto: Optional[Decimal | float] = None,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> AccionEvaluada:
     """
     Reglas ADR §7 — alineadas con POST /api/pagos/ (venta, turno, saldo, excedente).
@@ -160,6 +311,7 @@ def evaluar_registrar_pago(
     Venta activa/inactiva se resuelve antes del turno: OT con venta CANCELADA se trata
     como sin venta activa (VENTA_INEXISTENTE vía evaluar_registrar_pago_ot).
     """
+    fuente = fuente or FuenteDatosAcciones(db)
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion(
@@ -185,7 +337,7 @@ def evaluar_registrar_pago(
             "VENTA_CANCELADA",
         )
 
-    if turno_abierto_usuario(db, usuario) is None:
+    if fuente.turno_abierto(usuario) is None:
         return _accion(
             "registrar_pago",
             False,
@@ -193,7 +345,7 @@ def evaluar_registrar_pago(
             "TURNO_CERRADO",
         )
 
-    saldo = calcular_saldo_venta(db, venta)
+    saldo = fuente.saldo_venta(venta)
     if saldo <= SALDO_EPSILON:
         return _accion(
             "registrar_pago",
@@ -230,17 +382,22 @@ def evaluar_registrar_pago_ot(
     venta: Optional[Venta] = None,
     *,
     monto: Optional[Decimal | float] = None,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> AccionEvaluada:
-    venta_resuelta = venta if venta is not None else _venta_activa_por_orden(db, orden.id)
-    return evaluar_registrar_pago(db, venta_resuelta, usuario, monto=monto)
+    fuente = fuente or FuenteDatosAcciones(db)
+    venta_resuelta = venta if venta is not None else fuente.venta_activa_por_orden(orden.id)
+    return evaluar_registrar_pago(db, venta_resuelta, usuario, monto=monto, fuente=fuente)
 
 
 def evaluar_crear_venta_desde_ot(
     db: Session,
     orden: OrdenTrabajo,
     usuario: Usuario,
+    *,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> AccionEvaluada:
     """Mismas reglas que ot_acciones_service (T5); fuente canónica post-P4.0."""
+    fuente = fuente or FuenteDatosAcciones(db)
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion(
@@ -259,7 +416,7 @@ def evaluar_crear_venta_desde_ot(
             "ESTADO_INVALIDO",
         )
 
-    venta = _venta_activa_por_orden(db, orden.id)
+    venta = fuente.venta_activa_por_orden(orden.id)
     if venta:
         return _accion(
             "crear_venta_desde_ot",
@@ -0,0 +1,176 @@
+"""
+Evaluación de alertas de stock fuera del camino del movimiento.
+
+Registrar un movimiento solo anota los id_repuesto afectados en la sesión (marcar_alertas_stock).
+Cuando esa transacción hace commit, los ids pasan a una cola en memoria del proceso; un hilo
+de fondo espera una ventana corta para juntar ráfagas (entrada masiva, ventas seguidas),
+deduplica y evalúa en lotes: una consulta de repuestos, una de alertas activas y un commit
+por lote. Si la transacción hace rollback, los ids anotados se descartan. Un lote que falla
+vuelve a la cola hasta max_intentos veces; después sus ids se descartan con un aviso en el log.
+
+Sin el hilo iniciado (scripts, tests) los ids se acumulan hasta llamar procesar_pendientes().
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLAVE_INFO = "alertas_stock_pendientes"
+
+
+def marcar_alertas_stock(db: Session, ids_repuesto: Iterable[int]) -> None:
+    """Anota repuestos cuya alerta de stock debe reevaluarse cuando la transacción confirme."""
+    db.info.setdefault(CLAVE_INFO, set()).update(ids_repuesto)
+
+
+@dataclass
+class EstadisticasColaAlertas:
+    lotes: int = 0
+    repuestos_evaluados: int = 0
+    errores: int = 0
+    repuestos_descartados: int = 0
+
+
+class ColaAlertasStock:
+    """Cola deduplicada de id_repuesto con un hilo evaluador opcional."""
+
+    def __init__(self, espera_segundos: float, tamano_lote: int, max_intentos: int = 3):
+        self.espera_segundos = espera_segundos
+        self.tamano_lote = max(1, tamano_lote)
+        self.max_intentos = max(1, max_intentos)
+        self.estadisticas = EstadisticasColaAlertas()
+        self._pendientes: set[int] = set()
+        self._fallos: dict[int, int] = {}  # id_repuesto → lotes fallidos seguidos
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def activa(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def encolar(self, ids_repuesto: Iterable[int]) -> None:
+        with self._lock:
+            self._pendientes.update(ids_repuesto)
+        self._hay_trabajo.set()
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def descartar(self) -> None:
+        with self._lock:
+            self._pendientes.clear()
+            self._fallos.clear()
+
+    def _reencolar_fallido(self, lote: list[int]) -> None:
+        """Devuelve a la cola los ids del lote fallido que aún no agotan max_intentos."""
+        reintentar = []
+        with self._lock:
+            for id_repuesto in lote:
+                fallos = self._fallos.get(id_repuesto, 0) + 1
+                if fallos < self.max_intentos:
+                    self._fallos[id_repuesto] = fallos
+                    reintentar.append(id_repuesto)
+                else:
+                    self._fallos.pop(id_repuesto, None)
+        descartados = len(lote) - len(reintentar)
+        if descartados:
+            self.estadisticas.repuestos_descartados += descartados
+            logger.warning(
+                "Alertas de stock descartadas tras %s intentos: %s repuestos", self.max_intentos, descartados
+            )
+        if reintentar:
+            self.encolar(reintentar)
+
+    def procesar_pendientes(self, db: Optional[Session] = None) -> int:
+        """
+        Evalúa todo lo encolado en lotes de tamano_lote. Retorna cuántos repuestos evaluó.
+        Sin `db` abre una sesión propia (uso desde el hilo de fondo).
+        """
+        from app.database import SessionLocal
+        from app.services.inventario_service import InventarioService
+
+        with self._lock:
+            ids = sorted(self._pendientes)
+            self._pendientes.clear()
+        if not ids:
+            return 0
+        sesion = db if db is not None else SessionLocal()
+        try:
+            for i in range(0, len(ids), self.tamano_lote):
+                lote = ids[i : i + self.tamano_lote]
+                try:
+                    InventarioService.evaluar_alertas_stock(sesion, lote)
+                except Exception as e:
+                    sesion.rollback()
+                    self.estadisticas.errores += 1
+                    logger.warning("Alertas de stock no evaluadas (%s repuestos): %s", len(lote), e)
+                    self._reencolar_fallido(lote)
+                    continue
+                if self._fallos:
+                    with self._lock:
+                        for id_repuesto in lote:
+                            self._fallos.pop(id_repuesto, None)
+                self.estadisticas.lotes += 1
+                self.estadisticas.repuestos_evaluados += len(lote)
+        finally:
+            if db is None:
+                sesion.close()
+        return len(ids)
+
+    def iniciar(self) -> None:
+        if self.activa:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="alertas-stock", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo y evalúa lo que quede pendiente."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        self._hilo.join(timeout)
+        self._hilo = None
+        self.procesar_pendientes()
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            self._hay_trabajo.wait()
+            # Ventana de agrupación: los commits de una ráfaga caen en el mismo lote
+            self._detener.wait(self.espera_segundos)
+            self._hay_trabajo.clear()
+            try:
+                self.procesar_pendientes()
+            except Exception as e:
+                logger.warning("Cola de alertas de stock: %s", e)
+
+
+cola_alertas_stock = ColaAlertasStock(
+    settings.ALERTAS_STOCK_ESPERA_MS / 1000, settings.ALERTAS_STOCK_LOTE, settings.ALERTAS_STOCK_MAX_INTENTOS
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _encolar_al_confirmar(session: Session) -> None:
+    ids = session.info.pop(CLAVE_INFO, None)
+    if ids:
+        cola_alertas_stock.encolar(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_al_revertir(session: Session) -> None:
+    session.info.pop(CLAVE_INFO, None)
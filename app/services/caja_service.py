@@ -4,11 +4,8 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.caja_turno import CajaTurno
-from app.models.cuenta_pagar_manual import PagoCuentaPagarManual
-from app.models.gasto_operativo import GastoOperativo
-from app.models.pago import Pago
-from app.models.pago_orden_compra import PagoOrdenCompra
 from app.services.caja_alertas import generar_alerta_diferencia
+from app.services.caja_totales_service import leer_totales
 
 
 def cerrar_turno(db: Session, id_turno: int, monto_contado: Decimal):
@@ -18,41 +15,9 @@ def cerrar_turno(db: Session, id_turno: int, monto_contado: Decimal):
         raise ValueError("Turno no válido o ya cerrado")
 
     # 1️⃣ Total esperado: apertura + cobros EFECTIVO - egresos (pagos OC + pagos cuentas manuales + gastos)
-    # Solo cobros en efectivo: el cierre es por efectivo físico en caja
-    total_efectivo_cobrado = (
-        db.query(func.coalesce(func.sum(Pago.monto), 0))
-        .filter(Pago.id_turno == turno.id_turno, Pago.metodo == "EFECTIVO")
-        .scalar()
-    )
-    total_pagos_oc_efectivo = (
-        db.query(func.coalesce(func.sum(PagoOrdenCompra.monto), 0))
-        .filter(
-            PagoOrdenCompra.id_turno == turno.id_turno,
-            PagoOrdenCompra.metodo == "EFECTIVO",
-        )
-        .scalar()
-    )
-    total_pagos_manuales_efectivo = (
-        db.query(func.coalesce(func.sum(PagoCuentaPagarManual.monto), 0))
-        .filter(
-            PagoCuentaPagarManual.id_turno == turno.id_turno,
-            PagoCuentaPagarManual.metodo == "EFECTIVO",
-        )
-        .scalar()
-    )
-    total_gastos = (
-        db.query(func.coalesce(func.sum(GastoOperativo.monto), 0))
-        .filter(GastoOperativo.id_turno == turno.id_turno)
-        .scalar()
-    )
-
-    esperado = (
-        Decimal(turno.monto_apertura or 0)
-        + Decimal(total_efectivo_cobrado)
-        - Decimal(total_pagos_oc_efectivo)
-        - Decimal(total_pagos_manuales_efectivo)
-        - Decimal(total_gastos)
-    )
+    # Solo cobros en efectivo: el cierre es por efectivo físico en caja. Se lee la fila de totales
+    # del turno con bloqueo para que un cobro concurrente no quede fuera del esperado.
+    esperado = leer_totales(db, turno.id_turno, bloquear=True).efectivo_esperado(turno.monto_apertura)
     diferencia = monto_contado - esperado
 
     # 2️⃣ Guardar cierre
@@ -0,0 +1,300 @@
+"""
+Totales por turno de caja materializados (tabla caja_turno_totales).
+
+Corte, cierre, detalle, histórico y exportación de turnos leen una fila por turno en lugar de
+sumar Pago, GastoOperativo, PagoOrdenCompra y PagoCuentaPagarManual. Se mantienen así:
+
+- Al insertar un CajaTurno se crea su fila en cero (mismo flush).
+- Listeners de Session: en before_flush se resta lo que aportaban las filas modificadas o
+  borradas (valores previos de id_turno / metodo / monto); en after_flush se suma lo que
+  aportan las nuevas y modificadas. El delta se escribe con UPDATE col = col + delta, en la
+  misma transacción que el cobro o egreso.
+- auditar_totales(): recalcula todo desde las filas originales (SUM agrupados por turno),
+  reporta desfases y opcionalmente corrige (scripts/auditar_totales_caja.py).
+
+Si un turno no tiene fila (anterior a la tabla y sin auditar), leer_totales calcula en vivo.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.caja_turno import CajaTurno
+from app.models.caja_turno_total import CajaTurnoTotal
+from app.models.cuenta_pagar_manual import PagoCuentaPagarManual
+from app.models.gasto_operativo import GastoOperativo
+from app.models.pago import Pago
+from app.models.pago_orden_compra import PagoOrdenCompra
+from app.services.deltas_sesion import filas_modificadas, registrar_historial_previo, valor_previo
+
+logger = logging.getLogger(__name__)
+
+CLAVE_INFO = "caja_totales_pendientes"
+
+METODOS_COBRO = ("EFECTIVO", "TARJETA", "TRANSFERENCIA")
+_COLUMNA_COBRO = {m: f"cobros_{m.lower()}" for m in METODOS_COBRO}
+
+
+@dataclass
+class TotalesTurno:
+    cobros_efectivo: Decimal = Decimal("0")
+    cobros_tarjeta: Decimal = Decimal("0")
+    cobros_transferencia: Decimal = Decimal("0")
+    cantidad_cobros: int = 0
+    gastos: Decimal = Decimal("0")
+    pagos_proveedor_efectivo: Decimal = Decimal("0")
+    pagos_cuentas_manuales_efectivo: Decimal = Decimal("0")
+
+    @classmethod
+    def desde_fila(cls, fila) -> "TotalesTurno":
+        return cls(**{f.name: getattr(fila, f.name) or f.default for f in fields(cls)})
+
+    @property
+    def total_cobros(self) -> Decimal:
+        return self.cobros_efectivo + self.cobros_tarjeta + self.cobros_transferencia
+
+    def por_metodo(self) -> list[dict]:
+        """Mismo formato que el GROUP BY anterior: solo métodos con cobros."""
+        return [
+            {"metodo": m, "total": float(getattr(self, _COLUMNA_COBRO[m]))}
+            for m in METODOS_COBRO
+            if getattr(self, _COLUMNA_COBRO[m])
+        ]
+
+    def efectivo_esperado(self, monto_apertura) -> Decimal:
+        """Apertura + cobros en efectivo − egresos en efectivo (lo que debe haber en caja)."""
+        return (
+            Decimal(monto_apertura or 0)
+            + self.cobros_efectivo
+            - self.pagos_proveedor_efectivo
+            - self.pagos_cuentas_manuales_efectivo
+            - self.gastos
+        )
+
+
+# --- Aporte de cada fila a los totales (valores → {columna: delta}) ---
+
+
+def _metodo(valor) -> Optional[str]:
+    return getattr(valor, "value", valor)
+
+
+def _aporte_pago(id_turno, metodo, monto) -> dict:
+    columna = _COLUMNA_COBRO.get(_metodo(metodo))
+    return {columna: Decimal(monto or 0), "cantidad_cobros": 1} if columna else {"cantidad_cobros": 1}
+
+
+def _aporte_gasto(id_turno, monto) -> dict:
+    return {"gastos": Decimal(monto or 0)}
+
+
+def _aporte_egreso_efectivo(columna: str):
+    def _aporte(id_turno, metodo, monto) -> dict:
+        return {columna: Decimal(monto or 0)} if _metodo(metodo) == "EFECTIVO" else {}
+
+    return _aporte
+
+
+_FUENTES = {
+    Pago: (("id_turno", "metodo", "monto"), _aporte_pago),
+    GastoOperativo: (("id_turno", "monto"), _aporte_gasto),
+    PagoOrdenCompra: (("id_turno", "metodo", "monto"), _aporte_egreso_efectivo("pagos_proveedor_efectivo")),
+    PagoCuentaPagarManual: (
+        ("id_turno", "metodo", "monto"),
+        _aporte_egreso_efectivo("pagos_cuentas_manuales_efectivo"),
+    ),
+}
+_ATTRS_FUENTES = {modelo: attrs for modelo, (attrs, _) in _FUENTES.items()}
+
+
+def _acumular(deltas: dict, obj, previos: bool, signo: int) -> None:
+    attrs, aporte = _FUENTES[type(obj)]
+    valores = tuple(valor_previo(obj, a) if previos else getattr(obj, a) for a in attrs)
+    id_turno = valores[0]
+    if id_turno is None:
+        return
+    for columna, valor in aporte(*valores).items():
+        deltas[(int(id_turno), columna)] += signo * valor
+
+
+# --- Cálculo desde las filas originales ---
+
+
+def calcular_totales(db: Session, ids_turno: Optional[Iterable[int]] = None) -> dict[int, TotalesTurno]:
+    """Totales de cada turno (todos o ids_turno) sumando las tablas originales: 4 consultas agrupadas."""
+    ids = None if ids_turno is None else sorted(set(ids_turno))
+    totales: dict[int, TotalesTurno] = defaultdict(TotalesTurno)
+
+    def _por_turno(modelo, *columnas, filtros=()):
+        q = db.query(modelo.id_turno, *columnas).filter(modelo.id_turno.isnot(None), *filtros)
+        if ids is not None:
+            q = q.filter(modelo.id_turno.in_(ids))
+        return q
+
+    cobros = _por_turno(Pago, Pago.metodo, func.count(Pago.id_pago), func.sum(Pago.monto))
+    for id_turno, metodo, cantidad, total in cobros.group_by(Pago.id_turno, Pago.metodo).all():
+        t = totales[id_turno]
+        t.cantidad_cobros += int(cantidad)
+        columna = _COLUMNA_COBRO.get(_metodo(metodo))
+        if columna:
+            setattr(t, columna, Decimal(total or 0))
+
+    egresos = (
+        ("gastos", GastoOperativo, ()),
+        ("pagos_proveedor_efectivo", PagoOrdenCompra, (PagoOrdenCompra.metodo == "EFECTIVO",)),
+        ("pagos_cuentas_manuales_efectivo", PagoCuentaPagarManual, (PagoCuentaPagarManual.metodo == "EFECTIVO",)),
+    )
+    for columna, modelo, filtros in egresos:
+        for id_turno, total in _por_turno(modelo, func.sum(modelo.monto), filtros=filtros).group_by(modelo.id_turno):
+            setattr(totales[id_turno], columna, Decimal(total or 0))
+    return dict(totales)
+
+
+# --- Lectura ---
+
+
+def leer_totales(db: Session, id_turno: int, *, bloquear: bool = False) -> TotalesTurno:
+    """Totales del turno desde su fila (una lectura por PK); en vivo si la fila no existe."""
+    q = db.query(CajaTurnoTotal).filter(CajaTurnoTotal.id_turno == id_turno)
+    if bloquear:
+        q = q.with_for_update()
+    fila = q.populate_existing().first()
+    if fila is None:
+        return calcular_totales(db, [id_turno]).get(id_turno, TotalesTurno())
+    return TotalesTurno.desde_fila(fila)
+
+
+# --- Auditor ---
+
+
+@dataclass
+class DesfaseTurno:
+    id_turno: int
+    columna: str
+    almacenado: Optional[Decimal]
+    calculado: Decimal
+
+    def a_dict(self) -> dict:
+        return {
+            "id_turno": self.id_turno,
+            "columna": self.columna,
+            "almacenado": None if self.almacenado is None else float(self.almacenado),
+            "calculado": float(self.calculado),
+        }
+
+
+def auditar_totales(
+    db: Session, *, corregir: bool = False, ids_turno: Optional[Iterable[int]] = None
+) -> list[DesfaseTurno]:
+    """
+    Recalcula los totales de los turnos (todos o ids_turno) desde las filas originales y los
+    compara con caja_turno_totales. Una fila faltante se reporta con almacenado=None. Con
+    corregir=True escribe lo calculado (crea filas faltantes). No hace commit.
+    """
+    q_turnos = db.query(CajaTurno.id_turno)
+    if ids_turno is not None:
+        q_turnos = q_turnos.filter(CajaTurno.id_turno.in_(sorted(set(ids_turno))))
+    ids = [r[0] for r in q_turnos.order_by(CajaTurno.id_turno).all()]
+    calculados = calcular_totales(db, ids if ids_turno is not None else None)
+    almacenados = {
+        f.id_turno: f
+        for f in db.query(CajaTurnoTotal).filter(CajaTurnoTotal.id_turno.in_(ids)).populate_existing().all()
+    }
+
+    desfases: list[DesfaseTurno] = []
+    ahora = datetime.utcnow()
+    for id_turno in ids:
+        calculado = calculados.get(id_turno, TotalesTurno())
+        fila = almacenados.get(id_turno)
+        distintos = [
+            f.name
+            for f in fields(TotalesTurno)
+            if fila is None or (getattr(fila, f.name) or 0) != getattr(calculado, f.name)
+        ]
+        if not distintos:
+            continue
+        for columna in distintos:
+            almacenado = None if fila is None else getattr(fila, columna)
+            desfases.append(DesfaseTurno(id_turno, columna, almacenado, getattr(calculado, columna)))
+        if not corregir:
+            continue
+        valores = {f.name: getattr(calculado, f.name) for f in fields(TotalesTurno)}
+        if fila is None:
+            db.add(CajaTurnoTotal(id_turno=id_turno, version=1, actualizado_en=ahora, **valores))
+        else:
+            for columna, valor in valores.items():
+                setattr(fila, columna, valor)
+            fila.version = (fila.version or 0) + 1
+            fila.actualizado_en = ahora
+    db.flush()
+    existentes = sorted({d.id_turno for d in desfases if d.almacenado is not None})
+    if existentes:
+        logger.warning("Totales de caja con desfase en turnos: %s", ", ".join(map(str, existentes)))
+    return desfases
+
+
+# --- Mantenimiento por eventos ---
+
+
+@dataclass
+class _Pendiente:
+    """Deltas de las filas previas (before_flush) y filas modificadas a sumar en after_flush."""
+
+    deltas: dict = field(default_factory=lambda: defaultdict(Decimal))
+    modificados: list = field(default_factory=list)
+
+
+@event.listens_for(Session, "before_flush")
+def _restar_previos(session: Session, flush_context, instances) -> None:
+    pendiente = _Pendiente()
+    with session.no_autoflush:
+        for obj, borrado in filas_modificadas(session, _ATTRS_FUENTES):
+            _acumular(pendiente.deltas, obj, previos=True, signo=-1)
+            if not borrado:
+                pendiente.modificados.append(obj)
+    session.info[CLAVE_INFO] = pendiente
+
+
+@event.listens_for(Session, "after_flush")
+def _aplicar_deltas(session: Session, flush_context) -> None:
+    pendiente: Optional[_Pendiente] = session.info.pop(CLAVE_INFO, None)
+    if pendiente is None:
+        return
+    deltas = pendiente.deltas
+    tabla = CajaTurnoTotal.__table__
+    conn = session.connection()
+    ahora = datetime.utcnow()
+    nuevos = list(session.new)
+    turnos_nuevos = sorted(obj.id_turno for obj in nuevos if isinstance(obj, CajaTurno))
+    if turnos_nuevos:
+        conn.execute(insert(tabla), [{"id_turno": i, "actualizado_en": ahora} for i in turnos_nuevos])
+    for obj in (*nuevos, *pendiente.modificados):
+        if type(obj) in _FUENTES:
+            _acumular(deltas, obj, previos=False, signo=1)
+
+    por_turno: dict[int, dict] = defaultdict(dict)
+    for (id_turno, columna), delta in deltas.items():
+        if delta:
+            por_turno[id_turno][columna] = delta
+    # Orden fijo de turnos para no cruzar bloqueos entre transacciones
+    for id_turno in sorted(por_turno):
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.id_turno == id_turno)
+            .values(
+                version=tabla.c.version + 1,
+                actualizado_en=ahora,
+                **{columna: tabla.c[columna] + delta for columna, delta in por_turno[id_turno].items()},
+            )
+        )
+
+
+registrar_historial_previo(getattr(modelo, a) for modelo, attrs in _ATTRS_FUENTES.items() for a in attrs)
@@ -0,0 +1,435 @@
+"""
+Contadores operativos A0 materializados (tabla contadores_operativos).
+
+El fast path de /operaciones/resumen (incluir_items=false) lee estos contadores en una sola
+consulta en lugar de ~10 COUNT por poll. Se mantienen así:
+
+- Eventos de dominio (listeners de Session): cada flush calcula deltas que se acumulan en la
+  sesión y se escriben después del commit, en una transacción corta aparte. Así los cobros y
+  las ediciones de OT no retienen el bloqueo de las filas globales hasta su commit; un rollback
+  descarta los deltas.
+  * OT (estado / técnico), citas (estado / OT vinculada) y cotizaciones de refacción (estado):
+    delta −1/+1 a partir del valor previo y el nuevo de cada fila.
+  * Cobro O1/O2/V1 (OT completadas, ventas, pagos): se cuenta la pertenencia de las OT y
+    ventas afectadas antes y después del flush, con los mismos clasificadores de
+    operaciones_service restringidos a esos ids; el delta es la diferencia. Solo si el flush
+    crea o borra filas de esos modelos o cambia atributos que el clasificador lee (_ATTRS_COBRO).
+    El conteo "después" lee ventas.saldo, que escribe el after_flush de saldos_venta_service:
+    ese módulo se importa aquí para que su listener quede registrado antes.
+- reconciliar_contadores(): recalcula todo desde cero, corrige y reporta desfases
+  (scripts/reconciliar_contadores_operativos.py y tarea periódica en main.py). También cubre
+  deltas perdidos si el proceso cae entre el commit y su escritura.
+
+Si falta alguna fila (tabla recién creada, técnico nuevo), leer_contadores devuelve None y el
+fast path vuelve a los COUNT en vivo. citas_pendientes_asistencia depende de la hora actual y
+no se materializa.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.cita import Cita, EstadoCita
+from app.models.contador_operativo import ContadorOperativo
+from app.models.cotizacion_refaccion_especial import CotizacionRefaccionEspecial, EstadoCotizacionRefaccion
+from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
+from app.models.pago import Pago
+from app.models.usuario import Usuario
+from app.models.venta import Venta
+from app.services import operaciones_service, saldos_venta_service  # noqa: F401 (orden de listeners)
+from app.services.deltas_sesion import cambio, filas_modificadas, registrar_historial_previo, valor_previo
+
+logger = logging.getLogger(__name__)
+
+AMBITO_GLOBAL = 0
+
+CLAVES_OT = ("ot_pendientes", "ot_en_proceso", "ot_completadas")
+CLAVES_COBRO = ("ot_pendientes_cobro", "ot_listas_entrega", "ventas_saldo_pendiente")
+CLAVES_GLOBALES = (
+    "citas_convertibles",
+    *CLAVES_OT,
+    *CLAVES_COBRO,
+    "refacciones_en_compra",
+    "refacciones_recibidas_pendiente_entrega",
+)
+
+CLAVE_INFO = "contadores_operativos_pendientes"
+CLAVE_DELTAS = "contadores_operativos_deltas"
+
+_ESTADOS_CITA_CONVERTIBLE = frozenset({EstadoCita.CONFIRMADA.value, EstadoCita.SI_ASISTIO.value})
+_CLAVE_POR_ESTADO_REFACCION = {
+    EstadoCotizacionRefaccion.EN_COMPRA.value: "refacciones_en_compra",
+    EstadoCotizacionRefaccion.RECIBIDA.value: "refacciones_recibidas_pendiente_entrega",
+}
+
+
+def _estado(valor) -> Optional[str]:
+    return None if valor is None else operaciones_service._estado_str(valor)
+
+
+def _clave_estado_ot(estado) -> Optional[str]:
+    estado = _estado(estado)
+    if estado in {e.value for e in operaciones_service.ESTADOS_OT_PENDIENTES}:
+        return "ot_pendientes"
+    if estado == EstadoOrden.EN_PROCESO.value:
+        return "ot_en_proceso"
+    if estado == EstadoOrden.COMPLETADA.value:
+        return "ot_completadas"
+    return None
+
+
+# --- Pertenencia de una fila a los contadores simples (valores → claves) ---
+
+
+def _pertenencia_ot(estado, tecnico_id) -> list[tuple[str, int]]:
+    clave = _clave_estado_ot(estado)
+    if clave is None:
+        return []
+    claves = [(clave, AMBITO_GLOBAL)]
+    if tecnico_id is not None:
+        claves.append((clave, int(tecnico_id)))
+    return claves
+
+
+def _pertenencia_cita(estado, id_orden) -> list[tuple[str, int]]:
+    if _estado(estado) in _ESTADOS_CITA_CONVERTIBLE and id_orden is None:
+        return [("citas_convertibles", AMBITO_GLOBAL)]
+    return []
+
+
+def _pertenencia_refaccion(estado) -> list[tuple[str, int]]:
+    clave = _CLAVE_POR_ESTADO_REFACCION.get(_estado(estado))
+    return [(clave, AMBITO_GLOBAL)] if clave else []
+
+
+_SIMPLES = {
+    OrdenTrabajo: (("estado", "tecnico_id"), _pertenencia_ot),
+    Cita: (("estado", "id_orden"), _pertenencia_cita),
+    CotizacionRefaccionEspecial: (("estado",), _pertenencia_refaccion),
+}
+_ATTRS_SIMPLES = {modelo: attrs for modelo, (attrs, _) in _SIMPLES.items()}
+
+# Atributos que leen los clasificadores O1/O2/V1; editar otros (notas, fechas, cliente) no reclasifica
+_ATTRS_COBRO = {
+    Pago: ("id_venta", "monto"),
+    Venta: ("estado", "id_orden", "total"),
+    OrdenTrabajo: ("estado",),
+}
+
+
+def _valores(obj, attrs, previos: bool) -> tuple:
+    return tuple(valor_previo(obj, a) if previos else getattr(obj, a) for a in attrs)
+
+
+# --- Conteos (población completa o restringidos a ids) ---
+
+
+def _contar_ot(db: Session) -> Counter:
+    conteo: Counter = Counter()
+    filas = (
+        db.query(OrdenTrabajo.estado, OrdenTrabajo.tecnico_id, func.count(OrdenTrabajo.id))
+        .group_by(OrdenTrabajo.estado, OrdenTrabajo.tecnico_id)
+        .all()
+    )
+    for estado, tecnico_id, n in filas:
+        for clave in _pertenencia_ot(estado, tecnico_id):
+            conteo[clave] += int(n)
+    return conteo
+
+
+def _contar_citas(db: Session) -> Counter:
+    return Counter({("citas_convertibles", AMBITO_GLOBAL): operaciones_service._contar_citas_convertibles(db)})
+
+
+def _contar_refacciones(db: Session) -> Counter:
+    en_compra, recibidas = operaciones_service.contadores_refacciones(db)
+    return Counter(
+        {
+            ("refacciones_en_compra", AMBITO_GLOBAL): en_compra,
+            ("refacciones_recibidas_pendiente_entrega", AMBITO_GLOBAL): recibidas,
+        }
+    )
+
+
+def _contar_cobro(db: Session, ids_ot: Optional[Iterable[int]] = None, ids_venta: Optional[Iterable[int]] = None):
+    """O1/O2/V1 de toda la población, o solo de las OT / ventas indicadas."""
+    ops = operaciones_service
+    conteo: Counter = Counter()
+    for familia, clave in ((ops.FAMILIA_O1, "ot_pendientes_cobro"), (ops.FAMILIA_O2, "ot_listas_entrega")):
+        if ids_ot is not None and not ids_ot:
+            continue
+        q = ops._query_clasificador_ot_cobro(db, familia)
+        if ids_ot is not None:
+            q = q.filter(OrdenTrabajo.id.in_(sorted(ids_ot)))
+        conteo[(clave, AMBITO_GLOBAL)] = int(q.with_entities(func.count(OrdenTrabajo.id)).scalar() or 0)
+    if ids_venta is None or ids_venta:
+        q = ops._query_ventas_v1(db)
+        if ids_venta is not None:
+            q = q.filter(Venta.id_venta.in_(sorted(ids_venta)))
+        conteo[("ventas_saldo_pendiente", AMBITO_GLOBAL)] = int(
+            q.with_entities(func.count(Venta.id_venta)).scalar() or 0
+        )
+    return conteo
+
+
+def calcular_contadores(db: Session) -> Counter:
+    """Todos los contadores desde cero (lo que debería haber en la tabla)."""
+    conteo = _contar_ot(db)
+    conteo.update(_contar_citas(db))
+    conteo.update(_contar_refacciones(db))
+    conteo.update(_contar_cobro(db))
+    return conteo
+
+
+# --- Lectura (fast path) ---
+
+
+def leer_contadores(db: Session, tecnico_id: Optional[int] = None) -> Optional[dict[str, int]]:
+    """
+    Contadores globales (y los de OT del técnico si tecnico_id) en una sola consulta.
+    None si falta alguna fila: el llamador cuenta en vivo.
+    """
+    ambitos = [AMBITO_GLOBAL] if tecnico_id is None else [AMBITO_GLOBAL, tecnico_id]
+    filas = {
+        (clave, ambito): valor
+        for clave, ambito, valor in db.query(ContadorOperativo.clave, ContadorOperativo.ambito, ContadorOperativo.valor)
+        .filter(ContadorOperativo.ambito.in_(ambitos))
+        .all()
+    }
+    valores = {}
+    for clave in CLAVES_GLOBALES:
+        if (clave, AMBITO_GLOBAL) not in filas:
+            return None
+        valores[clave] = int(filas[(clave, AMBITO_GLOBAL)])
+    if tecnico_id is not None:
+        for clave in CLAVES_OT:
+            if (clave, tecnico_id) not in filas:
+                return None
+            valores[clave] = int(filas[(clave, tecnico_id)])
+    return valores
+
+
+# --- Reconciliador ---
+
+
+@dataclass
+class Desfase:
+    clave: str
+    ambito: int
+    almacenado: Optional[int]
+    calculado: int
+
+    def a_dict(self) -> dict:
+        return {
+            "clave": self.clave,
+            "ambito": self.ambito,
+            "almacenado": self.almacenado,
+            "calculado": self.calculado,
+        }
+
+
+def reconciliar_contadores(db: Session, *, corregir: bool = True) -> list[Desfase]:
+    """
+    Recalcula todos los contadores y los compara con la tabla. Con corregir=True escribe los
+    valores calculados (crea filas faltantes, sube version). Devuelve los desfases; una fila
+    que falta se reporta con almacenado=None. No hace commit.
+    """
+    calculado = calcular_contadores(db)
+    ids_tecnicos = [r[0] for r in db.query(Usuario.id_usuario).filter(Usuario.rol == "TECNICO").all()]
+    esperadas = {(clave, AMBITO_GLOBAL) for clave in CLAVES_GLOBALES}
+    esperadas.update((clave, id_tecnico) for id_tecnico in ids_tecnicos for clave in CLAVES_OT)
+    esperadas.update(calculado)
+
+    almacenados = {(c.clave, c.ambito): c for c in db.query(ContadorOperativo).all()}
+    esperadas.update(almacenados)
+
+    desfases = []
+    ahora = datetime.utcnow()
+    for clave, ambito in sorted(esperadas):
+        valor = int(calculado.get((clave, ambito), 0))
+        fila = almacenados.get((clave, ambito))
+        if fila is not None and fila.valor == valor:
+            continue
+        desfases.append(Desfase(clave, ambito, None if fila is None else fila.valor, valor))
+        if not corregir:
+            continue
+        if fila is None:
+            db.add(ContadorOperativo(clave=clave, ambito=ambito, valor=valor, version=1, actualizado_en=ahora))
+        else:
+            fila.valor = valor
+            fila.version = (fila.version or 0) + 1
+            fila.actualizado_en = ahora
+    db.flush()
+    desfases_existentes = [d for d in desfases if d.almacenado is not None]
+    if desfases_existentes:
+        logger.warning(
+            "Contadores operativos con desfase: %s",
+            ", ".join(f"{d.clave}[{d.ambito}] {d.almacenado}→{d.calculado}" for d in desfases_existentes),
+        )
+    return desfases
+
+
+def reconciliar_y_guardar() -> list[Desfase]:
+    """Reconciliación completa en una sesión propia, con commit (tarea periódica de main.py)."""
+    db = SessionLocal()
+    try:
+        desfases = reconciliar_contadores(db)
+        db.commit()
+        return desfases
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# --- Mantenimiento por eventos ---
+
+
+@dataclass
+class _Pendiente:
+    """Estado capturado en before_flush para aplicar deltas en after_flush."""
+
+    deltas: Counter = field(default_factory=Counter)
+    ids_ot: set[int] = field(default_factory=set)
+    ids_venta: set[int] = field(default_factory=set)
+    cobro_antes: Counter = field(default_factory=Counter)
+
+
+def _afectados_cobro(session: Session, objetos, previos: bool) -> tuple[set[int], set[int]]:
+    """OT y ventas cuya pertenencia a O1/O2/V1 puede cambiar por los objetos dados (filtrados con _toca_cobro)."""
+    ids_ot: set[int] = set()
+    ids_venta: set[int] = set()
+    for obj in objetos:
+        if isinstance(obj, Pago):
+            for id_venta in {obj.id_venta, valor_previo(obj, "id_venta") if previos else None}:
+                if id_venta is not None:
+                    ids_venta.add(id_venta)
+        elif isinstance(obj, Venta):
+            if obj.id_venta is not None:
+                ids_venta.add(obj.id_venta)
+            for id_orden in {obj.id_orden, valor_previo(obj, "id_orden") if previos else None}:
+                if id_orden is not None:
+                    ids_ot.add(id_orden)
+        elif isinstance(obj, OrdenTrabajo) and obj.id is not None:
+            ids_ot.add(obj.id)
+    if ids_venta:
+        ids_ot.update(
+            r[0]
+            for r in session.query(Venta.id_orden)
+            .filter(Venta.id_venta.in_(sorted(ids_venta)), Venta.id_orden.isnot(None))
+            .all()
+        )
+    if ids_ot:
+        ids_venta.update(r[0] for r in session.query(Venta.id_venta).filter(Venta.id_orden.in_(sorted(ids_ot))).all())
+    return ids_ot, ids_venta
+
+
+def _toca_cobro(session: Session, obj) -> bool:
+    """Fila de cobro nueva, borrada o con cambios en _ATTRS_COBRO (antes del flush)."""
+    attrs = _ATTRS_COBRO.get(type(obj))
+    if attrs is None:
+        return False
+    if obj in session.new:
+        return not isinstance(obj, OrdenTrabajo)  # sin id aún; se cuenta en after_flush
+    return obj in session.deleted or cambio(obj, attrs)
+
+
+@event.listens_for(Session, "before_flush")
+def _capturar_antes(session: Session, flush_context, instances) -> None:
+    pendiente = _Pendiente()
+    with session.no_autoflush:
+        for obj, borrado in filas_modificadas(session, _ATTRS_SIMPLES):
+            attrs, pertenencia = _SIMPLES[type(obj)]
+            for clave in pertenencia(*_valores(obj, attrs, previos=True)):
+                pendiente.deltas[clave] -= 1
+            if not borrado:
+                for clave in pertenencia(*_valores(obj, attrs, previos=False)):
+                    pendiente.deltas[clave] += 1
+
+        cobro = [obj for obj in (*session.new, *session.dirty, *session.deleted) if _toca_cobro(session, obj)]
+        if cobro:
+            pendiente.ids_ot, pendiente.ids_venta = _afectados_cobro(session, cobro, previos=True)
+            pendiente.cobro_antes = _contar_cobro(session, pendiente.ids_ot, pendiente.ids_venta)
+    session.info[CLAVE_INFO] = pendiente
+
+
+@event.listens_for(Session, "after_flush")
+def _aplicar_despues(session: Session, flush_context) -> None:
+    pendiente: Optional[_Pendiente] = session.info.pop(CLAVE_INFO, None)
+    if pendiente is None:
+        return
+    deltas = pendiente.deltas
+    nuevos = list(session.new)
+    with session.no_autoflush:
+        for obj in nuevos:
+            config = _SIMPLES.get(type(obj))
+            if config is not None:
+                attrs, pertenencia = config
+                for clave in pertenencia(*_valores(obj, attrs, previos=False)):
+                    deltas[clave] += 1
+
+        cobro_nuevos = [obj for obj in nuevos if type(obj) in _ATTRS_COBRO]
+        if pendiente.ids_ot or pendiente.ids_venta or cobro_nuevos:
+            ids_ot, ids_venta = _afectados_cobro(session, cobro_nuevos, previos=False)
+            ids_ot |= pendiente.ids_ot
+            ids_venta |= pendiente.ids_venta
+            despues = _contar_cobro(session, ids_ot, ids_venta)
+            for clave in set(despues) | set(pendiente.cobro_antes):
+                deltas[clave] += despues.get(clave, 0) - pendiente.cobro_antes.get(clave, 0)
+
+    acumulados: Counter = session.info.setdefault(CLAVE_DELTAS, Counter())
+    acumulados.update(deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _escribir_al_confirmar(session: Session) -> None:
+    deltas = session.info.pop(CLAVE_DELTAS, None)
+    if not deltas or not any(deltas.values()):
+        return
+    try:
+        with Session(bind=session.get_bind()) as db, db.begin():
+            _escribir_deltas(db, deltas)
+    except Exception as e:
+        logger.warning("No se aplicaron deltas de contadores operativos (los corrige la reconciliación): %s", e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_al_revertir(session: Session) -> None:
+    session.info.pop(CLAVE_DELTAS, None)
+
+
+def _escribir_deltas(db: Session, deltas: Counter) -> None:
+    """UPDATE valor = valor + delta; orden fijo de filas para no cruzar bloqueos entre transacciones."""
+    tabla = ContadorOperativo.__table__
+    conn = db.connection()
+    ahora = datetime.utcnow()
+    for (clave, ambito), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.clave == clave, tabla.c.ambito == ambito)
+            .values(valor=tabla.c.valor + delta, version=tabla.c.version + 1, actualizado_en=ahora)
+        )
+
+
+registrar_historial_previo(
+    (
+        OrdenTrabajo.estado,
+        OrdenTrabajo.tecnico_id,
+        Cita.estado,
+        Cita.id_orden,
+        CotizacionRefaccionEspecial.estado,
+        Venta.id_orden,
+        Pago.id_venta,
+    )
+)
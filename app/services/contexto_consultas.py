@@ -0,0 +1,187 @@
+"""
+Contexto de consultas por request (memoización ligada a la Session).
+
+Un mismo GET /api/operaciones/resumen o dashboard resuelve muchas veces el turno abierto
+del usuario y la venta activa de una OT (el saldo ya es la columna ventas.saldo de la venta
+cargada). Este contexto vive en
+`Session.info` (una Session por request vía get_db), así que:
+
+- el costo queda acotado por entidades distintas, no por llamadas a evaluadores;
+- cada lectura hace el autoflush que haría la consulta directa (si la sesión lo tiene activo),
+  así que Venta / CajaTurno pendientes de la misma sesión se ven también en un hit;
+- cualquier flush/UPDATE/DELETE que toque Venta o CajaTurno en la misma sesión
+  invalida las entradas afectadas, y commit o rollback lo vacían (listeners registrados al
+  importar el módulo).
+
+Sesiones simuladas (MagicMock, fakes de tests) no tienen `info` dict: contexto_de()
+devuelve None y los llamadores consultan directo, como antes.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.caja_turno import CajaTurno
+from app.models.venta import Venta
+
+CLAVE_INFO = "contexto_consultas"
+
+_SIN_VALOR = object()
+
+
+@dataclass
+class EstadisticasCache:
+    hits: int = 0
+    misses: int = 0
+
+    def a_dict(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class _Cache:
+    """Mapa clave → valor con contadores; None es un valor válido (p. ej. sin turno abierto)."""
+
+    def __init__(self):
+        self._valores: dict = {}
+        self.estadisticas = EstadisticasCache()
+
+    def obtener(self, clave, cargar: Callable):
+        valor = self._valores.get(clave, _SIN_VALOR)
+        if valor is not _SIN_VALOR:
+            self.estadisticas.hits += 1
+            return valor
+        self.estadisticas.misses += 1
+        valor = cargar()
+        self._valores[clave] = valor
+        return valor
+
+    def sembrar(self, clave, valor) -> None:
+        self._valores[clave] = valor
+
+    def contiene(self, clave) -> bool:
+        return clave in self._valores
+
+    def limpiar(self) -> None:
+        self._valores.clear()
+
+
+class ContextoConsultas:
+    """Lecturas compartidas por operaciones_service, ot_acciones_service y acciones_operativas_service."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._turnos = _Cache()
+        self._ventas_activas = _Cache()
+
+    # --- accesores ---
+
+    def _autoflush(self) -> None:
+        """Flush que habría disparado la consulta; el after_flush invalida lo que haya cambiado."""
+        if self.db.autoflush:
+            self.db.flush()
+
+    def turno_abierto(self, id_usuario: int) -> Optional[CajaTurno]:
+        """Turno ABIERTO del usuario — misma consulta que app/routers/pagos.py."""
+        self._autoflush()
+        return self._turnos.obtener(
+            id_usuario,
+            lambda: self.db.query(CajaTurno)
+            .filter(CajaTurno.id_usuario == id_usuario, CajaTurno.estado == "ABIERTO")
+            .first(),
+        )
+
+    def venta_activa_por_orden(self, orden_id: int) -> Optional[Venta]:
+        """Venta activa = max(id_venta) no cancelada vinculada a la OT."""
+        self._autoflush()
+        return self._ventas_activas.obtener(
+            orden_id,
+            lambda: self.db.query(Venta)
+            .filter(Venta.id_orden == orden_id, Venta.estado != "CANCELADA")
+            .order_by(Venta.id_venta.desc())
+            .first(),
+        )
+
+    # --- siembra desde cargas por lote (sin contar hit/miss) ---
+
+    def sembrar_venta_activa(self, orden_id: int, venta: Optional[Venta]) -> None:
+        self._ventas_activas.sembrar(orden_id, venta)
+
+    def tiene_venta_activa(self, orden_id: int) -> bool:
+        return self._ventas_activas.contiene(orden_id)
+
+    # --- invalidación ---
+
+    def invalidar_turnos(self) -> None:
+        self._turnos.limpiar()
+
+    def invalidar_ventas(self) -> None:
+        """Venta escrita: puede cambiar la venta activa por OT."""
+        self._ventas_activas.limpiar()
+
+    def invalidar(self) -> None:
+        self.invalidar_turnos()
+        self.invalidar_ventas()
+
+    def estadisticas(self) -> dict[str, dict[str, int]]:
+        return {
+            "turno_abierto": self._turnos.estadisticas.a_dict(),
+            "venta_activa_por_orden": self._ventas_activas.estadisticas.a_dict(),
+        }
+
+
+def contexto_de(db: Session) -> Optional[ContextoConsultas]:
+    """Contexto de la sesión (lo crea al primer uso). None si db no es una Session real."""
+    info = getattr(db, "info", None)
+    if not isinstance(info, dict):
+        return None
+    ctx = info.get(CLAVE_INFO)
+    if ctx is None:
+        ctx = ContextoConsultas(db)
+        info[CLAVE_INFO] = ctx
+    return ctx
+
+
+def _contexto_existente(session: Session) -> Optional[ContextoConsultas]:
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict):
+        return None
+    return info.get(CLAVE_INFO)
+
+
+def _invalidar_por_tipos(ctx: ContextoConsultas, tipos: set[type]) -> None:
+    if Venta in tipos:
+        ctx.invalidar_ventas()
+    if CajaTurno in tipos:
+        ctx.invalidar_turnos()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_tras_flush(session: Session, flush_context) -> None:
+    ctx = _contexto_existente(session)
+    if ctx is None:
+        return
+    tipos = {type(obj) for obj in (*session.new, *session.dirty, *session.deleted)}
+    _invalidar_por_tipos(ctx, tipos)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidar_tras_update_delete(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    ctx = _contexto_existente(orm_execute_state.session)
+    if ctx is None:
+        return
+    _invalidar_por_tipos(ctx, {m.class_ for m in orm_execute_state.all_mappers})
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidar_al_terminar(session: Session) -> None:
+    """Una sesión que sigue en uso tras commit / rollback no reutiliza turnos ni ventas previos."""
+    ctx = _contexto_existente(session)
+    if ctx is not None:
+        ctx.invalidar()
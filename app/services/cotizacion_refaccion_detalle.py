@@ -0,0 +1,241 @@
+"""
+Hidratación y serialización del detalle de cotizaciones de refacción.
+
+Antes el detalle consultaba Cliente, Usuario (creador) y Vehiculo por separado y un Usuario
+por comentario, y los totales volvían a ordenar líneas y a serializar (recalcular costo y
+precio sugerido) la opción elegida de cada línea. cargar_cotizacion() trae el grafo completo
+en un número fijo de consultas: la cabecera con cliente, vehículo y creador (JOIN) y un
+SELECT … IN por colección (líneas, opciones, comentarios con sus usuarios, compras).
+cotizacion_a_detalle() no consulta la base: calcula cada opción una sola vez y los totales
+reutilizan esos mismos cálculos. El dict resultante es el mismo CotizacionRefaccionDetail.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.config import settings
+from app.models.cotizacion_refaccion_especial import (
+    ComentarioCotizacionRefaccion,
+    CotizacionRefaccionEspecial,
+    LineaCotizacionRefaccion,
+    OpcionCompraLineaCotizacion,
+)
+from app.services.cotizacion_refaccion_calculo import (
+    costo_unitario_mxn_opcion,
+    ganancia_estimada,
+    precio_sugerido_con_iva,
+)
+
+OPCIONES_DETALLE = (
+    joinedload(CotizacionRefaccionEspecial.cliente),
+    joinedload(CotizacionRefaccionEspecial.vehiculo),
+    joinedload(CotizacionRefaccionEspecial.usuario_creo),
+    selectinload(CotizacionRefaccionEspecial.lineas).selectinload(LineaCotizacionRefaccion.opciones),
+    selectinload(CotizacionRefaccionEspecial.comentarios).selectinload(ComentarioCotizacionRefaccion.usuario),
+    selectinload(CotizacionRefaccionEspecial.compras_ejecutadas),
+)
+
+
+def cargar_cotizacion(db: Session, cotizacion_id: int) -> Optional[CotizacionRefaccionEspecial]:
+    """
+    Cotización con todo lo que usa cotizacion_a_detalle(), o None.
+    populate_existing: tras modificar líneas u opciones en la misma sesión, las colecciones
+    ya cargadas se vuelven a leer en lugar de devolver la versión previa del mapa de identidad.
+    """
+    return (
+        db.query(CotizacionRefaccionEspecial)
+        .options(*OPCIONES_DETALLE)
+        .filter(CotizacionRefaccionEspecial.id == cotizacion_id)
+        .populate_existing()
+        .first()
+    )
+
+
+def _valor(enum_o_str) -> str:
+    return enum_o_str.value if hasattr(enum_o_str, "value") else str(enum_o_str)
+
+
+def _decimal(valor) -> Optional[Decimal]:
+    return Decimal(str(valor)) if valor is not None else None
+
+
+def _texto_vehiculo(v) -> Optional[str]:
+    if v is None:
+        return None
+    partes = [
+        getattr(v, "marca", None) or "",
+        getattr(v, "modelo", None) or "",
+        str(getattr(v, "anio", "") or ""),
+    ]
+    return " ".join(filter(None, partes)).strip() or None
+
+
+def serializar_opcion(
+    opcion: OpcionCompraLineaCotizacion,
+    cantidad: Decimal,
+    tc_cot: Optional[Decimal],
+    margen: Optional[Decimal],
+    iva: Decimal,
+) -> dict[str, Any]:
+    d: dict[str, Any] = {
+        "id": opcion.id,
+        "id_linea": opcion.id_linea,
+        "origen_nombre": opcion.origen_nombre,
+        "url_compra": opcion.url_compra,
+        "moneda": _valor(opcion.moneda),
+        "monto_unitario": Decimal(str(opcion.monto_unitario)),
+        "tipo_cambio_a_mxn": _decimal(opcion.tipo_cambio_a_mxn),
+        "otros_costos_mxn": Decimal(str(opcion.otros_costos_mxn or 0)),
+        "dias_estimados_entrega": opcion.dias_estimados_entrega,
+        "notas": opcion.notas,
+        "es_preferida": bool(opcion.es_preferida),
+        "costo_unitario_mxn": None,
+        "precio_sugerido_linea": None,
+        "ganancia_estimada_linea": None,
+        "costo_error": None,
+    }
+    try:
+        cu = costo_unitario_mxn_opcion(opcion, tc_cot)
+        d["costo_unitario_mxn"] = cu.quantize(Decimal("0.01"))
+        ps = precio_sugerido_con_iva(cu, cantidad, margen, iva)
+        d["precio_sugerido_linea"] = ps
+        d["ganancia_estimada_linea"] = ganancia_estimada(ps, cu, cantidad)
+    except ValueError as e:
+        d["costo_error"] = str(e)
+    return d
+
+
+def _opcion_usada(opciones: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    """Opción que cuenta en los totales: la preferida o, si no hay, la de menor id (opciones ya ordenadas)."""
+    for o in opciones:
+        if o["es_preferida"]:
+            return o
+    return opciones[0] if opciones else None
+
+
+def _totales(lineas: list[tuple[Decimal, dict[str, Any]]]) -> dict[str, Any]:
+    """Totales con la opción usada de cada línea; recibe (cantidad de cálculo, línea serializada)."""
+    precio_total = Decimal("0")
+    costo_total = Decimal("0")
+    ganancia_total = Decimal("0")
+    lineas_detail: list[dict] = []
+    for cantidad, ln in lineas:
+        ser = _opcion_usada(ln["opciones"])
+        if ser is None:
+            lineas_detail.append(
+                {"id_linea": ln["id"], "subtotal_precio_sugerido": None, "costo_error": "Sin opciones"}
+            )
+            continue
+        ps = ser["precio_sugerido_linea"]
+        cu = ser["costo_unitario_mxn"]
+        ge = ser["ganancia_estimada_linea"]
+        if ser["costo_error"]:
+            lineas_detail.append(
+                {"id_linea": ln["id"], "subtotal_precio_sugerido": None, "costo_error": ser["costo_error"]}
+            )
+            continue
+        if ps is not None:
+            precio_total += ps
+        if cu is not None:
+            costo_total += cu * cantidad
+        if ge is not None:
+            ganancia_total += ge
+        lineas_detail.append({"id_linea": ln["id"], "subtotal_precio_sugerido": ps, "ganancia_estimada_linea": ge})
+    return {
+        "precio_sugerido_total": precio_total.quantize(Decimal("0.01")),
+        "costo_estimado_total_mxn": costo_total.quantize(Decimal("0.01")),
+        "ganancia_estimada_total": ganancia_total.quantize(Decimal("0.01")),
+        "lineas": lineas_detail,
+    }
+
+
+def _serializar_lineas(cot: CotizacionRefaccionEspecial) -> list[tuple[Decimal, dict[str, Any]]]:
+    tc_cot = _decimal(cot.tc_referencia_usd_mxn)
+    margen = _decimal(cot.margen_objetivo_pct)
+    iva = Decimal(str(settings.IVA_PORCENTAJE))
+    out = []
+    for linea in sorted(cot.lineas or [], key=lambda x: x.n_linea):
+        cantidad = Decimal(str(linea.cantidad or 1))
+        out.append(
+            (
+                cantidad,
+                {
+                    "id": linea.id,
+                    "id_cotizacion": linea.id_cotizacion,
+                    "n_linea": linea.n_linea,
+                    "descripcion": linea.descripcion,
+                    "cantidad": Decimal(str(linea.cantidad)),
+                    "posicion_lado": linea.posicion_lado,
+                    "observaciones": linea.observaciones,
+                    "opciones": [
+                        serializar_opcion(o, cantidad, tc_cot, margen, iva)
+                        for o in sorted(linea.opciones or [], key=lambda o: o.id)
+                    ],
+                },
+            )
+        )
+    return out
+
+
+def cotizacion_a_detalle(cot: CotizacionRefaccionEspecial) -> dict[str, Any]:
+    """Dict de CotizacionRefaccionDetail a partir de una cotización de cargar_cotizacion() (sin consultas)."""
+    lineas = _serializar_lineas(cot)
+
+    comentarios = [
+        {
+            "id": c.id,
+            "id_cotizacion": c.id_cotizacion,
+            "id_usuario": c.id_usuario,
+            "usuario_nombre": c.usuario.nombre if c.usuario else None,
+            "mensaje": c.mensaje,
+            "creado_en": c.creado_en,
+        }
+        for c in sorted(cot.comentarios or [], key=lambda x: x.creado_en or datetime.min)
+    ]
+    compras = [
+        {
+            "id": cp.id,
+            "id_cotizacion": cp.id_cotizacion,
+            "id_linea": cp.id_linea,
+            "id_opcion": cp.id_opcion,
+            "monto_pagado": cp.monto_pagado,
+            "moneda": _valor(cp.moneda),
+            "tipo_cambio_aplicado": cp.tipo_cambio_aplicado,
+            "metodo": _valor(cp.metodo),
+            "comprobante_url": cp.comprobante_url,
+            "notas": cp.notas,
+            "fecha_pago": cp.fecha_pago,
+            "id_usuario_registro": cp.id_usuario_registro,
+        }
+        for cp in sorted(cot.compras_ejecutadas or [], key=lambda x: x.fecha_pago or datetime.min)
+    ]
+
+    return {
+        "id": cot.id,
+        "numero": cot.numero,
+        "id_cliente": cot.id_cliente,
+        "cliente_nombre": cot.cliente.nombre if cot.cliente else None,
+        "id_vehiculo": cot.id_vehiculo,
+        "vehiculo_texto": _texto_vehiculo(cot.vehiculo),
+        "id_orden_trabajo": cot.id_orden_trabajo,
+        "id_usuario_creo": cot.id_usuario_creo,
+        "creador_nombre": cot.usuario_creo.nombre if cot.usuario_creo else None,
+        "estado": _valor(cot.estado),
+        "notas_generales": cot.notas_generales,
+        "tc_referencia_usd_mxn": cot.tc_referencia_usd_mxn,
+        "margen_objetivo_pct": cot.margen_objetivo_pct,
+        "congelada": bool(cot.congelada),
+        "id_usuario_aceptacion": cot.id_usuario_aceptacion,
+        "fecha_aceptacion_cliente": cot.fecha_aceptacion_cliente,
+        "creado_en": cot.creado_en,
+        "actualizado_en": cot.actualizado_en,
+        "lineas": [ln for _, ln in lineas],
+        "comentarios": comentarios,
+        "compras_ejecutadas": compras,
+        "totales": _totales(lineas),
+    }
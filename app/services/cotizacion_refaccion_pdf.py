@@ -4,13 +4,13 @@ from __future__ import annotations
 
 from decimal import Decimal
 from io import BytesIO
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from reportlab.lib.colors import HexColor
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session, joinedload
 
 from app.config import settings
@@ -22,52 +22,24 @@ from app.models.cotizacion_refaccion_especial import (
 )
 from app.models.vehiculo import Vehiculo
 from app.services.cotizacion_refaccion_calculo import costo_unitario_mxn_opcion, precio_sugerido_con_iva
+from app.utils.cache_pdf import clave_pdf
+from app.utils.pdf_layout import partir_lineas
+from app.utils.pdf_recursos import BLANCO, GRIS_BORDE_CLARO, GRIS_FONDO, GRIS_PIZARRA, NEGRO, dibujar_logo
 
 _COLOR_NARANJA = HexColor("#ea580c")
 _COLOR_NARANJA_CLARO = HexColor("#ffedd5")
-_LOGO_PATH = Path(__file__).resolve().parent.parent.parent / "static" / "logo_medina_autodiag.png"
 _Y_MIN = 1.5 * 72
-
-
-def _wrap_text(p, text, max_width, font="Helvetica", size=9):
-    if not text or not str(text).strip():
-        return [""]
-    text = str(text).strip()
-    words = text.split()
-    lines = []
-    current = []
-    for w in words:
-        test = " ".join(current + [w]) if current else w
-        if p.stringWidth(test, font, size) <= max_width:
-            current.append(w)
-        else:
-            if current:
-                lines.append(" ".join(current))
-            current = []
-            if p.stringWidth(w, font, size) <= max_width:
-                current = [w]
-            else:
-                while w:
-                    for k in range(len(w), 0, -1):
-                        if p.stringWidth(w[:k], font, size) <= max_width:
-                            lines.append(w[:k])
-                            w = w[k:]
-                            break
-                    else:
-                        lines.append(w[:25])
-                        w = w[25:]
-    if current:
-        lines.append(" ".join(current))
-    return lines if lines else [""]
+# Parte de la clave de la caché de PDFs: subir al cambiar el layout o los textos fijos
+_VERSION_PLANTILLA = "1"
 
 
 def _barra_naranja(p, x, y, ancho, alto, texto, font="Helvetica-Bold", size=10):
     p.setFillColor(_COLOR_NARANJA)
     p.rect(x, y - alto, ancho, alto, fill=1, stroke=0)
-    p.setFillColor(HexColor("#ffffff"))
+    p.setFillColor(BLANCO)
     p.setFont(font, size)
     p.drawCentredString(x + ancho / 2, y - alto + 0.06 * inch, texto)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     return y - alto
 
 
@@ -94,10 +66,9 @@ def _tc_cot(cot: CotizacionRefaccionEspecial) -> Optional[Decimal]:
     return Decimal(str(cot.tc_referencia_usd_mxn))
 
 
-def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[bytes, str]:
-    """
-    Genera PDF. Retorna (bytes, nombre_archivo sugerido).
-    """
+def _cargar_cotizacion(
+    db: Session, cotizacion_id: int
+) -> tuple[CotizacionRefaccionEspecial, Optional[Cliente], Optional[Vehiculo]]:
     cot = (
         db.query(CotizacionRefaccionEspecial)
         .options(
@@ -113,7 +84,54 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
     veh: Optional[Vehiculo] = None
     if cot.id_vehiculo:
         veh = db.query(Vehiculo).filter(Vehiculo.id_vehiculo == cot.id_vehiculo).first()
+    return cot, cli, veh
+
+
+def _nombre_archivo(cot: CotizacionRefaccionEspecial) -> str:
+    safe_name = (cot.numero or str(cot.id)).replace(" ", "_").replace("/", "-")
+    return f"cotizacion-refaccion-{safe_name}.pdf"
+
+
+def _columnas(obj) -> Optional[dict]:
+    if obj is None:
+        return None
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _datos_cache(cot: CotizacionRefaccionEspecial, cli: Optional[Cliente], veh: Optional[Vehiculo]) -> dict:
+    """Todo lo que lee el render: columnas de cotización/líneas/opciones/cliente/vehículo y parámetros fiscales."""
+    return {
+        "cotizacion": _columnas(cot),
+        "lineas": [
+            {**_columnas(linea), "opciones": [_columnas(o) for o in (linea.opciones or [])]}
+            for linea in (cot.lineas or [])
+        ],
+        "cliente": _columnas(cli),
+        "vehiculo": _columnas(veh),
+        "iva": settings.IVA_PORCENTAJE,
+        "markup": settings.MARKUP_PORCENTAJE,
+    }
+
+
+def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[bytes, str]:
+    """
+    Genera PDF. Retorna (bytes, nombre_archivo sugerido).
+    """
+    cot, cli, veh = _cargar_cotizacion(db, cotizacion_id)
+    return _dibujar_pdf(cot, cli, veh), _nombre_archivo(cot)
+
+
+def preparar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[str, Callable[[], bytes], str]:
+    """
+    Para la caché de PDFs: (clave, generador, nombre_archivo). El render solo ocurre al llamar
+    al generador, es decir, si la caché en disco no tiene la clave.
+    """
+    cot, cli, veh = _cargar_cotizacion(db, cotizacion_id)
+    clave = clave_pdf("cotizacion_refaccion", _VERSION_PLANTILLA, "", _datos_cache(cot, cli, veh))
+    return clave, lambda: _dibujar_pdf(cot, cli, veh), _nombre_archivo(cot)
+
 
+def _dibujar_pdf(cot: CotizacionRefaccionEspecial, cli: Optional[Cliente], veh: Optional[Vehiculo]) -> bytes:
     buf = BytesIO()
     p = canvas.Canvas(buf, pagesize=letter)
     w, h = letter
@@ -123,8 +141,7 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
     y = h - margin_top
 
     logo_w, logo_h = 3.4 * inch, 0.6 * inch
-    if _LOGO_PATH.exists():
-        p.drawImage(str(_LOGO_PATH), w / 2 - logo_w / 2, y - logo_h, width=logo_w, height=logo_h)
+    dibujar_logo(p, w / 2 - logo_w / 2, y - logo_h, logo_w, logo_h)
     y -= logo_h + 0.18 * inch
     p.setFont("Helvetica-Bold", 12)
     p.drawCentredString(w / 2, y, "COTIZACIÓN REFACCIÓN ESPECIAL")
@@ -132,7 +149,7 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
     p.setFont("Helvetica", 9)
     p.drawCentredString(w / 2, y, "Importación / piezas fuera de stock local")
     y -= 0.22 * inch
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.5)
     p.line(margin, y, w - margin, y)
     y -= 0.22 * inch
@@ -144,10 +161,10 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
 
     alto_caja = 0.36 * inch
     p.setFillColor(_COLOR_NARANJA_CLARO)
-    p.setStrokeColor(HexColor("#000000"))
+    p.setStrokeColor(NEGRO)
     p.setLineWidth(0.25)
     p.rect(margin, y - alto_caja, ancho_util, alto_caja, fill=1, stroke=1)
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     p.setFont("Helvetica", 10)
     y_texto = y - 0.14 * inch
     p.drawString(margin + 0.12 * inch, y_texto, f"FECHA: {fecha_str}")
@@ -156,28 +173,28 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
     y -= alto_caja + 0.12 * inch
 
     p.setFont("Helvetica", 8)
-    p.setFillColor(HexColor("#64748b"))
+    p.setFillColor(GRIS_PIZARRA)
     p.drawCentredString(
         w / 2,
         y,
         "Propuesta informativa. Precios sujetos a disponibilidad y tipo de cambio al momento de compra.",
     )
-    p.setFillColor(HexColor("#000000"))
+    p.setFillColor(NEGRO)
     y -= 0.28 * inch
 
     col_width = (ancho_util - 0.2 * inch) / 2
     box_h = 1.25 * inch
     line_h = 0.22 * inch
 
-    p.setFillColor(HexColor("#fafafa"))
-    p.setStrokeColor(HexColor("#e5e7eb"))
+    p.setFillColor(GRIS_FONDO)
+    p.setStrokeColor(GRIS_BORDE_CLARO)
     p.rect(margin, y - box_h, col_width, box_h, fill=1, stroke=1)
     p.setFont("Helvetica-Bold", 10)
     p.drawString(margin + 0.12 * inch, y - 0.26 * inch, "CLIENTE")
     p.setFont("Helvetica", 9)
     yc = y - 0.48 * inch
     if cli:
-        for ln in _wrap_text(p, (cli.nombre or "-")[:80], col_width - 0.3 * inch, "Helvetica", 9)[:2]:
+        for ln in partir_lineas((cli.nombre or "-")[:80], col_width - 0.3 * inch, "Helvetica", 9)[:2]:
             p.drawString(margin + 0.12 * inch, yc, ln)
             yc -= line_h
         p.drawString(margin + 0.12 * inch, yc, f"Tel: {(cli.telefono or '-')[:32]}")
@@ -185,7 +202,7 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
         p.drawString(margin + 0.12 * inch, yc, "—")
 
     x2 = margin + col_width + 0.2 * inch
-    p.setFillColor(HexColor("#fafafa"))
+    p.setFillColor(GRIS_FONDO)
     p.rect(x2, y - box_h, col_width, box_h, fill=1, stroke=1)
     p.setFont("Helvetica-Bold", 10)
     p.drawString(x2 + 0.12 * inch, y - 0.26 * inch, "VEHÍCULO (opcional)")
@@ -215,7 +232,7 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
         y = _barra_naranja(p, margin, y, ancho_util, 0.24 * inch, "NOTAS", size=9)
         y -= 0.1 * inch
         p.setFont("Helvetica", 9)
-        for ln in _wrap_text(p, notas_gen, ancho_util - 0.15 * inch, "Helvetica", 9)[:5]:
+        for ln in partir_lineas(notas_gen, ancho_util - 0.15 * inch, "Helvetica", 9)[:5]:
             p.drawString(margin, y, ln[:100])
             y -= 0.18 * inch
         y -= 0.08 * inch
@@ -267,7 +284,7 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
             except ValueError as e:
                 punit_txt = str(e)[:28]
 
-        for ln in _wrap_text(p, desc, 2.75 * inch, "Helvetica", 8)[:2]:
+        for ln in partir_lineas(desc, 2.75 * inch, "Helvetica", 8)[:2]:
             p.drawString(margin, y, ln[:55])
             p.drawString(3.0 * inch, y, origen[:24])
             p.drawRightString(4.35 * inch, y, str(cant))
@@ -283,18 +300,15 @@ def generar_pdf_cotizacion_refaccion(db: Session, cotizacion_id: int) -> tuple[b
     y -= 0.35 * inch
 
     p.setFont("Helvetica", 8)
-    p.setFillColor(HexColor("#64748b"))
+    p.setFillColor(GRIS_PIZARRA)
     ley = (
         f"IVA considerado al {settings.IVA_PORCENTAJE}%. Markup por defecto del sistema si no se indicó margen en la cotización. "
         "Los enlaces de compra y plazos son referencia interna del taller."
     )
-    for ln in _wrap_text(p, ley, ancho_util, "Helvetica", 8)[:4]:
+    for ln in partir_lineas(ley, ancho_util, "Helvetica", 8)[:4]:
         p.drawString(margin, y, ln)
         y -= 0.14 * inch
 
     p.showPage()
     p.save()
-    buf.seek(0)
-    raw = buf.getvalue()
-    safe_name = (cot.numero or str(cotizacion_id)).replace(" ", "_").replace("/", "-")
-    return raw, f"cotizacion-refaccion-{safe_name}.pdf"
+    return buf.getvalue()
@@ -0,0 +1,60 @@
+"""
+Piezas comunes de los servicios que mantienen valores materializados con deltas por flush
+(contadores_operativos_service, caja_totales_service, saldos_venta_service).
+
+Todos siguen el mismo esqueleto: en before_flush restan lo que aportaban las filas modificadas
+o borradas (valores previos del historial del atributo) y en after_flush suman lo que aportan
+las nuevas y modificadas. Aquí:
+
+- registrar_historial_previo(attrs): active_history en los atributos de los que se lee el valor
+  previo; sin él no queda en el historial si el atributo estaba expirado (p. ej. tras un commit).
+- valor_previo(obj, attr): valor antes de los cambios pendientes de la fila.
+- filas_modificadas(session, attrs_por_modelo): filas sucias o borradas de esos modelos cuyo
+  cambio toca alguno de sus atributos, con la marca de borrado.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+def valor_previo(obj, attr: str):
+    historial = inspect(obj).attrs[attr].history
+    if historial.deleted:
+        return historial.deleted[0]
+    if historial.unchanged:
+        return historial.unchanged[0]
+    if historial.added:
+        # Con active_history el previo siempre se carga; si no aparece en deleted era None
+        return None
+    return getattr(obj, attr)
+
+
+def cambio(obj, attrs: Iterable[str]) -> bool:
+    estado = inspect(obj)
+    return any(estado.attrs[a].history.has_changes() for a in attrs)
+
+
+def filas_modificadas(session: Session, attrs_por_modelo: dict) -> Iterator[tuple[object, bool]]:
+    """(fila, borrada) de session.dirty / session.deleted con cambios en los atributos de su modelo."""
+    for obj in (*session.dirty, *session.deleted):
+        attrs = attrs_por_modelo.get(type(obj))
+        if attrs is None:
+            continue
+        borrado = obj in session.deleted
+        if borrado or cambio(obj, attrs):
+            yield obj, borrado
+
+
+def _cargar_valor_previo(target, value, oldvalue, initiator) -> None:
+    """Sin efecto; registrado con active_history para que el historial traiga el valor previo."""
+
+
+def registrar_historial_previo(attrs: Iterable) -> None:
+    """active_history en cada atributo instrumentado (Modelo.columna) de `attrs`."""
+    for attr in attrs:
+        if not event.contains(attr, "set", _cargar_valor_previo):
+            event.listen(attr, "set", _cargar_valor_previo, active_history=True)
@@ -1,22 +1,34 @@
 """
 Servicio de envío de emails.
 Soporta Microsoft Graph API (OAuth2) y SMTP como fallback.
-Usado para enviar órdenes de compra a proveedores.
+Usado para enviar órdenes de compra a proveedores y recuperación de contraseña; la app no envía
+en la petición: encola en notificaciones_salientes (app/services/notificaciones_service.py) y el
+despachador llama a enviar_email().
 """
 
-import json
 import logging
+import re
 import smtplib
+import threading
+import time
 import urllib.parse
-import urllib.request
+from dataclasses import dataclass
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.utils import make_msgid
 from typing import Optional
 
+import httpx
+
 from app.config import settings
+from app.utils.envio_externo import ENVIADO, ResultadoEnvio, cliente_http, status_reintentable
 
 logger = logging.getLogger(__name__)
 
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+# Se pide un token nuevo este margen antes de que venza el actual
+MARGEN_TOKEN_S = 60
+
 
 def _graph_esta_configurado() -> bool:
     """Verifica si Microsoft Graph API está configurado."""
@@ -33,49 +45,75 @@ def _smtp_esta_configurado() -> bool:
     return bool(getattr(settings, "SMTP_HOST", None) and getattr(settings, "SMTP_FROM_EMAIL", None))
 
 
-def _obtener_token_graph() -> tuple[Optional[str], Optional[str]]:
+def email_esta_configurado() -> bool:
+    return _graph_esta_configurado() or _smtp_esta_configurado()
+
+
+@dataclass
+class _TokenGraph:
+    valor: str
+    vence: float  # time.monotonic()
+
+
+_token_graph: Optional[_TokenGraph] = None
+_lock_token = threading.Lock()
+
+
+def _olvidar_token_graph() -> None:
+    global _token_graph
+    with _lock_token:
+        _token_graph = None
+
+
+def _obtener_token_graph() -> tuple[Optional[str], Optional[ResultadoEnvio]]:
     """
-    Obtiene access token de Microsoft Graph usando client credentials.
-    Returns: (access_token, error_message)
+    Access token de Microsoft Graph (client credentials), cacheado en el proceso hasta
+    MARGEN_TOKEN_S antes de su expires_in. Returns: (access_token, resultado_de_error)
     """
-    try:
-        import msal
-
-        app = msal.ConfidentialClientApplication(
-            client_id=settings.AZURE_CLIENT_ID,
-            authority=f"https://login.microsoftonline.com/{settings.AZURE_TENANT_ID}",
-            client_credential=settings.AZURE_CLIENT_SECRET,
-        )
-        result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-
-        if result.get("access_token"):
-            return result["access_token"], None
-
-        # MSAL no lanza excepción; devuelve dict con error
-        err = result.get("error", "unknown")
-        desc = result.get("error_description", result.get("error_codes", "sin detalle"))
-        msg = f"{err}: {desc}"
-        logger.error(f"Graph token falló: {msg}")
-        return None, msg
-    except Exception as e:
-        logger.exception(f"Error obteniendo token Graph: {e}")
-        return None, str(e)
+    global _token_graph
+    with _lock_token:
+        if _token_graph is not None and time.monotonic() < _token_graph.vence:
+            return _token_graph.valor, None
+        url = f"{settings.AZURE_LOGIN_URL}/{settings.AZURE_TENANT_ID}/oauth2/v2.0/token"
+        try:
+            resp = cliente_http().post(
+                url,
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": settings.AZURE_CLIENT_ID,
+                    "client_secret": settings.AZURE_CLIENT_SECRET,
+                    "scope": GRAPH_SCOPE,
+                },
+            )
+        except httpx.RequestError as e:
+            logger.warning("Graph token: error de red: %s", e)
+            return None, ResultadoEnvio(False, str(e), reintentable=True)
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        if resp.status_code >= 400 or not data.get("access_token"):
+            msg = f"{data.get('error', resp.status_code)}: {data.get('error_description', 'sin detalle')}"
+            logger.error(f"Graph token falló: {msg}")
+            return None, ResultadoEnvio(False, msg, reintentable=status_reintentable(resp.status_code))
+        expira_en = int(data.get("expires_in") or 0)
+        _token_graph = _TokenGraph(data["access_token"], time.monotonic() + max(0, expira_en - MARGEN_TOKEN_S))
+        return _token_graph.valor, None
 
 
 def _enviar_via_graph(
     email_destino: str,
     subject: str,
     cuerpo: str,
-) -> tuple[bool, Optional[str]]:
-    """Envía email vía Microsoft Graph API."""
+    clave: Optional[str] = None,
+) -> ResultadoEnvio:
+    """Envía email vía Microsoft Graph API (cliente HTTP compartido, token cacheado)."""
     token, err_token = _obtener_token_graph()
     if not token:
-        return False, err_token or "No se pudo obtener el token de Microsoft Graph"
-
-    send_as = settings.AZURE_SEND_AS_EMAIL
-    user_id = urllib.parse.quote(send_as)
+        return err_token or ResultadoEnvio(False, "No se pudo obtener el token de Microsoft Graph")
 
-    url = f"https://graph.microsoft.com/v1.0/users/{user_id}/sendMail"
+    user_id = urllib.parse.quote(settings.AZURE_SEND_AS_EMAIL)
+    url = f"{settings.AZURE_GRAPH_URL}/v1.0/users/{user_id}/sendMail"
     payload = {
         "message": {
             "subject": subject,
@@ -84,42 +122,44 @@ def _enviar_via_graph(
         },
         "saveToSentItems": True,
     }
+    headers = {"Authorization": f"Bearer {token}"}
+    if clave:
+        headers["Idempotency-Key"] = clave
 
     try:
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, method="POST")
-        req.add_header("Authorization", f"Bearer {token}")
-        req.add_header("Content-Type", "application/json")
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            if resp.status in (200, 202):
-                return True, None
-            return False, f"Graph API devolvió status {resp.status}"
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="ignore") if e.fp else ""
-        try:
-            err_data = json.loads(body) if body else {}
-            msg = err_data.get("error", {}).get("message", str(e))
-        except json.JSONDecodeError:
-            msg = body or str(e)
-        logger.error(f"Error Graph API: {msg}")
-        return False, msg
-    except Exception as e:
-        logger.exception(f"Error inesperado Graph: {e}")
-        return False, str(e)
+        resp = cliente_http().post(url, json=payload, headers=headers)
+    except httpx.RequestError as e:
+        logger.warning("Graph sendMail: error de red: %s", e)
+        return ResultadoEnvio(False, str(e), reintentable=True)
+    if resp.status_code in (200, 202):
+        return ENVIADO
+    if resp.status_code == 401:
+        _olvidar_token_graph()  # token revocado o vencido antes de tiempo: el reintento pide otro
+    try:
+        msg = resp.json().get("error", {}).get("message") or resp.text
+    except ValueError:
+        msg = resp.text or f"Graph API devolvió status {resp.status_code}"
+    logger.error(f"Error Graph API: {msg}")
+    return ResultadoEnvio(False, msg, reintentable=resp.status_code == 401 or status_reintentable(resp.status_code))
 
 
 def _enviar_via_smtp(
     email_destino: str,
     subject: str,
     cuerpo: str,
-) -> tuple[bool, Optional[str]]:
-    """Envía email vía SMTP."""
+    clave: Optional[str] = None,
+) -> ResultadoEnvio:
+    """Envía email vía SMTP. Con clave, el Message-ID es estable entre reintentos."""
     try:
         from_email = settings.SMTP_FROM_EMAIL
         msg = MIMEMultipart("alternative")
         msg["Subject"] = subject
         msg["From"] = from_email
         msg["To"] = email_destino.strip()
+        if clave:
+            msg["Message-ID"] = f"<{re.sub(r'[^A-Za-z0-9._-]', '.', clave)}@{from_email.split('@')[-1]}>"
+        else:
+            msg["Message-ID"] = make_msgid()
         msg.attach(MIMEText(cuerpo, "plain", "utf-8"))
 
         host = settings.SMTP_HOST
@@ -128,43 +168,62 @@ def _enviar_via_smtp(
         password = getattr(settings, "SMTP_PASSWORD", None)
         use_tls = getattr(settings, "SMTP_USE_TLS", True)
 
-        with smtplib.SMTP(host, port, timeout=30) as server:
+        with smtplib.SMTP(host, port, timeout=settings.NOTIFICACIONES_TIMEOUT_S) as server:
             if use_tls:
                 server.starttls()
             if user and password:
                 server.login(user, password)
             server.sendmail(from_email, [email_destino.strip()], msg.as_string())
-        return True, None
+        return ENVIADO
     except smtplib.SMTPAuthenticationError as e:
         logger.error(f"Error SMTP autenticación: {e}")
-        return False, "Error de autenticación del servidor de correo"
+        return ResultadoEnvio(False, "Error de autenticación del servidor de correo")
+    except smtplib.SMTPResponseException as e:
+        logger.error(f"Error SMTP: {e}")
+        return ResultadoEnvio(False, str(e), reintentable=400 <= e.smtp_code < 500)  # 4xx: transitorio
+    except smtplib.SMTPServerDisconnected as e:
+        logger.warning(f"Error SMTP de conexión: {e}")
+        return ResultadoEnvio(False, str(e), reintentable=True)
     except smtplib.SMTPException as e:
         logger.error(f"Error SMTP: {e}")
-        return False, str(e)
+        return ResultadoEnvio(False, str(e))
+    except OSError as e:  # conexión rechazada, timeout, DNS (SMTPException también es OSError)
+        logger.warning(f"Error SMTP de conexión: {e}")
+        return ResultadoEnvio(False, str(e), reintentable=True)
     except Exception as e:
         logger.exception(f"Error inesperado SMTP: {e}")
-        return False, str(e)
+        return ResultadoEnvio(False, str(e))
 
 
-def enviar_orden_compra_a_proveedor(
-    email_destino: str,
+def enviar_email(email_destino: str, subject: str, cuerpo: str, clave: Optional[str] = None) -> ResultadoEnvio:
+    """
+    Envía un email con Graph API si está configurado; si no, SMTP.
+    clave: identificador estable del mensaje (idempotencia entre reintentos).
+    """
+    if not email_destino or not email_destino.strip():
+        return ResultadoEnvio(False, "Destinatario vacío")
+    if _graph_esta_configurado():
+        resultado = _enviar_via_graph(email_destino.strip(), subject, cuerpo, clave)
+        via = "Graph"
+    elif _smtp_esta_configurado():
+        resultado = _enviar_via_smtp(email_destino.strip(), subject, cuerpo, clave)
+        via = "SMTP"
+    else:
+        logger.warning("Ni Graph API ni SMTP configurados.")
+        return ResultadoEnvio(False, "Servidor de correo no configurado. Configure Azure (Graph API) o SMTP en .env")
+    if resultado.ok:
+        logger.info(f"Email enviado vía {via} a {email_destino}")
+    return resultado
+
+
+def armar_email_orden_compra(
     nombre_proveedor: str,
     numero_orden: str,
     lineas: list[dict],
     observaciones: Optional[str] = None,
     vehiculo_info: Optional[str] = None,
-) -> tuple[bool, Optional[str]]:
-    """
-    Envía un email al proveedor con el detalle de la orden de compra.
-    Usa Microsoft Graph API si está configurado; si no, SMTP.
-    Sin precios ni total estimado; incluye datos del vehículo si aplica.
-
-    Returns:
-        (éxito: bool, mensaje_error: str | None)
-    """
-    if not email_destino or not email_destino.strip():
-        return False, "El proveedor no tiene email configurado"
-
+) -> tuple[str, str]:
+    """(subject, cuerpo) del email al proveedor: sin precios ni total estimado; con vehículo si aplica."""
     subject = f"Orden de compra {numero_orden} - Medina AutoDiag"
 
     lineas_texto = []
@@ -195,23 +254,29 @@ Por favor confirme la recepción y la disponibilidad de los productos.
 Saludos cordiales,
 Medina AutoDiag
 """
+    return subject, cuerpo
 
-    # Prioridad: Graph API > SMTP
-    if _graph_esta_configurado():
-        logger.debug("Intentando envío vía Microsoft Graph API")
-        ok, err = _enviar_via_graph(email_destino, subject, cuerpo)
-        if ok:
-            logger.info(f"Email enviado vía Graph a {email_destino} para orden {numero_orden}")
-        return ok, err
 
-    if _smtp_esta_configurado():
-        ok, err = _enviar_via_smtp(email_destino, subject, cuerpo)
-        if ok:
-            logger.info(f"Email enviado vía SMTP a {email_destino} para orden {numero_orden}")
-        return ok, err
+def enviar_orden_compra_a_proveedor(
+    email_destino: str,
+    nombre_proveedor: str,
+    numero_orden: str,
+    lineas: list[dict],
+    observaciones: Optional[str] = None,
+    vehiculo_info: Optional[str] = None,
+) -> tuple[bool, Optional[str]]:
+    """
+    Envía en el momento el email al proveedor con el detalle de la orden de compra
+    (la app lo encola con notificaciones_service; esto queda para scripts de prueba).
 
-    logger.warning("Ni Graph API ni SMTP configurados.")
-    return False, "Servidor de correo no configurado. Configure Azure (Graph API) o SMTP en .env"
+    Returns:
+        (éxito: bool, mensaje_error: str | None)
+    """
+    if not email_destino or not email_destino.strip():
+        return False, "El proveedor no tiene email configurado"
+    subject, cuerpo = armar_email_orden_compra(nombre_proveedor, numero_orden, lineas, observaciones, vehiculo_info)
+    resultado = enviar_email(email_destino, subject, cuerpo)
+    return resultado.ok, resultado.error
 
 
 def enviar_email_simple(
@@ -220,23 +285,8 @@ def enviar_email_simple(
     cuerpo: str,
 ) -> tuple[bool, Optional[str]]:
     """
-    Envía un email genérico (subject + cuerpo plano).
-    Usa Graph API si está configurado; si no, SMTP.
+    Envía un email genérico (subject + cuerpo plano) en el momento.
     Returns: (éxito, mensaje_error)
     """
-    if not email_destino or not email_destino.strip():
-        return False, "Destinatario vacío"
-
-    if _graph_esta_configurado():
-        ok, err = _enviar_via_graph(email_destino.strip(), subject, cuerpo)
-        if ok:
-            logger.info(f"Email enviado vía Graph a {email_destino}")
-        return ok, err
-
-    if _smtp_esta_configurado():
-        ok, err = _enviar_via_smtp(email_destino.strip(), subject, cuerpo)
-        if ok:
-            logger.info(f"Email enviado vía SMTP a {email_destino}")
-        return ok, err
-
-    return False, "Servidor de correo no configurado"
+    resultado = enviar_email(email_destino, subject, cuerpo)
+    return resultado.ok, resultado.error
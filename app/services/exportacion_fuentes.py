@@ -0,0 +1,74 @@
+"""
+Fuentes de filas para exportaciones: agregados agrupados unidos a la consulta base.
+
+En lugar de una consulta por fila (COUNT de ventas por cliente, SUM de pagos por venta,
+costo de salidas por OT...), cada agregado se declara una vez como subconsulta agrupada
+y se une con LEFT OUTER JOIN a la consulta base. Una exportación queda en una sola
+consulta (más las de totales generales), sin importar el número de filas, y como el
+recorrido ya no intercala consultas puede leerse con yield_per.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.vehiculo import Vehiculo
+from app.models.venta import Venta
+
+
+@dataclass(frozen=True)
+class Agregado:
+    """Valor agregado por clave: SELECT clave, valor ... WHERE filtros GROUP BY clave."""
+
+    nombre: str
+    clave: Any
+    valor: Any
+    filtros: tuple = ()
+    por_defecto: Any = 0
+
+    def subconsulta(self, session):
+        q = session.query(self.clave.label("clave"), self.valor.label("valor"))
+        for f in self.filtros:
+            q = q.filter(f)
+        return q.group_by(self.clave).subquery(self.nombre)
+
+
+def con_agregados(query: Query, uniones: Sequence[tuple[Agregado, ColumnElement]]) -> Query:
+    """
+    Une cada agregado a la consulta por su clave y agrega su valor como columna
+    (etiquetada con Agregado.nombre; claves sin filas devuelven por_defecto).
+    """
+    for agregado, clave_base in uniones:
+        sq = agregado.subconsulta(query.session)
+        query = query.outerjoin(sq, sq.c.clave == clave_base).add_columns(
+            func.coalesce(sq.c.valor, agregado.por_defecto).label(agregado.nombre)
+        )
+    return query
+
+
+# --- Agregados compartidos por las exportaciones ---
+
+
+VENTAS_POR_CLIENTE = Agregado("ventas_por_cliente", Venta.id_cliente, func.count(Venta.id_venta))
+
+VEHICULOS_POR_CLIENTE = Agregado("vehiculos_por_cliente", Vehiculo.id_cliente, func.count(Vehiculo.id_vehiculo))
+
+# Costo de refacciones: salidas por número de OT (ventas desde OT) o por id_venta (mostrador)
+COSTO_SALIDAS_POR_REFERENCIA = Agregado(
+    "costo_salidas_por_referencia",
+    MovimientoInventario.referencia,
+    func.sum(MovimientoInventario.costo_total),
+    filtros=(MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,),
+)
+COSTO_SALIDAS_POR_VENTA = Agregado(
+    "costo_salidas_por_venta",
+    MovimientoInventario.id_venta,
+    func.sum(MovimientoInventario.costo_total),
+    filtros=(MovimientoInventario.tipo_movimiento == TipoMovimiento.SALIDA,),
+)
@@ -0,0 +1,227 @@
+"""
+Historial 360 de cliente y de vehículo en un número fijo de consultas.
+
+- Resumen: una sola sentencia con el agregado de ventas (cantidad, total, y pagado / saldo
+  materializados en cada venta) y COUNT escalares por sección.
+- Secciones (vehículos, ventas, órdenes, citas): primera página con paginar() en modo keyset,
+  sin COUNT propio (el total sale del resumen); el resto se pide por sección con siguiente_cursor.
+- Pagado por venta: columna ventas.total_pagado, sin consultar pagos.
+- Ventas sin fecha (filas antiguas) quedan al final de su sección y también se alcanzan por
+  cursor (paginar() trata NULL como el menor valor), así que la sección cuadra con el resumen.
+
+El costo no depende de cuántas ventas u órdenes tenga el cliente, solo del tamaño de página.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.cita import Cita
+from app.models.orden_trabajo import OrdenTrabajo
+from app.models.vehiculo import Vehiculo
+from app.models.venta import Venta
+from app.utils.fechas import isoformat_fecha_ingreso_ot
+from app.utils.paginacion import Pagina, paginar
+
+LIMITE_SECCION = 20
+
+SECCIONES_CLIENTE = ("vehiculos", "ventas", "ordenes_trabajo", "citas")
+SECCIONES_VEHICULO = ("ordenes_trabajo", "ventas")
+
+
+def _valor(v) -> Optional[str]:
+    return v.value if hasattr(v, "value") else (str(v) if v is not None else None)
+
+
+def _contar(modelo, condicion):
+    return select(func.count()).select_from(modelo).where(condicion).scalar_subquery()
+
+
+def _agregado_ventas(condicion):
+    """Subconsulta de una fila: cantidad, total, pagado y saldo (sin canceladas) de las ventas filtradas."""
+    saldo = case((Venta.estado != "CANCELADA", Venta.saldo), else_=0)
+    return (
+        select(
+            func.count(Venta.id_venta).label("cantidad_ventas"),
+            func.coalesce(func.sum(Venta.total), 0).label("total_ventas"),
+            func.coalesce(func.sum(Venta.total_pagado), 0).label("total_pagado"),
+            func.coalesce(func.sum(saldo), 0).label("saldo_pendiente"),
+        )
+        .where(condicion)
+        .subquery("historial_ventas")
+    )
+
+
+def _resumen(db: Session, condicion_ventas, conteos: dict) -> dict:
+    agregado = _agregado_ventas(condicion_ventas)
+    fila = db.execute(select(agregado, *(c.label(nombre) for nombre, c in conteos.items()))).mappings().one()
+    resumen = {
+        "cantidad_ventas": int(fila["cantidad_ventas"]),
+        "total_ventas": float(fila["total_ventas"]),
+        "total_pagado": float(fila["total_pagado"]),
+        "saldo_pendiente": float(fila["saldo_pendiente"]),
+    }
+    resumen.update({nombre: int(fila[nombre]) for nombre in conteos})
+    return resumen
+
+
+def resumen_cliente(db: Session, id_cliente: int) -> dict:
+    return _resumen(
+        db,
+        Venta.id_cliente == id_cliente,
+        {
+            "cantidad_ordenes": _contar(OrdenTrabajo, OrdenTrabajo.cliente_id == id_cliente),
+            "cantidad_citas": _contar(Cita, Cita.id_cliente == id_cliente),
+            "cantidad_vehiculos": _contar(Vehiculo, Vehiculo.id_cliente == id_cliente),
+        },
+    )
+
+
+def resumen_vehiculo(db: Session, id_vehiculo: int) -> dict:
+    return _resumen(
+        db,
+        Venta.id_vehiculo == id_vehiculo,
+        {"cantidad_ordenes": _contar(OrdenTrabajo, OrdenTrabajo.vehiculo_id == id_vehiculo)},
+    )
+
+
+# --- Serialización por sección (mismas claves que el historial anterior) ---
+
+
+def _ventas_a_dict(ventas: list[Venta]) -> list[dict]:
+    return [
+        {
+            "id_venta": v.id_venta,
+            "fecha": v.fecha.isoformat() if v.fecha else None,
+            "total": float(v.total),
+            "total_pagado": float(v.total_pagado or 0),
+            "estado": _valor(v.estado),
+        }
+        for v in ventas
+    ]
+
+
+def _orden_a_dict(o: OrdenTrabajo, con_vehiculo: bool) -> dict:
+    d = {
+        "id": o.id,
+        "numero_orden": o.numero_orden,
+        "fecha_ingreso": isoformat_fecha_ingreso_ot(o.fecha_ingreso),
+        "estado": _valor(o.estado),
+        "total": float(o.total),
+    }
+    if con_vehiculo:
+        d["vehiculo"] = f"{o.vehiculo.marca} {o.vehiculo.modelo}" if o.vehiculo else None
+    return d
+
+
+def _cita_a_dict(c: Cita) -> dict:
+    return {
+        "id_cita": c.id_cita,
+        "fecha_hora": c.fecha_hora.isoformat() if c.fecha_hora else None,
+        "tipo": _valor(c.tipo),
+        "estado": _valor(c.estado),
+        "motivo": c.motivo,
+    }
+
+
+def _vehiculo_a_dict(v: Vehiculo) -> dict:
+    return {"id_vehiculo": v.id_vehiculo, "marca": v.marca, "modelo": v.modelo, "anio": v.anio, "vin": v.vin}
+
+
+def _pagina(consulta, orden, limit: int, cursor: str, con_total: bool, opciones=()) -> Pagina:
+    return paginar(consulta, orden, skip=0, limit=limit, cursor=cursor, opciones=opciones, con_total=con_total)
+
+
+def seccion_cliente(
+    db: Session, id_cliente: int, seccion: str, limit: int, cursor: str = "", con_total: bool = True
+) -> Pagina:
+    """Página de una sección del historial del cliente con sus items ya serializados."""
+    if seccion == "vehiculos":
+        pagina = _pagina(
+            db.query(Vehiculo).filter(Vehiculo.id_cliente == id_cliente),
+            [(Vehiculo.id_vehiculo, False)],
+            limit,
+            cursor,
+            con_total,
+        )
+        pagina = replace(pagina, items=[_vehiculo_a_dict(v) for v in pagina.items])
+    elif seccion == "ventas":
+        pagina = _pagina(
+            db.query(Venta).filter(Venta.id_cliente == id_cliente),
+            [(Venta.fecha, True), (Venta.id_venta, True)],
+            limit,
+            cursor,
+            con_total,
+        )
+        pagina = replace(pagina, items=_ventas_a_dict(pagina.items))
+    elif seccion == "ordenes_trabajo":
+        pagina = _pagina(
+            db.query(OrdenTrabajo).filter(OrdenTrabajo.cliente_id == id_cliente),
+            [(OrdenTrabajo.fecha_ingreso, True), (OrdenTrabajo.id, True)],
+            limit,
+            cursor,
+            con_total,
+            opciones=[joinedload(OrdenTrabajo.vehiculo)],
+        )
+        pagina = replace(pagina, items=[_orden_a_dict(o, con_vehiculo=True) for o in pagina.items])
+    elif seccion == "citas":
+        pagina = _pagina(
+            db.query(Cita).filter(Cita.id_cliente == id_cliente),
+            [(Cita.fecha_hora, True), (Cita.id_cita, True)],
+            limit,
+            cursor,
+            con_total,
+        )
+        pagina = replace(pagina, items=[_cita_a_dict(c) for c in pagina.items])
+    else:
+        raise ValueError(f"Sección de historial de cliente no válida: {seccion}")
+    return pagina
+
+
+def seccion_vehiculo(
+    db: Session, id_vehiculo: int, seccion: str, limit: int, cursor: str = "", con_total: bool = True
+) -> Pagina:
+    """Página de una sección del historial del vehículo con sus items ya serializados."""
+    if seccion == "ordenes_trabajo":
+        pagina = _pagina(
+            db.query(OrdenTrabajo).filter(OrdenTrabajo.vehiculo_id == id_vehiculo),
+            [(OrdenTrabajo.fecha_ingreso, True), (OrdenTrabajo.id, True)],
+            limit,
+            cursor,
+            con_total,
+        )
+        pagina = replace(pagina, items=[_orden_a_dict(o, con_vehiculo=False) for o in pagina.items])
+    elif seccion == "ventas":
+        pagina = _pagina(
+            db.query(Venta).filter(Venta.id_vehiculo == id_vehiculo),
+            [(Venta.fecha, True), (Venta.id_venta, True)],
+            limit,
+            cursor,
+            con_total,
+        )
+        pagina = replace(pagina, items=_ventas_a_dict(pagina.items))
+    else:
+        raise ValueError(f"Sección de historial de vehículo no válida: {seccion}")
+    return pagina
+
+
+_TOTAL_POR_SECCION = {
+    "vehiculos": "cantidad_vehiculos",
+    "ventas": "cantidad_ventas",
+    "ordenes_trabajo": "cantidad_ordenes",
+    "citas": "cantidad_citas",
+}
+
+
+def armar_secciones(resumen: dict, secciones: dict[str, Pagina]) -> dict:
+    """Items de la primera página de cada sección + bloque `paginacion` (total del resumen, siguiente_cursor)."""
+    cuerpo = {nombre: p.items for nombre, p in secciones.items()}
+    cuerpo["paginacion"] = {
+        nombre: {"total": resumen[_TOTAL_POR_SECCION[nombre]], "siguiente_cursor": p.siguiente_cursor}
+        for nombre, p in secciones.items()
+    }
+    return cuerpo
@@ -3,21 +3,78 @@ Servicio de Inventario - Lógica de negocio
 """
 
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List
+from decimal import Decimal
+from typing import Any, List, Sequence
 
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, insert, or_, update
 from sqlalchemy.orm import Session
 
 from app.models.alerta_inventario import AlertaInventario, TipoAlertaInventario
 from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
 from app.models.repuesto import Repuesto
 from app.schemas.movimiento_inventario import AjusteInventario, MovimientoInventarioCreate
+from app.services.alertas_stock_service import marcar_alertas_stock
+from app.services.utilidad_ventas_service import registrar_costo_salida, registrar_costos_salida
 from app.utils.decimal_utils import money_round, to_decimal, to_float_money
 
 logger = logging.getLogger(__name__)
 
 
+_TIPOS_ENTRADA = (TipoMovimiento.ENTRADA, TipoMovimiento.AJUSTE_POSITIVO)
+_TIPOS_SALIDA = (TipoMovimiento.SALIDA, TipoMovimiento.AJUSTE_NEGATIVO, TipoMovimiento.MERMA)
+
+
+class MovimientoLoteError(ValueError):
+    """Error de validación de un movimiento dentro de un lote; `indice` es su posición en la lista."""
+
+    def __init__(self, indice: int, mensaje: str):
+        super().__init__(mensaje)
+        self.indice = indice
+
+
+@dataclass
+class ResultadoMovimientosLote:
+    """Índices aplicados, errores (índice, mensaje) y repuestos afectados de registrar_movimientos_lote."""
+
+    procesados: list[int] = field(default_factory=list)
+    errores: list[tuple[int, str]] = field(default_factory=list)
+    repuestos: list[Repuesto] = field(default_factory=list)
+
+
+def _calcular_movimiento(
+    movimiento: MovimientoInventarioCreate, stock_anterior, precio_compra
+) -> tuple[Decimal, Decimal, Decimal, Any]:
+    """
+    Stock nuevo, precio unitario, costo total y precio_compra (costo promedio ponderado) tras
+    aplicar el movimiento. Lanza ValueError si el tipo no es válido o no alcanza el stock.
+    """
+    if movimiento.tipo_movimiento in _TIPOS_ENTRADA:
+        stock_nuevo = stock_anterior + movimiento.cantidad
+    elif movimiento.tipo_movimiento in _TIPOS_SALIDA:
+        stock_nuevo = stock_anterior - movimiento.cantidad
+        if stock_nuevo < 0:
+            raise ValueError(
+                f"Stock insuficiente. Stock actual: {stock_anterior}, cantidad solicitada: {movimiento.cantidad}"
+            )
+    else:
+        raise ValueError(f"Tipo de movimiento no válido: {movimiento.tipo_movimiento}")
+
+    # Calcular costo total (Decimal para precisión monetaria)
+    precio_unitario = to_decimal(movimiento.precio_unitario or precio_compra or 0)
+    costo_total = money_round(precio_unitario * movimiento.cantidad)
+
+    # Costo promedio ponderado: para ENTRADA o AJUSTE+ con precio, actualizar precio_compra
+    if movimiento.tipo_movimiento in _TIPOS_ENTRADA:
+        precio_anterior = to_decimal(precio_compra or 0)
+        valor_anterior = stock_anterior * precio_anterior
+        valor_entrada = movimiento.cantidad * precio_unitario
+        if stock_nuevo > 0:
+            precio_compra = money_round((valor_anterior + valor_entrada) / stock_nuevo)
+    return stock_nuevo, precio_unitario, costo_total, precio_compra
+
+
 class InventarioService:
     """Servicio para gestionar operaciones de inventario"""
 
@@ -43,36 +100,10 @@ class InventarioService:
 
         # Guardar stock anterior
         stock_anterior = repuesto.stock_actual
-
-        # Calcular nuevo stock según tipo de movimiento
-        if movimiento.tipo_movimiento in [TipoMovimiento.ENTRADA, TipoMovimiento.AJUSTE_POSITIVO]:
-            stock_nuevo = stock_anterior + movimiento.cantidad
-        elif movimiento.tipo_movimiento in [
-            TipoMovimiento.SALIDA,
-            TipoMovimiento.AJUSTE_NEGATIVO,
-            TipoMovimiento.MERMA,
-        ]:
-            stock_nuevo = stock_anterior - movimiento.cantidad
-            if stock_nuevo < 0:
-                raise ValueError(
-                    f"Stock insuficiente. Stock actual: {stock_anterior}, "
-                    f"cantidad solicitada: {movimiento.cantidad}"
-                )
-        else:
-            raise ValueError(f"Tipo de movimiento no válido: {movimiento.tipo_movimiento}")
-
-        # Calcular costo total (Decimal para precisión monetaria)
-        precio_unitario = to_decimal(movimiento.precio_unitario or repuesto.precio_compra or 0)
-        costo_total = money_round(precio_unitario * movimiento.cantidad)
-
-        # Costo promedio ponderado: para ENTRADA o AJUSTE+ con precio, actualizar precio_compra
-        if movimiento.tipo_movimiento in [TipoMovimiento.ENTRADA, TipoMovimiento.AJUSTE_POSITIVO]:
-            precio_anterior = to_decimal(repuesto.precio_compra or 0)
-            valor_anterior = stock_anterior * precio_anterior
-            valor_entrada = movimiento.cantidad * precio_unitario
-            if stock_nuevo > 0:
-                nuevo_costo_promedio = money_round((valor_anterior + valor_entrada) / stock_nuevo)
-                repuesto.precio_compra = nuevo_costo_promedio
+        stock_nuevo, precio_unitario, costo_total, precio_compra = _calcular_movimiento(
+            movimiento, stock_anterior, repuesto.precio_compra
+        )
+        repuesto.precio_compra = precio_compra
 
         # Crear registro de movimiento
         nuevo_movimiento = MovimientoInventario(
@@ -97,10 +128,12 @@ class InventarioService:
         repuesto.actualizado_en = datetime.utcnow()
 
         db.add(nuevo_movimiento)
+        registrar_costo_salida(db, nuevo_movimiento)
+        # La alerta se evalúa en segundo plano cuando la transacción confirme
+        marcar_alertas_stock(db, [repuesto.id_repuesto])
         if autocommit:
             db.commit()
             db.refresh(nuevo_movimiento)
-            InventarioService.verificar_alertas_stock(db, repuesto)
 
         logger.info(
             f"Movimiento registrado: {movimiento.tipo_movimiento} - "
@@ -110,6 +143,105 @@ class InventarioService:
 
         return nuevo_movimiento
 
+    @staticmethod
+    def registrar_movimientos_lote(
+        db: Session,
+        movimientos: Sequence[MovimientoInventarioCreate],
+        id_usuario: int,
+        *,
+        transaccional: bool = True,
+        autocommit: bool = True,
+    ) -> ResultadoMovimientosLote:
+        """
+        Registra varios movimientos en una sola pasada (entrada masiva, recepción de OC, ventas).
+
+        Bloquea todos los repuestos afectados con un solo SELECT ... FOR UPDATE ordenado por id
+        (mismo orden en todas las transacciones: sin interbloqueos entre lotes), aplica stock y
+        costo promedio en memoria en el orden de la lista (varias filas del mismo repuesto se
+        encadenan) e inserta los movimientos en un INSERT por lote.
+
+        transaccional=True: el primer movimiento inválido lanza MovimientoLoteError sin escribir
+        nada (el llamador hace rollback). transaccional=False: los inválidos se reportan en
+        `errores` y el resto se aplica. Las alertas de stock de los repuestos afectados se
+        evalúan en segundo plano al confirmar la transacción (con o sin autocommit).
+        """
+        resultado = ResultadoMovimientosLote()
+        ids = sorted({m.id_repuesto for m in movimientos})
+        repuestos = {}
+        if ids:
+            repuestos = {
+                r.id_repuesto: r
+                for r in db.query(Repuesto)
+                .filter(Repuesto.id_repuesto.in_(ids))
+                .order_by(Repuesto.id_repuesto)
+                .with_for_update()
+                .all()
+            }
+        # Estado en memoria por repuesto: (stock, precio_compra)
+        estado = {r.id_repuesto: (r.stock_actual, r.precio_compra) for r in repuestos.values()}
+        ahora = datetime.utcnow()
+        filas = []
+        for indice, movimiento in enumerate(movimientos):
+            repuesto = repuestos.get(movimiento.id_repuesto)
+            try:
+                if not repuesto:
+                    raise ValueError(f"Repuesto con ID {movimiento.id_repuesto} no encontrado")
+                if not repuesto.activo:
+                    raise ValueError(f"El repuesto '{repuesto.nombre}' está inactivo")
+                stock_anterior, precio_anterior = estado[repuesto.id_repuesto]
+                stock_nuevo, precio_unitario, costo_total, precio_compra = _calcular_movimiento(
+                    movimiento, stock_anterior, precio_anterior
+                )
+            except ValueError as e:
+                if transaccional:
+                    raise MovimientoLoteError(indice, str(e)) from e
+                resultado.errores.append((indice, str(e)))
+                continue
+            estado[repuesto.id_repuesto] = (stock_nuevo, precio_compra)
+            filas.append(
+                {
+                    "id_repuesto": movimiento.id_repuesto,
+                    "tipo_movimiento": movimiento.tipo_movimiento,
+                    "cantidad": movimiento.cantidad,
+                    "precio_unitario": precio_unitario,
+                    "costo_total": costo_total,
+                    "stock_anterior": stock_anterior,
+                    "stock_nuevo": stock_nuevo,
+                    "referencia": movimiento.referencia,
+                    "motivo": movimiento.motivo,
+                    "id_venta": movimiento.id_venta,
+                    "id_usuario": id_usuario,
+                    "id_proveedor": movimiento.id_proveedor,
+                    "imagen_comprobante_url": movimiento.imagen_comprobante_url,
+                    "fecha_adquisicion": movimiento.fecha_adquisicion,
+                    "fecha_movimiento": ahora,
+                    "creado_en": ahora,
+                }
+            )
+            resultado.procesados.append(indice)
+
+        if not filas:
+            return resultado
+        afectados = {f["id_repuesto"] for f in filas}
+        for id_repuesto in afectados:
+            repuesto = repuestos[id_repuesto]
+            repuesto.stock_actual, repuesto.precio_compra = estado[id_repuesto]
+            repuesto.actualizado_en = ahora
+            resultado.repuestos.append(repuesto)
+        db.execute(insert(MovimientoInventario), filas)
+        registrar_costos_salida(db, filas)
+        marcar_alertas_stock(db, afectados)
+        if autocommit:
+            db.commit()
+
+        logger.info(
+            "Movimientos registrados en lote: %s (repuestos: %s, errores: %s)",
+            len(filas),
+            len(afectados),
+            len(resultado.errores),
+        )
+        return resultado
+
     @staticmethod
     def ajustar_inventario(db: Session, ajuste: AjusteInventario, id_usuario: int) -> MovimientoInventario:
         """
@@ -157,6 +289,33 @@ class InventarioService:
         except Exception as e:
             logger.warning("verificar_alertas_stock: %s (repuesto %s)", e, getattr(repuesto, "codigo", "?"))
 
+    @staticmethod
+    def evaluar_alertas_stock(db: Session, ids_repuesto: Sequence[int]) -> int:
+        """
+        Crea, actualiza o resuelve las alertas de stock de varios repuestos: una consulta de
+        repuestos, una de alertas activas y un commit. Retorna cuántas alertas cambiaron.
+        Lo invoca la cola de alertas (app.services.alertas_stock_service).
+        """
+        if not ids_repuesto:
+            return 0
+        repuestos = (
+            db.query(Repuesto)
+            .filter(Repuesto.id_repuesto.in_(ids_repuesto), Repuesto.eliminado == False)  # noqa: E712
+            .all()
+        )
+        activas = {}
+        for alerta in (
+            db.query(AlertaInventario)
+            .filter(AlertaInventario.id_repuesto.in_(ids_repuesto), AlertaInventario.activa)
+            .order_by(AlertaInventario.id_alerta)
+            .all()
+        ):
+            activas.setdefault(alerta.id_repuesto, alerta)
+        cambios = sum(InventarioService._aplicar_alerta_stock(db, r, activas.get(r.id_repuesto)) for r in repuestos)
+        if cambios:
+            db.commit()
+        return cambios
+
     @staticmethod
     def _verificar_alertas_stock_impl(db: Session, repuesto: Repuesto):
         """Implementación interna de verificación de alertas."""
@@ -166,7 +325,12 @@ class InventarioService:
             .filter(and_(AlertaInventario.id_repuesto == repuesto.id_repuesto, AlertaInventario.activa))
             .first()
         )
+        if InventarioService._aplicar_alerta_stock(db, repuesto, alerta_existente):
+            db.commit()
 
+    @staticmethod
+    def _aplicar_alerta_stock(db: Session, repuesto: Repuesto, alerta_existente) -> bool:
+        """Crea, actualiza o resuelve la alerta del repuesto según su stock. True si hubo cambios."""
         # Determinar tipo de alerta según el stock
         tipo_alerta = None
         mensaje = None
@@ -198,9 +362,8 @@ class InventarioService:
         if tipo_alerta is None and alerta_existente:
             alerta_existente.activa = False
             alerta_existente.fecha_resolucion = datetime.utcnow()
-            db.commit()
             logger.info(f"Alerta resuelta automáticamente para '{repuesto.nombre}'")
-            return
+            return True
 
         # Si hay alerta y no existe una activa, crearla
         if tipo_alerta and not alerta_existente:
@@ -213,65 +376,81 @@ class InventarioService:
                 stock_maximo=repuesto.stock_maximo,
             )
             db.add(nueva_alerta)
-            db.commit()
             logger.warning(f"Nueva alerta creada: {mensaje}")
+            return True
 
         # Si cambió el tipo de alerta, actualizar la existente
-        elif tipo_alerta and alerta_existente and alerta_existente.tipo_alerta != tipo_alerta:
+        if tipo_alerta and alerta_existente and alerta_existente.tipo_alerta != tipo_alerta:
             alerta_existente.tipo_alerta = tipo_alerta
             alerta_existente.mensaje = mensaje
             alerta_existente.stock_actual = repuesto.stock_actual
-            db.commit()
             logger.warning(f"Alerta actualizada: {mensaje}")
+            return True
+        return False
 
     @staticmethod
-    def verificar_productos_sin_movimiento(db: Session, dias: int = 90):
+    def verificar_productos_sin_movimiento(db: Session, dias: int = 90) -> dict:
         """
-        Verifica productos sin movimientos en los últimos X días
+        Crea alertas SIN_MOVIMIENTO para repuestos activos sin movimientos en los últimos X días
+        y resuelve las de repuestos que volvieron a moverse.
+
+        Un solo SELECT agrupado con MAX(fecha_movimiento) por repuesto (índice repuesto+fecha),
+        anti-join contra las alertas activas, un INSERT por lote y un UPDATE para las resueltas.
         """
-        fecha_limite = datetime.utcnow() - timedelta(days=dias)
-
-        # Obtener repuestos activos (excluir eliminados)
-        repuestos = db.query(Repuesto).filter(Repuesto.activo, not Repuesto.eliminado).all()
-
-        for repuesto in repuestos:
-            # Verificar último movimiento
-            ultimo_movimiento = (
-                db.query(MovimientoInventario)
-                .filter(MovimientoInventario.id_repuesto == repuesto.id_repuesto)
-                .order_by(MovimientoInventario.fecha_movimiento.desc())
-                .first()
+        ahora = datetime.utcnow()
+        fecha_limite = ahora - timedelta(days=dias)
+        ultimos = (
+            db.query(
+                MovimientoInventario.id_repuesto.label("id_repuesto"),
+                func.max(MovimientoInventario.fecha_movimiento).label("ultimo"),
             )
+            .group_by(MovimientoInventario.id_repuesto)
+            .subquery()
+        )
+        alerta_activa = and_(
+            AlertaInventario.tipo_alerta == TipoAlertaInventario.SIN_MOVIMIENTO,
+            AlertaInventario.activa,
+        )
 
-            # Si no hay movimientos o el último es muy antiguo
-            if not ultimo_movimiento or ultimo_movimiento.fecha_movimiento < fecha_limite:
-                # Verificar si ya existe alerta
-                alerta_existente = (
-                    db.query(AlertaInventario)
-                    .filter(
-                        and_(
-                            AlertaInventario.id_repuesto == repuesto.id_repuesto,
-                            AlertaInventario.tipo_alerta == TipoAlertaInventario.SIN_MOVIMIENTO,
-                            AlertaInventario.activa,
-                        )
-                    )
-                    .first()
-                )
-
-                if not alerta_existente:
-                    dias_sin_mov = (
-                        (datetime.utcnow() - ultimo_movimiento.fecha_movimiento).days if ultimo_movimiento else 999
-                    )
-                    nueva_alerta = AlertaInventario(
-                        id_repuesto=repuesto.id_repuesto,
-                        tipo_alerta=TipoAlertaInventario.SIN_MOVIMIENTO,
-                        mensaje=f"Sin movimientos por {dias_sin_mov} días: '{repuesto.nombre}'",
-                        stock_actual=repuesto.stock_actual,
-                    )
-                    db.add(nueva_alerta)
-
+        sin_alerta = (
+            db.query(Repuesto.id_repuesto, Repuesto.nombre, Repuesto.stock_actual, ultimos.c.ultimo)
+            .outerjoin(ultimos, ultimos.c.id_repuesto == Repuesto.id_repuesto)
+            .outerjoin(AlertaInventario, and_(AlertaInventario.id_repuesto == Repuesto.id_repuesto, alerta_activa))
+            .filter(
+                Repuesto.activo,
+                Repuesto.eliminado == False,  # noqa: E712
+                or_(ultimos.c.ultimo.is_(None), ultimos.c.ultimo < fecha_limite),
+                AlertaInventario.id_alerta.is_(None),
+            )
+            .all()
+        )
+        nuevas = [
+            {
+                "id_repuesto": id_repuesto,
+                "tipo_alerta": TipoAlertaInventario.SIN_MOVIMIENTO,
+                "mensaje": f"Sin movimientos por {(ahora - ultimo).days if ultimo else 999} días: '{nombre}'",
+                "stock_actual": stock_actual,
+                "activa": True,
+                "fecha_creacion": ahora,
+            }
+            for id_repuesto, nombre, stock_actual, ultimo in sin_alerta
+        ]
+        if nuevas:
+            db.execute(insert(AlertaInventario), nuevas)
+
+        movidos = db.query(ultimos.c.id_repuesto).filter(ultimos.c.ultimo >= fecha_limite)
+        resueltas = db.execute(
+            update(AlertaInventario)
+            .where(alerta_activa, AlertaInventario.id_repuesto.in_(movidos.scalar_subquery()))
+            .values(activa=False, fecha_resolucion=ahora)
+            .execution_options(synchronize_session=False)
+        ).rowcount
         db.commit()
-        logger.info(f"Verificación de productos sin movimiento completada ({dias} días)")
+        logger.info(
+            f"Verificación de productos sin movimiento completada ({dias} días): "
+            f"{len(nuevas)} alertas nuevas, {resueltas} resueltas"
+        )
+        return {"creadas": len(nuevas), "resueltas": resueltas}
 
     @staticmethod
     def calcular_valor_inventario(db: Session) -> dict:
@@ -5,13 +5,18 @@ Soporta periodo SEMANAL, QUINCENAL y MENSUAL según usuario.periodo_pago.
 """
 
 import calendar
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.asistencia import Asistencia
+from app.models.comision_devengada import ComisionDevengada
+from app.models.prestamo_empleado import DescuentoPrestamo, PrestamoEmpleado
 from app.models.usuario import Usuario
 
 # Tipos que cuentan como pagados (según plan)
@@ -114,10 +119,40 @@ def calcular_nomina(
     if not usuario:
         return {"error": "Usuario no encontrado"}
 
-    salario_base = Decimal("0") if usuario.salario_base is None else Decimal(str(usuario.salario_base))
-    bono_puntualidad_base = Decimal("0") if usuario.bono_puntualidad is None else Decimal(str(usuario.bono_puntualidad))
-    horas_por_dia = float(usuario.horas_por_dia or 8)
+    periodo = resolver_periodo(usuario, fecha_referencia, periodo_pago, offset_periodos, fecha_inicio, fecha_fin)
+    registros = (
+        db.query(Asistencia)
+        .filter(
+            Asistencia.id_usuario == id_usuario,
+            Asistencia.fecha >= periodo.inicio,
+            Asistencia.fecha <= periodo.fin,
+        )
+        .order_by(Asistencia.fecha)
+        .all()
+    )
+    return _nomina_desde_asistencias(usuario, periodo, registros)
+
+
+@dataclass(frozen=True)
+class PeriodoNomina:
+    """Rango y divisores de un periodo de nómina ya resuelto para un empleado."""
+
+    inicio: date
+    fin: date
+    tipo: str
+    dias_esperados: int
+    dias_para_prorrateo: Optional[int]
 
+
+def resolver_periodo(
+    usuario: Usuario,
+    fecha_referencia: date,
+    periodo_pago: Optional[str] = None,
+    offset_periodos: int = 0,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+) -> PeriodoNomina:
+    """Periodo del empleado: rango personalizado o periodo_pago desplazado offset_periodos hacia atrás."""
     if fecha_inicio is not None and fecha_fin is not None and fecha_inicio <= fecha_fin:
         lun = fecha_inicio
         dom = fecha_fin
@@ -134,44 +169,40 @@ def calcular_nomina(
             dias_para_prorrateo = 10
         else:
             dias_para_prorrateo = 22
-    else:
-        dias_para_prorrateo = None
-        tipo = (
-            periodo_pago or getattr(usuario.periodo_pago, "value", None) or str(usuario.periodo_pago)
-            if usuario.periodo_pago
-            else "SEMANAL"
-        )
-        if tipo not in ("SEMANAL", "QUINCENAL", "MENSUAL"):
-            tipo = "SEMANAL"
-        if tipo == "SEMANAL":
-            lun = _lunes_semana(fecha_referencia)
-            dom = _domingo_semana(fecha_referencia)
-        elif tipo == "QUINCENAL":
-            lun = _inicio_quincena(fecha_referencia)
-            dom = _fin_quincena(fecha_referencia)
-        else:
-            lun = _inicio_mes(fecha_referencia)
-            dom = _fin_mes(fecha_referencia)
-        for _ in range(abs(offset_periodos)):
-            lun, dom = _periodo_anterior(lun, dom, tipo)
-        dias_para_prorrateo = None
-        if tipo == "SEMANAL":
-            dias_esperados = int(usuario.dias_por_semana or 5)
-        elif tipo == "QUINCENAL":
-            dias_esperados = 10
-        else:
-            dias_esperados = 22
+        return PeriodoNomina(lun, dom, tipo, dias_esperados, dias_para_prorrateo)
 
-    registros = (
-        db.query(Asistencia)
-        .filter(
-            Asistencia.id_usuario == id_usuario,
-            Asistencia.fecha >= lun,
-            Asistencia.fecha <= dom,
-        )
-        .order_by(Asistencia.fecha)
-        .all()
+    tipo = (
+        periodo_pago or getattr(usuario.periodo_pago, "value", None) or str(usuario.periodo_pago)
+        if usuario.periodo_pago
+        else "SEMANAL"
     )
+    if tipo not in ("SEMANAL", "QUINCENAL", "MENSUAL"):
+        tipo = "SEMANAL"
+    if tipo == "SEMANAL":
+        lun = _lunes_semana(fecha_referencia)
+        dom = _domingo_semana(fecha_referencia)
+    elif tipo == "QUINCENAL":
+        lun = _inicio_quincena(fecha_referencia)
+        dom = _fin_quincena(fecha_referencia)
+    else:
+        lun = _inicio_mes(fecha_referencia)
+        dom = _fin_mes(fecha_referencia)
+    for _ in range(abs(offset_periodos)):
+        lun, dom = _periodo_anterior(lun, dom, tipo)
+    if tipo == "SEMANAL":
+        dias_esperados = int(usuario.dias_por_semana or 5)
+    elif tipo == "QUINCENAL":
+        dias_esperados = 10
+    else:
+        dias_esperados = 22
+    return PeriodoNomina(lun, dom, tipo, dias_esperados, None)
+
+
+def _nomina_desde_asistencias(usuario: Usuario, periodo: PeriodoNomina, registros: Iterable[Asistencia]) -> dict:
+    """Salario proporcional y bono a partir de las asistencias del periodo (ordenadas por fecha)."""
+    salario_base = Decimal("0") if usuario.salario_base is None else Decimal(str(usuario.salario_base))
+    bono_puntualidad_base = Decimal("0") if usuario.bono_puntualidad is None else Decimal(str(usuario.bono_puntualidad))
+    horas_por_dia = float(usuario.horas_por_dia or 8)
 
     dias_pagados = Decimal("0")
     dias_con_bono = Decimal("0")
@@ -204,6 +235,8 @@ def calcular_nomina(
             }
         )
 
+    dias_esperados = periodo.dias_esperados
+    dias_para_prorrateo = periodo.dias_para_prorrateo
     denom_salario = dias_para_prorrateo if dias_para_prorrateo is not None else dias_esperados
     if denom_salario > 0:
         salario_proporcional = (dias_pagados / Decimal(denom_salario)) * salario_base
@@ -217,9 +250,9 @@ def calcular_nomina(
         bono_puntualidad = Decimal("0")
 
     return {
-        "periodo_inicio": str(lun),
-        "periodo_fin": str(dom),
-        "tipo_periodo": tipo,
+        "periodo_inicio": str(periodo.inicio),
+        "periodo_fin": str(periodo.fin),
+        "tipo_periodo": periodo.tipo,
         "dias_pagados": float(dias_pagados),
         "dias_esperados": dias_esperados,
         "salario_base": float(salario_base),
@@ -228,3 +261,134 @@ def calcular_nomina(
         "bono_puntualidad": float(bono_puntualidad),
         "detalle_asistencia": detalle,
     }
+
+
+def dias_vista_periodo(nomina: dict) -> int:
+    """Días del periodo de nómina contra los que se prorratea el descuento de cada préstamo."""
+    tipo_periodo = nomina.get("tipo_periodo", "SEMANAL")
+    if tipo_periodo == "PERSONALIZADO" and nomina.get("periodo_inicio") and nomina.get("periodo_fin"):
+        try:
+            p_ini = date.fromisoformat(nomina["periodo_inicio"])
+            p_fin = date.fromisoformat(nomina["periodo_fin"])
+            return (p_fin - p_ini).days + 1
+        except (ValueError, TypeError):
+            return 7
+    return DIAS_PERIODO.get(tipo_periodo, 7)
+
+
+@dataclass
+class ResumenNomina:
+    """Nómina de un empleado en un periodo con descuentos de préstamos y comisiones devengadas."""
+
+    nomina: dict
+    total_descuento: Decimal
+    comisiones: Decimal
+
+    @property
+    def total_bruto(self) -> Decimal:
+        return (
+            Decimal(str(self.nomina.get("salario_proporcional", 0) or 0))
+            + Decimal(str(self.nomina.get("bono_puntualidad", 0) or 0))
+            + self.comisiones
+        )
+
+    @property
+    def total_neto(self) -> Decimal:
+        return self.total_bruto - self.total_descuento
+
+
+def calcular_resumenes_nomina(
+    db: Session,
+    usuarios: Sequence[Usuario],
+    fecha_referencia: Optional[date] = None,
+    offsets_periodos: Sequence[int] = (0,),
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+) -> list[dict[int, ResumenNomina]]:
+    """
+    Nómina por lote: un dict id_usuario → ResumenNomina por cada offset de offsets_periodos.
+
+    Asistencias, préstamos activos (con lo ya descontado) y comisiones se leen una sola vez
+    para todos los empleados y todo el rango de periodos pedidos (tres consultas agrupadas);
+    cada empleado/periodo se calcula en memoria con las mismas reglas que calcular_nomina.
+    Con fecha_inicio/fecha_fin válidos todos los offsets resuelven al mismo rango personalizado.
+    """
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    if not usuarios:
+        return [{} for _ in offsets_periodos]
+
+    periodos = [
+        {u.id_usuario: resolver_periodo(u, fecha_referencia, None, offset, fecha_inicio, fecha_fin) for u in usuarios}
+        for offset in offsets_periodos
+    ]
+    ids = [u.id_usuario for u in usuarios]
+    desde = min(p.inicio for por_usuario in periodos for p in por_usuario.values())
+    hasta = max(p.fin for por_usuario in periodos for p in por_usuario.values())
+
+    asistencias: dict[int, list[Asistencia]] = defaultdict(list)
+    for r in (
+        db.query(Asistencia)
+        .filter(Asistencia.id_usuario.in_(ids), Asistencia.fecha >= desde, Asistencia.fecha <= hasta)
+        .order_by(Asistencia.id_usuario, Asistencia.fecha, Asistencia.id)
+        .all()
+    ):
+        asistencias[r.id_usuario].append(r)
+
+    descontado = (
+        db.query(
+            DescuentoPrestamo.id_prestamo.label("id_prestamo"),
+            func.sum(DescuentoPrestamo.monto_descontado).label("total"),
+        )
+        .group_by(DescuentoPrestamo.id_prestamo)
+        .subquery()
+    )
+    prestamos: dict[int, list[tuple[PrestamoEmpleado, Decimal]]] = defaultdict(list)
+    for p, total_descontado in (
+        db.query(PrestamoEmpleado, func.coalesce(descontado.c.total, 0))
+        .outerjoin(descontado, descontado.c.id_prestamo == PrestamoEmpleado.id)
+        .filter(PrestamoEmpleado.id_usuario.in_(ids), PrestamoEmpleado.estado == "ACTIVO")
+        .order_by(PrestamoEmpleado.id)
+        .all()
+    ):
+        saldo = max(Decimal("0"), Decimal(str(p.monto_total)) - Decimal(str(total_descontado)))
+        if saldo > 0:
+            prestamos[p.id_usuario].append((p, saldo))
+
+    comisiones_por_dia: dict[int, list[tuple[date, Decimal]]] = defaultdict(list)
+    for id_usuario, fecha_venta, suma in (
+        db.query(
+            ComisionDevengada.id_usuario,
+            ComisionDevengada.fecha_venta,
+            func.sum(ComisionDevengada.monto_comision),
+        )
+        .filter(
+            ComisionDevengada.id_usuario.in_(ids),
+            ComisionDevengada.fecha_venta >= desde,
+            ComisionDevengada.fecha_venta <= hasta,
+        )
+        .group_by(ComisionDevengada.id_usuario, ComisionDevengada.fecha_venta)
+        .all()
+    ):
+        comisiones_por_dia[id_usuario].append((fecha_venta, Decimal(str(suma or 0))))
+
+    resultado: list[dict[int, ResumenNomina]] = []
+    for por_usuario in periodos:
+        resumenes: dict[int, ResumenNomina] = {}
+        for u in usuarios:
+            periodo = por_usuario[u.id_usuario]
+            registros = [r for r in asistencias[u.id_usuario] if periodo.inicio <= r.fecha <= periodo.fin]
+            nomina = _nomina_desde_asistencias(u, periodo, registros)
+            dias_vista = dias_vista_periodo(nomina)
+            total_descuento = Decimal("0")
+            for p, _saldo in prestamos[u.id_usuario]:
+                periodo_prestamo = getattr(p.periodo_descuento, "value", None) or str(p.periodo_descuento)
+                factor = Decimal(dias_vista) / Decimal(DIAS_PERIODO.get(periodo_prestamo, 7))
+                total_descuento += Decimal(str(p.descuento_por_periodo)) * factor
+            comisiones = sum(
+                (monto for fecha, monto in comisiones_por_dia[u.id_usuario] if periodo.inicio <= fecha <= periodo.fin),
+                Decimal("0"),
+            )
+            resumenes[u.id_usuario] = ResumenNomina(nomina, total_descuento, comisiones)
+        resultado.append(resumenes)
+    return resultado
@@ -0,0 +1,367 @@
+"""
+Notificaciones salientes (email / WhatsApp) fuera de la petición.
+
+Antes, enviar una orden de compra o confirmar una cita llamaba a Graph / SMTP / WhatsApp dentro
+de la petición (token MSAL, urlopen de 30 s, httpx.Client nuevo por mensaje): un proveedor
+lento congelaba el worker hasta un minuto. Ahora:
+
+- encolar_email() / encolar_whatsapp() insertan una fila en notificaciones_salientes en la misma
+  transacción que el hecho que la origina y devuelven su id para consultar el estado
+  (GET /api/notificaciones/envios/{id}). La clave de idempotencia evita encolar dos veces el mismo aviso.
+- Al confirmar la transacción se despierta al despachador: un hilo de fondo que toma lotes de
+  filas vencidas con un UPDATE condicional (dos procesos no toman la misma), envía en paralelo
+  con el cliente HTTP compartido y el token de Graph cacheado, y registra el resultado.
+- Errores reintentables (red, 429, 5xx, SMTP 4xx) vuelven a PENDIENTE con espera exponencial
+  hasta max_intentos; los definitivos pasan a FALLIDA. Una fila ENVIANDO cuyo despachador murió
+  se retoma al vencer su plazo (el envío es al menos una vez; la clave viaja como Message-ID /
+  Idempotency-Key para que el proveedor pueda deduplicar).
+- Al quedar ENVIADA o FALLIDA se vacía el contenido: el cuerpo (p. ej. el enlace de recuperación
+  de contraseña) no se conserva en la tabla una vez resuelto el envío.
+
+Sin el hilo iniciado (scripts, tests) las filas esperan hasta llamar procesar_pendientes().
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.notificacion_saliente import (
+    CANAL_EMAIL,
+    CANAL_WHATSAPP,
+    ESTADO_ENVIADA,
+    ESTADO_ENVIANDO,
+    ESTADO_FALLIDA,
+    ESTADO_PENDIENTE,
+    NotificacionSaliente,
+)
+from app.services.email_service import enviar_email
+from app.services.whatsapp_service import enviar_plantilla
+from app.utils.envio_externo import ResultadoEnvio, cerrar_cliente_http
+from app.utils.fechas import isoformat_utc
+
+logger = logging.getLogger(__name__)
+
+CLAVE_INFO = "notificaciones_encoladas"
+MAX_ESPERA_REINTENTO_S = 3600
+CONTENIDO_DESCARTADO = "{}"  # contenido de filas ENVIADA / FALLIDA
+
+
+# --- Encolar ---
+
+
+def _encolar(db: Session, clave: str, **campos) -> NotificacionSaliente:
+    existente = db.query(NotificacionSaliente).filter(NotificacionSaliente.clave_idempotencia == clave).first()
+    if existente is not None:
+        return existente
+    notificacion = NotificacionSaliente(
+        clave_idempotencia=clave,
+        estado=ESTADO_PENDIENTE,
+        intentos=0,
+        max_intentos=max(1, settings.NOTIFICACIONES_MAX_INTENTOS),
+        proximo_intento_en=datetime.utcnow(),
+        **campos,
+    )
+    db.add(notificacion)
+    db.flush()
+    db.info[CLAVE_INFO] = True
+    return notificacion
+
+
+def encolar_email(
+    db: Session,
+    destino: str,
+    asunto: str,
+    cuerpo: str,
+    *,
+    clave: str,
+    referencia_tipo: Optional[str] = None,
+    referencia_id: Optional[int] = None,
+    id_usuario: Optional[int] = None,
+) -> NotificacionSaliente:
+    """Encola un email (no hace commit). Si la clave ya existe devuelve la notificación previa."""
+    return _encolar(
+        db,
+        clave,
+        canal=CANAL_EMAIL,
+        destino=destino.strip(),
+        asunto=asunto[:255],
+        contenido=json.dumps({"cuerpo": cuerpo}, ensure_ascii=False),
+        referencia_tipo=referencia_tipo,
+        referencia_id=referencia_id,
+        id_usuario=id_usuario,
+    )
+
+
+def encolar_whatsapp(
+    db: Session,
+    telefono: str,
+    plantilla: str,
+    parametros: list[str],
+    *,
+    clave: str,
+    referencia_tipo: Optional[str] = None,
+    referencia_id: Optional[int] = None,
+    id_usuario: Optional[int] = None,
+) -> NotificacionSaliente:
+    """Encola una plantilla de WhatsApp (no hace commit). Misma idempotencia que encolar_email."""
+    return _encolar(
+        db,
+        clave,
+        canal=CANAL_WHATSAPP,
+        destino=str(telefono).strip(),
+        asunto=plantilla,
+        contenido=json.dumps({"parametros": parametros}, ensure_ascii=False),
+        referencia_tipo=referencia_tipo,
+        referencia_id=referencia_id,
+        id_usuario=id_usuario,
+    )
+
+
+def notificacion_a_dict(n: NotificacionSaliente) -> dict:
+    """Estado de entrega (sin el contenido del mensaje)."""
+    return {
+        "id_notificacion": n.id,
+        "canal": n.canal,
+        "destino": n.destino,
+        "estado": n.estado,
+        "intentos": n.intentos,
+        "max_intentos": n.max_intentos,
+        "ultimo_error": n.ultimo_error,
+        "proximo_intento_en": isoformat_utc(n.proximo_intento_en) if n.estado == ESTADO_PENDIENTE else None,
+        "referencia_tipo": n.referencia_tipo,
+        "referencia_id": n.referencia_id,
+        "creado_en": isoformat_utc(n.creado_en),
+        "enviado_en": isoformat_utc(n.enviado_en) if n.enviado_en else None,
+    }
+
+
+# --- Despachador ---
+
+
+def espera_reintento(intentos: int) -> timedelta:
+    """Espera antes del siguiente intento: base, 2·base, 4·base… con tope de una hora."""
+    base = max(1, settings.NOTIFICACIONES_REINTENTO_BASE_S)
+    return timedelta(seconds=min(MAX_ESPERA_REINTENTO_S, base * 2 ** max(0, intentos - 1)))
+
+
+@dataclass(frozen=True)
+class _Envio:
+    """Copia de la fila tomada; los hilos de envío no usan la sesión."""
+
+    id: int
+    clave: str
+    canal: str
+    destino: str
+    asunto: Optional[str]
+    contenido: str
+    intentos: int
+    max_intentos: int
+
+
+def _enviar(envio: _Envio) -> ResultadoEnvio:
+    try:
+        datos = json.loads(envio.contenido)
+        if envio.canal == CANAL_EMAIL:
+            return enviar_email(envio.destino, envio.asunto or "", datos["cuerpo"], clave=envio.clave)
+        if envio.canal == CANAL_WHATSAPP:
+            return enviar_plantilla(envio.destino, envio.asunto or "", datos["parametros"], clave=envio.clave)
+        return ResultadoEnvio(False, f"Canal desconocido: {envio.canal}")
+    except Exception as e:
+        logger.exception("Notificación %s: error inesperado al enviar", envio.id)
+        return ResultadoEnvio(False, str(e), reintentable=True)
+
+
+@dataclass
+class EstadisticasDespachador:
+    lotes: int = 0
+    enviadas: int = 0
+    reintentos: int = 0
+    fallidas: int = 0
+
+
+class DespachadorNotificaciones:
+    """Envía las notificaciones vencidas por lotes, con un hilo de fondo opcional."""
+
+    def __init__(self, intervalo_segundos: float, tamano_lote: int, hilos: int, plazo_segundos: float):
+        self.intervalo_segundos = intervalo_segundos
+        self.tamano_lote = max(1, tamano_lote)
+        self.hilos = max(1, hilos)
+        self.plazo_segundos = plazo_segundos  # cuánto dura la toma de una fila ENVIANDO
+        self.estadisticas = EstadisticasDespachador()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def activa(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def avisar(self) -> None:
+        self._hay_trabajo.set()
+
+    def _tomar(self, db: Session, ahora: datetime) -> list[_Envio]:
+        """Marca ENVIANDO hasta tamano_lote filas vencidas; UPDATE condicional por fila."""
+        tabla = NotificacionSaliente.__table__
+        # Tomadas por un despachador que no terminó y ya sin intentos: no se reintentan más
+        db.execute(
+            update(tabla)
+            .where(
+                tabla.c.estado == ESTADO_ENVIANDO,
+                tabla.c.proximo_intento_en <= ahora,
+                tabla.c.intentos >= tabla.c.max_intentos,
+            )
+            .values(
+                estado=ESTADO_FALLIDA,
+                ultimo_error="Envío sin confirmar (proceso interrumpido)",
+                contenido=CONTENIDO_DESCARTADO,
+            )
+        )
+        candidatas = (
+            db.query(NotificacionSaliente.id, NotificacionSaliente.estado, NotificacionSaliente.intentos)
+            .filter(
+                NotificacionSaliente.estado.in_((ESTADO_PENDIENTE, ESTADO_ENVIANDO)),
+                NotificacionSaliente.proximo_intento_en <= ahora,
+            )
+            .order_by(NotificacionSaliente.proximo_intento_en, NotificacionSaliente.id)
+            .limit(self.tamano_lote)
+            .all()
+        )
+        tomadas = []
+        for c in candidatas:
+            resultado = db.execute(
+                update(tabla)
+                .where(tabla.c.id == c.id, tabla.c.estado == c.estado, tabla.c.intentos == c.intentos)
+                .values(
+                    estado=ESTADO_ENVIANDO,
+                    intentos=tabla.c.intentos + 1,
+                    proximo_intento_en=ahora + timedelta(seconds=self.plazo_segundos),
+                )
+            )
+            if resultado.rowcount == 1:
+                tomadas.append(c.id)
+        envios = []
+        if tomadas:
+            filas = db.query(tabla).filter(tabla.c.id.in_(tomadas)).order_by(tabla.c.id).all()
+            envios = [
+                _Envio(
+                    f.id, f.clave_idempotencia, f.canal, f.destino, f.asunto, f.contenido, f.intentos, f.max_intentos
+                )
+                for f in filas
+            ]
+        db.commit()
+        return envios
+
+    def _registrar(self, db: Session, envio: _Envio, resultado: ResultadoEnvio, ahora: datetime) -> None:
+        tabla = NotificacionSaliente.__table__
+        if resultado.ok:
+            valores = {
+                "estado": ESTADO_ENVIADA,
+                "enviado_en": ahora,
+                "ultimo_error": None,
+                "contenido": CONTENIDO_DESCARTADO,
+            }
+            self.estadisticas.enviadas += 1
+        elif resultado.reintentable and envio.intentos < envio.max_intentos:
+            valores = {
+                "estado": ESTADO_PENDIENTE,
+                "proximo_intento_en": ahora + espera_reintento(envio.intentos),
+                "ultimo_error": (resultado.error or "")[:500],
+            }
+            self.estadisticas.reintentos += 1
+        else:
+            valores = {
+                "estado": ESTADO_FALLIDA,
+                "ultimo_error": (resultado.error or "")[:500],
+                "contenido": CONTENIDO_DESCARTADO,
+            }
+            self.estadisticas.fallidas += 1
+            logger.warning("Notificación %s (%s) fallida: %s", envio.id, envio.canal, resultado.error)
+        db.execute(update(tabla).where(tabla.c.id == envio.id, tabla.c.estado == ESTADO_ENVIANDO).values(**valores))
+
+    def procesar_pendientes(self, db: Optional[Session] = None, ahora: Optional[datetime] = None) -> int:
+        """
+        Toma y envía un lote de notificaciones vencidas. Retorna cuántas intentó.
+        Sin `db` abre una sesión propia (uso desde el hilo de fondo).
+        """
+        from app.database import SessionLocal
+
+        sesion = db if db is not None else SessionLocal()
+        try:
+            envios = self._tomar(sesion, ahora or datetime.utcnow())
+            if not envios:
+                return 0
+            if len(envios) == 1 or self.hilos == 1:
+                resultados = [_enviar(e) for e in envios]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.hilos, len(envios))) as ejecutor:
+                    resultados = list(ejecutor.map(_enviar, envios))
+            fin = ahora or datetime.utcnow()
+            for envio, resultado in zip(envios, resultados):
+                self._registrar(sesion, envio, resultado, fin)
+            sesion.commit()
+            self.estadisticas.lotes += 1
+            return len(envios)
+        except Exception:
+            sesion.rollback()
+            raise
+        finally:
+            if db is None:
+                sesion.close()
+
+    def iniciar(self) -> None:
+        if self.activa:
+            return
+        self._detener.clear()
+        self._hay_trabajo.set()  # lo que quedó pendiente de una ejecución anterior
+        self._hilo = threading.Thread(target=self._bucle, name="notificaciones", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo; lo pendiente queda en la tabla para el siguiente arranque."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        self._hilo.join(timeout)
+        self._hilo = None
+        cerrar_cliente_http()
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            # Despierta al confirmar un encolado o cada intervalo (reintentos, otros procesos)
+            self._hay_trabajo.wait(self.intervalo_segundos)
+            self._hay_trabajo.clear()
+            try:
+                while not self._detener.is_set() and self.procesar_pendientes() >= self.tamano_lote:
+                    pass
+            except Exception as e:
+                logger.warning("Despachador de notificaciones: %s", e)
+
+
+despachador_notificaciones = DespachadorNotificaciones(
+    settings.NOTIFICACIONES_INTERVALO_S,
+    settings.NOTIFICACIONES_LOTE,
+    settings.NOTIFICACIONES_HILOS,
+    plazo_segundos=max(60.0, 4 * settings.NOTIFICACIONES_TIMEOUT_S),
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _avisar_al_confirmar(session: Session) -> None:
+    if session.info.pop(CLAVE_INFO, None):
+        despachador_notificaciones.avisar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_al_revertir(session: Session) -> None:
+    session.info.pop(CLAVE_INFO, None)
@@ -10,10 +10,9 @@ from datetime import datetime, timedelta
 from typing import Any, Optional
 
 from sqlalchemy import func, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, aliased, joinedload
 
 from app.models.alerta_inventario import AlertaInventario, TipoAlertaInventario
-from app.models.caja_turno import CajaTurno
 from app.models.cita import Cita, EstadoCita
 from app.models.cliente import Cliente
 from app.models.cotizacion_refaccion_especial import (
@@ -21,14 +20,15 @@ from app.models.cotizacion_refaccion_especial import (
     EstadoCotizacionRefaccion,
 )
 from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
-from app.models.pago import Pago
 from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
-from app.models.venta import Venta
-from app.services import acciones_operativas_service
+from app.models.venta import ESTADOS_VENTA_ACTIVA, Venta
+from app.services import acciones_operativas_service, contadores_operativos_service
+from app.services.acciones_operativas_service import FuenteDatosAcciones, FuenteDatosPrecargada
 from app.services.cita_estado_service import calcular_estado_meta
-from app.services.ot_acciones_service import acciones_a_dict, evaluar_acciones_ot
+from app.services.ot_acciones_service import acciones_a_dict, evaluar_acciones_ot_lote
 from app.services.recepcion_ot_service import evaluar_cita_convertible
+from app.services.saldos_venta_service import saldo_de
 from app.utils.fechas import ahora_local, isoformat_fecha_ingreso_ot
 
 SALDO_EPSILON = 0.001
@@ -162,9 +162,8 @@ def _vehiculo_resumen(vehiculo) -> Optional[str]:
 
 
 def calcular_saldo_venta(db: Session, venta: Venta) -> float:
-    """Mismo cálculo que ventas/crud: total - sum(pagos), mínimo 0."""
-    total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
-    return max(0.0, float(venta.total) - float(total_pagado or 0))
+    """Saldo materializado de la venta (ventas.saldo), sin consulta."""
+    return acciones_operativas_service.calcular_saldo_venta(db, venta)
 
 
 def resolver_origen_venta(venta: Venta) -> tuple[str, Optional[int]]:
@@ -270,14 +269,7 @@ def _resumen_inventario_alertas(db: Session) -> dict[str, int]:
 
 
 def _info_caja(db: Session, usuario: Usuario) -> dict:
-    turno = (
-        db.query(CajaTurno)
-        .filter(
-            CajaTurno.id_usuario == usuario.id_usuario,
-            CajaTurno.estado == "ABIERTO",
-        )
-        .first()
-    )
+    turno = acciones_operativas_service.turno_abierto_usuario(db, usuario)
     if not turno:
         return {"turno_abierto": False, "id_turno": None, "alerta_turno_largo": False}
 
@@ -294,12 +286,7 @@ def _info_caja(db: Session, usuario: Usuario) -> dict:
 
 
 def _venta_activa_por_orden(db: Session, orden_id: int) -> Optional[Venta]:
-    return (
-        db.query(Venta)
-        .filter(Venta.id_orden == orden_id, Venta.estado != "CANCELADA")
-        .order_by(Venta.id_venta.desc())
-        .first()
-    )
+    return acciones_operativas_service._venta_activa_por_orden(db, orden_id)
 
 
 def _acciones_cita_item(cita: Cita, rol: str, eval_conv: dict) -> list[dict]:
@@ -323,30 +310,37 @@ def _acciones_cita_item(cita: Cita, rol: str, eval_conv: dict) -> list[dict]:
     return acciones
 
 
-def _acciones_ot_item(
+ACCIONES_OT_POR_CONTEXTO: dict[str, list[str]] = {
+    "pendientes": ["iniciar_ot"],
+    "en_proceso": ["finalizar_ot"],
+    "listas_entrega": ["entregar_vehiculo"],
+}
+
+
+def _acciones_ot_items_lote(
     db: Session,
-    orden: OrdenTrabajo,
-    rol: str,
+    ordenes: list[OrdenTrabajo],
     usuario: Usuario,
     contexto: str,
-) -> list[dict]:
-    acciones_solicitadas: list[str] = []
-    if contexto == "pendientes":
-        acciones_solicitadas = ["iniciar_ot"]
-    elif contexto == "en_proceso":
-        acciones_solicitadas = ["finalizar_ot"]
-    elif contexto == "listas_entrega":
-        acciones_solicitadas = ["entregar_vehiculo"]
-
+    *,
+    fuente: Optional[FuenteDatosPrecargada] = None,
+) -> dict[int, list[dict]]:
+    """Acciones por contexto de bandeja para una página de OT (lecturas precargadas por lote)."""
+    acciones_solicitadas = ACCIONES_OT_POR_CONTEXTO.get(contexto)
     if not acciones_solicitadas:
-        return []
-
-    evaluadas = evaluar_acciones_ot(db, orden, usuario, acciones=acciones_solicitadas)
-    return acciones_a_dict(evaluadas)
+        return {orden.id: [] for orden in ordenes}
+    evaluadas = evaluar_acciones_ot_lote(db, ordenes, usuario, acciones=acciones_solicitadas, fuente=fuente)
+    return {id_orden: acciones_a_dict(acciones) for id_orden, acciones in evaluadas.items()}
 
 
 def _acciones_ot_pendientes_cobro(
-    db: Session, orden: OrdenTrabajo, rol: str, usuario: Usuario, venta: Optional[Venta]
+    db: Session,
+    orden: OrdenTrabajo,
+    rol: str,
+    usuario: Usuario,
+    venta: Optional[Venta],
+    *,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> list[dict]:
     del rol
     # Coherencia O1: si el clasificador ya resolvió venta activa, bloquear sin re-query.
@@ -358,14 +352,24 @@ def _acciones_ot_pendientes_cobro(
             codigo_bloqueo="VENTA_EXISTENTE",
         )
     else:
-        crear_ev = acciones_operativas_service.evaluar_crear_venta_desde_ot(db, orden, usuario)
-    pago_ev = acciones_operativas_service.evaluar_registrar_pago_ot(db, orden, usuario, venta=venta)
+        crear_ev = acciones_operativas_service.evaluar_crear_venta_desde_ot(db, orden, usuario, fuente=fuente)
+    pago_ev = acciones_operativas_service.evaluar_registrar_pago_ot(db, orden, usuario, venta=venta, fuente=fuente)
     return [
         acciones_operativas_service.accion_a_dict(crear_ev),
         acciones_operativas_service.accion_a_dict(pago_ev),
     ]
 
 
+def _fuente_lote_cobro(
+    db: Session, filas: list[tuple[OrdenTrabajo, Optional[Venta], Optional[float]]]
+) -> FuenteDatosPrecargada:
+    """Fuente de lote sembrada con la venta activa y saldo que ya resolvió el clasificador O1/O2."""
+    fuente = FuenteDatosPrecargada(db, ordenes=[orden for orden, _, _ in filas])
+    for orden, venta, saldo in filas:
+        fuente.registrar_venta_activa(orden.id, venta, saldo)
+    return fuente
+
+
 def _serializar_orden_base(orden: OrdenTrabajo, acciones: list[dict], extras: Optional[dict] = None) -> dict:
     estado_db = _estado_str(orden.estado)
     item = {
@@ -458,102 +462,173 @@ def _subquery_venta_activa_por_orden_agg(db: Session):
     )
 
 
-def _subquery_saldos_venta(db: Session):
-    """id_venta → saldo (total - pagos, mínimo 0) — paridad con calcular_saldo_venta."""
-    pagos_agg = (
-        db.query(
-            Pago.id_venta.label("id_venta"),
-            func.coalesce(func.sum(Pago.monto), 0).label("total_pagado"),
-        )
-        .group_by(Pago.id_venta)
-        .subquery("a0_pagos_por_venta")
-    )
-    return (
-        db.query(
-            Venta.id_venta.label("id_venta"),
-            func.greatest(
-                0,
-                Venta.total - func.coalesce(pagos_agg.c.total_pagado, 0),
-            ).label("saldo"),
-        )
-        .outerjoin(pagos_agg, Venta.id_venta == pagos_agg.c.id_venta)
-        .subquery("a0_saldos_venta")
-    )
+def _columnas_saldo(venta):
+    """
+    (total_pagado, saldo) materializados de la venta (o alias) — paridad con calcular_saldo_venta.
+    Con outerjoin sin venta, saldo queda NULL.
+    """
+    return func.coalesce(venta.total_pagado, 0), venta.saldo
 
 
-def _query_ids_ordenes_o1(db: Session):
-    """IDs de OT en clasificador O1 — paridad con _ids_ordenes_ot_pendientes_cobro."""
+# --- Clasificador set-based O1 / O2 / V1 (bandejas caja sin consultas por fila) ---
+
+FAMILIA_O1 = "ot_pendientes_cobro"
+FAMILIA_O2 = "ot_listas_entrega"
+
+
+def _saldo_desde_totales(total, total_pagado) -> float:
+    """Mismo valor que calcular_saldo_venta: max(0, total - pagado) en Decimal, como la columna ventas.saldo."""
+    return float(saldo_de(total, total_pagado))
+
+
+def _query_clasificador_ot_cobro(db: Session, familia: Optional[str]):
+    """
+    Una sola consulta sobre OT COMPLETADA con venta activa y saldo resueltos en SQL.
+
+    familia=O1: sin venta activa o saldo > ε (ADR §3.2).
+    familia=O2: con venta activa y saldo <= ε (listas para entrega).
+    familia=None: todas las OT COMPLETADA; el llamador clasifica con _saldo_desde_totales.
+    Columnas: id_orden, id_venta_activa, total_venta, total_pagado.
+    """
     va = _subquery_venta_activa_por_orden_agg(db)
-    saldos = _subquery_saldos_venta(db)
-    return (
-        db.query(OrdenTrabajo.id)
+    venta_activa = aliased(Venta, name="a0_venta_activa")
+    total_pagado, saldo = _columnas_saldo(venta_activa)
+    q = (
+        db.query(
+            OrdenTrabajo.id.label("id_orden"),
+            va.c.id_venta_activa.label("id_venta_activa"),
+            venta_activa.total.label("total_venta"),
+            total_pagado.label("total_pagado"),
+        )
         .outerjoin(va, OrdenTrabajo.id == va.c.id_orden)
-        .outerjoin(saldos, va.c.id_venta_activa == saldos.c.id_venta)
+        .outerjoin(venta_activa, va.c.id_venta_activa == venta_activa.id_venta)
         .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .filter(
+    )
+    if familia is None:
+        return q
+    if familia == FAMILIA_O1:
+        return q.filter(
             or_(
                 va.c.id_venta_activa.is_(None),
-                saldos.c.saldo > SALDO_EPSILON,
+                saldo > SALDO_EPSILON,
             )
         )
-    )
+    if familia == FAMILIA_O2:
+        return q.filter(
+            va.c.id_venta_activa.isnot(None),
+            saldo <= SALDO_EPSILON,
+        )
+    raise ValueError(f"familia de cobro no soportada: {familia}")
+
+
+def _query_ids_ordenes_o1(db: Session):
+    """IDs de OT en clasificador O1 — paridad con _ids_ordenes_ot_pendientes_cobro."""
+    return _query_clasificador_ot_cobro(db, FAMILIA_O1).with_entities(OrdenTrabajo.id)
 
 
 def _contar_ot_pendientes_cobro(db: Session) -> int:
     """COUNT O1 — OT COMPLETADA sin venta activa o con saldo > ε."""
-    va = _subquery_venta_activa_por_orden_agg(db)
-    saldos = _subquery_saldos_venta(db)
-    return int(
-        db.query(func.count(OrdenTrabajo.id))
-        .outerjoin(va, OrdenTrabajo.id == va.c.id_orden)
-        .outerjoin(saldos, va.c.id_venta_activa == saldos.c.id_venta)
-        .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .filter(
-            or_(
-                va.c.id_venta_activa.is_(None),
-                saldos.c.saldo > SALDO_EPSILON,
-            )
-        )
-        .scalar()
-        or 0
-    )
+    return int(_query_clasificador_ot_cobro(db, FAMILIA_O1).with_entities(func.count(OrdenTrabajo.id)).scalar() or 0)
 
 
 def _contar_ot_listas_entrega(db: Session) -> int:
     """COUNT O2 — OT COMPLETADA con venta activa y saldo <= ε."""
-    va = _subquery_venta_activa_por_orden_agg(db)
-    saldos = _subquery_saldos_venta(db)
-    return int(
-        db.query(func.count(OrdenTrabajo.id))
-        .join(va, OrdenTrabajo.id == va.c.id_orden)
-        .join(saldos, va.c.id_venta_activa == saldos.c.id_venta)
-        .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .filter(saldos.c.saldo <= SALDO_EPSILON)
-        .scalar()
-        or 0
-    )
+    return int(_query_clasificador_ot_cobro(db, FAMILIA_O2).with_entities(func.count(OrdenTrabajo.id)).scalar() or 0)
 
 
-def _contar_ventas_saldo_pendiente(db: Session) -> int:
-    """COUNT V1 — ventas con saldo > ε excluyendo OT ya en O1."""
-    saldos = _subquery_saldos_venta(db)
+def _query_ventas_v1(db: Session):
+    """
+    V1 set-based: ventas activas con saldo > ε excluyendo OT ya en O1.
+    Columnas: Venta, total_pagado, cliente_nombre.
+    """
+    total_pagado, saldo = _columnas_saldo(Venta)
     ids_o1 = _query_ids_ordenes_o1(db)
-    return int(
-        db.query(func.count(Venta.id_venta))
-        .join(saldos, Venta.id_venta == saldos.c.id_venta)
-        .filter(Venta.estado != "CANCELADA")
-        .filter(saldos.c.saldo > SALDO_EPSILON)
+    return (
+        db.query(
+            Venta,
+            total_pagado.label("total_pagado"),
+            Cliente.nombre.label("cliente_nombre"),
+        )
+        .outerjoin(Cliente, Venta.id_cliente == Cliente.id_cliente)
+        .filter(Venta.estado.in_(ESTADOS_VENTA_ACTIVA))
+        .filter(saldo > SALDO_EPSILON)
         .filter(
             or_(
                 Venta.id_orden.is_(None),
                 ~Venta.id_orden.in_(ids_o1),
             )
         )
-        .scalar()
-        or 0
     )
 
 
+def _contar_ventas_saldo_pendiente(db: Session) -> int:
+    """COUNT V1 — ventas con saldo > ε excluyendo OT ya en O1."""
+    return int(_query_ventas_v1(db).with_entities(func.count(Venta.id_venta)).scalar() or 0)
+
+
+def clasificar_ot_cobro(
+    db: Session,
+    familia: str,
+    *,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> list[tuple[OrdenTrabajo, Optional[Venta], Optional[float]]]:
+    """
+    Página O1/O2 como (orden, venta_activa, saldo) — orden fecha_finalizacion DESC.
+
+    Paginación en SQL sobre el clasificador; la hidratación usa dos IN (órdenes, ventas),
+    así que el costo no depende del histórico de OT completadas. limit=None → población completa.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    q = _query_clasificador_ot_cobro(db, familia).order_by(
+        OrdenTrabajo.fecha_finalizacion.desc(), OrdenTrabajo.id.desc()
+    )
+    if offset:
+        q = q.offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    filas = q.all()
+    if not filas:
+        return []
+
+    ids_orden = [f.id_orden for f in filas]
+    ordenes = {o.id: o for o in _query_ot_base(db, None).filter(OrdenTrabajo.id.in_(ids_orden)).all()}
+    ids_venta = [f.id_venta_activa for f in filas if f.id_venta_activa is not None]
+    ventas = {v.id_venta: v for v in db.query(Venta).filter(Venta.id_venta.in_(ids_venta)).all()} if ids_venta else {}
+
+    resultado: list[tuple[OrdenTrabajo, Optional[Venta], Optional[float]]] = []
+    for f in filas:
+        orden = ordenes.get(f.id_orden)
+        if orden is None:
+            continue
+        if f.id_venta_activa is None:
+            resultado.append((orden, None, None))
+            continue
+        resultado.append((orden, ventas.get(f.id_venta_activa), _saldo_desde_totales(f.total_venta, f.total_pagado)))
+    return resultado
+
+
+def clasificar_ventas_v1(
+    db: Session,
+    *,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> list[tuple[Venta, float, Optional[str]]]:
+    """Página V1 como (venta, saldo, cliente_nombre) — orden fecha DESC, paginada en SQL."""
+    if limit is not None and limit <= 0:
+        return []
+    q = _query_ventas_v1(db).order_by(Venta.fecha.desc(), Venta.id_venta.desc())
+    if offset:
+        q = q.offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    return [
+        (venta, _saldo_desde_totales(venta.total, total_pagado), cliente_nombre)
+        for venta, total_pagado, cliente_nombre in q.all()
+    ]
+
+
 def bandeja_citas_pendientes_asistencia(db: Session, rol: str, limit: int) -> tuple[int, list[dict]]:
     ahora = ahora_local()
     q = (
@@ -649,15 +724,15 @@ def bandeja_ot_pendientes(
     q = q.order_by(OrdenTrabajo.fecha_ingreso.asc())
     total = q.count()
     ordenes = q.limit(limit).all()
+    acciones_por_orden = _acciones_ot_items_lote(db, ordenes, usuario, "pendientes")
     items = []
     for orden in ordenes:
         estado_db = _estado_str(orden.estado)
         estado_operativo = _estado_operativo_ot(estado_db)
-        acciones = _acciones_ot_item(db, orden, rol, usuario, "pendientes")
         items.append(
             _serializar_orden_base(
                 orden,
-                acciones,
+                acciones_por_orden[orden.id],
                 {
                     "estado_operativo": estado_operativo,
                     "etiqueta_estado": ETIQUETAS_ESTADO_OT.get(estado_operativo, estado_db),
@@ -679,14 +754,14 @@ def bandeja_ot_en_proceso(
     q = q.order_by(OrdenTrabajo.fecha_ingreso.asc())
     total = q.count()
     ordenes = q.limit(limit).all()
+    acciones_por_orden = _acciones_ot_items_lote(db, ordenes, usuario, "en_proceso")
     items = []
     for orden in ordenes:
         estado_db = _estado_str(orden.estado)
-        acciones = _acciones_ot_item(db, orden, rol, usuario, "en_proceso")
         items.append(
             _serializar_orden_base(
                 orden,
-                acciones,
+                acciones_por_orden[orden.id],
                 {
                     "estado_operativo": estado_db,
                     "etiqueta_estado": ETIQUETAS_ESTADO_OT.get(estado_db, estado_db),
@@ -733,24 +808,12 @@ def _iter_ot_pendientes_cobro(db: Session):
     Clasificador O1 (ADR §3.2): OT COMPLETADA sin venta activa o con saldo > ε.
     Fuente única para bandeja ot_pendientes_cobro y deduplicación V1.
     """
-    q = (
-        _query_ot_base(db, None)
-        .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .order_by(OrdenTrabajo.fecha_finalizacion.desc())
-    )
-    for orden in q.all():
-        venta = _venta_activa_por_orden(db, orden.id)
-        if venta is None:
-            yield orden, None, None
-            continue
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo > SALDO_EPSILON:
-            yield orden, venta, saldo
+    yield from clasificar_ot_cobro(db, FAMILIA_O1)
 
 
 def _ids_ordenes_ot_pendientes_cobro(db: Session) -> frozenset[int]:
     """IDs de OT presentes en O1 — usados para excluir duplicados en ventas_saldo_pendiente (V1)."""
-    return frozenset(orden.id for orden, _, _ in _iter_ot_pendientes_cobro(db))
+    return frozenset(row.id for row in _query_ids_ordenes_o1(db).all())
 
 
 def _venta_pertenece_v1(venta: Venta, ids_o1: frozenset[int]) -> bool:
@@ -765,11 +828,12 @@ def _venta_pertenece_v1(venta: Venta, ids_o1: frozenset[int]) -> bool:
 
 
 def bandeja_ot_pendientes_cobro(db: Session, rol: str, usuario: Usuario, limit: int) -> tuple[int, list[dict]]:
-    pendientes = list(_iter_ot_pendientes_cobro(db))
-    total = len(pendientes)
+    total = _contar_ot_pendientes_cobro(db)
+    filas = clasificar_ot_cobro(db, FAMILIA_O1, limit=limit)
+    fuente = _fuente_lote_cobro(db, filas)
     items = []
-    for orden, venta, saldo in pendientes[:limit]:
-        acciones = _acciones_ot_pendientes_cobro(db, orden, rol, usuario, venta)
+    for orden, venta, saldo in filas:
+        acciones = _acciones_ot_pendientes_cobro(db, orden, rol, usuario, venta, fuente=fuente)
         extras = {
             "total_orden": float(orden.total or 0),
             "id_venta": venta.id_venta if venta else None,
@@ -783,25 +847,14 @@ def bandeja_ot_pendientes_cobro(db: Session, rol: str, usuario: Usuario, limit:
 
 
 def bandeja_ot_listas_entrega(db: Session, rol: str, usuario: Usuario, limit: int) -> tuple[int, list[dict]]:
-    q = (
-        _query_ot_base(db, None)
-        .filter(OrdenTrabajo.estado == EstadoOrden.COMPLETADA)
-        .order_by(OrdenTrabajo.fecha_finalizacion.desc())
+    total = _contar_ot_listas_entrega(db)
+    filas = clasificar_ot_cobro(db, FAMILIA_O2, limit=limit)
+    acciones_por_orden = _acciones_ot_items_lote(
+        db, [orden for orden, _, _ in filas], usuario, "listas_entrega", fuente=_fuente_lote_cobro(db, filas)
     )
-    ordenes = q.all()
-    listas = []
-    for orden in ordenes:
-        venta = _venta_activa_por_orden(db, orden.id)
-        if not venta:
-            continue
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo <= SALDO_EPSILON:
-            listas.append((orden, venta, saldo))
-
-    total = len(listas)
     items = []
-    for orden, venta, saldo in listas[:limit]:
-        acciones = _acciones_ot_item(db, orden, rol, usuario, "listas_entrega")
+    for orden, venta, saldo in filas:
+        acciones = acciones_por_orden[orden.id]
         extras = {
             "total_orden": float(orden.total or 0),
             "id_venta": venta.id_venta,
@@ -815,25 +868,20 @@ def bandeja_ot_listas_entrega(db: Session, rol: str, usuario: Usuario, limit: in
 
 
 def bandeja_ventas_saldo_pendiente(db: Session, rol: str, usuario: Usuario, limit: int) -> tuple[int, list[dict]]:
-    ids_o1 = _ids_ordenes_ot_pendientes_cobro(db)
-    ventas = db.query(Venta).filter(Venta.estado != "CANCELADA").order_by(Venta.fecha.desc()).all()
-    pendientes = []
-    for venta in ventas:
-        saldo = calcular_saldo_venta(db, venta)
-        if saldo > SALDO_EPSILON and _venta_pertenece_v1(venta, ids_o1):
-            pendientes.append((venta, saldo))
-
-    total = len(pendientes)
+    total = _contar_ventas_saldo_pendiente(db)
+    filas = clasificar_ventas_v1(db, limit=limit)
+    fuente = FuenteDatosPrecargada(db, ventas=[venta for venta, _, _ in filas])
+    for venta, saldo, _ in filas:
+        fuente.registrar_saldo(venta, saldo)
     items = []
-    for venta, saldo in pendientes[:limit]:
-        cliente = db.query(Cliente).filter(Cliente.id_cliente == venta.id_cliente).first() if venta.id_cliente else None
+    for venta, saldo, cliente_nombre in filas:
         origen_tipo, origen_id = resolver_origen_venta(venta)
         items.append(
             {
                 "tipo_entidad": "venta",
                 "id": venta.id_venta,
                 "id_orden": venta.id_orden,
-                "cliente_nombre": cliente.nombre if cliente else None,
+                "cliente_nombre": cliente_nombre,
                 "total": float(venta.total),
                 "saldo_pendiente": saldo,
                 "estado": venta.estado.value if hasattr(venta.estado, "value") else str(venta.estado),
@@ -841,7 +889,7 @@ def bandeja_ventas_saldo_pendiente(db: Session, rol: str, usuario: Usuario, limi
                 "origen_id": origen_id,
                 "acciones": [
                     acciones_operativas_service.accion_a_dict(
-                        acciones_operativas_service.evaluar_registrar_pago(db, venta, usuario)
+                        acciones_operativas_service.evaluar_registrar_pago(db, venta, usuario, fuente=fuente)
                     ),
                 ],
             }
@@ -909,10 +957,12 @@ def _construir_resumen_metricas_rapidas(
     usuario: Usuario,
     *,
     limit_items: int,
+    verificar_contadores: bool = False,
 ) -> dict[str, Any]:
     """
     P5.3 Fase 1 Commit D — fast path genuino para incluir_items=false.
-    Métricas vía contadores SQL; bandejas sin ítems ni evaluadores por fila.
+    Métricas desde contadores_operativos (una lectura); si faltan filas o
+    verificar_contadores=True, vía contadores SQL en vivo. Bandejas sin ítems ni evaluadores por fila.
     """
     rol = _rol_usuario(usuario)
     ahora = ahora_local()
@@ -920,37 +970,46 @@ def _construir_resumen_metricas_rapidas(
     ver_citas = _puede_ver_citas(rol) or rol == "ADMIN"
     ver_financiero = _puede_ver_bandeja_financiera(rol)
 
+    contadores = None if verificar_contadores else contadores_operativos_service.leer_contadores(db, tecnico_filtro)
+
+    def _contar(clave: str, contar_sql, *args) -> int:
+        return contadores[clave] if contadores is not None else contar_sql(db, *args)
+
     if ver_citas:
         total_asist = _contar_citas_pendientes_asistencia(db)
-        total_conv = _contar_citas_convertibles(db)
+        total_conv = _contar("citas_convertibles", _contar_citas_convertibles)
     else:
         total_asist, total_conv = 0, 0
 
     if rol == "TECNICO":
-        total_ot_pend = _contar_ot_pendientes(db, tecnico_filtro)
-        total_ot_proc = _contar_ot_en_proceso(db, tecnico_filtro)
-        total_ot_compl = _contar_ot_completadas(db, tecnico_filtro)
+        total_ot_pend = _contar("ot_pendientes", _contar_ot_pendientes, tecnico_filtro)
+        total_ot_proc = _contar("ot_en_proceso", _contar_ot_en_proceso, tecnico_filtro)
+        total_ot_compl = _contar("ot_completadas", _contar_ot_completadas, tecnico_filtro)
         total_ot_cobro, total_ot_entrega, total_ventas = 0, 0, 0
     elif ver_financiero:
-        total_ot_pend = _contar_ot_pendientes(db, None)
-        total_ot_proc = _contar_ot_en_proceso(db, None)
-        total_ot_cobro = _contar_ot_pendientes_cobro(db)
-        total_ot_entrega = _contar_ot_listas_entrega(db)
-        total_ventas = _contar_ventas_saldo_pendiente(db)
-        total_ot_compl = _contar_ot_completadas(db, None) if rol == "ADMIN" else 0
+        total_ot_pend = _contar("ot_pendientes", _contar_ot_pendientes, None)
+        total_ot_proc = _contar("ot_en_proceso", _contar_ot_en_proceso, None)
+        total_ot_cobro = _contar("ot_pendientes_cobro", _contar_ot_pendientes_cobro)
+        total_ot_entrega = _contar("ot_listas_entrega", _contar_ot_listas_entrega)
+        total_ventas = _contar("ventas_saldo_pendiente", _contar_ventas_saldo_pendiente)
+        total_ot_compl = _contar("ot_completadas", _contar_ot_completadas, None) if rol == "ADMIN" else 0
     elif rol == "EMPLEADO":
-        total_ot_pend = _contar_ot_pendientes(db, None)
-        total_ot_proc = _contar_ot_en_proceso(db, None)
+        total_ot_pend = _contar("ot_pendientes", _contar_ot_pendientes, None)
+        total_ot_proc = _contar("ot_en_proceso", _contar_ot_en_proceso, None)
         total_ot_compl, total_ot_cobro, total_ot_entrega, total_ventas = 0, 0, 0, 0
     else:
-        total_ot_pend = _contar_ot_pendientes(db, None)
-        total_ot_proc = _contar_ot_en_proceso(db, None)
-        total_ot_cobro = _contar_ot_pendientes_cobro(db)
-        total_ot_entrega = _contar_ot_listas_entrega(db)
-        total_ventas = _contar_ventas_saldo_pendiente(db)
+        total_ot_pend = _contar("ot_pendientes", _contar_ot_pendientes, None)
+        total_ot_proc = _contar("ot_en_proceso", _contar_ot_en_proceso, None)
+        total_ot_cobro = _contar("ot_pendientes_cobro", _contar_ot_pendientes_cobro)
+        total_ot_entrega = _contar("ot_listas_entrega", _contar_ot_listas_entrega)
+        total_ventas = _contar("ventas_saldo_pendiente", _contar_ventas_saldo_pendiente)
         total_ot_compl = 0
 
-    ref_compra, ref_recibidas = contadores_refacciones(db)
+    if contadores is not None:
+        ref_compra = contadores["refacciones_en_compra"]
+        ref_recibidas = contadores["refacciones_recibidas_pendiente_entrega"]
+    else:
+        ref_compra, ref_recibidas = contadores_refacciones(db)
 
     metricas = {
         "citas_pendientes_asistencia": total_asist,
@@ -1006,6 +1065,7 @@ def _construir_resumen_metricas_rapidas(
             "limit_items": limit_items,
             "incluir_items": False,
             "version_contrato": VERSION_CONTRATO,
+            "fuente_metricas": "contadores" if contadores is not None else "sql",
         },
     }
 
@@ -1298,10 +1358,11 @@ def construir_resumen_operativo(
     incluir_items: bool = True,
     grupo: Optional[str] = None,
     bandejas: Optional[str] = None,
+    verificar_contadores: bool = False,
 ) -> dict[str, Any]:
     """
     Resumen operativo A0 v2 / v2.1.
-    incluir_items=false → fast path P5.3 (contadores SQL).
+    incluir_items=false → fast path P5.3 (contadores_operativos; verificar_contadores=True → SQL en vivo).
     grupo / bandejas → slice v2.1 (UX-1B.0).
     incluir_items=true sin slice → bandejas completas con evaluadores (legacy).
     """
@@ -1316,7 +1377,9 @@ def construir_resumen_operativo(
             grupo=grupo_norm,
         )
     if not incluir_items:
-        return _construir_resumen_metricas_rapidas(db, usuario, limit_items=limit_items)
+        return _construir_resumen_metricas_rapidas(
+            db, usuario, limit_items=limit_items, verificar_contadores=verificar_contadores
+        )
     return _construir_resumen_completo(
         db,
         usuario,
@@ -6,6 +6,9 @@ Fuente única de verdad para:
 - GET /api/ordenes-trabajo/{id} (acciones[] opcional)
 - POST mutaciones en acciones.py (asegurar_accion_ot_permitida)
 
+Evaluación por lote (evaluar_acciones_ot_lote): mismas reglas, lecturas precargadas
+para toda la página vía FuenteDatosPrecargada.
+
 DEPRECADO (compatibilidad temporal):
 - ALLOW_TECNICO_SELF_ASSIGN: TECNICO puede iniciar OT sin tecnico_id previo.
   Plan futuro: False cuando Mi Taller + asignación obligatoria estén en prod.
@@ -14,19 +17,16 @@ DEPRECADO (compatibilidad temporal):
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
-from app.models.repuesto import Repuesto
 from app.models.usuario import Usuario
-from app.models.venta import Venta
 from app.routers.ordenes_trabajo.helpers import MSG_ORDEN_SIN_ITEMS, orden_tiene_servicios_o_repuestos
 from app.services import acciones_operativas_service
+from app.services.acciones_operativas_service import FuenteDatosAcciones, FuenteDatosPrecargada
 
 # Compatibilidad temporal — ver docstring del módulo.
 ALLOW_TECNICO_SELF_ASSIGN = True
@@ -83,20 +83,6 @@ def _accion(
     )
 
 
-def _venta_activa_por_orden(db: Session, orden_id: int) -> Optional[Venta]:
-    return (
-        db.query(Venta)
-        .filter(Venta.id_orden == orden_id, Venta.estado != "CANCELADA")
-        .order_by(Venta.id_venta.desc())
-        .first()
-    )
-
-
-def _saldo_venta(db: Session, venta: Venta) -> float:
-    total_pagado = db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == venta.id_venta).scalar()
-    return max(0.0, float(venta.total) - float(total_pagado or 0))
-
-
 def _tecnico_puede_operar(orden: OrdenTrabajo, usuario: Usuario) -> tuple[bool, Optional[str], Optional[str]]:
     """Valida asignación de técnico para acciones operativas del técnico."""
     rol = _rol_usuario(usuario)
@@ -111,13 +97,15 @@ def _tecnico_puede_operar(orden: OrdenTrabajo, usuario: Usuario) -> tuple[bool,
     return True, None, None
 
 
-def _evaluar_stock_inicio(db: Session, orden: OrdenTrabajo) -> tuple[bool, Optional[str], Optional[str]]:
+def _evaluar_stock_inicio(
+    fuente: FuenteDatosAcciones, orden: OrdenTrabajo
+) -> tuple[bool, Optional[str], Optional[str]]:
     if getattr(orden, "cliente_proporciono_refacciones", False):
         return True, None, None
     for detalle in orden.detalles_repuesto or []:
         if not detalle.repuesto_id:
             continue
-        repuesto = db.query(Repuesto).filter(Repuesto.id_repuesto == detalle.repuesto_id).first()
+        repuesto = fuente.repuesto(detalle.repuesto_id)
         if not repuesto:
             return (
                 False,
@@ -133,7 +121,9 @@ def _evaluar_stock_inicio(db: Session, orden: OrdenTrabajo) -> tuple[bool, Optio
     return True, None, None
 
 
-def evaluar_iniciar_ot(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
+def evaluar_iniciar_ot(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
     rol = _rol_usuario(usuario)
     if rol not in ROLES_INICIAR_FINALIZAR:
         return _accion("iniciar_ot", False, f"Rol {rol} no puede iniciar órdenes de trabajo", "ROL_NO_PERMITIDO")
@@ -170,15 +160,17 @@ def evaluar_iniciar_ot(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> Ac
             "SIN_TECNICO",
         )
 
-    ok_stock, motivo_stock, codigo_stock = _evaluar_stock_inicio(db, orden)
+    ok_stock, motivo_stock, codigo_stock = _evaluar_stock_inicio(fuente or FuenteDatosAcciones(db), orden)
     if not ok_stock:
         return _accion("iniciar_ot", False, motivo_stock, codigo_stock)
 
     return _accion("iniciar_ot", True)
 
 
-def evaluar_finalizar_ot(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    del db  # reservado para reglas futuras
+def evaluar_finalizar_ot(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    del db, fuente  # reservado para reglas futuras
     rol = _rol_usuario(usuario)
     if rol not in ROLES_INICIAR_FINALIZAR:
         return _accion("finalizar_ot", False, f"Rol {rol} no puede finalizar órdenes de trabajo", "ROL_NO_PERMITIDO")
@@ -201,8 +193,10 @@ def evaluar_finalizar_ot(db: Session, orden: OrdenTrabajo, usuario: Usuario) ->
     return _accion("finalizar_ot", True)
 
 
-def evaluar_marcar_cotizacion_enviada(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    del db
+def evaluar_marcar_cotizacion_enviada(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    del db, fuente
     rol = _rol_usuario(usuario)
     if rol not in ROLES_COTIZACION_ENVIADA:
         return _accion(
@@ -224,8 +218,10 @@ def evaluar_marcar_cotizacion_enviada(db: Session, orden: OrdenTrabajo, usuario:
     return _accion("marcar_cotizacion_enviada", True)
 
 
-def evaluar_autorizar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    del db
+def evaluar_autorizar_orden(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    del db, fuente
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion("autorizar_orden", False, f"Rol {rol} no puede autorizar órdenes", "ROL_NO_PERMITIDO")
@@ -234,12 +230,16 @@ def evaluar_autorizar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario)
     return _accion("autorizar_orden", True)
 
 
-def evaluar_rechazar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
+def evaluar_rechazar_orden(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
     base = evaluar_autorizar_orden(db, orden, usuario)
     return _accion("rechazar_orden", base.permitida, base.motivo_bloqueo, base.codigo_bloqueo)
 
 
-def evaluar_entregar_vehiculo(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
+def evaluar_entregar_vehiculo(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion("entregar_vehiculo", False, f"Rol {rol} no puede entregar vehículos", "ROL_NO_PERMITIDO")
@@ -253,7 +253,8 @@ def evaluar_entregar_vehiculo(db: Session, orden: OrdenTrabajo, usuario: Usuario
             "ESTADO_INVALIDO",
         )
 
-    venta = _venta_activa_por_orden(db, orden.id)
+    fuente = fuente or FuenteDatosAcciones(db)
+    venta = fuente.venta_activa_por_orden(orden.id)
     if not venta:
         return _accion(
             "entregar_vehiculo",
@@ -262,7 +263,7 @@ def evaluar_entregar_vehiculo(db: Session, orden: OrdenTrabajo, usuario: Usuario
             "SIN_VENTA",
         )
 
-    saldo = _saldo_venta(db, venta)
+    saldo = fuente.saldo_venta(venta)
     if saldo > SALDO_EPSILON:
         return _accion(
             "entregar_vehiculo",
@@ -274,8 +275,10 @@ def evaluar_entregar_vehiculo(db: Session, orden: OrdenTrabajo, usuario: Usuario
     return _accion("entregar_vehiculo", True)
 
 
-def evaluar_cancelar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    del db
+def evaluar_cancelar_orden(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    del db, fuente
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion("cancelar_orden", False, f"Rol {rol} no puede cancelar órdenes", "ROL_NO_PERMITIDO")
@@ -287,7 +290,9 @@ def evaluar_cancelar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario) -
     return _accion("cancelar_orden", True)
 
 
-def evaluar_reactivar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
+def evaluar_reactivar_orden(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
     rol = _rol_usuario(usuario)
     if rol not in ROLES_CAJA:
         return _accion("reactivar_orden", False, f"Rol {rol} no puede reactivar órdenes", "ROL_NO_PERMITIDO")
@@ -301,7 +306,7 @@ def evaluar_reactivar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario)
             "ESTADO_INVALIDO",
         )
 
-    venta = _venta_activa_por_orden(db, orden.id)
+    venta = (fuente or FuenteDatosAcciones(db)).venta_activa_por_orden(orden.id)
     if venta:
         return _accion(
             "reactivar_orden",
@@ -313,8 +318,10 @@ def evaluar_reactivar_orden(db: Session, orden: OrdenTrabajo, usuario: Usuario)
     return _accion("reactivar_orden", True)
 
 
-def evaluar_crear_venta_desde_ot(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    resultado = acciones_operativas_service.evaluar_crear_venta_desde_ot(db, orden, usuario)
+def evaluar_crear_venta_desde_ot(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    resultado = acciones_operativas_service.evaluar_crear_venta_desde_ot(db, orden, usuario, fuente=fuente)
     return _accion(
         resultado.accion,
         resultado.permitida,
@@ -323,8 +330,10 @@ def evaluar_crear_venta_desde_ot(db: Session, orden: OrdenTrabajo, usuario: Usua
     )
 
 
-def evaluar_pausar_refaccion(db: Session, orden: OrdenTrabajo, usuario: Usuario) -> AccionEvaluada:
-    del db, orden, usuario
+def evaluar_pausar_refaccion(
+    db: Session, orden: OrdenTrabajo, usuario: Usuario, *, fuente: Optional[FuenteDatosAcciones] = None
+) -> AccionEvaluada:
+    del db, orden, usuario, fuente
     return _accion("pausar_refaccion", False, "Acción no disponible todavía", "NO_IMPLEMENTADO")
 
 
@@ -347,11 +356,13 @@ def evaluar_accion_ot(
     orden: OrdenTrabajo,
     usuario: Usuario,
     accion: str,
+    *,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> AccionEvaluada:
     evaluador = _EVALUADORES.get(accion)
     if not evaluador:
         return _accion(accion, False, f"Acción desconocida: {accion}", "ACCION_DESCONOCIDA")
-    return evaluador(db, orden, usuario)
+    return evaluador(db, orden, usuario, fuente=fuente)
 
 
 def evaluar_acciones_ot(
@@ -359,9 +370,30 @@ def evaluar_acciones_ot(
     orden: OrdenTrabajo,
     usuario: Usuario,
     acciones: Optional[list[str]] = None,
+    *,
+    fuente: Optional[FuenteDatosAcciones] = None,
 ) -> list[AccionEvaluada]:
     nombres = acciones if acciones is not None else list(ACCIONES_OPERATIVAS_DEFAULT)
-    return [evaluar_accion_ot(db, orden, usuario, nombre) for nombre in nombres]
+    return [evaluar_accion_ot(db, orden, usuario, nombre, fuente=fuente) for nombre in nombres]
+
+
+def evaluar_acciones_ot_lote(
+    db: Session,
+    ordenes: Iterable[OrdenTrabajo],
+    usuario: Usuario,
+    acciones: Optional[list[str]] = None,
+    *,
+    fuente: Optional[FuenteDatosPrecargada] = None,
+) -> dict[int, list[AccionEvaluada]]:
+    """
+    Evalúa las mismas acciones para una página de OT: id_orden → acciones evaluadas.
+
+    Ventas activas, saldos, turno y repuestos se precargan una vez para todo el lote
+    (FuenteDatosPrecargada); el resultado es idéntico a evaluar_acciones_ot por orden.
+    """
+    ordenes = list(ordenes)
+    fuente = fuente or FuenteDatosPrecargada(db, ordenes=ordenes)
+    return {orden.id: evaluar_acciones_ot(db, orden, usuario, acciones, fuente=fuente) for orden in ordenes}
 
 
 def acciones_a_dict(evaluadas: list[AccionEvaluada]) -> list[dict]:
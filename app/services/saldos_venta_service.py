@@ -0,0 +1,196 @@
+"""
+Total pagado y saldo de cada venta materializados (columnas ventas.total_pagado / ventas.saldo).
+
+Listados, detalle, ticket, cuentas por cobrar, exportaciones, bandejas A0 e historial leen las
+columnas en lugar de sumar Pago por venta. Se mantienen así:
+
+- Venta nueva: saldo = total (mismo flush que la inserta).
+- Listeners de Session: en before_flush se resta lo que aportaban los pagos modificados o
+  borrados (valores previos de id_venta / monto) y se anotan las ventas cuyo total cambió; en
+  after_flush se suma lo que aportan los pagos nuevos y modificados y se escribe, por venta y en
+  orden de id, UPDATE total_pagado = total_pagado + delta con saldo = max(0, total - pagado).
+  El UPDATE bloquea la fila en la misma transacción que el pago.
+- Quien valida contra el saldo antes de escribir (registrar pago, editar venta) toma la fila
+  con bloquear_venta() para que dos cobros concurrentes no pasen la misma validación.
+- auditar_saldos(): recalcula desde pagos, reporta desfases y opcionalmente corrige
+  (scripts/auditar_saldos_ventas.py).
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.pago import Pago
+from app.models.venta import Venta
+from app.services.deltas_sesion import filas_modificadas, registrar_historial_previo, valor_previo
+
+logger = logging.getLogger(__name__)
+
+CLAVE_INFO = "saldos_venta_pendientes"
+CLAVE_EXPIRAR = "saldos_venta_expirar"
+
+_ATTRS_PAGO = ("id_venta", "monto")
+
+
+def saldo_de(total, total_pagado) -> Decimal:
+    """max(0, total - total_pagado): mismo cálculo que la columna ventas.saldo."""
+    return max(Decimal("0"), Decimal(total or 0) - Decimal(total_pagado or 0))
+
+
+# --- Lectura ---
+
+
+def bloquear_venta(db: Session, id_venta: int) -> Optional[Venta]:
+    """Venta con su fila bloqueada (FOR UPDATE) y total_pagado / saldo recién leídos."""
+    return db.query(Venta).filter(Venta.id_venta == id_venta).with_for_update().populate_existing().first()
+
+
+# --- Auditor ---
+
+
+def calcular_pagado(db: Session, ids_venta: Optional[Iterable[int]] = None) -> dict[int, Decimal]:
+    """id_venta → SUM(pagos.monto) de las ventas indicadas (o todas); una consulta agrupada."""
+    q = db.query(Pago.id_venta, func.sum(Pago.monto)).filter(Pago.id_venta.isnot(None))
+    if ids_venta is not None:
+        q = q.filter(Pago.id_venta.in_(sorted(set(ids_venta))))
+    return {int(id_venta): Decimal(total or 0) for id_venta, total in q.group_by(Pago.id_venta).all()}
+
+
+@dataclass
+class DesfaseVenta:
+    id_venta: int
+    columna: str
+    almacenado: Decimal
+    calculado: Decimal
+
+    def a_dict(self) -> dict:
+        return {
+            "id_venta": self.id_venta,
+            "columna": self.columna,
+            "almacenado": float(self.almacenado),
+            "calculado": float(self.calculado),
+        }
+
+
+def auditar_saldos(
+    db: Session, *, corregir: bool = False, ids_venta: Optional[Iterable[int]] = None
+) -> list[DesfaseVenta]:
+    """
+    Recalcula total_pagado y saldo de las ventas (todas o ids_venta) desde pagos y los compara
+    con lo almacenado. Con corregir=True escribe lo calculado. No hace commit.
+    """
+    db.flush()
+    q = db.query(Venta.id_venta, Venta.total, Venta.total_pagado, Venta.saldo)
+    if ids_venta is not None:
+        q = q.filter(Venta.id_venta.in_(sorted(set(ids_venta))))
+    filas = q.order_by(Venta.id_venta).all()
+    pagado = calcular_pagado(db, [f.id_venta for f in filas] if ids_venta is not None else None)
+
+    desfases: list[DesfaseVenta] = []
+    tabla = Venta.__table__
+    for f in filas:
+        total_pagado = pagado.get(f.id_venta, Decimal("0"))
+        calculado = {"total_pagado": total_pagado, "saldo": saldo_de(f.total, total_pagado)}
+        distintos = [c for c, valor in calculado.items() if Decimal(getattr(f, c) or 0) != valor]
+        if not distintos:
+            continue
+        desfases.extend(DesfaseVenta(f.id_venta, c, Decimal(getattr(f, c) or 0), calculado[c]) for c in distintos)
+        if corregir:
+            db.execute(update(tabla).where(tabla.c.id_venta == f.id_venta).values(**calculado))
+            _expirar(db, [f.id_venta])
+    if desfases:
+        ids = sorted({d.id_venta for d in desfases})
+        logger.warning("Saldos de venta con desfase: %s", ", ".join(map(str, ids)))
+    return desfases
+
+
+# --- Mantenimiento por eventos ---
+
+
+@dataclass
+class _Pendiente:
+    """Deltas de pagos previos (before_flush), pagos modificados y ventas con total cambiado."""
+
+    deltas: dict = field(default_factory=lambda: defaultdict(Decimal))
+    modificados: list = field(default_factory=list)
+    ventas_total: set = field(default_factory=set)
+
+
+def _acumular(deltas: dict, id_venta, monto, signo: int) -> None:
+    if id_venta is not None:
+        deltas[int(id_venta)] += signo * Decimal(monto or 0)
+
+
+def _expirar(session: Session, ids_venta: Iterable[int]) -> None:
+    """Las Venta ya cargadas vuelven a leer total_pagado / saldo en el siguiente acceso."""
+    for id_venta in ids_venta:
+        venta = session.identity_map.get(identity_key(Venta, id_venta))
+        if venta is not None:
+            session.expire(venta, ["total_pagado", "saldo"])
+
+
+@event.listens_for(Session, "before_flush")
+def _restar_previos(session: Session, flush_context, instances) -> None:
+    pendiente = _Pendiente()
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Venta):
+                obj.total_pagado = obj.total_pagado or Decimal("0")
+                obj.saldo = saldo_de(obj.total, obj.total_pagado)
+        for obj, borrado in filas_modificadas(session, {Venta: ("total",), Pago: _ATTRS_PAGO}):
+            if isinstance(obj, Venta):
+                if not borrado:
+                    pendiente.ventas_total.add(obj.id_venta)
+                continue
+            _acumular(pendiente.deltas, valor_previo(obj, "id_venta"), valor_previo(obj, "monto"), -1)
+            if not borrado:
+                pendiente.modificados.append(obj)
+    session.info[CLAVE_INFO] = pendiente
+
+
+@event.listens_for(Session, "after_flush")
+def _aplicar_deltas(session: Session, flush_context) -> None:
+    pendiente: Optional[_Pendiente] = session.info.pop(CLAVE_INFO, None)
+    if pendiente is None:
+        return
+    deltas = pendiente.deltas
+    for obj in (*session.new, *pendiente.modificados):
+        if isinstance(obj, Pago):
+            _acumular(deltas, obj.id_venta, obj.monto, 1)
+
+    ids = sorted({i for i, d in deltas.items() if d} | pendiente.ventas_total)
+    if not ids:
+        return
+    tabla = Venta.__table__
+    conn = session.connection()
+    # Orden fijo de ventas para no cruzar bloqueos; saldo primero con el pagado previo
+    # (MySQL asigna de izquierda a derecha con valores ya actualizados).
+    for id_venta in ids:
+        delta = deltas.get(id_venta, Decimal("0"))
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.id_venta == id_venta)
+            .ordered_values(
+                (tabla.c.saldo, func.greatest(0, tabla.c.total - tabla.c.total_pagado - delta)),
+                (tabla.c.total_pagado, tabla.c.total_pagado + delta),
+            )
+        )
+    session.info.setdefault(CLAVE_EXPIRAR, set()).update(ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expirar_actualizadas(session: Session, flush_context) -> None:
+    ids = session.info.pop(CLAVE_EXPIRAR, None)
+    if ids:
+        _expirar(session, ids)
+
+
+registrar_historial_previo(getattr(Pago, a) for a in _ATTRS_PAGO)
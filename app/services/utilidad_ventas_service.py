@@ -0,0 +1,201 @@
+"""
+Libro de costos por venta (ventas_utilidad) para reportes de utilidad.
+
+Reglas de costo (las mismas que usaban los reportes al recorrer venta por venta):
+- Venta desde OT: suma de SALIDAS con referencia = número de la OT, salvo que el cliente
+  haya proporcionado las refacciones (costo 0).
+- Venta de mostrador: suma de SALIDAS con id_venta de la venta.
+- Pérdida por merma: suma de costo_total_mer de las cancelaciones de la venta.
+
+Mantenimiento:
+- registrar_costo_salida / registrar_costos_salida: incremento al registrar SALIDAS (InventarioService,
+  uno a uno o por lote).
+- recalcular_ventas: recálculo completo al crear/vincular/desvincular ventas desde OT y al
+  cancelar (merma). También lo usa scripts/backfill_ventas_utilidad.py.
+
+Lectura: resumen_utilidad hace un solo SELECT agregado sobre ventas del rango unidas al libro.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.cancelacion_producto import CancelacionProducto
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.orden_trabajo import OrdenTrabajo
+from app.models.venta import Venta
+from app.models.venta_utilidad import VentaUtilidad
+from app.services.exportacion_fuentes import (
+    COSTO_SALIDAS_POR_REFERENCIA,
+    COSTO_SALIDAS_POR_VENTA,
+    Agregado,
+    con_agregados,
+)
+from app.utils.decimal_utils import money_round, to_decimal
+from app.utils.fechas import condiciones_rango_taller
+
+_CANCELADA = "CANCELADA"
+
+
+def _costo_calculado(venta: Venta, id_ot: Optional[int], cliente_proporciono: Optional[bool], por_ref, por_venta):
+    """Costo según el origen de la venta (OT o mostrador)."""
+    if venta.id_orden:
+        if id_ot is None or cliente_proporciono:
+            return to_decimal(0)
+        return to_decimal(por_ref or 0)
+    return to_decimal(por_venta or 0)
+
+
+def recalcular_ventas(db: Session, ids_venta: Iterable[int]) -> int:
+    """
+    Recalcula costo y merma de las ventas indicadas y guarda el resultado en el libro.
+    Consultas constantes (ventas + agregados, filas existentes del libro). Devuelve filas escritas.
+    """
+    ids = sorted({int(i) for i in ids_venta if i})
+    if not ids:
+        return 0
+    db.flush()
+
+    numeros_ot = (
+        select(OrdenTrabajo.numero_orden).join(Venta, Venta.id_orden == OrdenTrabajo.id).where(Venta.id_venta.in_(ids))
+    )
+    por_referencia = dataclasses.replace(
+        COSTO_SALIDAS_POR_REFERENCIA,
+        filtros=COSTO_SALIDAS_POR_REFERENCIA.filtros + (MovimientoInventario.referencia.in_(numeros_ot),),
+    )
+    por_venta = dataclasses.replace(
+        COSTO_SALIDAS_POR_VENTA,
+        filtros=COSTO_SALIDAS_POR_VENTA.filtros + (MovimientoInventario.id_venta.in_(ids),),
+    )
+    mermas = Agregado(
+        "perdidas_mer_por_venta",
+        CancelacionProducto.id_venta,
+        func.sum(CancelacionProducto.costo_total_mer),
+        filtros=(CancelacionProducto.id_venta.in_(ids),),
+    )
+    q = db.query(Venta, OrdenTrabajo.id, OrdenTrabajo.cliente_proporciono_refacciones).outerjoin(
+        OrdenTrabajo, OrdenTrabajo.id == Venta.id_orden
+    )
+    q = con_agregados(
+        q,
+        [
+            (por_referencia, OrdenTrabajo.numero_orden),
+            (por_venta, Venta.id_venta),
+            (mermas, Venta.id_venta),
+        ],
+    ).filter(Venta.id_venta.in_(ids))
+
+    existentes = {u.id_venta: u for u in db.query(VentaUtilidad).filter(VentaUtilidad.id_venta.in_(ids)).all()}
+    escritas = 0
+    for venta, id_ot, cliente_proporciono, costo_ref, costo_venta, perdidas in q.all():
+        fila = existentes.get(venta.id_venta)
+        if fila is None:
+            fila = VentaUtilidad(id_venta=venta.id_venta)
+            db.add(fila)
+        fila.costo = money_round(_costo_calculado(venta, id_ot, cliente_proporciono, costo_ref, costo_venta))
+        fila.perdidas_mer = money_round(to_decimal(perdidas or 0))
+        escritas += 1
+    db.flush()
+    return escritas
+
+
+def recalcular_ventas_orden(db: Session, id_orden: int) -> int:
+    """Recalcula las ventas vinculadas a una OT (p. ej. al cambiar cliente_proporciono_refacciones)."""
+    ids = [r[0] for r in db.query(Venta.id_venta).filter(Venta.id_orden == id_orden).all()]
+    return recalcular_ventas(db, ids)
+
+
+def registrar_costo_salida(db: Session, movimiento: MovimientoInventario) -> None:
+    """
+    Suma el costo de una SALIDA a la(s) venta(s) a la que se atribuye: por id_venta (mostrador)
+    o por referencia = número de OT. Ventas sin fila en el libro se recalculan completas.
+    """
+    if movimiento.tipo_movimiento != TipoMovimiento.SALIDA or not movimiento.costo_total:
+        return
+    _sumar_costo_salidas(db, movimiento.id_venta, movimiento.referencia, to_decimal(movimiento.costo_total))
+
+
+def registrar_costos_salida(db: Session, movimientos: Iterable[dict]) -> None:
+    """
+    registrar_costo_salida para un lote de movimientos (dicts con las columnas del movimiento,
+    ya insertados): una actualización por venta/OT con la suma de sus SALIDAS.
+    """
+    por_destino: dict[tuple, Decimal] = {}
+    for m in movimientos:
+        if m["tipo_movimiento"] != TipoMovimiento.SALIDA or not m["costo_total"]:
+            continue
+        destino = (m["id_venta"], None) if m["id_venta"] else (None, m["referencia"])
+        por_destino[destino] = por_destino.get(destino, Decimal("0")) + to_decimal(m["costo_total"])
+    for (id_venta, referencia), costo in por_destino.items():
+        _sumar_costo_salidas(db, id_venta, referencia, costo)
+
+
+def _sumar_costo_salidas(db: Session, id_venta: Optional[int], referencia: Optional[str], costo: Decimal) -> None:
+    q = db.query(Venta.id_venta, VentaUtilidad.id_venta).outerjoin(
+        VentaUtilidad, VentaUtilidad.id_venta == Venta.id_venta
+    )
+    if id_venta:
+        q = q.filter(Venta.id_venta == id_venta, Venta.id_orden.is_(None))
+    elif referencia:
+        q = q.join(OrdenTrabajo, OrdenTrabajo.id == Venta.id_orden).filter(
+            OrdenTrabajo.numero_orden == referencia,
+            OrdenTrabajo.cliente_proporciono_refacciones.isnot(True),
+        )
+    else:
+        return
+    filas = q.all()
+    con_libro = [id_venta for id_venta, id_libro in filas if id_libro is not None]
+    sin_libro = [id_venta for id_venta, id_libro in filas if id_libro is None]
+    if con_libro:
+        db.query(VentaUtilidad).filter(VentaUtilidad.id_venta.in_(con_libro)).update(
+            {VentaUtilidad.costo: VentaUtilidad.costo + costo},
+            synchronize_session=False,
+        )
+        for id_venta in con_libro:
+            fila = db.identity_map.get(identity_key(VentaUtilidad, id_venta))
+            if fila is not None:
+                db.expire(fila, ["costo"])
+    if sin_libro:
+        recalcular_ventas(db, sin_libro)
+
+
+def query_ventas_utilidad(db: Session, *columnas, fecha_desde=None, fecha_hasta=None) -> Query:
+    """Ventas del rango (fecha de taller) unidas a su fila del libro; sin fila = costo 0."""
+    q = db.query(*columnas).select_from(Venta).outerjoin(VentaUtilidad, VentaUtilidad.id_venta == Venta.id_venta)
+    for cond in condiciones_rango_taller(Venta.fecha, fecha_desde, fecha_hasta):
+        q = q.filter(cond)
+    return q
+
+
+def costo_venta_columna():
+    """Costo de la venta según el libro (0 si no tiene fila)."""
+    return func.coalesce(VentaUtilidad.costo, 0)
+
+
+def resumen_utilidad(db: Session, fecha_desde=None, fecha_hasta=None) -> dict[str, Decimal | int]:
+    """
+    Totales del período en una sola consulta: ingresos y costo de ventas no canceladas,
+    pérdidas por merma de las canceladas y cantidad de ventas no canceladas.
+    """
+    activa = Venta.estado != _CANCELADA
+    fila = query_ventas_utilidad(
+        db,
+        func.coalesce(func.sum(case((activa, Venta.total), else_=0)), 0),
+        func.coalesce(func.sum(case((activa, costo_venta_columna()), else_=0)), 0),
+        func.coalesce(func.sum(case((activa, 0), else_=func.coalesce(VentaUtilidad.perdidas_mer, 0))), 0),
+        func.coalesce(func.sum(case((activa, 1), else_=0)), 0),
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+    ).one()
+    return {
+        "total_ingresos": to_decimal(fila[0] or 0),
+        "total_costo": to_decimal(fila[1] or 0),
+        "perdidas_mer": to_decimal(fila[2] or 0),
+        "cantidad_ventas": int(fila[3] or 0),
+    }
@@ -7,7 +7,7 @@ import logging
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import bindparam, func, text
+from sqlalchemy import bindparam, text
 from sqlalchemy.orm import Session, joinedload
 
 from app.config import settings
@@ -17,12 +17,13 @@ from app.models.detalle_orden import DetalleRepuestoOrden
 from app.models.detalle_venta import DetalleVenta
 from app.models.movimiento_inventario import TipoMovimiento
 from app.models.orden_trabajo import OrdenTrabajo
-from app.models.pago import Pago
 from app.models.repuesto import Repuesto
 from app.models.venta import Venta
 from app.schemas.movimiento_inventario import MovimientoInventarioCreate
 from app.schemas.venta import VentaCreate, VentaUpdate
 from app.services.inventario_service import InventarioService
+from app.services.saldos_venta_service import bloquear_venta
+from app.services.utilidad_ventas_service import recalcular_ventas
 from app.utils.decimal_utils import money_round, to_decimal, to_float_money
 
 logger = logging.getLogger(__name__)
@@ -147,6 +148,7 @@ class VentasService:
             venta.total = (
                 money_round(subtotal * ivaf) if getattr(venta, "requiere_factura", False) else money_round(subtotal)
             )
+            recalcular_ventas(db, [id_venta])
             db.commit()
             return {
                 "id_venta": id_venta,
@@ -190,6 +192,7 @@ class VentasService:
             money_round(subtotal * ivaf) if getattr(venta, "requiere_factura", False) else money_round(subtotal)
         )
         venta.id_orden = None
+        recalcular_ventas(db, [id_venta])
         db.commit()
         return {
             "id_venta": id_venta,
@@ -207,7 +210,7 @@ class VentasService:
     ) -> dict:
         """Cancela una venta. productos: [{id_detalle, cantidad_reutilizable, cantidad_mer, motivo_mer}]."""
         try:
-            venta = db.query(Venta).filter(Venta.id_venta == id_venta).first()
+            venta = bloquear_venta(db, id_venta)
             if not venta:
                 raise ValueError("Venta no encontrada")
             if venta.estado == "CANCELADA":
@@ -327,6 +330,7 @@ class VentasService:
             venta.fecha_cancelacion = datetime.utcnow()
             venta.id_usuario_cancelacion = id_usuario
             db.query(ComisionDevengada).filter(ComisionDevengada.id_venta == id_venta).delete(synchronize_session=False)
+            recalcular_ventas(db, [id_venta])
             db.commit()
             return {"id_venta": id_venta, "estado": "CANCELADA"}
         except Exception:
@@ -379,22 +383,24 @@ class VentasService:
                 )
                 db.add(detalle)
             db.flush()
-            for item in data.detalles:
-                if item.tipo == "PRODUCTO":
-                    InventarioService.registrar_movimiento(
-                        db,
-                        MovimientoInventarioCreate(
-                            id_repuesto=item.id_item,
-                            tipo_movimiento=TipoMovimiento.SALIDA,
-                            cantidad=item.cantidad,
-                            precio_unitario=None,
-                            referencia=f"Venta#{venta.id_venta}",
-                            motivo="Venta manual",
-                            id_venta=venta.id_venta,
-                        ),
-                        id_usuario,
-                        autocommit=False,
+            InventarioService.registrar_movimientos_lote(
+                db,
+                [
+                    MovimientoInventarioCreate(
+                        id_repuesto=item.id_item,
+                        tipo_movimiento=TipoMovimiento.SALIDA,
+                        cantidad=item.cantidad,
+                        precio_unitario=None,
+                        referencia=f"Venta#{venta.id_venta}",
+                        motivo="Venta manual",
+                        id_venta=venta.id_venta,
                     )
+                    for item in data.detalles
+                    if item.tipo == "PRODUCTO"
+                ],
+                id_usuario,
+                autocommit=False,
+            )
             db.commit()
             db.refresh(venta)
             return {
@@ -483,6 +489,7 @@ class VentasService:
                     id_orden_origen=orden_id,
                 )
                 db.add(det)
+            recalcular_ventas(db, [venta.id_venta])
             db.commit()
             db.refresh(venta)
             return {
@@ -500,7 +507,7 @@ class VentasService:
     def actualizar_venta(db: Session, id_venta: int, data: VentaUpdate, id_usuario: int) -> dict:
         """Actualiza una venta y ajusta stock si es manual (sin id_orden)."""
         try:
-            venta = db.query(Venta).filter(Venta.id_venta == id_venta).first()
+            venta = bloquear_venta(db, id_venta)
             if not venta:
                 raise ValueError("Venta no encontrada")
             if venta.estado == "CANCELADA":
@@ -508,9 +515,7 @@ class VentasService:
             if not data.detalles or len(data.detalles) == 0:
                 raise ValueError("La venta debe tener al menos un detalle")
 
-            total_pagado = to_float_money(
-                db.query(func.coalesce(func.sum(Pago.monto), 0)).filter(Pago.id_venta == id_venta).scalar() or 0
-            )
+            total_pagado = to_float_money(venta.total_pagado or 0)
             subtotal = sum(to_decimal(item.cantidad) * to_decimal(item.precio_unitario) for item in data.detalles)
             ivaf = to_decimal(settings.IVA_FACTOR)
             total_nuevo = money_round(subtotal * ivaf) if data.requiere_factura else money_round(subtotal)
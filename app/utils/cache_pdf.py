@@ -0,0 +1,206 @@
+"""
+Caché en disco de PDFs generados (cotización OT, hoja técnico, cotización de refacción).
+
+ReportLab rearma el documento en cada descarga aunque la orden no haya cambiado. Esta caché
+guarda el PDF bajo una clave que es el hash (sha256) de:
+
+- el tipo de documento y la versión de su plantilla (subirla al cambiar el layout),
+- el nombre de la app impreso en el encabezado,
+- los datos serializados que alimentan el render.
+
+Si cambia cualquier dato de la orden cambia la clave: no hay invalidación explícita y las
+entradas viejas simplemente dejan de pedirse hasta que el desalojo LRU las borra. El tamaño
+total del directorio se acota con PDF_CACHE_MAX_MB (0 = sin caché en disco); el acierto
+actualiza el mtime del archivo y el desalojo borra por mtime más antiguo.
+
+La misma clave es el ETag de la respuesta: con If-None-Match coincidente se responde 304
+sin leer disco ni generar. El directorio puede compartirse entre workers (escritura atómica
+con archivo temporal + os.replace; los borrados concurrentes se toleran).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE_PDF = "application/pdf"
+# El navegador guarda el PDF pero revalida siempre (ETag): nunca muestra una versión vieja
+CACHE_CONTROL_PDF = "private, no-cache"
+_EXTENSION = ".pdf"
+
+
+def clave_pdf(tipo: str, version_plantilla: str, app_name: str, datos: Any) -> str:
+    """Hash hex estable del documento: mismo tipo/plantilla/app/datos → misma clave."""
+    contenido = json.dumps(
+        {"tipo": tipo, "version": version_plantilla, "app": app_name, "datos": datos},
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EstadisticasCachePdf:
+    hits: int = 0
+    misses: int = 0
+    desalojos: int = 0
+    errores_escritura: int = 0
+
+    def a_dict(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "desalojos": self.desalojos,
+            "errores_escritura": self.errores_escritura,
+            "tasa_aciertos": round(self.hits / consultas, 4) if consultas else 0.0,
+        }
+
+
+class CachePdf:
+    """Directorio clave → <clave>.pdf con desalojo LRU por tamaño total. Seguro entre hilos."""
+
+    def __init__(self, directorio: Path | str, max_bytes: int):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.estadisticas = EstadisticasCachePdf()
+        self._lock = threading.Lock()
+
+    @property
+    def activa(self) -> bool:
+        return self.max_bytes > 0
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / f"{clave}{_EXTENSION}"
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        """PDF cacheado o None (cuenta hit/miss). El acierto lo marca como usado recientemente."""
+        if not self.activa:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            contenido = ruta.read_bytes()
+            os.utime(ruta)
+        except OSError:
+            with self._lock:
+                self.estadisticas.misses += 1
+            return None
+        with self._lock:
+            self.estadisticas.hits += 1
+        return contenido
+
+    def guardar(self, clave: str, contenido: bytes) -> None:
+        """Escribe el PDF de forma atómica y desaloja lo más antiguo si se excede el tamaño."""
+        if not self.activa or len(contenido) > self.max_bytes:
+            return
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix=f".{clave[:16]}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(contenido)
+                os.replace(tmp, self._ruta(clave))
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        except OSError:
+            logger.warning("No se pudo escribir PDF en caché %s", self.directorio, exc_info=True)
+            with self._lock:
+                self.estadisticas.errores_escritura += 1
+            return
+        self._desalojar()
+
+    def _desalojar(self) -> None:
+        """Borra los PDFs con mtime más antiguo hasta quedar dentro de max_bytes."""
+        with self._lock:
+            entradas = []
+            total = 0
+            try:
+                with os.scandir(self.directorio) as it:
+                    for e in it:
+                        if not e.name.endswith(_EXTENSION):
+                            continue
+                        try:
+                            st = e.stat()
+                        except FileNotFoundError:
+                            continue
+                        entradas.append((st.st_mtime, st.st_size, e.path))
+                        total += st.st_size
+            except OSError:
+                return
+            if total <= self.max_bytes:
+                return
+            entradas.sort()
+            for _, tamano, ruta in entradas:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(ruta)
+                except FileNotFoundError:
+                    pass
+                total -= tamano
+                self.estadisticas.desalojos += 1
+
+    def obtener_o_generar(self, clave: str, generar: Callable[[], bytes]) -> bytes:
+        """PDF de la caché o recién generado (y guardado)."""
+        contenido = self.obtener(clave)
+        if contenido is None:
+            contenido = generar()
+            self.guardar(clave, contenido)
+        return contenido
+
+    def limpiar(self) -> None:
+        """Borra todos los PDFs cacheados."""
+        with self._lock:
+            for ruta in self.directorio.glob(f"*{_EXTENSION}"):
+                ruta.unlink(missing_ok=True)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "activa": self.activa,
+                "directorio": str(self.directorio),
+                "max_bytes": self.max_bytes,
+                **self.estadisticas.a_dict(),
+            }
+
+
+cache_pdf = CachePdf(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def respuesta_pdf(request: Request, clave: str, generar: Callable[[], bytes], content_disposition: str) -> Response:
+    """
+    Respuesta PDF con ETag = clave. 304 si el cliente ya tiene esa versión; si no, PDF desde
+    la caché en disco o generado con `generar()` (solo se llama en un miss).
+    """
+    etag = f'"{clave}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL_PDF}
+    if _etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    contenido = cache_pdf.obtener_o_generar(clave, generar)
+    headers["Content-Disposition"] = content_disposition
+    return Response(content=contenido, media_type=MEDIA_TYPE_PDF, headers=headers)
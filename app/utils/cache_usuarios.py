@@ -0,0 +1,167 @@
+"""
+Caché en proceso de usuarios autenticados (get_current_user).
+
+Cada request autenticado resolvía el usuario del JWT con un SELECT a usuarios. Esta caché
+guarda, por id_usuario, una copia de las columnas del usuario con TTL y tamaño acotado (LRU):
+
+- en un acierto el usuario se adjunta a la sesión del request con merge(load=False), sin SELECT;
+- el router de usuarios invalida explícitamente al crear/editar (rol, activo, contraseña);
+- además, cualquier flush que inserte/modifique/borre un Usuario invalida su id, y el commit
+  vuelve a invalidar (evita que otro request re-cachee la fila previa entre flush y commit);
+  un UPDATE/DELETE masivo sobre usuarios vacía la caché;
+- AUTH_CACHE_TTL_SEGUNDOS=0 la desactiva.
+
+La caché es por proceso: con varios workers, un cambio hecho en otro worker se ve a más
+tardar al vencer el TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models.usuario import Usuario
+
+CLAVE_INFO = "usuarios_por_invalidar"
+
+
+@dataclass
+class EstadisticasCacheUsuarios:
+    hits: int = 0
+    misses: int = 0
+    expirados: int = 0
+    invalidaciones: int = 0
+
+    def a_dict(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirados": self.expirados,
+            "invalidaciones": self.invalidaciones,
+            "tasa_aciertos": round(self.hits / consultas, 4) if consultas else 0.0,
+        }
+
+
+class CacheUsuarios:
+    """Mapa id_usuario → (vence_en, columnas) con TTL y desalojo LRU. Seguro entre hilos."""
+
+    def __init__(self, ttl_segundos: int, max_usuarios: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_usuarios = max_usuarios
+        self.estadisticas = EstadisticasCacheUsuarios()
+        self._datos: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Sube con cada invalidación; guardar() descarta lecturas hechas antes de la última
+        self.generacion = 0
+
+    @property
+    def activa(self) -> bool:
+        return self.ttl_segundos > 0 and self.max_usuarios > 0
+
+    def obtener(self, id_usuario: int) -> Optional[dict]:
+        """Columnas cacheadas del usuario o None (cuenta hit/miss)."""
+        if not self.activa:
+            return None
+        with self._lock:
+            entrada = self._datos.get(id_usuario)
+            if entrada is not None and entrada[0] <= time.monotonic():
+                del self._datos[id_usuario]
+                self.estadisticas.expirados += 1
+                entrada = None
+            if entrada is None:
+                self.estadisticas.misses += 1
+                return None
+            self._datos.move_to_end(id_usuario)
+            self.estadisticas.hits += 1
+            return entrada[1]
+
+    def guardar(self, usuario: Usuario, generacion: int) -> None:
+        """Cachea el usuario leído de BD; `generacion` es la vigente antes de leerlo."""
+        if not self.activa:
+            return
+        columnas = {attr.key: getattr(usuario, attr.key) for attr in inspect(Usuario).column_attrs}
+        with self._lock:
+            if generacion != self.generacion:
+                return
+            self._datos[usuario.id_usuario] = (time.monotonic() + self.ttl_segundos, columnas)
+            self._datos.move_to_end(usuario.id_usuario)
+            while len(self._datos) > self.max_usuarios:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, id_usuario: Optional[int] = None) -> None:
+        """Descarta un usuario (o todos si id_usuario es None)."""
+        with self._lock:
+            if id_usuario is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(id_usuario, None)
+            self.generacion += 1
+            self.estadisticas.invalidaciones += 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "activa": self.activa,
+                "ttl_segundos": self.ttl_segundos,
+                "max_usuarios": self.max_usuarios,
+                "usuarios_en_cache": len(self._datos),
+                **self.estadisticas.a_dict(),
+            }
+
+
+cache_usuarios = CacheUsuarios(settings.AUTH_CACHE_TTL_SEGUNDOS, settings.AUTH_CACHE_MAX_USUARIOS)
+
+
+def usuario_desde_cache(db: Session, id_usuario: int) -> Optional[Usuario]:
+    """Usuario adjunto a `db` a partir de la caché, sin SELECT. None si no está cacheado."""
+    columnas = cache_usuarios.obtener(id_usuario)
+    if columnas is None:
+        return None
+    copia = Usuario(**columnas)
+    make_transient_to_detached(copia)
+    return db.merge(copia, load=False)
+
+
+def invalidar_usuario(id_usuario: Optional[int] = None) -> None:
+    cache_usuarios.invalidar(id_usuario)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_tras_flush(session: Session, flush_context) -> None:
+    ids = {
+        obj.id_usuario
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Usuario) and obj.id_usuario is not None
+    }
+    if not ids:
+        return
+    for id_usuario in ids:
+        cache_usuarios.invalidar(id_usuario)
+    session.info.setdefault(CLAVE_INFO, set()).update(ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidar_tras_update_delete(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(m.class_ is Usuario for m in orm_execute_state.all_mappers):
+        cache_usuarios.invalidar()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(session: Session) -> None:
+    for id_usuario in session.info.pop(CLAVE_INFO, ()):
+        cache_usuarios.invalidar(id_usuario)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session) -> None:
+    session.info.pop(CLAVE_INFO, None)
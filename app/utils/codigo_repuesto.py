@@ -0,0 +1,22 @@
+"""
+Normalización de códigos de repuesto para búsquedas exactas por índice.
+
+El código capturado se guarda tal cual en repuestos.codigo; la forma normalizada
+(mayúsculas, sin espacios) vive en repuestos.codigo_normalizado, indexada, y es la que se
+usa para resolver códigos que llegan de archivos de proveedor. Un repuesto eliminado
+(soft delete) renombra su código a «CODIGO_ELIM_<id>»; su forma normalizada conserva el
+código original para poder informar «eliminado» en lugar de «no encontrado».
+"""
+
+import re
+
+_ESPACIOS = re.compile(r"\s+")
+_SUFIJO_ELIMINADO = re.compile(r"_ELIM_\d+$")
+
+
+def normalizar_codigo_repuesto(codigo: str | None) -> str:
+    """Código en mayúsculas, sin espacios y sin el sufijo _ELIM_<id> del soft delete."""
+    if not codigo:
+        return ""
+    limpio = _ESPACIOS.sub("", str(codigo)).upper()
+    return _SUFIJO_ELIMINADO.sub("", limpio)
@@ -0,0 +1,55 @@
+"""
+Cliente HTTP compartido y resultado de envío para los transportes de notificaciones
+(Microsoft Graph, WhatsApp Cloud API).
+
+Un solo httpx.Client por proceso: las conexiones TLS a cada proveedor se reutilizan entre envíos
+en lugar de abrir una por mensaje. httpx.Client es seguro entre hilos.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+_cliente: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ResultadoEnvio:
+    """ok; si no, el error y si vale la pena reintentar (red, 429, 5xx) o es definitivo."""
+
+    ok: bool
+    error: Optional[str] = None
+    reintentable: bool = False
+
+
+ENVIADO = ResultadoEnvio(True)
+
+
+def cliente_http() -> httpx.Client:
+    global _cliente
+    with _lock:
+        if _cliente is None or _cliente.is_closed:
+            _cliente = httpx.Client(
+                timeout=settings.NOTIFICACIONES_TIMEOUT_S,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return _cliente
+
+
+def cerrar_cliente_http() -> None:
+    global _cliente
+    with _lock:
+        if _cliente is not None:
+            _cliente.close()
+            _cliente = None
+
+
+def status_reintentable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from app.config import settings
 from app.database import get_db
 from app.models.usuario import Usuario
+from app.utils.cache_usuarios import cache_usuarios, usuario_desde_cache
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -41,19 +42,13 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Usuario:
+def obtener_payload_token(token: str = Depends(oauth2_scheme)) -> dict:
     """
-    Obtiene el usuario autenticado desde el JWT
-
-    Args:
-        token: Token JWT del header Authorization
-        db: Sesión de base de datos
-
-    Returns:
-        Usuario autenticado
+    Decodifica y valida el JWT del header Authorization.
+    FastAPI la resuelve una vez por request aunque la usen get_current_user y require_roles.
 
     Raises:
-        HTTPException: Si el token es inválido o el usuario no existe
+        HTTPException: Si el token es inválido, expiró o no trae 'sub'
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,24 +57,50 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     try:
-        # Decodificar token
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-
-        if user_id is None:
-            logger.warning("Token sin campo 'sub'")
-            raise credentials_exception
-
     except JWTError as e:
         logger.error(f"Error al decodificar JWT: {str(e)}")
         raise credentials_exception
 
-    # Buscar usuario en base de datos
-    usuario = db.query(Usuario).filter(Usuario.id_usuario == int(user_id)).first()
-
-    if not usuario:
-        logger.warning(f"Usuario no encontrado: {user_id}")
+    if payload.get("sub") is None:
+        logger.warning("Token sin campo 'sub'")
         raise credentials_exception
+    return payload
+
+
+def get_current_user(payload: dict = Depends(obtener_payload_token), db: Session = Depends(get_db)) -> Usuario:
+    """
+    Obtiene el usuario autenticado desde el JWT
+
+    Primero busca en la caché en proceso (app/utils/cache_usuarios.py); si no está,
+    consulta la base de datos y la cachea.
+
+    Args:
+        payload: Claims del token ya validado
+        db: Sesión de base de datos
+
+    Returns:
+        Usuario autenticado
+
+    Raises:
+        HTTPException: Si el token es inválido o el usuario no existe
+    """
+    user_id = int(payload["sub"])
+
+    usuario = usuario_desde_cache(db, user_id)
+    if usuario is None:
+        generacion = cache_usuarios.generacion
+        # Buscar usuario en base de datos
+        usuario = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+
+        if not usuario:
+            logger.warning(f"Usuario no encontrado: {user_id}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        cache_usuarios.guardar(usuario, generacion)
 
     if not usuario.activo:
         logger.warning(f"Usuario inactivo intentó autenticarse: {user_id}")
@@ -0,0 +1,166 @@
+"""
+Paginación de listados: skip/limit (compatibilidad) o keyset con ?cursor= (opt-in).
+
+Ambos modos comparten el mismo esquema de consultas:
+- Total: COUNT sobre una subconsulta que solo selecciona el id (sin joinedload ni ORDER BY).
+  En modo cursor se calcula solo en la primera página (cursor vacío); las siguientes
+  devuelven total=None.
+- Página: se seleccionan solo las columnas de orden + id; los objetos completos (con sus
+  joinedload) se cargan después con un IN sobre los ids de la página.
+
+Modo cursor: el cliente pide ?cursor= (vacío) para la primera página y reenvía
+siguiente_cursor para las demás. El cursor codifica los valores de orden de la última fila
+devuelta, así que el costo no crece con la profundidad (sin OFFSET). El último elemento del
+orden debe ser la clave primaria (desempate único). Las columnas de orden pueden admitir NULL
+(p. ej. fechas de filas antiguas): el filtro del cursor trata NULL como el menor valor, igual que
+el ORDER BY de MySQL (primero en ASC, al final en DESC), para que esas filas no se pierdan.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, false, func, or_
+from sqlalchemy.orm import Query
+
+
+@dataclass
+class Pagina:
+    items: list
+    total: Optional[int]
+    siguiente_cursor: Optional[str] = None
+
+    def respuesta(self, clave: str, skip: int, limit: int, cursor: Optional[str], items: Optional[list] = None) -> dict:
+        """
+        Cuerpo de respuesta con los campos de paginación de siempre (+ siguiente_cursor en modo cursor).
+        `items` reemplaza a self.items en el cuerpo cuando el endpoint serializa las filas a mano.
+        """
+        items = self.items if items is None else items
+        if cursor is not None:
+            return {clave: items, "total": self.total, "siguiente_cursor": self.siguiente_cursor, "limit": limit}
+        return {
+            clave: items,
+            "total": self.total,
+            "pagina": skip // limit + 1 if limit > 0 else 1,
+            "total_paginas": (self.total + limit - 1) // limit if limit > 0 else 1,
+            "limit": limit,
+        }
+
+
+def _a_json(valor: Any) -> list:
+    if isinstance(valor, datetime):
+        return ["dt", valor.isoformat()]
+    if isinstance(valor, date):
+        return ["d", valor.isoformat()]
+    if isinstance(valor, Decimal):
+        return ["n", str(valor)]
+    if hasattr(valor, "value"):  # Enum
+        return ["v", valor.value]
+    return ["v", valor]
+
+
+def _de_json(par: list) -> Any:
+    tipo, valor = par
+    if tipo == "dt":
+        return datetime.fromisoformat(valor)
+    if tipo == "d":
+        return date.fromisoformat(valor)
+    if tipo == "n":
+        return Decimal(valor)
+    return valor
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    datos = json.dumps([_a_json(v) for v in valores], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, n_columnas: int) -> list:
+    """Valores de orden del cursor; HTTP 400 si no es un cursor válido para este listado."""
+    try:
+        datos = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = [_de_json(par) for par in json.loads(datos)]
+    except (binascii.Error, ValueError, TypeError):
+        valores = None
+    if valores is None or len(valores) != n_columnas:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido")
+    return valores
+
+
+def _admite_nulos(columna) -> bool:
+    return getattr(getattr(columna, "expression", columna), "nullable", True)
+
+
+def _siguiente(columna, valor, descendente: bool):
+    """Condición «columna va después de valor» en el orden dado, con NULL como el menor valor."""
+    if valor is None:
+        return false() if descendente else columna.is_not(None)
+    if descendente:
+        return or_(columna < valor, columna.is_(None)) if _admite_nulos(columna) else columna < valor
+    return columna > valor
+
+
+def _despues_de(orden: Sequence[tuple[Any, bool]], valores: Sequence[Any]):
+    """(a, b, id) > (va, vb, vid) respetando la dirección de cada columna, en forma expandida."""
+    condiciones = []
+    for i, (columna, descendente) in enumerate(orden):
+        iguales = [c == v for (c, _), v in zip(orden[:i], valores[:i])]  # == None genera IS NULL
+        condiciones.append(and_(*iguales, _siguiente(columna, valores[i], descendente)))
+    return or_(*condiciones)
+
+
+def contar(query: Query, clave) -> int:
+    """COUNT(*) sobre la consulta reducida al id (sin eager loads ni ORDER BY)."""
+    ids = query.with_entities(clave).order_by(None).subquery()
+    return query.session.query(func.count()).select_from(ids).scalar() or 0
+
+
+def paginar(
+    query: Query,
+    orden: Sequence[tuple[Any, bool]],
+    *,
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    opciones: Sequence[Any] = (),
+    con_total: bool = True,
+) -> Pagina:
+    """
+    Pagina `query` (entidad ORM + filtros, sin options) por `orden`: [(columna, descendente), ..., (pk, desc)].
+    cursor=None usa skip/limit; cursor="" o un siguiente_cursor usan keyset. `opciones` (joinedload,
+    selectinload…) se aplican solo a la carga de los objetos de la página. con_total=False omite el
+    COUNT cuando el llamador ya conoce el total (p. ej. el resumen del historial).
+    """
+    entidad = query.column_descriptions[0]["entity"]
+    columnas = [c for c, _ in orden]
+    clave = columnas[-1]
+
+    total = contar(query, clave) if con_total and not cursor else None
+    claves = query.with_entities(*columnas)
+    if cursor:
+        claves = claves.filter(_despues_de(orden, decodificar_cursor(cursor, len(orden))))
+    claves = claves.order_by(*(c.desc() if descendente else c.asc() for c, descendente in orden))
+    if cursor is None:
+        filas = claves.offset(skip).limit(limit).all()
+        hay_mas = False
+    else:
+        filas = claves.limit(limit + 1).all()
+        hay_mas = len(filas) > limit
+        filas = filas[:limit]
+
+    ids = [f[-1] for f in filas]
+    items = []
+    if ids:
+        por_id = {
+            getattr(o, clave.key): o for o in query.session.query(entidad).options(*opciones).filter(clave.in_(ids))
+        }
+        items = [por_id[i] for i in ids]
+    siguiente = codificar_cursor(filas[-1]) if hay_mas else None
+    return Pagina(items=items, total=total, siguiente_cursor=siguiente)
@@ -0,0 +1,113 @@
+"""
+Utilidades de layout para los PDF generados con ReportLab.
+
+- Medición de texto memoizada: las fuentes estándar (Helvetica, Times…) no tienen kerning, así
+  que el ancho de una línea es la suma de los anchos de sus palabras más los espacios. Cada
+  (token, fuente, tamaño) se mide una sola vez por proceso en lugar de volver a medir la línea
+  completa por cada palabra agregada.
+- CanvasTotalPaginasDiferido: permite imprimir «Página X de Y» en una sola pasada. Cada página
+  cerrada se guarda (su stream de operaciones, no se rasteriza) y el pie con el total se dibuja
+  en save(), cuando ya se conoce Y. Sustituye al render doble (contar páginas y volver a generar).
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# Caracteres usados como último recurso para partir una palabra sin medir (comportamiento previo)
+_CORTE_FORZADO = 25
+
+
+@lru_cache(maxsize=16384)
+def ancho_texto(texto: str, font: str, size: float) -> float:
+    """stringWidth memoizado por (texto, fuente, tamaño)."""
+    return stringWidth(texto, font, size)
+
+
+def _partir_palabra(palabra: str, max_width: float, font: str, size: float) -> list[str]:
+    """Parte una palabra más ancha que max_width en trozos que sí caben (prefijo más largo)."""
+    trozos = []
+    while palabra:
+        acumulado = 0.0
+        k = 0
+        for c in palabra:
+            acumulado += ancho_texto(c, font, size)
+            if acumulado > max_width:
+                break
+            k += 1
+        if k == 0:
+            trozos.append(palabra[:_CORTE_FORZADO])
+            palabra = palabra[_CORTE_FORZADO:]
+        else:
+            trozos.append(palabra[:k])
+            palabra = palabra[k:]
+    return trozos
+
+
+def partir_lineas(text, max_width: float, font: str = "Helvetica", size: float = 9) -> list[str]:
+    """Divide texto en líneas que caben en max_width (mismo criterio que el wrap palabra a palabra)."""
+    if not text or not str(text).strip():
+        return [""]
+    espacio = ancho_texto(" ", font, size)
+    lines: list[str] = []
+    current: list[str] = []
+    ancho_actual = 0.0
+    for w in str(text).split():
+        ancho_w = ancho_texto(w, font, size)
+        if current and ancho_actual + espacio + ancho_w <= max_width:
+            current.append(w)
+            ancho_actual += espacio + ancho_w
+            continue
+        if not current and ancho_w <= max_width:
+            current = [w]
+            ancho_actual = ancho_w
+            continue
+        if current:
+            lines.append(" ".join(current))
+        current = []
+        ancho_actual = 0.0
+        if ancho_w <= max_width:
+            current = [w]
+            ancho_actual = ancho_w
+        else:
+            lines.extend(_partir_palabra(w, max_width, font, size))
+    if current:
+        lines.append(" ".join(current))
+    return lines if lines else [""]
+
+
+class CanvasTotalPaginasDiferido(canvas.Canvas, ABC):
+    """
+    Canvas que difiere el cierre de páginas hasta save() para conocer el total.
+
+    Las subclases implementan dibujar_pie(pagina, total), que se llama sobre cada página justo
+    antes de emitirla (mismo orden de dibujo que un showPage normal).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._paginas_diferidas: list[dict] = []
+
+    def showPage(self):
+        self._paginas_diferidas.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        if self._code:
+            self._paginas_diferidas.append(dict(self.__dict__))
+        paginas = self._paginas_diferidas
+        self._paginas_diferidas = []
+        total = len(paginas)
+        for estado in paginas:
+            self.__dict__.update(estado)
+            self.dibujar_pie(self._pageNumber, total)
+            canvas.Canvas.showPage(self)
+        canvas.Canvas.save(self)
+
+    @abstractmethod
+    def dibujar_pie(self, pagina: int, total: int) -> None:
+        """Dibuja el pie de la página `pagina` de `total`."""
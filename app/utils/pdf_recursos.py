@@ -0,0 +1,128 @@
+"""
+Recursos compartidos por los PDF de ReportLab (ticket, cotización OT, hoja del técnico,
+cotización de refacción): logo, fuentes y colores.
+
+Antes cada render resolvía la ruta del logo, llamaba exists() y pasaba la ruta a drawImage:
+ReportLab volvía a decodificar el PNG y a comprimir (zlib) sus píxeles en cada documento, y los
+HexColor se reconstruían en cada llamada. Aquí:
+
+- imagen_pdf(ruta, mask) decodifica la imagen una sola vez por proceso (ImageReader) y arma una
+  plantilla del XObject ya comprimido; dibujar_imagen() registra una copia superficial en el
+  documento (los bytes comprimidos se comparten, solo lectura) y emite el mismo operador que
+  Canvas.drawImage. El PDF resultante es idéntico byte a byte al de drawImage(ImageReader).
+- precargar_recursos_pdf() (lifespan de la app) carga el logo y las métricas de las fuentes
+  usadas para que la primera descarga no pague ese costo.
+- Colores de uso común como constantes de módulo.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from reportlab.lib.colors import HexColor
+from reportlab.lib.utils import ImageReader, _digester
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfdoc import PDFImageXObject, PDFObjectReference
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = Path(__file__).resolve().parent.parent.parent / "static" / "logo_medina_autodiag.png"
+
+# Fuentes estándar (Type 1, sin archivo) que usan los generadores
+FUENTES = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique")
+
+NEGRO = HexColor("#000000")
+BLANCO = HexColor("#ffffff")
+GRIS_PIZARRA = HexColor("#64748b")  # leyendas y pies de página
+GRIS_SUAVE = HexColor("#9ca3af")
+GRIS_LINEA = HexColor("#cccccc")
+GRIS_FONDO = HexColor("#fafafa")
+GRIS_BORDE_CLARO = HexColor("#e5e7eb")
+
+
+@dataclass(frozen=True)
+class ImagenPdf:
+    """Imagen decodificada y su XObject comprimido, listos para insertarse en cualquier documento."""
+
+    lector: ImageReader
+    nombre: str  # firma que usaría drawImage (contenido + máscara)
+    plantilla: PDFImageXObject
+
+
+@lru_cache(maxsize=16)
+def imagen_pdf(ruta: str, mask: Optional[str] = None) -> Optional[ImagenPdf]:
+    """ImagenPdf de `ruta` con la máscara de drawImage (None o "auto"); None si no existe o no se puede leer."""
+    if not Path(ruta).is_file():
+        logger.warning("Imagen para PDF no encontrada: %s", ruta)
+        return None
+    try:
+        lector = ImageReader(ruta)
+        datos = lector.getRGBData()
+    except Exception as e:
+        logger.warning("No se pudo leer la imagen para PDF %s: %s", ruta, e)
+        return None
+    alfa = lector._dataA
+    firma_mascara = alfa.getRGBData() if mask == "auto" and alfa else str(mask).encode("utf-8")
+    nombre = _digester(datos + firma_mascara)
+    plantilla = PDFImageXObject(nombre, lector, mask=mask)
+    plantilla.name = nombre
+    return ImagenPdf(lector=lector, nombre=nombre, plantilla=plantilla)
+
+
+def logo(mask: Optional[str] = None) -> Optional[ImagenPdf]:
+    return imagen_pdf(str(LOGO_PATH), mask)
+
+
+def dibujar_imagen(p: canvas.Canvas, imagen: ImagenPdf, x: float, y: float, width: float, height: float) -> None:
+    """
+    Equivale a p.drawImage(imagen.lector, x, y, width, height, mask=...) sin volver a comprimir la imagen.
+    Reproduce el registro del XObject de Canvas.drawImage (reportlab 4.x); test_pdf_recursos compara
+    ambos PDFs byte a byte para detectar cambios de ReportLab.
+    """
+    doc = p._doc
+    nombre_reg = doc.getXObjectName(imagen.nombre)
+    if nombre_reg not in doc.idToObject:
+        obj = copy.copy(imagen.plantilla)
+        p._setXObjects(obj)
+        doc.Reference(obj, nombre_reg)
+        doc.addForm(imagen.nombre, obj)
+        smask = getattr(obj, "_smask", None)
+        if smask is not None:
+            mascara_reg = doc.getXObjectName(smask.name)
+            if mascara_reg not in doc.idToObject:
+                smask = copy.copy(smask)
+                p._setXObjects(smask)
+                obj.smask = doc.Reference(smask, mascara_reg)
+            else:
+                obj.smask = PDFObjectReference(mascara_reg)
+            del obj._smask
+    p._currentPageHasImages = 1
+    p.saveState()
+    p.translate(x, y)
+    p.scale(width, height)
+    p._code.append(f"/{nombre_reg} Do")
+    p.restoreState()
+    p._formsinuse.append(imagen.nombre)
+
+
+def dibujar_logo(p: canvas.Canvas, x: float, y: float, width: float, height: float, mask: Optional[str] = None) -> bool:
+    """Dibuja el logo del taller; False (sin dibujar) si el archivo no está disponible."""
+    imagen = logo(mask)
+    if imagen is None:
+        return False
+    dibujar_imagen(p, imagen, x, y, width, height)
+    return True
+
+
+def precargar_recursos_pdf() -> None:
+    """Carga métricas de fuentes y el logo (con y sin máscara) antes de la primera descarga."""
+    for fuente in FUENTES:
+        pdfmetrics.getFont(fuente)
+    for mask in (None, "auto"):
+        logo(mask)
@@ -93,7 +93,7 @@ export default function Caja() {
 
   const efectivoIngresos = corte?.totales_por_metodo?.find((m) => m.metodo === 'EFECTIVO')?.total ?? 0
   const efectivoEsperado = turno?.estado === 'ABIERTO' && corte
-    ? (Number(turno.monto_apertura) || 0) + efectivoIngresos - (corte.total_pagos_proveedores || 0) - (corte.total_gastos || 0)
+    ? (corte.efectivo_esperado ?? (Number(turno.monto_apertura) || 0) + efectivoIngresos - (corte.total_pagos_proveedores || 0) - (corte.total_gastos || 0))
     : null
 
   const abrirTurno = async (e) => {
@@ -108,6 +108,25 @@ export default function Clientes() {
     }
   }
 
+  const cargarMasHistorial = async (seccion) => {
+    const cursor = historialData?.paginacion?.[seccion]?.siguiente_cursor
+    if (!cursor) return
+    try {
+      const res = await api.get(`/clientes/${historialData.cliente.id_cliente}/historial/${seccion}`, { params: { cursor } })
+      setHistorialData((prev) => ({
+        ...prev,
+        [seccion]: [...(prev[seccion] ?? []), ...(res.data[seccion] ?? [])],
+        paginacion: { ...prev.paginacion, [seccion]: { ...prev.paginacion[seccion], siguiente_cursor: res.data.siguiente_cursor } },
+      }))
+    } catch (err) {
+      showError(normalizeDetail(err.response?.data?.detail) || 'Error al cargar historial')
+    }
+  }
+
+  const botonCargarMas = (seccion) => historialData?.paginacion?.[seccion]?.siguiente_cursor ? (
+    <button type="button" onClick={() => cargarMasHistorial(seccion)} className="mt-2 text-sm text-primary-600 hover:text-primary-700 touch-manipulation">Cargar más</button>
+  ) : null
+
   const abrirAgregarVehiculo = (c) => {
     setClienteParaVehiculo(c)
     setFormVehiculo({ marca: '', modelo: '', anio: new Date().getFullYear(), color: '', numero_serie: '', motor: '' })
@@ -121,7 +140,7 @@ export default function Clientes() {
     setErrorEliminar('')
     setModalEliminar(true)
     try {
-      const res = await api.get(`/clientes/${c.id_cliente}/historial`)
+      const res = await api.get(`/clientes/${c.id_cliente}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       setErrorEliminar(normalizeDetail(err.response?.data?.detail) || 'Error al cargar datos')
@@ -138,7 +157,7 @@ export default function Clientes() {
     setProcesandoOrdenId(orden.id)
     try {
       await api.post(`/ordenes-trabajo/${orden.id}/cancelar`, null, { params: { motivo: motivo.trim() } })
-      const res = await api.get(`/clientes/${clienteAEliminar.id_cliente}/historial`)
+      const res = await api.get(`/clientes/${clienteAEliminar.id_cliente}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       showError(normalizeDetail(err.response?.data?.detail) || 'Error al cancelar')
@@ -153,7 +172,7 @@ export default function Clientes() {
     setProcesandoOrdenId(orden.id)
     try {
       await api.delete(`/ordenes-trabajo/${orden.id}`)
-      const res = await api.get(`/clientes/${clienteAEliminar.id_cliente}/historial`)
+      const res = await api.get(`/clientes/${clienteAEliminar.id_cliente}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       showError(normalizeDetail(err.response?.data?.detail) || 'Error al eliminar orden')
@@ -346,13 +365,15 @@ export default function Clientes() {
               <div className="grid grid-cols-2 sm:grid-cols-3 md:grid-cols-5 gap-2 text-sm">
                 <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Ventas:</span> {historialData.resumen?.cantidad_ventas ?? 0}</div>
                 <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Total $:</span> ${(Number(historialData.resumen?.total_ventas) || 0).toFixed(2)}</div>
+                <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Pagado $:</span> ${(Number(historialData.resumen?.total_pagado) || 0).toFixed(2)}</div>
+                <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Saldo $:</span> ${(Number(historialData.resumen?.saldo_pendiente) || 0).toFixed(2)}</div>
                 <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Órdenes:</span> {historialData.resumen?.cantidad_ordenes ?? 0}</div>
                 <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Citas:</span> {historialData.resumen?.cantidad_citas ?? 0}</div>
                 <div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Vehículos:</span> {historialData.resumen?.cantidad_vehiculos ?? 0}</div>
               </div>
             </div>
             <div>
-              <h3 className="text-sm font-semibold text-slate-700 mb-2">Vehículos ({historialData.vehiculos?.length ?? 0})</h3>
+              <h3 className="text-sm font-semibold text-slate-700 mb-2">Vehículos ({historialData.resumen?.cantidad_vehiculos ?? historialData.vehiculos?.length ?? 0})</h3>
               {(historialData.vehiculos?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin vehículos</p> : (
                 <div className="overflow-x-auto">
                   <table className="min-w-full text-sm">
@@ -365,9 +386,10 @@ export default function Clientes() {
                   </table>
                 </div>
               )}
+              {botonCargarMas('vehiculos')}
             </div>
             <div>
-              <h3 className="text-sm font-semibold text-slate-700 mb-2">Ventas ({historialData.ventas?.length ?? 0})</h3>
+              <h3 className="text-sm font-semibold text-slate-700 mb-2">Ventas ({historialData.resumen?.cantidad_ventas ?? historialData.ventas?.length ?? 0})</h3>
               {(historialData.ventas?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin ventas</p> : (
                 <div className="overflow-x-auto">
                   <table className="min-w-full text-sm">
@@ -380,9 +402,10 @@ export default function Clientes() {
                   </table>
                 </div>
               )}
+              {botonCargarMas('ventas')}
             </div>
             <div>
-              <h3 className="text-sm font-semibold text-slate-700 mb-2">Órdenes de trabajo ({historialData.ordenes_trabajo?.length ?? 0})</h3>
+              <h3 className="text-sm font-semibold text-slate-700 mb-2">Órdenes de trabajo ({historialData.resumen?.cantidad_ordenes ?? historialData.ordenes_trabajo?.length ?? 0})</h3>
               {(historialData.ordenes_trabajo?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin órdenes</p> : (
                 <div className="overflow-x-auto">
                   <table className="min-w-full text-sm">
@@ -395,9 +418,10 @@ export default function Clientes() {
                   </table>
                 </div>
               )}
+              {botonCargarMas('ordenes_trabajo')}
             </div>
             <div>
-              <h3 className="text-sm font-semibold text-slate-700 mb-2">Citas ({historialData.citas?.length ?? 0})</h3>
+              <h3 className="text-sm font-semibold text-slate-700 mb-2">Citas ({historialData.resumen?.cantidad_citas ?? historialData.citas?.length ?? 0})</h3>
               {(historialData.citas?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin citas</p> : (
                 <div className="overflow-x-auto">
                   <table className="min-w-full text-sm">
@@ -410,6 +434,7 @@ export default function Clientes() {
                   </table>
                 </div>
               )}
+              {botonCargarMas('citas')}
             </div>
           </div>
         ) : null}
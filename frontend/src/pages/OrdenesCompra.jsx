@@ -220,14 +220,33 @@ export default function OrdenesCompra() {
     }
   }
 
+  // El email se envía en segundo plano: se consulta su estado unos segundos para avisar si falla
+  const seguirEnvioEmail = async (idNotificacion, intentos = 6) => {
+    for (let i = 0; i < intentos; i++) {
+      await new Promise((r) => setTimeout(r, 2000))
+      try {
+        const { data } = await api.get(`/notificaciones/envios/${idNotificacion}`)
+        if (data.estado === 'ENVIADA') return
+        if (data.estado === 'FALLIDA') {
+          showWarning(`El email al proveedor no se pudo enviar: ${data.ultimo_error || 'error desconocido'}`)
+          return
+        }
+      } catch {
+        return
+      }
+    }
+  }
+
   const enviarOrden = async (oc) => {
     setEnviandoOrden(true)
     try {
       const res = await api.post(`/ordenes-compra/${oc.id_orden_compra}/enviar`)
       invalidate(['ordenes-compra']); invalidate(['ordenes-compra-alertas'])
       abrirDetalle({ ...oc, estado: 'ENVIADA' })
-      if (res.data?.email_enviado) {
-        showSuccess('Orden enviada. Se envió un email al proveedor con el detalle.')
+      const envioEmail = (res.data?.notificaciones || []).find((n) => n.canal === 'EMAIL')
+      if (envioEmail) {
+        showSuccess('Orden enviada. El email al proveedor se está enviando.')
+        seguirEnvioEmail(envioEmail.id_notificacion)
       } else if (res.data?.mensaje_email) {
         showWarning(`Orden enviada (estado actualizado). El email no se pudo enviar: ${res.data.mensaje_email}`)
       }
@@ -105,6 +105,25 @@ export default function Vehiculos() {
     }
   }
 
+  const cargarMasHistorial = async (seccion) => {
+    const cursor = historialData?.paginacion?.[seccion]?.siguiente_cursor
+    if (!cursor) return
+    try {
+      const res = await api.get(`/vehiculos/${historialData.vehiculo.id_vehiculo}/historial/${seccion}`, { params: { cursor } })
+      setHistorialData((prev) => ({
+        ...prev,
+        [seccion]: [...(prev[seccion] ?? []), ...(res.data[seccion] ?? [])],
+        paginacion: { ...prev.paginacion, [seccion]: { ...prev.paginacion[seccion], siguiente_cursor: res.data.siguiente_cursor } },
+      }))
+    } catch (err) {
+      showError(err, 'Error al cargar historial')
+    }
+  }
+
+  const botonCargarMas = (seccion) => historialData?.paginacion?.[seccion]?.siguiente_cursor ? (
+    <button type="button" onClick={() => cargarMasHistorial(seccion)} className="mt-2 text-sm text-primary-600 hover:text-primary-700 touch-manipulation">Cargar más</button>
+  ) : null
+
   const abrirModalEliminar = async (v) => {
     setVehiculoAEliminar(v)
     setDatosEliminar(null)
@@ -112,7 +131,7 @@ export default function Vehiculos() {
     setErrorEliminar('')
     setModalEliminar(true)
     try {
-      const res = await api.get(`/vehiculos/${v.id_vehiculo}/historial`)
+      const res = await api.get(`/vehiculos/${v.id_vehiculo}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       setErrorEliminar(normalizeDetail(err.response?.data?.detail) || 'Error al cargar datos')
@@ -130,7 +149,7 @@ export default function Vehiculos() {
     setProcesandoOrdenId(orden.id)
     try {
       await api.post(`/ordenes-trabajo/${orden.id}/cancelar`, null, { params: { motivo: motivo.trim() } })
-      const res = await api.get(`/vehiculos/${vehiculoAEliminar.id_vehiculo}/historial`)
+      const res = await api.get(`/vehiculos/${vehiculoAEliminar.id_vehiculo}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       showError(err, 'Error al cancelar')
@@ -145,7 +164,7 @@ export default function Vehiculos() {
     setProcesandoOrdenId(orden.id)
     try {
       await api.delete(`/ordenes-trabajo/${orden.id}`)
-      const res = await api.get(`/vehiculos/${vehiculoAEliminar.id_vehiculo}/historial`)
+      const res = await api.get(`/vehiculos/${vehiculoAEliminar.id_vehiculo}/historial`, { params: { limit: 100 } })
       setDatosEliminar(res.data)
     } catch (err) {
       showError(err, 'Error al eliminar orden')
@@ -351,9 +370,9 @@ export default function Vehiculos() {
         {cargandoHistorial ? <p className="text-slate-500 py-4">Cargando historial...</p> : historialData ? (
           <div className="space-y-6 max-h-[70vh] overflow-y-auto">
             <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Datos</h3><div className="text-sm text-slate-600"><p><span className="font-medium">Cliente:</span> {historialData.vehiculo?.cliente_nombre || '-'}</p><p><span className="font-medium">Color:</span> {historialData.vehiculo?.color || '-'}</p><p><span className="font-medium">Motor:</span> {historialData.vehiculo?.motor ?? '-'}</p><p><span className="font-medium">VIN:</span> {historialData.vehiculo?.vin || '-'}</p></div></div>
-            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Resumen</h3><div className="grid grid-cols-2 sm:grid-cols-3 gap-2 text-sm"><div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Órdenes:</span> {historialData.resumen?.cantidad_ordenes ?? 0}</div><div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Ventas:</span> {historialData.resumen?.cantidad_ventas ?? 0}</div></div></div>
-            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Órdenes ({historialData.ordenes_trabajo?.length ?? 0})</h3>{(historialData.ordenes_trabajo?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin órdenes</p> : <div className="overflow-x-auto"><table className="min-w-full text-sm"><thead><tr><th className="text-left py-1">Nº</th><th className="text-left py-1">Fecha</th><th className="text-left py-1">Estado</th><th className="text-right py-1">Total</th></tr></thead><tbody>{historialData.ordenes_trabajo.map((o) => <tr key={o.id}><td className="py-1">{o.numero_orden}</td><td>{formatearFechaSolo(o.fecha_ingreso)}</td><td>{o.estado || '-'}</td><td className="text-right">${(o.total ?? 0).toFixed(2)}</td></tr>)}</tbody></table></div>}</div>
-            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Ventas ({historialData.ventas?.length ?? 0})</h3>{(historialData.ventas?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin ventas</p> : <div className="overflow-x-auto"><table className="min-w-full text-sm"><thead><tr><th className="text-left py-1">ID</th><th className="text-left py-1">Fecha</th><th className="text-right py-1">Total</th><th className="text-right py-1">Pagado</th><th className="text-left py-1">Estado</th></tr></thead><tbody>{historialData.ventas.map((v) => <tr key={v.id_venta}><td className="py-1">{v.id_venta}</td><td>{formatearFechaSolo(v.fecha)}</td><td className="text-right">${(v.total ?? 0).toFixed(2)}</td><td className="text-right">${(v.total_pagado ?? 0).toFixed(2)}</td><td>{v.estado || '-'}</td></tr>)}</tbody></table></div>}</div>
+            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Resumen</h3><div className="grid grid-cols-2 sm:grid-cols-3 gap-2 text-sm"><div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Órdenes:</span> {historialData.resumen?.cantidad_ordenes ?? 0}</div><div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Ventas:</span> {historialData.resumen?.cantidad_ventas ?? 0}</div><div className="p-2 bg-slate-50 rounded"><span className="text-slate-500">Saldo $:</span> ${(Number(historialData.resumen?.saldo_pendiente) || 0).toFixed(2)}</div></div></div>
+            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Órdenes ({historialData.resumen?.cantidad_ordenes ?? historialData.ordenes_trabajo?.length ?? 0})</h3>{(historialData.ordenes_trabajo?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin órdenes</p> : <div className="overflow-x-auto"><table className="min-w-full text-sm"><thead><tr><th className="text-left py-1">Nº</th><th className="text-left py-1">Fecha</th><th className="text-left py-1">Estado</th><th className="text-right py-1">Total</th></tr></thead><tbody>{historialData.ordenes_trabajo.map((o) => <tr key={o.id}><td className="py-1">{o.numero_orden}</td><td>{formatearFechaSolo(o.fecha_ingreso)}</td><td>{o.estado || '-'}</td><td className="text-right">${(o.total ?? 0).toFixed(2)}</td></tr>)}</tbody></table></div>}{botonCargarMas('ordenes_trabajo')}</div>
+            <div><h3 className="text-sm font-semibold text-slate-700 mb-2">Ventas ({historialData.resumen?.cantidad_ventas ?? historialData.ventas?.length ?? 0})</h3>{(historialData.ventas?.length ?? 0) === 0 ? <p className="text-slate-500 text-sm">Sin ventas</p> : <div className="overflow-x-auto"><table className="min-w-full text-sm"><thead><tr><th className="text-left py-1">ID</th><th className="text-left py-1">Fecha</th><th className="text-right py-1">Total</th><th className="text-right py-1">Pagado</th><th className="text-left py-1">Estado</th></tr></thead><tbody>{historialData.ventas.map((v) => <tr key={v.id_venta}><td className="py-1">{v.id_venta}</td><td>{formatearFechaSolo(v.fecha)}</td><td className="text-right">${(v.total ?? 0).toFixed(2)}</td><td className="text-right">${(v.total_pagado ?? 0).toFixed(2)}</td><td>{v.estado || '-'}</td></tr>)}</tbody></table></div>}{botonCargarMas('ventas')}</div>
           </div>
         ) : null}
       </Modal>
@@ -0,0 +1,49 @@
+"""
+Recalcula ventas.total_pagado y ventas.saldo desde pagos y reporta las ventas que no coinciden.
+
+Ejecutar: python scripts/auditar_saldos_ventas.py [--corregir] [--venta ID ...]
+
+Los valores se mantienen por eventos (app/services/saldos_venta_service.py); este script sirve
+para auditarlos. Sin --corregir no escribe nada. Sale con código 1 si encontró desfases.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditar total pagado y saldo materializados de ventas")
+    parser.add_argument("--corregir", action="store_true", help="Escribir los valores recalculados")
+    parser.add_argument("--venta", type=int, action="append", help="Auditar solo esta venta (repetible)")
+    args = parser.parse_args()
+
+    import app.models  # noqa: F401  (registra todos los modelos)
+    from app.database import SessionLocal
+    from app.services.saldos_venta_service import auditar_saldos
+
+    print("\n=== Auditar saldos de ventas ===\n")
+    db = SessionLocal()
+    try:
+        desfases = auditar_saldos(db, corregir=args.corregir, ids_venta=args.venta)
+        if args.corregir:
+            db.commit()
+        else:
+            db.rollback()
+        for d in desfases:
+            print(f"  DESFASE venta {d.id_venta} {d.columna}: almacenado={d.almacenado} calculado={d.calculado}")
+        ventas = len({d.id_venta for d in desfases})
+        print(f"\nOK: {len(desfases)} desfase(s) en {ventas} venta(s)" + (" (corregidos)." if args.corregir else "."))
+        return 1 if desfases else 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Recalcula caja_turno_totales desde pagos, gastos y pagos a proveedores / cuentas manuales y
+reporta los turnos cuyo total acumulado no coincide.
+
+Ejecutar: python scripts/auditar_totales_caja.py [--corregir] [--turno ID ...]
+
+Los totales se mantienen por eventos (app/services/caja_totales_service.py); este script sirve
+para auditarlos y para crear filas de turnos que no la tengan. Sin --corregir no escribe nada.
+Sale con código 1 si encontró desfases en filas existentes.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditar totales acumulados por turno de caja")
+    parser.add_argument("--corregir", action="store_true", help="Escribir los totales recalculados")
+    parser.add_argument("--turno", type=int, action="append", help="Auditar solo este turno (repetible)")
+    args = parser.parse_args()
+
+    import app.models  # noqa: F401  (registra todos los modelos)
+    from app.database import SessionLocal
+    from app.services.caja_totales_service import auditar_totales
+
+    print("\n=== Auditar caja_turno_totales ===\n")
+    db = SessionLocal()
+    try:
+        desfases = auditar_totales(db, corregir=args.corregir, ids_turno=args.turno)
+        if args.corregir:
+            db.commit()
+        else:
+            db.rollback()
+        existentes = [d for d in desfases if d.almacenado is not None]
+        sin_fila = sorted({d.id_turno for d in desfases if d.almacenado is None})
+        for d in existentes:
+            print(f"  DESFASE turno {d.id_turno} {d.columna}: almacenado={d.almacenado} calculado={d.calculado}")
+        if sin_fila:
+            print(f"  {len(sin_fila)} turno(s) sin fila de totales" + (" (creadas)" if args.corregir else ""))
+        print(f"\nOK: {len(existentes)} desfase(s) en {len({d.id_turno for d in existentes})} turno(s).")
+        return 1 if existentes else 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Pobla (o recalcula) el libro de costos por venta ventas_utilidad.
+
+Ejecutar: python scripts/backfill_ventas_utilidad.py [--lote 500] [--desde-id 0]
+
+Recorre ventas por id en lotes y recalcula costo de refacciones y merma con las mismas
+reglas de los reportes (app/services/utilidad_ventas_service.py). Es idempotente: se puede
+volver a correr para corregir desvíos (p. ej. si cambió cliente_proporciono_refacciones en una OT).
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de ventas_utilidad")
+    parser.add_argument("--lote", type=int, default=500, help="Ventas por commit")
+    parser.add_argument("--desde-id", type=int, default=0, help="Reanudar a partir de este id_venta")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+    from app.models.venta import Venta
+    from app.services.utilidad_ventas_service import recalcular_ventas
+
+    print("\n=== Backfill ventas_utilidad ===\n")
+    db = SessionLocal()
+    try:
+        ultimo = args.desde_id
+        total = 0
+        while True:
+            ids = [
+                r[0]
+                for r in db.query(Venta.id_venta)
+                .filter(Venta.id_venta > ultimo)
+                .order_by(Venta.id_venta.asc())
+                .limit(args.lote)
+                .all()
+            ]
+            if not ids:
+                break
+            total += recalcular_ventas(db, ids)
+            db.commit()
+            ultimo = ids[-1]
+            print(f"  ... {total} ventas (hasta id {ultimo})")
+        print(f"\nOK: {total} ventas en ventas_utilidad.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Mide el CPU por PDF de la cotización OT para órdenes de 1, 10 y 100 líneas.
+
+Ejecutar: python scripts/benchmark_pdf_cotizacion.py [--repeticiones 20] [--lineas 1 10 100]
+
+Compara el generador actual (una pasada, anchos de texto memoizados) contra una referencia que
+reproduce el esquema anterior: dos renders completos por PDF (uno para contar páginas, otro con
+el pie «Página X de Y») y sin memo de anchos entre renders. No requiere base de datos.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DESCRIPCION = "Sustitución de balatas delanteras y rectificado de discos con revisión de calipers y mangueras"
+
+
+def _orden(n: int) -> dict:
+    filas = [
+        {"descripcion": f"{_DESCRIPCION} #{i}", "cantidad": 2, "precio_unitario": 150.5, "subtotal": 301.0}
+        for i in range(n)
+    ]
+    return {
+        "numero_orden": "OT-BENCH-001",
+        "fecha_ingreso": "2026-01-02T10:00:00",
+        "fecha_vigencia_cotizacion": "2026-01-09",
+        "kilometraje": 50000,
+        "diagnostico_inicial": _DESCRIPCION,
+        "observaciones_cliente": "Ruido al frenar.",
+        "descuento": 0,
+        "total": 602.0 * n,
+        "cliente": {"nombre": "Cliente Benchmark", "telefono": "8680000000", "email": "", "direccion": ""},
+        "vehiculo": {"marca": "Nissan", "modelo": "Sentra", "anio": 2020, "vin": "VIN123"},
+        "servicios": filas,
+        "partes": filas,
+    }
+
+
+def _medir(fn, repeticiones: int) -> float:
+    """ms de CPU por llamada (process_time: no cuenta esperas)."""
+    fn()
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        fn()
+    return (time.process_time() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del PDF de cotización OT")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--lineas", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    from app.routers.ordenes_trabajo.cotizacion import _generar_pdf_cotizacion
+    from app.utils.pdf_layout import ancho_texto
+
+    def referencia_dos_pasadas(data):
+        for _ in range(2):
+            ancho_texto.cache_clear()
+            _generar_pdf_cotizacion(data)
+
+    print(f"\n{'líneas':>7} {'actual ms':>10} {'referencia ms':>14} {'ahorro':>7}")
+    for n in args.lineas:
+        data = _orden(n)
+        actual = _medir(lambda: _generar_pdf_cotizacion(data), args.repeticiones)
+        referencia = _medir(lambda: referencia_dos_pasadas(data), args.repeticiones)
+        print(f"{n:>7} {actual:>10.1f} {referencia:>14.1f} {1 - actual / referencia:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
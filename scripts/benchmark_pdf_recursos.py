@@ -0,0 +1,135 @@
+"""
+Mide CPU y memoria asignada por PDF (ticket, cotización OT, cotización de refacción) con el logo
+del registro de recursos (app/utils/pdf_recursos.py) contra el esquema anterior.
+
+Ejecutar: python scripts/benchmark_pdf_recursos.py [--repeticiones 30]
+
+La referencia reproduce el dibujo previo del logo: Path.exists() y drawImage con la ruta del PNG,
+que vuelve a decodificar la imagen y a comprimir sus píxeles en cada documento. «Asignado» es el
+pico de tracemalloc durante un render. No requiere base de datos.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _venta() -> dict:
+    filas = [
+        {"descripcion": f"Servicio {i}", "cantidad": 1, "precio_unitario": 350.0, "subtotal": 350.0} for i in range(5)
+    ]
+    return {
+        "id_venta": 1,
+        "fecha": "2026-01-02T10:00:00",
+        "cliente": {"nombre": "Cliente Benchmark", "telefono": "8680000000"},
+        "vehiculo": {"marca": "Nissan", "modelo": "Sentra", "anio": 2020},
+        "servicios": filas,
+        "partes": filas,
+        "total": 3500.0,
+        "total_pagado": 1000.0,
+        "saldo_pendiente": 2500.0,
+    }
+
+
+def _cotizacion_refaccion():
+    from app.models.cliente import Cliente
+    from app.models.cotizacion_refaccion_especial import (
+        CotizacionRefaccionEspecial,
+        EstadoCotizacionRefaccion,
+        LineaCotizacionRefaccion,
+        MonedaCotizacion,
+        OpcionCompraLineaCotizacion,
+    )
+
+    lineas = [
+        LineaCotizacionRefaccion(
+            n_linea=i,
+            descripcion=f"Módulo ABS importado #{i}",
+            cantidad=Decimal("1"),
+            opciones=[
+                OpcionCompraLineaCotizacion(
+                    origen_nombre="Proveedor USA",
+                    moneda=MonedaCotizacion.USD,
+                    monto_unitario=Decimal("120"),
+                    otros_costos_mxn=Decimal("300"),
+                    es_preferida=True,
+                )
+            ],
+        )
+        for i in range(1, 6)
+    ]
+    cot = CotizacionRefaccionEspecial(
+        numero="COT-BENCH-0001",
+        estado=EstadoCotizacionRefaccion.BORRADOR,
+        tc_referencia_usd_mxn=Decimal("18.5"),
+        margen_objetivo_pct=Decimal("30"),
+        creado_en=datetime(2026, 1, 2, 10),
+        lineas=lineas,
+    )
+    return cot, Cliente(nombre="Cliente Benchmark", telefono="8680000000")
+
+
+def _medir(fn, repeticiones: int) -> tuple[float, float]:
+    """(ms de CPU por llamada, KiB pico asignados en una llamada)."""
+    fn()
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        fn()
+    cpu = (time.process_time() - inicio) / repeticiones * 1000
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, pico / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recursos compartidos en PDFs")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    args = parser.parse_args()
+
+    from app.routers.ordenes_trabajo import cotizacion
+    from app.routers.ventas import ticket
+    from app.services import cotizacion_refaccion_pdf
+    from app.utils.pdf_recursos import LOGO_PATH, dibujar_logo, precargar_recursos_pdf
+    from scripts.benchmark_pdf_cotizacion import _orden
+
+    def logo_por_ruta(p, x, y, width, height, mask=None):
+        if LOGO_PATH.exists():
+            p.drawImage(str(LOGO_PATH), x, y, width=width, height=height, mask=mask)
+            return True
+        return False
+
+    modulos = (ticket, cotizacion, cotizacion_refaccion_pdf)
+    venta, orden, (cot, cli) = _venta(), _orden(10), _cotizacion_refaccion()
+    documentos = {
+        "ticket": lambda: ticket._generar_pdf_ticket(venta, "venta"),
+        "cotización OT": lambda: cotizacion._generar_pdf_cotizacion(orden),
+        "hoja técnico": lambda: cotizacion._generar_pdf_hoja_tecnico(orden),
+        "cotización refacción": lambda: cotizacion_refaccion_pdf._dibujar_pdf(cot, cli, None),
+    }
+
+    precargar_recursos_pdf()
+    print(f"\n{'documento':<22} {'actual ms':>10} {'antes ms':>9} {'ahorro':>7} {'actual KiB':>11} {'antes KiB':>10}")
+    for nombre, generar in documentos.items():
+        actual, mem_actual = _medir(generar, args.repeticiones)
+        for m in modulos:
+            m.dibujar_logo = logo_por_ruta
+        try:
+            antes, mem_antes = _medir(generar, args.repeticiones)
+        finally:
+            for m in modulos:
+                m.dibujar_logo = dibujar_logo
+        print(
+            f"{nombre:<22} {actual:>10.1f} {antes:>9.1f} {1 - actual / antes:>7.0%} {mem_actual:>11.0f} {mem_antes:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
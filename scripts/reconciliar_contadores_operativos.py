@@ -0,0 +1,53 @@
+"""
+Recalcula contadores_operativos desde cero y reporta desfases contra lo almacenado.
+
+Ejecutar: python scripts/reconciliar_contadores_operativos.py [--solo-reportar]
+
+Los contadores se mantienen por eventos (app/services/contadores_operativos_service.py); este
+script sirve para poblarlos la primera vez y para auditar. La app también reconcilia de forma
+periódica (CONTADORES_RECONCILIAR_SEGUNDOS). Sale con código 1 si encontró desfases en filas
+existentes.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliar contadores_operativos")
+    parser.add_argument("--solo-reportar", action="store_true", help="No corregir, solo listar desfases")
+    args = parser.parse_args()
+
+    import app.models  # noqa: F401  (registra todos los modelos)
+    from app.database import SessionLocal
+    from app.services.contadores_operativos_service import reconciliar_contadores
+
+    print("\n=== Reconciliar contadores_operativos ===\n")
+    db = SessionLocal()
+    try:
+        desfases = reconciliar_contadores(db, corregir=not args.solo_reportar)
+        if args.solo_reportar:
+            db.rollback()
+        else:
+            db.commit()
+        nuevas = [d for d in desfases if d.almacenado is None]
+        existentes = [d for d in desfases if d.almacenado is not None]
+        for d in existentes:
+            print(f"  DESFASE {d.clave}[{d.ambito}]: almacenado={d.almacenado} calculado={d.calculado}")
+        if nuevas:
+            print(f"  {len(nuevas)} fila(s) sin inicializar" + (" (creadas)" if not args.solo_reportar else ""))
+        print(f"\nOK: {len(existentes)} desfase(s).")
+        return 1 if existentes else 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
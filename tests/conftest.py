@@ -10,6 +10,32 @@ from sqlalchemy.orm import sessionmaker
 from app.main import app
 
 
+@pytest.fixture(autouse=True)
+def _sin_cache_usuarios(monkeypatch):
+    """Caché de usuario autenticado apagada: los conteos de SQL por request no dependen del orden."""
+    from app.utils.cache_usuarios import cache_usuarios
+
+    monkeypatch.setattr(cache_usuarios, "ttl_segundos", 0)
+
+
+@pytest.fixture(autouse=True)
+def _sin_cache_pdf(monkeypatch):
+    """Caché de PDFs en disco apagada: los tests no escriben en el directorio del proyecto."""
+    from app.utils.cache_pdf import cache_pdf
+
+    monkeypatch.setattr(cache_pdf, "max_bytes", 0)
+
+
+@pytest.fixture(autouse=True)
+def _cola_alertas_stock_vacia():
+    """Cada test parte sin repuestos encolados para alertas (la cola es global al proceso)."""
+    from app.services.alertas_stock_service import cola_alertas_stock
+
+    cola_alertas_stock.descartar()
+    yield
+    cola_alertas_stock.descartar()
+
+
 @pytest.fixture
 def client() -> TestClient:
     """Cliente HTTP para tests de API (usa httpx internamente)."""
@@ -0,0 +1,233 @@
+"""
+Datos de prueba compartidos por los tests de integración (no es un módulo de tests).
+
+- contar_sentencias: sentencias SQL que emite una llamada en la conexión de la sesión.
+- seed_*: usuario con token, cliente con vehículo, turno de caja, OT completada, venta de OT con
+  abono y ventas de exportación (con salidas de inventario) sobre db_session_transactional.
+- orden_cotizacion: diccionario de OT para los generadores de PDF de cotización.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
+from app.models.pago import Pago
+from app.models.repuesto import Repuesto
+from app.models.venta import Venta
+from app.services.utilidad_ventas_service import recalcular_ventas
+from app.utils.jwt import create_access_token
+from app.utils.security import hash_password
+
+FECHA_EXPORTACION = datetime(2031, 3, 10, 18, 0, 0)
+RANGO_EXPORTACION = {"fecha_desde": "2031-03-10", "fecha_hasta": "2031-03-10"}
+
+
+def contar_sentencias(db, fn) -> int:
+    """Ejecuta fn() y devuelve cuántas sentencias SQL emitió la conexión de la sesión."""
+    conn = db.connection()
+    sentencias: list[str] = []
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        fn()
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+    return len(sentencias)
+
+
+def seed_usuario(session, rol: str = "CAJA"):
+    from app.models.usuario import Usuario
+
+    uid = uuid.uuid4().hex[:10]
+    usuario = Usuario(
+        nombre=f"Fin {rol}",
+        email=f"fin_a0_{rol.lower()}_{uid}@test.medina",
+        password_hash=hash_password("FinSecret!9"),
+        rol=rol,
+        activo=True,
+    )
+    session.add(usuario)
+    session.flush()
+    token = create_access_token(data={"sub": str(usuario.id_usuario), "rol": rol})
+    return usuario, token
+
+
+def seed_cliente_vehiculo(session):
+    from app.models.cliente import Cliente
+    from app.models.vehiculo import Vehiculo
+
+    uid = uuid.uuid4().hex[:8]
+    cliente = Cliente(nombre=f"Cliente Fin {uid}", telefono=f"644{uid[:7]}")
+    session.add(cliente)
+    session.flush()
+    vehiculo = Vehiculo(
+        id_cliente=cliente.id_cliente,
+        marca="Mazda",
+        modelo="3",
+        anio=2021,
+    )
+    session.add(vehiculo)
+    session.flush()
+    return cliente, vehiculo
+
+
+def seed_turno(session, id_usuario: int):
+    from app.models.caja_turno import CajaTurno
+
+    turno = CajaTurno(
+        id_usuario=id_usuario,
+        monto_apertura=Decimal("500.00"),
+        estado="ABIERTO",
+        fecha_apertura=datetime.utcnow(),
+    )
+    session.add(turno)
+    session.flush()
+    return turno
+
+
+def seed_ot_completada(session, cliente, vehiculo) -> OrdenTrabajo:
+    ot = OrdenTrabajo(
+        numero_orden=f"OT-FIN-{uuid.uuid4().hex[:8]}",
+        vehiculo_id=vehiculo.id_vehiculo,
+        cliente_id=cliente.id_cliente,
+        estado=EstadoOrden.COMPLETADA,
+        fecha_ingreso=datetime.utcnow(),
+        fecha_finalizacion=datetime.utcnow(),
+        total=Decimal("1000.00"),
+        subtotal_servicios=Decimal("1000.00"),
+        subtotal_repuestos=Decimal("0.00"),
+        descuento=Decimal("0.00"),
+    )
+    session.add(ot)
+    session.flush()
+    return ot
+
+
+def seed_venta_ot_con_abono(session, usuario, turno, cliente, vehiculo, total: str, abono: str) -> Venta:
+    ot = seed_ot_completada(session, cliente, vehiculo)
+    venta = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        id_orden=ot.id,
+        total=Decimal(total),
+        estado="PENDIENTE",
+    )
+    session.add(venta)
+    session.flush()
+    session.add(
+        Pago(
+            id_venta=venta.id_venta,
+            id_usuario=usuario.id_usuario,
+            id_turno=turno.id_turno,
+            monto=Decimal(abono),
+            metodo="EFECTIVO",
+            fecha=datetime.utcnow(),
+        )
+    )
+    session.flush()
+    return venta
+
+
+def seed_movimiento_salida(db, repuesto, usuario, costo: str, *, referencia=None, id_venta=None):
+    db.add(
+        MovimientoInventario(
+            id_repuesto=repuesto.id_repuesto,
+            tipo_movimiento=TipoMovimiento.SALIDA,
+            cantidad=Decimal("1"),
+            costo_total=Decimal(costo),
+            stock_anterior=Decimal("10"),
+            stock_nuevo=Decimal("9"),
+            referencia=referencia,
+            id_venta=id_venta,
+            id_usuario=usuario.id_usuario,
+            fecha_movimiento=FECHA_EXPORTACION,
+        )
+    )
+
+
+def seed_ventas_exportacion(db, n: int):
+    """n ventas de mostrador con un abono cada una y una venta desde OT con salidas por número de OT."""
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    repuesto = Repuesto(
+        codigo=f"EXP-{uuid.uuid4().hex[:8]}",
+        nombre="Filtro export",
+        stock_actual=Decimal("10"),
+        precio_compra=Decimal("50"),
+        precio_venta=Decimal("80"),
+    )
+    db.add(repuesto)
+    db.flush()
+    ventas = []
+    for i in range(n):
+        venta = Venta(
+            id_cliente=cliente.id_cliente, total=Decimal("300.00"), estado="PENDIENTE", fecha=FECHA_EXPORTACION
+        )
+        db.add(venta)
+        db.flush()
+        db.add(
+            Pago(
+                id_venta=venta.id_venta,
+                id_usuario=usuario.id_usuario,
+                id_turno=turno.id_turno,
+                monto=Decimal("100.00") + i,
+                metodo="EFECTIVO",
+                fecha=FECHA_EXPORTACION,
+            )
+        )
+        seed_movimiento_salida(db, repuesto, usuario, "40.00", id_venta=venta.id_venta)
+        ventas.append(venta)
+    ot = seed_ot_completada(db, cliente, vehiculo)
+    venta_ot = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        id_orden=ot.id,
+        total=Decimal("1000.00"),
+        estado="PENDIENTE",
+        fecha=FECHA_EXPORTACION,
+    )
+    db.add(venta_ot)
+    seed_movimiento_salida(db, repuesto, usuario, "150.00", referencia=ot.numero_orden)
+    seed_movimiento_salida(db, repuesto, usuario, "25.00", referencia=ot.numero_orden)
+    db.flush()
+    recalcular_ventas(db, [v.id_venta for v in ventas] + [venta_ot.id_venta])
+    return token, cliente, ventas, venta_ot
+
+
+def orden_cotizacion(**overrides):
+    data = {
+        "numero_orden": "OT-P54-TEST-001",
+        "fecha_ingreso": datetime.now().isoformat(),
+        "fecha_vigencia_cotizacion": (date.today() + timedelta(days=7)).isoformat(),
+        "kilometraje": 50000,
+        "diagnostico_inicial": "Diagnóstico de prueba.",
+        "observaciones_cliente": "Ruido en motor.",
+        "descuento": 100,
+        "total": 900.0,
+        "cliente_proporciono_refacciones": False,
+        "cliente": {
+            "nombre": "Cliente Prueba",
+            "telefono": "5550000000",
+            "email": "test@ejemplo.com",
+            "direccion": "Calle Test 1",
+        },
+        "vehiculo": {"marca": "Nissan", "modelo": "Sentra", "anio": 2020, "vin": "VIN123"},
+        "servicios": [
+            {"descripcion": "Servicio prueba", "cantidad": 1, "precio_unitario": 500, "subtotal": 500},
+        ],
+        "partes": [
+            {"descripcion": "[TST] Pieza prueba", "cantidad": 1, "precio_unitario": 500, "subtotal": 500},
+        ],
+    }
+    data.update(overrides)
+    return data
@@ -7,16 +7,15 @@ Validación: contador SQL == bandeja legacy (limit=0).
 
 from __future__ import annotations
 
-import uuid
 from datetime import datetime
 from decimal import Decimal
 
 import pytest
 
-from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
 from app.models.pago import Pago
 from app.models.venta import Venta
 from app.services.operaciones_service import (
+    FAMILIA_O1,
     SALDO_EPSILON,
     _contar_ot_listas_entrega,
     _contar_ot_pendientes_cobro,
@@ -27,81 +26,22 @@ from app.services.operaciones_service import (
     bandeja_ot_listas_entrega,
     bandeja_ot_pendientes_cobro,
     bandeja_ventas_saldo_pendiente,
+    calcular_saldo_venta,
+    clasificar_ot_cobro,
+    clasificar_ventas_v1,
+)
+from tests.semillas import (
+    contar_sentencias,
+    seed_cliente_vehiculo,
+    seed_ot_completada,
+    seed_turno,
+    seed_usuario,
+    seed_venta_ot_con_abono,
 )
-from app.utils.jwt import create_access_token
-from app.utils.security import hash_password
 
 ROL_FINANCIERO = "CAJA"
 
 
-def _seed_usuario(session, rol: str = ROL_FINANCIERO):
-    from app.models.usuario import Usuario
-
-    uid = uuid.uuid4().hex[:10]
-    usuario = Usuario(
-        nombre=f"Fin {rol}",
-        email=f"fin_a0_{rol.lower()}_{uid}@test.medina",
-        password_hash=hash_password("FinSecret!9"),
-        rol=rol,
-        activo=True,
-    )
-    session.add(usuario)
-    session.flush()
-    token = create_access_token(data={"sub": str(usuario.id_usuario), "rol": rol})
-    return usuario, token
-
-
-def _seed_cliente_vehiculo(session):
-    from app.models.cliente import Cliente
-    from app.models.vehiculo import Vehiculo
-
-    uid = uuid.uuid4().hex[:8]
-    cliente = Cliente(nombre=f"Cliente Fin {uid}", telefono=f"644{uid[:7]}")
-    session.add(cliente)
-    session.flush()
-    vehiculo = Vehiculo(
-        id_cliente=cliente.id_cliente,
-        marca="Mazda",
-        modelo="3",
-        anio=2021,
-    )
-    session.add(vehiculo)
-    session.flush()
-    return cliente, vehiculo
-
-
-def _seed_turno(session, id_usuario: int):
-    from app.models.caja_turno import CajaTurno
-
-    turno = CajaTurno(
-        id_usuario=id_usuario,
-        monto_apertura=Decimal("500.00"),
-        estado="ABIERTO",
-        fecha_apertura=datetime.utcnow(),
-    )
-    session.add(turno)
-    session.flush()
-    return turno
-
-
-def _seed_ot_completada(session, cliente, vehiculo) -> OrdenTrabajo:
-    ot = OrdenTrabajo(
-        numero_orden=f"OT-FIN-{uuid.uuid4().hex[:8]}",
-        vehiculo_id=vehiculo.id_vehiculo,
-        cliente_id=cliente.id_cliente,
-        estado=EstadoOrden.COMPLETADA,
-        fecha_ingreso=datetime.utcnow(),
-        fecha_finalizacion=datetime.utcnow(),
-        total=Decimal("1000.00"),
-        subtotal_servicios=Decimal("1000.00"),
-        subtotal_repuestos=Decimal("0.00"),
-        descuento=Decimal("0.00"),
-    )
-    session.add(ot)
-    session.flush()
-    return ot
-
-
 def _assert_paridad(contador: int, bandeja_total: int, etiqueta: str) -> None:
     assert contador == bandeja_total, f"{etiqueta}: SQL={contador} legacy={bandeja_total}"
 
@@ -128,16 +68,16 @@ def _paridad_financiera_completa(db, usuario) -> None:
 @pytest.mark.integration
 def test_p3_paridad_financiera_bandejas_vacio(db_session_transactional):
     """P3 — paridad O1/O2/V1 con BD mínima."""
-    usuario, _ = _seed_usuario(db_session_transactional)
+    usuario, _ = seed_usuario(db_session_transactional)
     _paridad_financiera_completa(db_session_transactional, usuario)
 
 
 @pytest.mark.integration
 def test_u3_o1_ot_completada_sin_venta(db_session_transactional):
     """U3 — OT COMPLETADA sin venta activa cuenta en O1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
 
     assert _contar_ot_pendientes_cobro(db_session_transactional) >= 1
     assert _contar_ot_listas_entrega(db_session_transactional) == bandeja_ot_listas_entrega(
@@ -152,10 +92,10 @@ def test_u3_o1_ot_completada_sin_venta(db_session_transactional):
 @pytest.mark.integration
 def test_u3_o1_ot_con_venta_saldo_pendiente(db_session_transactional):
     """U3 — OT COMPLETADA con venta activa y saldo > ε cuenta en O1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -184,10 +124,10 @@ def test_u3_o1_ot_con_venta_saldo_pendiente(db_session_transactional):
 @pytest.mark.integration
 def test_u4_o2_ot_con_venta_pagada(db_session_transactional):
     """U4 — OT COMPLETADA con venta saldada cuenta en O2, no en O1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -220,9 +160,9 @@ def test_u4_o2_ot_con_venta_pagada(db_session_transactional):
 @pytest.mark.integration
 def test_u5_v1_venta_mostrador_sin_ot(db_session_transactional):
     """U5 — venta mostrador con saldo pendiente cuenta en V1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -250,10 +190,10 @@ def test_u5_v1_venta_mostrador_sin_ot(db_session_transactional):
 @pytest.mark.integration
 def test_u5_v1_no_duplica_venta_ot_en_o1(db_session_transactional):
     """U5 / P3 — venta OT en O1 no aparece en V1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -284,8 +224,8 @@ def test_u5_v1_no_duplica_venta_ot_en_o1(db_session_transactional):
 @pytest.mark.integration
 def test_u6_venta_cancelada_no_cuenta_v1(db_session_transactional):
     """U6 — venta CANCELADA no cuenta en V1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
+    usuario, _ = seed_usuario(db_session_transactional)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -303,10 +243,10 @@ def test_u6_venta_cancelada_no_cuenta_v1(db_session_transactional):
 @pytest.mark.integration
 def test_u6_borde_saldo_epsilon_o2_no_o1(db_session_transactional):
     """U6 — saldo == SALDO_EPSILON → O2, no O1."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     total = Decimal("1000.00")
     # Dejar saldo exactamente en SALDO_EPSILON (0.001)
     monto_pagado = total - Decimal(str(SALDO_EPSILON))
@@ -340,10 +280,10 @@ def test_u6_borde_saldo_epsilon_o2_no_o1(db_session_transactional):
 @pytest.mark.integration
 def test_u6_venta_activa_usa_ultima_no_cancelada(db_session_transactional):
     """U6 — max(id_venta) no cancelada define venta activa para O1/O2."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
 
     venta_vieja = Venta(
         id_cliente=cliente.id_cliente,
@@ -384,13 +324,13 @@ def test_u6_venta_activa_usa_ultima_no_cancelada(db_session_transactional):
 @pytest.mark.integration
 def test_ids_o1_sql_vs_legacy_frozenset(db_session_transactional):
     """Paridad conjunto ids O1: query SQL vs _ids_ordenes_ot_pendientes_cobro."""
-    usuario, _ = _seed_usuario(db_session_transactional)
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
-    cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
+    usuario, _ = seed_usuario(db_session_transactional)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db_session_transactional)
 
-    _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    seed_ot_completada(db_session_transactional, cliente, vehiculo)
 
-    ot_o1 = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    ot_o1 = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -401,7 +341,7 @@ def test_ids_o1_sql_vs_legacy_frozenset(db_session_transactional):
     db_session_transactional.add(venta)
     db_session_transactional.flush()
 
-    ot_o2 = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    ot_o2 = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta_pagada = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
@@ -427,3 +367,77 @@ def test_ids_o1_sql_vs_legacy_frozenset(db_session_transactional):
     sql_ids = frozenset(row[0] for row in _query_ids_ordenes_o1(db_session_transactional).all())
     assert legacy_ids == sql_ids
     _paridad_financiera_completa(db_session_transactional, usuario)
+
+
+@pytest.mark.integration
+def test_clasificador_o1_pagina_en_sql_y_saldos_legacy(db_session_transactional):
+    """Clasificador set-based: páginas SQL concatenadas == población completa; saldo == calcular_saldo_venta."""
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    seed_ot_completada(db, cliente, vehiculo)
+    for abono in ("100.00", "250.00", "10.00"):
+        seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "700.00", abono)
+
+    completa = clasificar_ot_cobro(db, FAMILIA_O1)
+    assert len(completa) == _contar_ot_pendientes_cobro(db)
+    paginas = clasificar_ot_cobro(db, FAMILIA_O1, limit=2) + clasificar_ot_cobro(db, FAMILIA_O1, limit=2, offset=2)
+    assert [o.id for o, _, _ in paginas] == [o.id for o, _, _ in completa[:4]]
+    for orden, venta, saldo in completa:
+        if venta is None:
+            assert saldo is None
+            continue
+        assert venta.id_orden == orden.id
+        assert saldo == calcular_saldo_venta(db, venta)
+
+
+@pytest.mark.integration
+def test_clasificador_v1_incluye_cliente_y_saldo(db_session_transactional):
+    """V1 set-based: nombre de cliente por JOIN y saldo idéntico al cálculo por venta."""
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        total=Decimal("480.50"),
+        estado="PENDIENTE",
+    )
+    db.add(venta)
+    db.flush()
+    db.add(
+        Pago(
+            id_venta=venta.id_venta,
+            id_usuario=usuario.id_usuario,
+            id_turno=turno.id_turno,
+            monto=Decimal("80.25"),
+            metodo="EFECTIVO",
+            fecha=datetime.utcnow(),
+        )
+    )
+    db.flush()
+
+    filas = {v.id_venta: (saldo, nombre) for v, saldo, nombre in clasificar_ventas_v1(db)}
+    assert venta.id_venta in filas
+    saldo, nombre = filas[venta.id_venta]
+    assert nombre == cliente.nombre
+    assert saldo == calcular_saldo_venta(db, venta)
+    assert len(filas) == _contar_ventas_saldo_pendiente(db)
+
+
+@pytest.mark.integration
+def test_clasificador_o1_consultas_constantes(db_session_transactional):
+    """El clasificador no emite consultas por OT: mismo número de sentencias con 1 o 6 órdenes."""
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "500.00", "50.00")
+    pocas = contar_sentencias(db, lambda: clasificar_ot_cobro(db, FAMILIA_O1))
+    for _ in range(5):
+        seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "500.00", "50.00")
+    muchas = contar_sentencias(db, lambda: clasificar_ot_cobro(db, FAMILIA_O1))
+    assert muchas == pocas
+    assert muchas <= 3
@@ -236,12 +236,12 @@ def test_slice_bandejas_total_coincide_metricas(db_session_transactional):
 @pytest.mark.integration
 def test_slice_v1_dedup_sin_o1_en_request(db_session_transactional):
     """V1 slice debe excluir OT en O1 aunque O1 no esté en bandejas solicitadas."""
-    from tests.test_a0_contadores_financieros import _seed_ot_completada, _seed_turno
+    from tests.semillas import seed_ot_completada, seed_turno
 
     usuario, _ = _seed_usuario(db_session_transactional, "ADMIN")
-    turno = _seed_turno(db_session_transactional, usuario.id_usuario)
+    turno = seed_turno(db_session_transactional, usuario.id_usuario)
     cliente, vehiculo = _seed_cliente_vehiculo(db_session_transactional)
-    ot = _seed_ot_completada(db_session_transactional, cliente, vehiculo)
+    ot = seed_ot_completada(db_session_transactional, cliente, vehiculo)
     venta = Venta(
         id_cliente=cliente.id_cliente,
         id_vehiculo=vehiculo.id_vehiculo,
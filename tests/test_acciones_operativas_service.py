@@ -16,6 +16,7 @@ from app.models.usuario import Usuario
 from app.models.venta import Venta
 from app.services.acciones_operativas_service import (
     ACCIONES_FINANCIERAS_ITEM_ONLY,
+    FuenteDatosPrecargada,
     accion_global_item_only,
     acciones_globales_financieras_item_only,
     evaluar_crear_venta_desde_ot,
@@ -36,14 +37,16 @@ def _usuario(rol: str, uid: int = 42) -> Usuario:
     )
 
 
-def _venta(**kwargs) -> Venta:
+def _venta(total_pagado=0, **kwargs) -> Venta:
+    """Venta con total_pagado / saldo materializados como los deja saldos_venta_service."""
     defaults = {
         "id_venta": 100,
         "total": Decimal("1000.00"),
         "estado": "PENDIENTE",
     }
     defaults.update(kwargs)
-    return Venta(**defaults)
+    pagado = Decimal(str(total_pagado))
+    return Venta(**defaults, total_pagado=pagado, saldo=max(Decimal("0"), defaults["total"] - pagado))
 
 
 def _orden(**kwargs) -> OrdenTrabajo:
@@ -63,15 +66,12 @@ def _orden(**kwargs) -> OrdenTrabajo:
     return OrdenTrabajo(**defaults)
 
 
-def _mock_db(*, turno=None, total_pagado=0.0, venta_por_orden=None):
-    """Simula consultas de turno, saldo y venta activa por OT."""
+def _mock_db(*, turno=None, venta_por_orden=None):
+    """Simula consultas de turno y venta activa por OT (el saldo viene de la venta)."""
     session = MagicMock()
     turno_query = MagicMock()
     turno_query.filter.return_value.first.return_value = turno
 
-    pago_query = MagicMock()
-    pago_query.filter.return_value.scalar.return_value = total_pagado
-
     venta_query = MagicMock()
     venta_query.filter.return_value.order_by.return_value.first.return_value = venta_por_orden
 
@@ -80,8 +80,7 @@ def _mock_db(*, turno=None, total_pagado=0.0, venta_por_orden=None):
             return turno_query
         if model_or_func is Venta:
             return venta_query
-        # db.query(func.coalesce(func.sum(Pago.monto), 0)) — suma de pagos
-        return pago_query
+        raise AssertionError(f"consulta inesperada: {model_or_func}")
 
     session.query.side_effect = query_side_effect
     return session
@@ -134,24 +133,24 @@ class TestEvaluarRegistrarPago:
 
     def test_rechaza_venta_cancelada(self):
         turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=0)
+        db = _mock_db(turno=turno)
         ev = evaluar_registrar_pago(db, _venta(estado="CANCELADA"), _usuario("CAJA"))
         assert ev.permitida is False
         assert ev.codigo_bloqueo == "VENTA_CANCELADA"
 
     def test_rechaza_saldo_cero(self):
         turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=1000.0)
-        ev = evaluar_registrar_pago(db, _venta(total=Decimal("1000.00")), _usuario("CAJA"))
+        db = _mock_db(turno=turno)
+        ev = evaluar_registrar_pago(db, _venta(total=Decimal("1000.00"), total_pagado=1000.0), _usuario("CAJA"))
         assert ev.permitida is False
         assert ev.codigo_bloqueo == "SALDO_CERO"
 
     def test_rechaza_pago_excede_total(self):
         turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=400.0)
+        db = _mock_db(turno=turno)
         ev = evaluar_registrar_pago(
             db,
-            _venta(total=Decimal("1000.00")),
+            _venta(total=Decimal("1000.00"), total_pagado=400.0),
             _usuario("CAJA"),
             monto=700.0,
         )
@@ -160,8 +159,8 @@ class TestEvaluarRegistrarPago:
 
     def test_permitida_con_turno_y_saldo(self):
         turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=400.0)
-        venta = _venta(total=Decimal("1000.00"))
+        db = _mock_db(turno=turno)
+        venta = _venta(total=Decimal("1000.00"), total_pagado=400.0)
         ev = evaluar_registrar_pago(db, venta, _usuario("CAJA"))
         assert ev.permitida is True
         assert ev.codigo_bloqueo is None
@@ -169,16 +168,16 @@ class TestEvaluarRegistrarPago:
 
     def test_permitida_admin_con_turno(self):
         turno = CajaTurno(id_turno=2, id_usuario=99, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=0.0)
+        db = _mock_db(turno=turno)
         ev = evaluar_registrar_pago(db, _venta(), _usuario("ADMIN", uid=99))
         assert ev.permitida is True
 
     def test_monto_valido_no_excede(self):
         turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
-        db = _mock_db(turno=turno, total_pagado=400.0)
+        db = _mock_db(turno=turno)
         ev = evaluar_registrar_pago(
             db,
-            _venta(total=Decimal("1000.00")),
+            _venta(total=Decimal("1000.00"), total_pagado=400.0),
             _usuario("CAJA"),
             monto=600.0,
         )
@@ -222,3 +221,36 @@ class TestEvaluarCrearVentaDesdeOt:
         db = _mock_db(venta_por_orden=None)
         ev = evaluar_crear_venta_desde_ot(db, _orden(), _usuario("CAJA"))
         assert ev.permitida is True
+
+
+class TestFuenteDatosPrecargada:
+    def test_saldo_sembrado_no_consulta_pagos(self):
+        turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
+        db = _mock_db(turno=turno)
+        venta = _venta(total=Decimal("1000.00"), total_pagado=999.0)
+        fuente = FuenteDatosPrecargada(db, ventas=[venta])
+        fuente.registrar_saldo(venta, 600.0)
+        ev = evaluar_registrar_pago(db, venta, _usuario("CAJA"), fuente=fuente)
+        assert ev.permitida is True
+        assert ev.contexto == {"id_venta": 100, "saldo_pendiente": 600.0}
+
+    def test_turno_se_consulta_una_vez_por_usuario(self):
+        turno = CajaTurno(id_turno=1, id_usuario=42, estado="ABIERTO")
+        db = _mock_db(turno=turno)
+        usuario = _usuario("CAJA")
+        ventas = [_venta(id_venta=i) for i in (1, 2, 3)]
+        fuente = FuenteDatosPrecargada(db, ventas=ventas)
+        for v in ventas:
+            fuente.registrar_saldo(v, 100.0)
+            assert evaluar_registrar_pago(db, v, usuario, fuente=fuente).permitida is True
+        consultas_turno = [c for c in db.query.call_args_list if c.args and c.args[0] is CajaTurno]
+        assert len(consultas_turno) == 1
+
+    def test_venta_activa_sembrada_bloquea_crear_venta(self):
+        db = _mock_db(venta_por_orden=None)
+        orden = _orden()
+        fuente = FuenteDatosPrecargada(db, ordenes=[orden])
+        fuente.registrar_venta_activa(orden.id, _venta(id_orden=orden.id), 0.0)
+        ev = evaluar_crear_venta_desde_ot(db, orden, _usuario("CAJA"), fuente=fuente)
+        assert ev.codigo_bloqueo == "VENTA_EXISTENTE"
+        assert db.query.call_count == 0
@@ -0,0 +1,198 @@
+"""
+Tests de la cola de alertas de stock (evaluación fuera del movimiento) y del barrido
+SIN_MOVIMIENTO con un solo MAX(fecha_movimiento) agrupado.
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.alerta_inventario import AlertaInventario, TipoAlertaInventario
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.repuesto import Repuesto
+from app.schemas.movimiento_inventario import MovimientoInventarioCreate
+from app.services import alertas_stock_service
+from app.services.alertas_stock_service import ColaAlertasStock, cola_alertas_stock
+from app.services.inventario_service import InventarioService
+from tests.semillas import contar_sentencias, seed_usuario
+
+
+def _seed_repuesto(db, stock="10", **kwargs) -> Repuesto:
+    repuesto = Repuesto(
+        codigo=f"ALR-{uuid.uuid4().hex[:8]}",
+        nombre="Aceite alerta",
+        stock_actual=Decimal(stock),
+        stock_minimo=Decimal("5"),
+        precio_compra=Decimal("80.00"),
+        precio_venta=Decimal("120.00"),
+        **kwargs,
+    )
+    db.add(repuesto)
+    db.flush()
+    return repuesto
+
+
+def _salida(repuesto, cantidad="10") -> MovimientoInventarioCreate:
+    return MovimientoInventarioCreate(
+        id_repuesto=repuesto.id_repuesto, tipo_movimiento=TipoMovimiento.SALIDA, cantidad=Decimal(cantidad)
+    )
+
+
+def _alertas(db, repuesto, tipo=None) -> list[AlertaInventario]:
+    q = db.query(AlertaInventario).filter(AlertaInventario.id_repuesto == repuesto.id_repuesto)
+    if tipo is not None:
+        q = q.filter(AlertaInventario.tipo_alerta == tipo)
+    return q.order_by(AlertaInventario.id_alerta).all()
+
+
+@pytest.mark.integration
+def test_movimiento_encola_al_confirmar_sin_consultar_alertas(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    repuesto = _seed_repuesto(db)
+    sentencias = []
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    conn = db.connection()
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        InventarioService.registrar_movimiento(db, _salida(repuesto), usuario.id_usuario)
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+
+    # El movimiento ya no consulta ni escribe alertas_inventario
+    assert not [s for s in sentencias if "alertas_inventario" in s]
+    assert cola_alertas_stock.pendientes() == 1
+
+    assert cola_alertas_stock.procesar_pendientes(db) == 1
+    alertas = _alertas(db, repuesto)
+    assert [a.tipo_alerta for a in alertas] == [TipoAlertaInventario.SIN_STOCK]
+
+
+@pytest.mark.integration
+def test_rollback_descarta_repuestos_marcados(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    repuesto = _seed_repuesto(db)
+    db.commit()
+
+    InventarioService.registrar_movimiento(db, _salida(repuesto, "1"), usuario.id_usuario, autocommit=False)
+    assert db.info[alertas_stock_service.CLAVE_INFO] == {repuesto.id_repuesto}
+    db.rollback()
+
+    assert alertas_stock_service.CLAVE_INFO not in db.info
+    assert cola_alertas_stock.pendientes() == 0
+
+
+def test_hilo_agrupa_y_deduplica_rafagas(monkeypatch):
+    lotes = []
+    listo = threading.Event()
+
+    def evaluar(db, ids):
+        lotes.append(list(ids))
+        listo.set()
+
+    monkeypatch.setattr(InventarioService, "evaluar_alertas_stock", staticmethod(evaluar))
+    cola = ColaAlertasStock(espera_segundos=0.2, tamano_lote=3)
+    cola.iniciar()
+    try:
+        for ids in ([5, 1], [1, 2], [5, 4, 3]):
+            cola.encolar(ids)
+        assert listo.wait(5)
+    finally:
+        cola.detener()
+
+    assert lotes == [[1, 2, 3], [4, 5]]
+    assert cola.estadisticas.repuestos_evaluados == 5
+    assert not cola.activa
+
+
+def test_lote_fallido_vuelve_a_la_cola_hasta_max_intentos(monkeypatch):
+    evaluados = []
+
+    def evaluar(db, ids):
+        if 7 in ids:
+            raise RuntimeError("bloqueo")
+        evaluados.extend(ids)
+
+    monkeypatch.setattr(InventarioService, "evaluar_alertas_stock", staticmethod(evaluar))
+    cola = ColaAlertasStock(espera_segundos=0, tamano_lote=2, max_intentos=3)
+    cola.encolar([1, 2, 7, 8])
+
+    assert cola.procesar_pendientes() == 4
+    assert evaluados == [1, 2]
+    assert cola.pendientes() == 2  # el lote [7, 8] vuelve a la cola
+
+    monkeypatch.setattr(cola, "tamano_lote", 1)
+    cola.procesar_pendientes()
+    assert evaluados == [1, 2, 8] and cola.pendientes() == 1
+    cola.procesar_pendientes()  # tercer fallo de 7: se descarta
+    assert cola.pendientes() == 0
+    assert (cola.estadisticas.errores, cola.estadisticas.repuestos_descartados) == (3, 1)
+
+
+@pytest.mark.integration
+def test_sin_movimiento_en_sentencias_constantes_y_sin_duplicar(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    hace_200 = datetime.utcnow() - timedelta(days=200)
+    nunca = [_seed_repuesto(db) for _ in range(30)]
+    viejos = [_seed_repuesto(db) for _ in range(30)]
+    reciente = _seed_repuesto(db)
+    inactivo = _seed_repuesto(db, activo=False)
+    for r in viejos:
+        db.add(
+            MovimientoInventario(
+                id_repuesto=r.id_repuesto,
+                tipo_movimiento=TipoMovimiento.ENTRADA,
+                cantidad=Decimal("1"),
+                stock_anterior=Decimal("9"),
+                stock_nuevo=Decimal("10"),
+                id_usuario=usuario.id_usuario,
+                fecha_movimiento=hace_200,
+            )
+        )
+    InventarioService.registrar_movimiento(
+        db,
+        MovimientoInventarioCreate(
+            id_repuesto=reciente.id_repuesto, tipo_movimiento=TipoMovimiento.ENTRADA, cantidad=Decimal("1")
+        ),
+        usuario.id_usuario,
+        autocommit=False,
+    )
+    db.flush()
+
+    resultados = []
+    n = contar_sentencias(db, lambda: resultados.append(InventarioService.verificar_productos_sin_movimiento(db)))
+
+    assert n <= 5
+    sin_mov = TipoAlertaInventario.SIN_MOVIMIENTO
+    assert all(len(_alertas(db, r, sin_mov)) == 1 for r in nunca + viejos)
+    assert "999 días" in _alertas(db, nunca[0], sin_mov)[0].mensaje
+    assert "200 días" in _alertas(db, viejos[0], sin_mov)[0].mensaje
+    assert _alertas(db, reciente, sin_mov) == [] and _alertas(db, inactivo, sin_mov) == []
+    assert resultados[0]["creadas"] >= 60
+
+    InventarioService.registrar_movimiento(
+        db,
+        MovimientoInventarioCreate(
+            id_repuesto=viejos[0].id_repuesto, tipo_movimiento=TipoMovimiento.ENTRADA, cantidad=Decimal("1")
+        ),
+        usuario.id_usuario,
+        autocommit=False,
+    )
+    db.flush()
+    segundo = InventarioService.verificar_productos_sin_movimiento(db)
+
+    assert segundo == {"creadas": 0, "resueltas": 1}
+    assert all(len(_alertas(db, r, sin_mov)) == 1 for r in nunca + viejos)
+    db.expire_all()
+    assert not _alertas(db, viejos[0], sin_mov)[0].activa
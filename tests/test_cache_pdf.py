@@ -0,0 +1,152 @@
+"""
+Tests de la caché de PDFs en disco: clave por contenido, ETag/304, desalojo LRU e invalidación
+automática al cambiar los datos de la orden/cotización.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.models.cotizacion_refaccion_especial import (
+    CotizacionRefaccionEspecial,
+    LineaCotizacionRefaccion,
+    OpcionCompraLineaCotizacion,
+)
+from app.routers.ordenes_trabajo import cotizacion as cotizacion_ot
+from app.services import cotizacion_refaccion_pdf
+from app.utils import cache_pdf as modulo_cache_pdf
+from app.utils.cache_pdf import CachePdf, clave_pdf
+from tests.semillas import seed_cliente_vehiculo, seed_ot_completada, seed_usuario
+
+
+@pytest.fixture
+def cache_temporal(tmp_path, monkeypatch) -> CachePdf:
+    cache = CachePdf(tmp_path / "pdf", 10 * 1024 * 1024)
+    monkeypatch.setattr(modulo_cache_pdf, "cache_pdf", cache)
+    return cache
+
+
+def _contar_llamadas(monkeypatch, modulo, nombre: str) -> list:
+    llamadas = []
+    original = getattr(modulo, nombre)
+
+    def envoltura(*args, **kwargs):
+        llamadas.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(modulo, nombre, envoltura)
+    return llamadas
+
+
+def test_clave_estable_y_sensible_a_datos_plantilla_y_app():
+    datos = {"total": 10.5, "partes": [{"descripcion": "Balata", "cantidad": 2}]}
+    base = clave_pdf("cotizacion_ot", "1", "Medina", datos)
+    assert base == clave_pdf("cotizacion_ot", "1", "Medina", dict(reversed(list(datos.items()))))
+    assert base != clave_pdf("cotizacion_ot", "2", "Medina", datos)
+    assert base != clave_pdf("cotizacion_ot", "1", "Otro", datos)
+    assert base != clave_pdf("cotizacion_ot", "1", "Medina", {**datos, "total": 10.6})
+
+
+def test_desalojo_lru_por_tamano(tmp_path):
+    cache = CachePdf(tmp_path, 3000)
+    for i, clave in enumerate(("a", "b", "c")):
+        cache.guardar(clave, b"x" * 1000)
+        os.utime(tmp_path / f"{clave}.pdf", (1000 + i, 1000 + i))
+
+    assert cache.obtener("a") == b"x" * 1000  # "a" pasa a ser la más reciente
+    cache.guardar("d", b"y" * 1000)
+
+    assert cache.obtener("b") is None
+    assert {p.stem for p in tmp_path.glob("*.pdf")} == {"a", "c", "d"}
+    assert cache.estadisticas.desalojos == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cache_desactivada_siempre_genera(tmp_path):
+    cache = CachePdf(tmp_path, 0)
+    llamadas = []
+    for _ in range(2):
+        assert cache.obtener_o_generar("k", lambda: llamadas.append(1) or b"%PDF") == b"%PDF"
+    assert len(llamadas) == 2
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.integration
+def test_cotizacion_ot_etag_304_cache_e_invalidacion(
+    client_transactional_db, db_session_transactional, cache_temporal, monkeypatch
+):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    orden = seed_ot_completada(db, cliente, vehiculo)
+    renders = _contar_llamadas(monkeypatch, cotizacion_ot, "_generar_pdf_cotizacion")
+    url = f"/api/ordenes-trabajo/{orden.id}/cotizacion"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    primera = client_transactional_db.get(url, headers=headers)
+    assert primera.status_code == 200, primera.text
+    assert primera.content.startswith(b"%PDF")
+    etag = primera.headers["etag"]
+    assert primera.headers["cache-control"] == "private, no-cache"
+    n_renders = len(renders)
+
+    no_modificado = client_transactional_db.get(url, headers={**headers, "If-None-Match": etag})
+    assert no_modificado.status_code == 304
+    assert no_modificado.content == b""
+    assert no_modificado.headers["etag"] == etag
+
+    repetida = client_transactional_db.get(url, headers=headers)
+    assert repetida.content == primera.content
+    assert len(renders) == n_renders
+    assert cache_temporal.estadisticas.hits == 1
+
+    orden.diagnostico_inicial = "Ruido en suspensión delantera"
+    db.flush()
+    cambiada = client_transactional_db.get(url, headers={**headers, "If-None-Match": etag})
+    assert cambiada.status_code == 200
+    assert cambiada.headers["etag"] != etag
+    assert len(renders) > n_renders
+
+
+@pytest.mark.integration
+def test_cotizacion_refaccion_clave_cambia_con_opciones(db_session_transactional, cache_temporal, monkeypatch):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    cot = CotizacionRefaccionEspecial(
+        numero=f"CRE-{uuid.uuid4().hex[:8]}",
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        id_usuario_creo=usuario.id_usuario,
+    )
+    db.add(cot)
+    db.flush()
+    linea = LineaCotizacionRefaccion(id_cotizacion=cot.id, descripcion="Módulo ABS", cantidad=Decimal("1"))
+    db.add(linea)
+    db.flush()
+    opcion = OpcionCompraLineaCotizacion(id_linea=linea.id, origen_nombre="Proveedor US", monto_unitario=Decimal("150"))
+    db.add(opcion)
+    db.flush()
+    db.expire_all()
+    renders = _contar_llamadas(monkeypatch, cotizacion_refaccion_pdf, "_dibujar_pdf")
+
+    clave, generar, nombre = cotizacion_refaccion_pdf.preparar_pdf_cotizacion_refaccion(db, cot.id)
+    assert nombre == f"cotizacion-refaccion-{cot.numero}.pdf"
+    assert renders == []
+    pdf = cache_temporal.obtener_o_generar(clave, generar)
+    assert pdf.startswith(b"%PDF")
+    db.expire_all()
+    clave_repetida, generar, _ = cotizacion_refaccion_pdf.preparar_pdf_cotizacion_refaccion(db, cot.id)
+    assert clave_repetida == clave
+    assert cache_temporal.obtener_o_generar(clave, generar) == pdf
+    assert len(renders) == 1
+
+    db.get(OpcionCompraLineaCotizacion, opcion.id).monto_unitario = Decimal("175")
+    db.flush()
+    db.expire_all()
+    clave_nueva, _, _ = cotizacion_refaccion_pdf.preparar_pdf_cotizacion_refaccion(db, cot.id)
+    assert clave_nueva != clave
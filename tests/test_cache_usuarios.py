@@ -0,0 +1,112 @@
+"""
+Tests de la caché de usuario autenticado (app/utils/cache_usuarios.py) y de require_roles con ella.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models.usuario import Usuario
+from app.utils.cache_usuarios import CacheUsuarios, cache_usuarios
+from tests.semillas import seed_usuario
+
+
+def _selects_usuarios(client, db, url, token):
+    """(status, SELECTs a usuarios) de un GET autenticado."""
+    conn = db.connection()
+    sentencias: list[str] = []
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM usuarios" in statement:
+            sentencias.append(statement)
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        r = client.get(url, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+    return r.status_code, len(sentencias)
+
+
+@pytest.fixture
+def cache_activa(monkeypatch):
+    monkeypatch.setattr(cache_usuarios, "ttl_segundos", 60)
+    monkeypatch.setattr(cache_usuarios, "max_usuarios", 100)
+    cache_usuarios.invalidar()
+    yield cache_usuarios
+    cache_usuarios.invalidar()
+
+
+def test_lru_desaloja_el_menos_usado_y_cuenta_aciertos():
+    cache = CacheUsuarios(ttl_segundos=60, max_usuarios=2)
+    for i in (1, 2):
+        cache.guardar(Usuario(id_usuario=i), cache.generacion)
+    assert cache.obtener(1) is not None
+    cache.guardar(Usuario(id_usuario=3), cache.generacion)
+    assert cache.obtener(2) is None
+    assert cache.obtener(3) is not None
+    resumen = cache.resumen()
+    assert (resumen["hits"], resumen["misses"], resumen["usuarios_en_cache"]) == (2, 1, 2)
+    assert resumen["tasa_aciertos"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_ttl_y_generacion(monkeypatch):
+    cache = CacheUsuarios(ttl_segundos=60, max_usuarios=10)
+    generacion = cache.generacion
+    cache.invalidar(99)
+    # Lectura hecha antes de una invalidación: no se cachea
+    cache.guardar(Usuario(id_usuario=1), generacion)
+    assert cache.obtener(1) is None
+
+    cache.guardar(Usuario(id_usuario=1), cache.generacion)
+    ahora = time.monotonic()
+    monkeypatch.setattr("app.utils.cache_usuarios.time.monotonic", lambda: ahora + 61)
+    assert cache.obtener(1) is None
+    assert cache.resumen()["expirados"] == 1
+
+
+@pytest.mark.integration
+def test_segundo_request_no_consulta_usuarios(client_transactional_db, db_session_transactional, cache_activa):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    url = "/api/usuarios/cache-autenticacion"
+
+    assert _selects_usuarios(client_transactional_db, db, url, token) == (200, 1)
+    # Fuera del identity map: el acierto adjunta la copia cacheada sin SELECT
+    db.expunge_all()
+    assert _selects_usuarios(client_transactional_db, db, url, token) == (200, 0)
+    assert cache_activa.estadisticas.hits >= 1
+
+
+@pytest.mark.integration
+def test_router_usuarios_invalida_rol_y_activo(client_transactional_db, db_session_transactional, cache_activa):
+    db = db_session_transactional
+    _, token_admin = seed_usuario(db, "ADMIN")
+    empleado, token_empleado = seed_usuario(db, "ADMIN")
+    headers = {"Authorization": f"Bearer {token_admin}"}
+    url = "/api/usuarios/cache-autenticacion"
+
+    assert _selects_usuarios(client_transactional_db, db, url, token_empleado)[0] == 200
+    r = client_transactional_db.put(f"/api/usuarios/{empleado.id_usuario}", json={"rol": "TECNICO"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert _selects_usuarios(client_transactional_db, db, url, token_empleado) == (403, 1)
+
+    r = client_transactional_db.put(f"/api/usuarios/{empleado.id_usuario}", json={"activo": False}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert _selects_usuarios(client_transactional_db, db, url, token_empleado)[0] == 401
+
+
+@pytest.mark.integration
+def test_rol_cambiado_aplica_sin_volver_a_iniciar_sesion(
+    client_transactional_db, db_session_transactional, cache_activa
+):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    usuario.rol = "TECNICO"
+    db.flush()
+
+    # El claim "rol" del token sigue diciendo ADMIN; manda el rol del usuario
+    assert _selects_usuarios(client_transactional_db, db, "/api/usuarios/cache-autenticacion", token)[0] == 403
@@ -0,0 +1,180 @@
+"""
+Tests de los totales acumulados por turno (caja_turno_totales): se mantienen en la misma
+transacción que cobros, gastos y egresos (alta, cambio de monto/método/turno, baja); corte y
+cierre los leen sin sumar pagos; el auditor detecta y corrige desfases.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, update
+
+from app.models.caja_turno_total import CajaTurnoTotal
+from app.models.cuenta_pagar_manual import CuentaPagarManual, PagoCuentaPagarManual
+from app.models.gasto_operativo import GastoOperativo
+from app.models.orden_compra import OrdenCompra
+from app.models.pago import Pago
+from app.models.pago_orden_compra import PagoOrdenCompra
+from app.models.proveedor import Proveedor
+from app.services.caja_totales_service import auditar_totales, calcular_totales, leer_totales
+from tests.semillas import seed_cliente_vehiculo, seed_turno, seed_usuario, seed_venta_ot_con_abono
+
+
+def _sembrar_movimientos(db, usuario, turno) -> dict:
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "2000.00", "300.00")
+    tarjeta = Pago(
+        id_venta=venta.id_venta,
+        id_usuario=usuario.id_usuario,
+        id_turno=turno.id_turno,
+        monto=Decimal("450.00"),
+        metodo="TARJETA",
+    )
+    gasto = GastoOperativo(
+        fecha=date.today(),
+        concepto="Garrafón",
+        monto=Decimal("40.00"),
+        categoria="OTROS",
+        id_turno=turno.id_turno,
+        id_usuario=usuario.id_usuario,
+    )
+    proveedor = Proveedor(nombre=f"Prov caja {uuid.uuid4().hex[:6]}")
+    db.add_all([tarjeta, gasto, proveedor])
+    db.flush()
+    oc = OrdenCompra(
+        numero=f"OC-CAJA-{uuid.uuid4().hex[:6]}", id_proveedor=proveedor.id_proveedor, id_usuario=usuario.id_usuario
+    )
+    cuenta = CuentaPagarManual(
+        concepto="Luz", monto_total=Decimal("500.00"), fecha_registro=date.today(), id_usuario=usuario.id_usuario
+    )
+    db.add_all([oc, cuenta])
+    db.flush()
+    db.add_all(
+        [
+            PagoOrdenCompra(
+                id_orden_compra=oc.id_orden_compra,
+                id_usuario=usuario.id_usuario,
+                id_turno=turno.id_turno,
+                monto=Decimal("100.00"),
+                metodo="EFECTIVO",
+            ),
+            PagoOrdenCompra(
+                id_orden_compra=oc.id_orden_compra,
+                id_usuario=usuario.id_usuario,
+                id_turno=turno.id_turno,
+                monto=Decimal("900.00"),
+                metodo="TRANSFERENCIA",  # no sale de caja
+            ),
+            PagoCuentaPagarManual(
+                id_cuenta=cuenta.id_cuenta,
+                id_usuario=usuario.id_usuario,
+                id_turno=turno.id_turno,
+                monto=Decimal("60.00"),
+                metodo="EFECTIVO",
+                fecha=datetime.utcnow(),
+            ),
+        ]
+    )
+    db.flush()
+    return {"venta": venta, "tarjeta": tarjeta, "gasto": gasto}
+
+
+@pytest.mark.integration
+def test_totales_se_mantienen_en_altas_cambios_y_bajas(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    otro = seed_turno(db, usuario.id_usuario)
+    filas = _sembrar_movimientos(db, usuario, turno)
+
+    t = leer_totales(db, turno.id_turno)
+    assert (t.cobros_efectivo, t.cobros_tarjeta, t.cantidad_cobros) == (Decimal("300"), Decimal("450"), 2)
+    assert (t.gastos, t.pagos_proveedor_efectivo, t.pagos_cuentas_manuales_efectivo) == (40, 100, 60)
+    assert t.efectivo_esperado(turno.monto_apertura) == Decimal("600.00")  # 500 + 300 - 100 - 60 - 40
+
+    filas["tarjeta"].metodo = "EFECTIVO"
+    filas["tarjeta"].monto = Decimal("400.00")
+    filas["gasto"].id_turno = otro.id_turno
+    db.flush()
+    db.delete(db.query(Pago).filter(Pago.id_venta == filas["venta"].id_venta, Pago.metodo == "EFECTIVO").first())
+    db.flush()
+
+    t = leer_totales(db, turno.id_turno)
+    assert (t.cobros_efectivo, t.cobros_tarjeta, t.cantidad_cobros, t.gastos) == (400, 0, 1, 0)
+    assert leer_totales(db, otro.id_turno).gastos == Decimal("40.00")
+    assert calcular_totales(db, [turno.id_turno, otro.id_turno]) == {
+        turno.id_turno: t,
+        otro.id_turno: leer_totales(db, otro.id_turno),
+    }
+    assert auditar_totales(db, ids_turno=[turno.id_turno, otro.id_turno]) == []
+
+
+@pytest.mark.integration
+def test_corte_y_cierre_leen_los_totales_sin_sumar_pagos(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    _sembrar_movimientos(db, usuario, turno)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    sentencias = []
+    conn = db.connection()
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(" ".join(statement.split()).upper())
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        corte = client_transactional_db.get("/api/caja/corte-diario", headers=headers)
+        cierre = client_transactional_db.post("/api/caja/cerrar", json={"monto_cierre": 590}, headers=headers)
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+
+    assert corte.status_code == 200, corte.text
+    body = corte.json()
+    assert body["totales_por_metodo"] == [{"metodo": "EFECTIVO", "total": 300.0}, {"metodo": "TARJETA", "total": 450.0}]
+    assert body["total_general"] == 750.0
+    assert (body["total_gastos"], body["total_pagos_proveedores"], body["total_pagos_cuentas_manuales"]) == (
+        40,
+        100,
+        60,
+    )
+    assert body["efectivo_esperado"] == 600.0
+    assert not [s for s in sentencias if "FROM PAGOS " in s or "SUM(" in s]
+
+    assert cierre.status_code == 200, cierre.text
+    db.refresh(turno)
+    assert turno.diferencia == Decimal("-10")
+
+    historico = client_transactional_db.get("/api/caja/historico-turnos", params={"limit": 5}, headers=headers).json()
+    fila = next(h for h in historico if h["id_turno"] == turno.id_turno)
+    assert (fila["total_cobros"], fila["efectivo_esperado"]) == (750.0, 600.0)
+
+
+@pytest.mark.integration
+def test_auditor_detecta_y_corrige_desfases(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    sin_fila = seed_turno(db, usuario.id_usuario)
+    _sembrar_movimientos(db, usuario, turno)
+    tabla = CajaTurnoTotal.__table__
+    db.execute(update(tabla).where(tabla.c.id_turno == turno.id_turno).values(cobros_tarjeta=Decimal("1.00")))
+    db.query(CajaTurnoTotal).filter(CajaTurnoTotal.id_turno == sin_fila.id_turno).delete()
+    ids = [turno.id_turno, sin_fila.id_turno]
+
+    desfases = auditar_totales(db, ids_turno=ids)
+    assert [(d.id_turno, d.columna, d.almacenado, d.calculado) for d in desfases if d.almacenado is not None] == [
+        (turno.id_turno, "cobros_tarjeta", Decimal("1.00"), Decimal("450.00"))
+    ]
+    assert {d.id_turno for d in desfases if d.almacenado is None} == {sin_fila.id_turno}
+    # Sin fila, la lectura calcula en vivo
+    assert leer_totales(db, sin_fila.id_turno).total_cobros == 0
+
+    auditar_totales(db, corregir=True, ids_turno=ids)
+    assert auditar_totales(db, ids_turno=ids) == []
+    assert leer_totales(db, turno.id_turno).cobros_tarjeta == Decimal("450.00")
@@ -0,0 +1,196 @@
+"""
+Tests de contadores_operativos: mantenimiento por eventos, reconciliador y fast path A0.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.cita import Cita, EstadoCita, TipoCita
+from app.models.contador_operativo import ContadorOperativo
+from app.models.orden_trabajo import EstadoOrden, OrdenTrabajo
+from app.models.pago import Pago
+from app.models.venta import Venta
+from app.services import contadores_operativos_service, saldos_venta_service
+from app.services.contadores_operativos_service import leer_contadores, reconciliar_contadores
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_ot_completada, seed_turno, seed_usuario
+
+
+def _assert_sin_desfase(db, etiqueta: str) -> None:
+    db.commit()  # los deltas se escriben al confirmar
+    desfases = reconciliar_contadores(db, corregir=False)
+    assert not desfases, f"{etiqueta}: " + ", ".join(str(d.a_dict()) for d in desfases)
+
+
+def _seed_ot(db, cliente, vehiculo, estado=EstadoOrden.PENDIENTE, tecnico_id=None) -> OrdenTrabajo:
+    ot = OrdenTrabajo(
+        numero_orden=f"OT-CNT-{uuid.uuid4().hex[:8]}",
+        vehiculo_id=vehiculo.id_vehiculo,
+        cliente_id=cliente.id_cliente,
+        tecnico_id=tecnico_id,
+        estado=estado,
+        fecha_ingreso=datetime.utcnow(),
+        total=Decimal("600.00"),
+        subtotal_servicios=Decimal("600.00"),
+        subtotal_repuestos=Decimal("0.00"),
+        descuento=Decimal("0.00"),
+    )
+    db.add(ot)
+    db.flush()
+    return ot
+
+
+@pytest.mark.integration
+def test_eventos_mantienen_contadores_sin_desfase(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    tecnico, _ = seed_usuario(db, "TECNICO")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    reconciliar_contadores(db)
+    _assert_sin_desfase(db, "tras reconciliar")
+
+    ot = _seed_ot(db, cliente, vehiculo, tecnico_id=tecnico.id_usuario)
+    _assert_sin_desfase(db, "OT nueva")
+    ot.estado = EstadoOrden.EN_PROCESO
+    _assert_sin_desfase(db, "OT en proceso")
+    ot.estado = EstadoOrden.COMPLETADA
+    ot.fecha_finalizacion = datetime.utcnow()
+    _assert_sin_desfase(db, "OT completada (O1 sin venta)")
+
+    venta = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        id_orden=ot.id,
+        total=Decimal("600.00"),
+        estado="PENDIENTE",
+    )
+    db.add(venta)
+    _assert_sin_desfase(db, "venta de la OT")
+    pago = Pago(
+        id_venta=venta.id_venta,
+        id_usuario=usuario.id_usuario,
+        id_turno=turno.id_turno,
+        monto=Decimal("200.00"),
+        metodo="EFECTIVO",
+        fecha=datetime.utcnow(),
+    )
+    db.add(pago)
+    _assert_sin_desfase(db, "abono parcial")
+    pago.monto = Decimal("600.00")
+    _assert_sin_desfase(db, "pago completo (O2)")
+    venta.estado = "CANCELADA"
+    _assert_sin_desfase(db, "venta cancelada")
+
+    mostrador = Venta(id_cliente=cliente.id_cliente, total=Decimal("150.00"), estado="PENDIENTE")
+    db.add(mostrador)
+    _assert_sin_desfase(db, "venta mostrador (V1)")
+    db.delete(mostrador)
+    _assert_sin_desfase(db, "venta mostrador borrada")
+
+    otra = seed_ot_completada(db, cliente, vehiculo)
+    ot.tecnico_id = None
+    otra.estado = EstadoOrden.ENTREGADA
+    _assert_sin_desfase(db, "técnico removido y OT entregada")
+
+    cita = Cita(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        fecha_hora=datetime.utcnow() + timedelta(days=1),
+        tipo=TipoCita.REVISION,
+        estado=EstadoCita.CONFIRMADA,
+    )
+    db.add(cita)
+    _assert_sin_desfase(db, "cita convertible")
+    cita.id_orden = ot.id
+    _assert_sin_desfase(db, "cita vinculada a OT")
+    cita.id_orden = None
+    cita.estado = EstadoCita.CANCELADA
+    _assert_sin_desfase(db, "cita cancelada")
+
+    assert leer_contadores(db, tecnico.id_usuario)["ot_completadas"] == 0
+
+
+@pytest.mark.integration
+def test_reconciliador_reporta_y_corrige_desfase(db_session_transactional):
+    db = db_session_transactional
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    _seed_ot(db, cliente, vehiculo)
+    reconciliar_contadores(db)
+
+    fila = db.get(ContadorOperativo, ("ot_pendientes", 0))
+    esperado, version = fila.valor, fila.version
+    fila.valor = esperado + 7
+    db.flush()
+
+    desfases = reconciliar_contadores(db)
+    assert [(d.clave, d.almacenado, d.calculado) for d in desfases] == [("ot_pendientes", esperado + 7, esperado)]
+    db.refresh(fila)
+    assert fila.valor == esperado
+    assert fila.version == version + 1
+    assert reconciliar_contadores(db) == []
+
+
+@pytest.mark.integration
+def test_fast_path_lee_contadores_y_verificacion_usa_sql(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    seed_ot_completada(db, cliente, vehiculo)
+    _seed_ot(db, cliente, vehiculo)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def _resumen(**params):
+        r = client_transactional_db.get(
+            "/api/operaciones/resumen", params={"incluir_items": False, **params}, headers=headers
+        )
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    sin_tabla = _resumen()
+    assert sin_tabla["meta"]["fuente_metricas"] == "sql"
+    n_sql = contar_sentencias(db, _resumen)
+
+    reconciliar_contadores(db)
+    datos = {}
+    n_contadores = contar_sentencias(db, lambda: datos.update(_resumen()))
+    verificacion = _resumen(verificar_contadores=True)
+
+    assert datos["meta"]["fuente_metricas"] == "contadores"
+    assert verificacion["meta"]["fuente_metricas"] == "sql"
+    assert datos["metricas"] == verificacion["metricas"] == sin_tabla["metricas"]
+    assert n_contadores <= n_sql - 8
+
+
+def test_listener_de_saldos_corre_antes_del_de_contadores():
+    """El conteo "después" de O1/O2/V1 lee ventas.saldo ya escrito por saldos_venta_service."""
+    orden = list(Session().dispatch.after_flush)
+    assert orden.index(saldos_venta_service._aplicar_deltas) < orden.index(
+        contadores_operativos_service._aplicar_despues
+    )
+
+
+@pytest.mark.integration
+def test_deltas_se_escriben_al_confirmar_y_sin_reclasificar_cambios_ajenos(db_session_transactional):
+    db = db_session_transactional
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    reconciliar_contadores(db)
+    db.commit()
+    pendientes = leer_contadores(db)["ot_pendientes"]
+
+    _seed_ot(db, cliente, vehiculo)
+    assert leer_contadores(db)["ot_pendientes"] == pendientes  # la fila global no se toca en el flush
+    db.commit()
+    assert leer_contadores(db)["ot_pendientes"] == pendientes + 1
+
+    venta = Venta(id_cliente=cliente.id_cliente, total=Decimal("150.00"), estado="PENDIENTE")
+    db.add(venta)
+    db.flush()
+    venta.comentarios = "Entregar factura"
+    assert contar_sentencias(db, db.flush) == 1  # solo el UPDATE de la venta, sin COUNT de O1/O2/V1
+    _assert_sin_desfase(db, "venta editada")
@@ -0,0 +1,150 @@
+"""
+Tests del contexto de consultas por request (turno, venta activa por OT) y del saldo
+materializado que leen los mismos servicios.
+
+Unitarios: sesiones simuladas no usan contexto. Integración: hits/misses e invalidación
+al escribir Pago/Venta/CajaTurno en la misma sesión.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.pago import Pago
+from app.models.venta import Venta
+from app.services import acciones_operativas_service, operaciones_service
+from app.services.contexto_consultas import CLAVE_INFO, contexto_de
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_turno, seed_usuario, seed_venta_ot_con_abono
+
+
+def test_sesion_simulada_sin_contexto():
+    assert contexto_de(MagicMock()) is None
+
+
+def test_saldo_es_la_columna_materializada_sin_consulta():
+    db = MagicMock()
+    venta = MagicMock(id_venta=1, total=Decimal("100"), saldo=Decimal("60"))
+    assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 60.0
+    assert db.query.call_count == 0
+
+
+@pytest.mark.integration
+def test_contexto_compartido_entre_servicios(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+
+    assert contexto_de(db) is db.info[CLAVE_INFO]
+
+    def _lecturas():
+        assert operaciones_service._venta_activa_por_orden(db, venta.id_orden).id_venta == venta.id_venta
+        assert acciones_operativas_service._venta_activa_por_orden(db, venta.id_orden).id_venta == venta.id_venta
+        assert operaciones_service.calcular_saldo_venta(db, venta) == 750.0
+        assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 750.0
+        assert operaciones_service._info_caja(db, usuario)["id_turno"] == turno.id_turno
+        assert acciones_operativas_service.turno_abierto_usuario(db, usuario).id_turno == turno.id_turno
+
+    assert contar_sentencias(db, _lecturas) == 2
+    assert contar_sentencias(db, _lecturas) == 0
+    assert contexto_de(db).estadisticas() == {
+        "turno_abierto": {"hits": 3, "misses": 1},
+        "venta_activa_por_orden": {"hits": 3, "misses": 1},
+    }
+
+
+@pytest.mark.integration
+def test_contexto_invalida_saldo_al_registrar_pago(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+
+    assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 750.0
+    db.add(
+        Pago(
+            id_venta=venta.id_venta,
+            id_usuario=usuario.id_usuario,
+            id_turno=turno.id_turno,
+            monto=Decimal("700.00"),
+            metodo="EFECTIVO",
+            fecha=datetime.utcnow(),
+        )
+    )
+    db.flush()
+    assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 50.0
+
+
+@pytest.mark.integration
+def test_contexto_invalida_venta_activa_al_escribir_venta(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "0.00")
+
+    assert operaciones_service._venta_activa_por_orden(db, venta.id_orden).id_venta == venta.id_venta
+    venta.estado = "CANCELADA"
+    db.flush()
+    assert operaciones_service._venta_activa_por_orden(db, venta.id_orden) is None
+
+    nueva = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        id_orden=venta.id_orden,
+        total=Decimal("900.00"),
+        estado="PENDIENTE",
+    )
+    db.add(nueva)
+    db.flush()
+    assert operaciones_service._venta_activa_por_orden(db, venta.id_orden).id_venta == nueva.id_venta
+
+
+@pytest.mark.integration
+def test_contexto_invalida_turno_con_update_masivo(db_session_transactional):
+    from app.models.caja_turno import CajaTurno
+
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+
+    assert acciones_operativas_service.turno_abierto_usuario(db, usuario).id_turno == turno.id_turno
+    db.query(CajaTurno).filter(CajaTurno.id_turno == turno.id_turno).update(
+        {CajaTurno.estado: "CERRADO"}, synchronize_session=False
+    )
+    assert acciones_operativas_service.turno_abierto_usuario(db, usuario) is None
+
+
+@pytest.mark.integration
+def test_hit_ve_pago_sin_flush_y_commit_vacia_el_contexto(db_session_transactional):
+    db = db_session_transactional
+    db.autoflush = True  # como SessionLocal
+    usuario, _ = seed_usuario(db)
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+
+    assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 750.0
+    db.add(
+        Pago(
+            id_venta=venta.id_venta,
+            id_usuario=usuario.id_usuario,
+            id_turno=turno.id_turno,
+            monto=Decimal("700.00"),
+            metodo="EFECTIVO",
+            fecha=datetime.utcnow(),
+        )
+    )
+    # Sin flush explícito: la lectura hace el autoflush de la consulta directa
+    assert acciones_operativas_service.calcular_saldo_venta(db, venta) == 50.0
+
+    id_usuario = usuario.id_usuario
+    assert contexto_de(db).turno_abierto(id_usuario).id_turno == turno.id_turno
+    db.commit()
+    assert contar_sentencias(db, lambda: contexto_de(db).turno_abierto(id_usuario)) == 1  # vuelve a consultar
@@ -5,6 +5,7 @@ from datetime import date, datetime, timedelta
 import pytest
 
 from app.routers.ordenes_trabajo.cotizacion import _generar_pdf_cotizacion
+from tests.semillas import orden_cotizacion
 
 try:
     import fitz  # pymupdf
@@ -32,35 +33,6 @@ def _page_count(pdf_bytes: bytes) -> int:
     return n
 
 
-def _base_orden(**overrides):
-    data = {
-        "numero_orden": "OT-P54-TEST-001",
-        "fecha_ingreso": datetime.now().isoformat(),
-        "fecha_vigencia_cotizacion": (date.today() + timedelta(days=7)).isoformat(),
-        "kilometraje": 50000,
-        "diagnostico_inicial": "Diagnóstico de prueba.",
-        "observaciones_cliente": "Ruido en motor.",
-        "descuento": 100,
-        "total": 900.0,
-        "cliente_proporciono_refacciones": False,
-        "cliente": {
-            "nombre": "Cliente Prueba",
-            "telefono": "5550000000",
-            "email": "test@ejemplo.com",
-            "direccion": "Calle Test 1",
-        },
-        "vehiculo": {"marca": "Nissan", "modelo": "Sentra", "anio": 2020, "vin": "VIN123"},
-        "servicios": [
-            {"descripcion": "Servicio prueba", "cantidad": 1, "precio_unitario": 500, "subtotal": 500},
-        ],
-        "partes": [
-            {"descripcion": "[TST] Pieza prueba", "cantidad": 1, "precio_unitario": 500, "subtotal": 500},
-        ],
-    }
-    data.update(overrides)
-    return data
-
-
 def _escenario_aceite(**overrides):
     """Fixture equivalente OT-20260617-0002 — cambio de aceite simple."""
     data = {
@@ -95,14 +67,14 @@ def _escenario_aceite(**overrides):
 
 
 def test_pdf_genera_bytes_validos():
-    pdf = _generar_pdf_cotizacion(_base_orden())
+    pdf = _generar_pdf_cotizacion(orden_cotizacion())
     assert pdf[:4] == b"%PDF"
     assert len(pdf) > 2000
 
 
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_fase2_estructura_compacta():
-    pdf = _generar_pdf_cotizacion(_base_orden())
+    pdf = _generar_pdf_cotizacion(orden_cotizacion())
     text = _extract_pdf_text(pdf)
 
     assert "COTIZACIÓN" in text
@@ -149,7 +121,7 @@ def test_pdf_comentarios_deduplicados():
 
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_vigencia_metadata_default():
-    pdf = _generar_pdf_cotizacion(_base_orden(fecha_vigencia_cotizacion=None))
+    pdf = _generar_pdf_cotizacion(orden_cotizacion(fecha_vigencia_cotizacion=None))
     text = _extract_pdf_text(pdf)
     assert "VIGENCIA:" in text
     assert "7 días naturales" in text
@@ -157,14 +129,14 @@ def test_pdf_vigencia_metadata_default():
 
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_sin_descuento_no_muestra_linea():
-    pdf = _generar_pdf_cotizacion(_base_orden(descuento=0, total=1000.0))
+    pdf = _generar_pdf_cotizacion(orden_cotizacion(descuento=0, total=1000.0))
     text = _extract_pdf_text(pdf)
     assert "Descuento:" not in text
 
 
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_numeracion_paginas():
-    pdf = _generar_pdf_cotizacion(_base_orden())
+    pdf = _generar_pdf_cotizacion(orden_cotizacion())
     doc = fitz.open(stream=pdf, filetype="pdf")
     total = doc.page_count
     assert total >= 1
@@ -177,7 +149,7 @@ def test_pdf_numeracion_paginas():
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_escenario_afinacion_multipagina():
     pdf = _generar_pdf_cotizacion(
-        _base_orden(
+        orden_cotizacion(
             numero_orden="OT-P54-A-001",
             diagnostico_inicial="Afinación mayor",
             observaciones_cliente="Motor falla en ralentí",
@@ -219,7 +191,7 @@ def test_pdf_escenario_afinacion_multipagina():
 
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_pie_comercial_sin_placeholders():
-    pdf = _generar_pdf_cotizacion(_base_orden())
+    pdf = _generar_pdf_cotizacion(orden_cotizacion())
     text = _extract_pdf_text(pdf)
     assert "000 0000" not in text
     assert "[Dirección" not in text
@@ -229,7 +201,7 @@ def test_pdf_pie_comercial_sin_placeholders():
 @pytest.mark.skipif(not HAS_PYMUPDF, reason="pymupdf no instalado")
 def test_pdf_numeracion_unica_por_pagina():
     pdf = _generar_pdf_cotizacion(
-        _base_orden(
+        orden_cotizacion(
             numero_orden="OT-P54-XL",
             servicios=[
                 {
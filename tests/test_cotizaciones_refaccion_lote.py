@@ -0,0 +1,188 @@
+"""
+Tests de la hidratación de cotizaciones de refacción: listado, detalle y endpoints que devuelven
+el detalle cuestan las mismas consultas con una cotización chica que con muchas líneas, opciones,
+comentarios (de varios usuarios) y compras; los totales salen de la opción preferida.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.models.cliente import Cliente
+from app.models.cotizacion_refaccion_especial import (
+    ComentarioCotizacionRefaccion,
+    CompraEjecutadaCotizacionRefaccion,
+    CotizacionRefaccionEspecial,
+    EstadoCotizacionRefaccion,
+    LineaCotizacionRefaccion,
+    MonedaCotizacion,
+    OpcionCompraLineaCotizacion,
+)
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_usuario
+
+
+def _seed_cotizacion(db, cliente, usuario, *, lineas=1, opciones=1, comentaristas=(), compras=0, vehiculo=None):
+    cot = CotizacionRefaccionEspecial(
+        numero=f"COT-L-{uuid.uuid4().hex[:8]}",
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo if vehiculo else None,
+        id_usuario_creo=usuario.id_usuario,
+        estado=EstadoCotizacionRefaccion.BORRADOR,
+        tc_referencia_usd_mxn=Decimal("20"),
+        margen_objetivo_pct=Decimal("30"),
+    )
+    db.add(cot)
+    db.flush()
+    for n in range(1, lineas + 1):
+        ln = LineaCotizacionRefaccion(id_cotizacion=cot.id, n_linea=n, descripcion=f"Pieza {n}", cantidad=Decimal("2"))
+        db.add(ln)
+        db.flush()
+        for i in range(opciones):
+            db.add(
+                OpcionCompraLineaCotizacion(
+                    id_linea=ln.id,
+                    origen_nombre=f"Tienda {i}",
+                    moneda=MonedaCotizacion.USD if i % 2 else MonedaCotizacion.MXN,
+                    monto_unitario=Decimal("10") + i,
+                    otros_costos_mxn=Decimal("5"),
+                    es_preferida=i == 0,
+                )
+            )
+    inicio = datetime(2026, 6, 1, 9)
+    for i, autor in enumerate(comentaristas):
+        db.add(
+            ComentarioCotizacionRefaccion(
+                id_cotizacion=cot.id, id_usuario=autor.id_usuario, mensaje=f"Nota {i}", creado_en=inicio + timedelta(i)
+            )
+        )
+    for i in range(compras):
+        db.add(
+            CompraEjecutadaCotizacionRefaccion(
+                id_cotizacion=cot.id,
+                monto_pagado=Decimal("100"),
+                fecha_pago=inicio + timedelta(i),
+                id_usuario_registro=usuario.id_usuario,
+            )
+        )
+    db.flush()
+    return cot
+
+
+def _llamar(client, token, metodo, url, **kwargs):
+    r = client.request(
+        metodo, f"/api/cotizaciones-refaccion{url}", headers={"Authorization": f"Bearer {token}"}, **kwargs
+    )
+    assert r.status_code in (200, 201), r.text
+    return r.json()
+
+
+@pytest.mark.integration
+def test_listado_con_consultas_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    marca = uuid.uuid4().hex[:8]
+    clientes = [Cliente(nombre=f"Cot lote {marca} {i}") for i in range(10)]
+    db.add_all(clientes)
+    db.flush()
+
+    def listar():
+        return _llamar(client_transactional_db, token, "GET", "/", params={"buscar": marca, "limite": 50})
+
+    for cliente in clientes[:2]:
+        _seed_cotizacion(db, cliente, usuario)
+    pocas = contar_sentencias(db, listar)
+    for cliente in clientes[2:]:
+        _seed_cotizacion(db, cliente, usuario)
+    muchas = contar_sentencias(db, listar)
+
+    datos = listar()
+    assert datos["total"] == 10
+    assert {i["cliente_nombre"] for i in datos["items"]} == {c.nombre for c in clientes}
+    assert muchas == pocas
+
+
+@pytest.mark.integration
+def test_detalle_y_mutaciones_con_consultas_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    otros = [seed_usuario(db, "CAJA")[0] for _ in range(3)]
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    chica = _seed_cotizacion(db, cliente, usuario, opciones=2, comentaristas=[usuario])
+    grande = _seed_cotizacion(
+        db,
+        cliente,
+        usuario,
+        lineas=4,
+        opciones=3,
+        comentaristas=[usuario, *otros, otros[0]],
+        compras=2,
+        vehiculo=vehiculo,
+    )
+
+    def costos(cot):
+        linea = min(cot.lineas, key=lambda ln: ln.n_linea)
+        opcion = max(linea.opciones, key=lambda o: o.id)
+        c = client_transactional_db
+        return [
+            contar_sentencias(db, lambda: _llamar(c, token, "GET", f"/{cot.id}")),
+            contar_sentencias(db, lambda: _llamar(c, token, "POST", f"/{cot.id}/lineas", json={"descripcion": "Otra"})),
+            contar_sentencias(
+                db,
+                lambda: _llamar(
+                    c,
+                    token,
+                    "POST",
+                    f"/lineas/{linea.id}/opciones",
+                    json={"origen_nombre": "Web", "monto_unitario": "7"},
+                ),
+            ),
+            contar_sentencias(db, lambda: _llamar(c, token, "POST", f"/opciones/{opcion.id}/marcar-preferida")),
+            contar_sentencias(db, lambda: _llamar(c, token, "POST", f"/{cot.id}/comentarios", json={"mensaje": "Ok"})),
+        ]
+
+    db.refresh(chica)
+    db.refresh(grande)
+    assert costos(grande) == costos(chica)
+
+    detalle = _llamar(client_transactional_db, token, "GET", f"/{grande.id}")
+    assert [len(ln["opciones"]) for ln in detalle["lineas"]] == [4, 3, 3, 3, 0]
+    assert [c["usuario_nombre"] for c in detalle["comentarios"]][:5] == [u.nombre for u in (usuario, *otros, otros[0])]
+    assert len(detalle["compras_ejecutadas"]) == 2
+    assert detalle["vehiculo_texto"] == "Mazda 3 2021"
+
+
+@pytest.mark.integration
+def test_totales_con_opcion_preferida(client_transactional_db, db_session_transactional, monkeypatch):
+    monkeypatch.setattr(settings, "IVA_PORCENTAJE", 16)
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    cliente, _ = seed_cliente_vehiculo(db)
+    cot = _seed_cotizacion(db, cliente, usuario, opciones=2)
+    [linea] = cot.lineas
+    [usd] = [o for o in linea.opciones if o.moneda == MonedaCotizacion.USD]
+    vacia = LineaCotizacionRefaccion(id_cotizacion=cot.id, n_linea=2, descripcion="Sin opciones", cantidad=Decimal("1"))
+    db.add(vacia)
+    db.flush()
+
+    detalle = _llamar(client_transactional_db, token, "POST", f"/opciones/{usd.id}/marcar-preferida")
+
+    # USD 11 × TC 20 + 5 = 225 por pieza; 2 piezas = 450; +30 % margen +16 % IVA = 678.60
+    assert detalle["totales"] == {
+        "precio_sugerido_total": "678.60",
+        "costo_estimado_total_mxn": "450.00",
+        "ganancia_estimada_total": "228.60",
+        "lineas": [
+            {"id_linea": linea.id, "subtotal_precio_sugerido": "678.60", "ganancia_estimada_linea": "228.60"},
+            {"id_linea": vacia.id, "subtotal_precio_sugerido": None, "costo_error": "Sin opciones"},
+        ],
+    }
+    [mxn, usd_out] = detalle["lineas"][0]["opciones"]
+    assert (mxn["es_preferida"], mxn["costo_unitario_mxn"], usd_out["es_preferida"]) == (False, "15.00", True)
+    assert detalle["creador_nombre"] == usuario.nombre
+    assert detalle["cliente_nombre"] == cliente.nombre
+    assert _llamar(client_transactional_db, token, "GET", f"/{cot.id}") == detalle
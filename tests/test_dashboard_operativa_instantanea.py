@@ -0,0 +1,118 @@
+"""
+Tests de la extracción en una sola pasada del bloque operativo (Dashboard V2).
+
+Cobros, entregas y por_cobrar salen de una misma InstantaneaCobros: clasificación O1/O2/V1
+igual a la de las bandejas y costo en sentencias SQL independiente del volumen.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models.cita import Cita, EstadoCita, TipoCita
+from app.models.venta import Venta
+from app.routers.dashboard_operativa import (
+    _extraer_candidatos_citas,
+    construir_bloque_operativa,
+    construir_resumen_ligero,
+    extraer_candidatos,
+)
+from app.services.contexto_consultas import CLAVE_INFO
+from app.utils.fechas import ahora_local
+from tests.semillas import (
+    contar_sentencias,
+    seed_cliente_vehiculo,
+    seed_ot_completada,
+    seed_turno,
+    seed_usuario,
+    seed_venta_ot_con_abono,
+)
+
+PRESUPUESTO_SENTENCIAS = 12
+
+
+def _seed_operativa(db, usuario, turno, n: int) -> dict[str, set[str]]:
+    """n OT de cada familia (O1 sin venta, O1 con abono, O2), ventas V1/canceladas y citas; devuelve item_ids."""
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    ids: dict[str, set[str]] = {"cobros": set(), "entregas": set(), "citas": set()}
+    for i in range(n):
+        sin_venta = seed_ot_completada(db, cliente, vehiculo)
+        sin_venta.fecha_finalizacion = datetime.utcnow() - timedelta(hours=i)
+        ids["cobros"].add(f"ot-{sin_venta.id}")
+        parcial = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "800.00", "300.00")
+        ids["cobros"].add(f"ot-{parcial.id_orden}")
+        pagada = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "400.00", "400.00")
+        ids["entregas"].add(f"ot-{pagada.id_orden}")
+        mostrador = Venta(id_cliente=cliente.id_cliente, total=Decimal("250.00"), estado="PENDIENTE")
+        db.add(mostrador)
+        db.add(Venta(id_cliente=cliente.id_cliente, total=Decimal("999.00"), estado="CANCELADA"))
+        db.flush()
+        ids["cobros"].add(f"venta-{mostrador.id_venta}")
+
+        for horas in (-3, 2, 30):
+            cita = Cita(
+                id_cliente=cliente.id_cliente,
+                id_vehiculo=vehiculo.id_vehiculo,
+                fecha_hora=ahora_local() + timedelta(hours=horas, minutes=i),
+                tipo=TipoCita.REVISION,
+                estado=EstadoCita.CONFIRMADA,
+            )
+            db.add(cita)
+            db.flush()
+            ids["citas"].add(f"cita-{cita.id_cita}")
+    return ids
+
+
+def _contar_bloque(db, usuario) -> int:
+    db.info.pop(CLAVE_INFO, None)
+    return contar_sentencias(db, lambda: construir_bloque_operativa(db, usuario))
+
+
+@pytest.mark.integration
+def test_bloque_operativa_sentencias_constantes(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    _seed_operativa(db, usuario, turno, 1)
+    n_pocas = _contar_bloque(db, usuario)
+
+    _seed_operativa(db, usuario, turno, 8)
+    n_muchas = _contar_bloque(db, usuario)
+
+    assert n_muchas == n_pocas
+    assert n_muchas <= PRESUPUESTO_SENTENCIAS
+
+
+@pytest.mark.integration
+def test_instantanea_clasifica_familias_y_por_cobrar(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    por_cobrar_antes = construir_resumen_ligero(db, usuario)["por_cobrar"]
+
+    ids = _seed_operativa(db, usuario, turno, 3)
+    candidatos = extraer_candidatos(db, usuario)
+    por_grupo: dict[str, set[str]] = {}
+    for c in candidatos:
+        por_grupo.setdefault(c.grupo, set()).add(c.item_id)
+
+    assert ids["cobros"] <= por_grupo["cobros"]
+    assert ids["entregas"] <= por_grupo["entregas"]
+    assert not ids["entregas"] & por_grupo["cobros"]
+    # Saldo O1 con abono (500) + venta mostrador V1 (250); la OT sin venta no suma
+    assert construir_resumen_ligero(db, usuario)["por_cobrar"] == pytest.approx(por_cobrar_antes + 3 * 750)
+
+
+@pytest.mark.integration
+def test_citas_sin_duplicados_entre_proximas_y_convertibles(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    ids = _seed_operativa(db, usuario, turno, 2)
+
+    item_ids = [c.item_id for c in _extraer_candidatos_citas(db)]
+    assert len(item_ids) == len(set(item_ids))
+    assert ids["citas"] <= set(item_ids)
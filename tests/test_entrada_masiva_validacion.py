@@ -0,0 +1,131 @@
+"""
+Tests de la validación previa de entrada masiva: códigos normalizados resueltos en un solo IN,
+reporte de desconocidos / duplicados / inactivos / eliminados y modo dry_run sin escrituras.
+"""
+
+from __future__ import annotations
+
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.models.movimiento_inventario import MovimientoInventario
+from app.models.repuesto import Repuesto
+from app.utils.codigo_repuesto import normalizar_codigo_repuesto
+from tests.semillas import contar_sentencias, seed_usuario
+
+URL = "/api/inventario/movimientos/entrada-masiva"
+
+
+def _seed_repuesto(db, **kwargs) -> Repuesto:
+    repuesto = Repuesto(
+        codigo=f"VAL-{uuid.uuid4().hex[:8].upper()}",
+        nombre="Filtro validación",
+        stock_actual=Decimal("0"),
+        precio_compra=Decimal("50.00"),
+        precio_venta=Decimal("90.00"),
+        **kwargs,
+    )
+    db.add(repuesto)
+    db.flush()
+    return repuesto
+
+
+def _subir(client, token, lineas, **params):
+    return client.post(
+        URL,
+        params=params,
+        files={"archivo": ("entradas.csv", "\n".join(["codigo,cantidad", *lineas]).encode(), "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_normalizar_codigo_repuesto():
+    assert normalizar_codigo_repuesto("  mot 001 ") == "MOT001"
+    assert normalizar_codigo_repuesto("MOT-001_ELIM_42") == "MOT-001"
+    assert normalizar_codigo_repuesto(None) == ""
+
+
+@pytest.mark.integration
+def test_codigo_normalizado_se_mantiene_en_el_modelo(db_session_transactional):
+    db = db_session_transactional
+    repuesto = _seed_repuesto(db)
+    assert repuesto.codigo_normalizado == repuesto.codigo
+
+    original = repuesto.codigo
+    repuesto.codigo = f"{original}_ELIM_{repuesto.id_repuesto}"
+    assert repuesto.codigo_normalizado == original
+
+
+@pytest.mark.integration
+def test_dry_run_reporta_todo_sin_mover_stock(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    ok = _seed_repuesto(db)
+    inactivo = _seed_repuesto(db, activo=False)
+    eliminado = _seed_repuesto(db)
+    codigo_eliminado = eliminado.codigo
+    eliminado.codigo = f"{codigo_eliminado}_ELIM_{eliminado.id_repuesto}"
+    eliminado.eliminado = True
+    eliminado.activo = False
+    db.flush()
+    lineas = [
+        f"{ok.codigo},2",  # fila 2
+        f" {ok.codigo.lower()} ,3",  # fila 3: mismo código con otro formato
+        "NO-EXISTE,1",  # fila 4
+        f"{inactivo.codigo},1",  # fila 5
+        f"{codigo_eliminado},1",  # fila 6
+        f"{ok.codigo},abc",  # fila 7
+    ]
+
+    respuestas = []
+    n = contar_sentencias(db, lambda: respuestas.append(_subir(client_transactional_db, token, lineas, dry_run=True)))
+
+    r = respuestas[0]
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["dry_run"] is True
+    assert (body["procesados"], body["validas"], body["total_filas"]) == (0, 2, 6)
+    assert [(e["fila"], e["error"]) for e in body["errores"]] == [
+        (4, "Repuesto no encontrado"),
+        (5, "Repuesto inactivo"),
+        (6, "Repuesto eliminado"),
+        (7, "Cantidad inválida: abc"),
+    ]
+    assert body["duplicados"] == [{"codigo": ok.codigo, "filas": [2, 3]}]
+    db.expire_all()
+    assert ok.stock_actual == 0
+    assert db.query(MovimientoInventario).filter(MovimientoInventario.id_repuesto == ok.id_repuesto).count() == 0
+    assert n <= 4
+
+
+@pytest.mark.integration
+def test_transaccional_falla_en_validacion_antes_de_escribir(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    ok = _seed_repuesto(db)
+
+    r = _subir(client_transactional_db, token, [f"{ok.codigo},2", "NO-EXISTE,1"], transaccional=True)
+
+    assert r.status_code == 400
+    assert "fila 3" in r.json()["detail"]
+    assert db.query(MovimientoInventario).filter(MovimientoInventario.id_repuesto == ok.id_repuesto).count() == 0
+
+
+@pytest.mark.integration
+def test_dry_run_5000_filas_en_sentencias_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    repuestos = [_seed_repuesto(db) for _ in range(100)]
+    lineas = [f"{repuestos[i % 100].codigo},1" for i in range(4999)] + ["NO-EXISTE,1"]
+
+    respuestas = []
+    n = contar_sentencias(db, lambda: respuestas.append(_subir(client_transactional_db, token, lineas, dry_run=True)))
+
+    body = respuestas[0].json()
+    assert body["validas"] == 4999
+    assert len(body["errores"]) == 1
+    assert len(body["duplicados"]) == 100
+    assert n <= 4
+    assert _subir(client_transactional_db, token, lineas).status_code == 400  # escritura: máximo 500 filas
@@ -0,0 +1,108 @@
+"""
+Tests del motor de exportación Excel en streaming (app/utils/exportacion_excel.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from app.utils.exportacion_excel import MEDIA_TYPE_XLSX, escribir_xlsx, respuesta_xlsx
+
+
+def _leer_respuesta(resp) -> bytes:
+    async def _consumir():
+        partes = []
+        async for bloque in resp.body_iterator:
+            partes.append(bloque)
+        return b"".join(partes)
+
+    return asyncio.run(_consumir())
+
+
+def test_escribir_xlsx_encabezado_y_filas():
+    buf = BytesIO()
+    n = escribir_xlsx(buf, "Hoja", ["A", "B"], ((i, f"fila {i}") for i in range(3)))
+    assert n == 3
+    ws = load_workbook(BytesIO(buf.getvalue())).active
+    assert ws.title == "Hoja"
+    assert [c.value for c in ws[1]] == ["A", "B"]
+    assert ws["A1"].font.bold
+    assert ws["A1"].alignment.horizontal == "center"
+    assert [[c.value for c in fila] for fila in ws.iter_rows(min_row=2)] == [
+        [0, "fila 0"],
+        [1, "fila 1"],
+        [2, "fila 2"],
+    ]
+
+
+def test_respuesta_xlsx_consume_generador_y_emite_bloques():
+    consumidas = []
+
+    def _filas():
+        for i in range(20_000):
+            consumidas.append(i)
+            yield (i, "x" * 20, float(i))
+        yield ("TOTAL", None, 123.45)
+
+    resp = respuesta_xlsx("prueba", "Datos", ["ID", "Texto", "Monto"], _filas())
+    # Las filas se escriben dentro del request (sesión de BD aún abierta)
+    assert len(consumidas) == 20_000
+    assert resp.media_type == MEDIA_TYPE_XLSX
+    assert resp.headers["content-disposition"].startswith("attachment; filename=prueba_")
+
+    contenido = _leer_respuesta(resp)
+    ws = load_workbook(BytesIO(contenido), read_only=True).active
+    filas = list(ws.iter_rows(values_only=True))
+    assert len(filas) == 20_002
+    assert filas[1] == (0, "x" * 20, 0)
+    assert filas[-1] == ("TOTAL", None, 123.45)
+
+
+@pytest.mark.integration
+def test_exportar_gastos_streaming_con_total(client_transactional_db, db_session_transactional):
+    from app.models.gasto_operativo import GastoOperativo
+    from app.models.usuario import Usuario
+    from app.utils.jwt import create_access_token
+    from app.utils.security import hash_password
+
+    db = db_session_transactional
+    usuario = Usuario(
+        nombre="Admin Export",
+        email=f"export_{uuid.uuid4().hex[:10]}@test.medina",
+        password_hash=hash_password("ExportSecret!9"),
+        rol="ADMIN",
+        activo=True,
+    )
+    db.add(usuario)
+    db.flush()
+    concepto = f"Gasto export {uuid.uuid4().hex[:6]}"
+    for monto in ("100.50", "49.50"):
+        db.add(
+            GastoOperativo(
+                fecha=date(2030, 1, 15),
+                concepto=concepto,
+                monto=Decimal(monto),
+                categoria="OTROS",
+                id_usuario=usuario.id_usuario,
+            )
+        )
+    db.flush()
+    token = create_access_token(data={"sub": str(usuario.id_usuario), "rol": "ADMIN"})
+
+    r = client_transactional_db.get(
+        "/api/exportaciones/gastos",
+        params={"fecha_desde": "2030-01-01", "fecha_hasta": "2030-01-31", "buscar": concepto},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 200, r.text
+    filas = list(load_workbook(BytesIO(r.content)).active.iter_rows(values_only=True))
+    assert filas[0] == ("Fecha", "Concepto", "Categoría", "Monto", "Observaciones")
+    assert [f[1] for f in filas[1:3]] == [concepto, concepto]
+    assert filas[3][:4] == ("TOTAL", None, None, 150.0)
@@ -0,0 +1,87 @@
+"""
+Tests de fuentes de filas para exportaciones (agregados unidos, sin consultas por fila).
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import event
+
+from app.models.orden_trabajo import OrdenTrabajo
+from app.services.utilidad_ventas_service import recalcular_ventas_orden
+from tests.semillas import (
+    RANGO_EXPORTACION,
+    seed_ventas_exportacion,
+)
+
+
+def _get_contando(client, db, url, token, params=None):
+    """GET con conteo de sentencias SQL emitidas en la conexión de la sesión."""
+    conn = db.connection()
+    sentencias: list[str] = []
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        r = client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+    assert r.status_code == 200, r.text
+    return list(load_workbook(BytesIO(r.content)).active.iter_rows(values_only=True)), len(sentencias)
+
+
+@pytest.mark.integration
+def test_exportar_ventas_saldo_y_cliente_en_consultas_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    token, cliente, ventas, venta_ot = seed_ventas_exportacion(db, 1)
+    _, n_pocas = _get_contando(client_transactional_db, db, "/api/exportaciones/ventas", token, RANGO_EXPORTACION)
+
+    token, cliente, ventas, venta_ot = seed_ventas_exportacion(db, 4)
+    filas, n_muchas = _get_contando(client_transactional_db, db, "/api/exportaciones/ventas", token, RANGO_EXPORTACION)
+    assert n_muchas == n_pocas
+
+    por_id = {f[0]: f for f in filas[1:]}
+    for i, venta in enumerate(ventas):
+        assert por_id[venta.id_venta][2] == cliente.nombre
+        assert por_id[venta.id_venta][4] == round(300.0 - (100.0 + i), 2)
+    assert por_id[venta_ot.id_venta][4] == 1000.0
+
+
+@pytest.mark.integration
+def test_exportar_utilidad_costo_por_ot_y_por_venta(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    token, _, ventas, venta_ot = seed_ventas_exportacion(db, 3)
+    filas, n = _get_contando(client_transactional_db, db, "/api/exportaciones/utilidad", token, RANGO_EXPORTACION)
+    assert n <= 6
+
+    por_id = {f[0]: f for f in filas[1:] if isinstance(f[0], int)}
+    for venta in ventas:
+        assert por_id[venta.id_venta][2:] == (300.0, 40.0, 260.0)
+    assert por_id[venta_ot.id_venta][2:] == (1000.0, 175.0, 825.0)
+    subtotal = next(f for f in filas if f[0] == "SUBTOTAL VENTAS")
+    assert subtotal[2:] == (1900.0, 295.0, 1605.0)
+
+    ot = db.get(OrdenTrabajo, venta_ot.id_orden)
+    ot.cliente_proporciono_refacciones = True
+    recalcular_ventas_orden(db, ot.id)
+    filas, _ = _get_contando(client_transactional_db, db, "/api/exportaciones/utilidad", token, RANGO_EXPORTACION)
+    por_id = {f[0]: f for f in filas[1:] if isinstance(f[0], int)}
+    assert por_id[venta_ot.id_venta][3] == 0.0
+
+
+@pytest.mark.integration
+def test_exportar_clientes_conteos_agregados(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    token, cliente, ventas, _ = seed_ventas_exportacion(db, 2)
+    filas, n = _get_contando(
+        client_transactional_db, db, "/api/exportaciones/clientes", token, {"buscar": cliente.nombre}
+    )
+    assert n <= 3
+    assert len(filas) == 2
+    assert filas[1][0] == cliente.id_cliente
+    assert filas[1][6:8] == (3, 1)
@@ -0,0 +1,191 @@
+"""
+Tests del historial 360 de cliente y vehículo: resumen agregado en SQL (pagado, saldo sin
+canceladas), sentencias constantes sin importar cuántas ventas tenga el cliente y carga
+incremental por sección con siguiente_cursor.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models.cita import Cita, EstadoCita, TipoCita
+from app.models.pago import Pago
+from app.models.venta import Venta
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_ot_completada, seed_turno, seed_usuario
+
+INSTANTE = datetime(2026, 3, 4, 10, 30, 0)
+
+
+def _venta(db, usuario, turno, cliente, vehiculo, total: str, abonos=(), estado="PENDIENTE", fecha=INSTANTE) -> Venta:
+    venta = Venta(
+        id_cliente=cliente.id_cliente,
+        id_vehiculo=vehiculo.id_vehiculo,
+        total=Decimal(total),
+        estado=estado,
+        fecha=fecha,
+    )
+    db.add(venta)
+    db.flush()
+    for monto in abonos:
+        db.add(
+            Pago(
+                id_venta=venta.id_venta,
+                id_usuario=usuario.id_usuario,
+                id_turno=turno.id_turno,
+                monto=Decimal(monto),
+                metodo="EFECTIVO",
+                fecha=fecha,
+            )
+        )
+    return venta
+
+
+def _sembrar_cliente(db, usuario, turno, n_ventas: int):
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    for i in range(n_ventas):
+        _venta(
+            db, usuario, turno, cliente, vehiculo, "100.00", ["40.00", "10.00"], fecha=INSTANTE - timedelta(hours=i % 4)
+        )
+        seed_ot_completada(db, cliente, vehiculo)
+        db.add(
+            Cita(
+                id_cliente=cliente.id_cliente,
+                id_vehiculo=vehiculo.id_vehiculo,
+                fecha_hora=INSTANTE + timedelta(days=i),
+                tipo=TipoCita.REVISION,
+                estado=EstadoCita.CONFIRMADA,
+            )
+        )
+    db.flush()
+    return cliente, vehiculo
+
+
+@pytest.mark.integration
+def test_resumen_agregado_y_pagado_por_venta(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    parcial = _venta(db, usuario, turno, cliente, vehiculo, "1000.00", ["300.00", "200.00"])
+    _venta(db, usuario, turno, cliente, vehiculo, "400.00", ["450.00"], estado="PAGADA")  # sobrepago: saldo 0
+    _venta(db, usuario, turno, cliente, vehiculo, "250.00", estado="CANCELADA")  # no suma saldo
+    seed_ot_completada(db, cliente, vehiculo)
+    db.flush()
+
+    r = client_transactional_db.get(
+        f"/api/clientes/{cliente.id_cliente}/historial", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    assert body["resumen"] == {
+        "cantidad_ventas": 3,
+        "total_ventas": 1650.0,
+        "total_pagado": 950.0,
+        "saldo_pendiente": 500.0,
+        "cantidad_ordenes": 1,
+        "cantidad_citas": 0,
+        "cantidad_vehiculos": 1,
+    }
+    pagado = {v["id_venta"]: v["total_pagado"] for v in body["ventas"]}
+    assert pagado[parcial.id_venta] == 500.0 and sorted(pagado.values()) == [0.0, 450.0, 500.0]
+    assert body["ordenes_trabajo"][0]["vehiculo"] == "Mazda 3"
+    assert body["paginacion"]["ventas"] == {"total": 3, "siguiente_cursor": None}
+
+    r = client_transactional_db.get(
+        f"/api/vehiculos/{vehiculo.id_vehiculo}/historial", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["vehiculo"]["cliente_nombre"] == cliente.nombre
+    assert body["resumen"]["saldo_pendiente"] == 500.0 and body["resumen"]["cantidad_ordenes"] == 1
+    assert len(body["ventas"]) == 3 and "fecha_ingreso" in body["ordenes_trabajo"][0]
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("ruta", ["/api/clientes/{id_cliente}/historial", "/api/vehiculos/{id_vehiculo}/historial"])
+def test_sentencias_constantes_con_muchas_ventas(ruta, client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    headers = {"Authorization": f"Bearer {token}"}
+    conteos = []
+    for n_ventas in (2, 60):
+        cliente, vehiculo = _sembrar_cliente(db, usuario, turno, n_ventas)
+        url = ruta.format(id_cliente=cliente.id_cliente, id_vehiculo=vehiculo.id_vehiculo)
+        respuestas = []
+        conteos.append(
+            contar_sentencias(db, lambda: respuestas.append(client_transactional_db.get(url, headers=headers)))
+        )
+        assert respuestas[0].status_code == 200, respuestas[0].text
+        body = respuestas[0].json()
+        assert body["resumen"]["cantidad_ventas"] == n_ventas
+        assert len(body["ventas"]) == min(n_ventas, 20)
+
+    assert conteos[0] == conteos[1]
+
+
+@pytest.mark.integration
+def test_seccion_por_cursor_recorre_todo_sin_repetir(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, _ = _sembrar_cliente(db, usuario, turno, 23)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    inicial = client_transactional_db.get(
+        f"/api/clientes/{cliente.id_cliente}/historial", params={"limit": 5}, headers=headers
+    ).json()
+    ids = [v["id_venta"] for v in inicial["ventas"]]
+    cursor = inicial["paginacion"]["ventas"]["siguiente_cursor"]
+    while cursor is not None:
+        r = client_transactional_db.get(
+            f"/api/clientes/{cliente.id_cliente}/historial/ventas",
+            params={"limit": 5, "cursor": cursor},
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+        assert r.json()["total"] is None
+        ids += [v["id_venta"] for v in r.json()["ventas"]]
+        cursor = r.json()["siguiente_cursor"]
+
+    completo = client_transactional_db.get(
+        f"/api/clientes/{cliente.id_cliente}/historial/ventas", params={"limit": 100}, headers=headers
+    ).json()
+    assert completo["total"] == 23
+    assert len(ids) == 23 == len(set(ids))
+    assert ids == [v["id_venta"] for v in completo["ventas"]]
+    assert all(v["total_pagado"] == 50.0 for v in completo["ventas"])
+
+    r = client_transactional_db.get(f"/api/clientes/{cliente.id_cliente}/historial/pagos", headers=headers)
+    assert r.status_code == 404
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("entidad", ["clientes", "vehiculos"])
+def test_ventas_sin_fecha_se_alcanzan_por_cursor(entidad, client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    ventas = [_venta(db, usuario, turno, cliente, vehiculo, "100.00") for _ in range(7)]
+    sin_fecha = [v.id_venta for v in ventas[:4]]
+    db.query(Venta).filter(Venta.id_venta.in_(sin_fecha)).update({Venta.fecha: None}, synchronize_session=False)
+    db.flush()
+    headers = {"Authorization": f"Bearer {token}"}
+    base = f"/api/{entidad}/{cliente.id_cliente if entidad == 'clientes' else vehiculo.id_vehiculo}/historial"
+
+    inicial = client_transactional_db.get(base, params={"limit": 2}, headers=headers).json()
+    ids = [v["id_venta"] for v in inicial["ventas"]]
+    cursor = inicial["paginacion"]["ventas"]["siguiente_cursor"]
+    while cursor is not None:
+        r = client_transactional_db.get(f"{base}/ventas", params={"limit": 2, "cursor": cursor}, headers=headers)
+        assert r.status_code == 200, r.text
+        ids += [v["id_venta"] for v in r.json()["ventas"]]
+        cursor = r.json()["siguiente_cursor"]
+
+    assert inicial["resumen"]["cantidad_ventas"] == 7 == len(ids) == len(set(ids))
+    assert ids[-4:] == sorted(sin_fecha, reverse=True)
@@ -0,0 +1,190 @@
+"""
+Tests de registrar_movimientos_lote: paridad con registrar_movimiento, éxito parcial / todo o nada
+y entrada masiva de 500 filas con sentencias SQL constantes.
+"""
+
+from __future__ import annotations
+
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.models.alerta_inventario import AlertaInventario, TipoAlertaInventario
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.repuesto import Repuesto
+from app.schemas.movimiento_inventario import MovimientoInventarioCreate
+from app.services.alertas_stock_service import cola_alertas_stock
+from app.services.inventario_service import InventarioService, MovimientoLoteError
+from tests.semillas import contar_sentencias, seed_usuario
+
+SECUENCIA = (
+    (0, TipoMovimiento.ENTRADA, "10", "120.00"),
+    (1, TipoMovimiento.ENTRADA, "4", None),
+    (0, TipoMovimiento.SALIDA, "7", None),
+    (0, TipoMovimiento.ENTRADA, "2.5", "99.99"),
+    (1, TipoMovimiento.MERMA, "1", None),
+    (0, TipoMovimiento.AJUSTE_POSITIVO, "3", "150.00"),
+    (1, TipoMovimiento.AJUSTE_NEGATIVO, "2", None),
+)
+
+
+def _seed_repuesto(db, stock="5", precio="100.00", **kwargs) -> Repuesto:
+    repuesto = Repuesto(
+        codigo=f"LOTE-{uuid.uuid4().hex[:8]}",
+        nombre="Balata lote",
+        stock_actual=Decimal(stock),
+        precio_compra=Decimal(precio),
+        precio_venta=Decimal("200.00"),
+        **kwargs,
+    )
+    db.add(repuesto)
+    db.flush()
+    return repuesto
+
+
+def _movimientos(repuestos, secuencia=SECUENCIA) -> list[MovimientoInventarioCreate]:
+    return [
+        MovimientoInventarioCreate(
+            id_repuesto=repuestos[i].id_repuesto,
+            tipo_movimiento=tipo,
+            cantidad=Decimal(cantidad),
+            precio_unitario=Decimal(precio) if precio else None,
+            referencia="LOTE-TEST",
+        )
+        for i, tipo, cantidad, precio in secuencia
+    ]
+
+
+def _kardex(db, repuesto) -> list[tuple]:
+    return [
+        (m.tipo_movimiento, m.cantidad, m.precio_unitario, m.costo_total, m.stock_anterior, m.stock_nuevo)
+        for m in db.query(MovimientoInventario)
+        .filter(MovimientoInventario.id_repuesto == repuesto.id_repuesto)
+        .order_by(MovimientoInventario.id_movimiento)
+    ]
+
+
+@pytest.mark.integration
+def test_lote_igual_a_movimientos_uno_a_uno(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    uno_a_uno = [_seed_repuesto(db), _seed_repuesto(db, stock="8", precio="40.00")]
+    en_lote = [_seed_repuesto(db), _seed_repuesto(db, stock="8", precio="40.00")]
+
+    for mov in _movimientos(uno_a_uno):
+        InventarioService.registrar_movimiento(db, mov, usuario.id_usuario, autocommit=False)
+    db.flush()
+    resultado = InventarioService.registrar_movimientos_lote(
+        db, _movimientos(en_lote), usuario.id_usuario, autocommit=False
+    )
+    db.flush()
+    db.expire_all()
+
+    assert resultado.procesados == list(range(len(SECUENCIA)))
+    assert resultado.errores == []
+    for a, b in zip(uno_a_uno, en_lote):
+        assert (b.stock_actual, b.precio_compra) == (a.stock_actual, a.precio_compra)
+        assert _kardex(db, b) == _kardex(db, a)
+
+
+@pytest.mark.integration
+def test_lote_parcial_y_todo_o_nada(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    repuesto = _seed_repuesto(db, stock="5")
+    inactivo = _seed_repuesto(db, activo=False)
+    secuencia = (
+        (0, TipoMovimiento.SALIDA, "3", None),
+        (0, TipoMovimiento.SALIDA, "3", None),  # solo quedan 2
+        (1, TipoMovimiento.ENTRADA, "1", None),
+        (0, TipoMovimiento.ENTRADA, "1", None),
+    )
+
+    with pytest.raises(MovimientoLoteError) as exc:
+        InventarioService.registrar_movimientos_lote(
+            db, _movimientos([repuesto, inactivo], secuencia), usuario.id_usuario, autocommit=False
+        )
+    assert exc.value.indice == 1
+    assert "Stock insuficiente" in str(exc.value)
+    assert repuesto.stock_actual == Decimal("5")
+    assert _kardex(db, repuesto) == []
+
+    resultado = InventarioService.registrar_movimientos_lote(
+        db, _movimientos([repuesto, inactivo], secuencia), usuario.id_usuario, transaccional=False, autocommit=False
+    )
+    assert resultado.procesados == [0, 3]
+    assert [i for i, _ in resultado.errores] == [1, 2]
+    assert "inactivo" in resultado.errores[1][1]
+    assert repuesto.stock_actual == Decimal("3")
+    assert [r.id_repuesto for r in resultado.repuestos] == [repuesto.id_repuesto]
+
+
+@pytest.mark.integration
+def test_entrada_masiva_500_filas_en_un_lote(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "ADMIN")
+    repuestos = [_seed_repuesto(db, stock="0") for _ in range(50)]
+    lineas = ["codigo,cantidad,precio_unitario,referencia"]
+    for i in range(499):
+        r = repuestos[i % 50]
+        codigo = r.codigo.lower() if i % 2 else r.codigo
+        lineas.append(f"{codigo},2,{100 + i % 3}.00,FAC-{i}")
+    lineas.append("NO-EXISTE,1,,")
+
+    def _subir():
+        return client_transactional_db.post(
+            "/api/inventario/movimientos/entrada-masiva",
+            files={"archivo": ("entradas.csv", "\n".join(lineas).encode(), "text/csv")},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    respuestas = []
+    n = contar_sentencias(db, lambda: respuestas.append(_subir()))
+
+    r = respuestas[0]
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["procesados"] == 499
+    assert body["errores"] == [{"fila": 501, "codigo": "NO-EXISTE", "error": "Repuesto no encontrado"}]
+    db.expire_all()
+    assert sum(rep.stock_actual for rep in repuestos) == Decimal("998")
+    assert len(_kardex(db, repuestos[0])) == 10
+    assert n <= 15
+
+
+@pytest.mark.integration
+def test_lote_revisa_alertas_una_vez_por_repuesto(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    se_agota = _seed_repuesto(db, stock="4")
+    se_repone = _seed_repuesto(db, stock="1")
+    db.add(
+        AlertaInventario(
+            id_repuesto=se_repone.id_repuesto,
+            tipo_alerta=TipoAlertaInventario.STOCK_CRITICO,
+            mensaje="Stock crítico",
+            stock_actual=Decimal("1"),
+            stock_minimo=Decimal("5"),
+            stock_maximo=Decimal("100"),
+        )
+    )
+    db.flush()
+    secuencia = (
+        (0, TipoMovimiento.SALIDA, "2", None),
+        (0, TipoMovimiento.SALIDA, "2", None),
+        (1, TipoMovimiento.ENTRADA, "20", None),
+    )
+
+    InventarioService.registrar_movimientos_lote(db, _movimientos([se_agota, se_repone], secuencia), usuario.id_usuario)
+    assert cola_alertas_stock.procesar_pendientes(db) == 2
+
+    alertas = {
+        a.id_repuesto: a
+        for a in db.query(AlertaInventario).filter(
+            AlertaInventario.id_repuesto.in_([se_agota.id_repuesto, se_repone.id_repuesto])
+        )
+    }
+    assert alertas[se_agota.id_repuesto].tipo_alerta == TipoAlertaInventario.SIN_STOCK
+    assert alertas[se_agota.id_repuesto].activa
+    assert not alertas[se_repone.id_repuesto].activa
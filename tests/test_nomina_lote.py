@@ -0,0 +1,187 @@
+"""
+Tests de nómina por lote: paridad con calcular_nomina por empleado y consultas constantes.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func
+
+from app.models.asistencia import Asistencia, TipoAsistencia
+from app.models.comision_devengada import ComisionDevengada
+from app.models.prestamo_empleado import DescuentoPrestamo, PrestamoEmpleado
+from app.models.venta import Venta
+from app.routers.prestamos_empleados import _saldo_pendiente
+from app.services.nomina_service import calcular_nomina, calcular_resumenes_nomina, dias_vista_periodo
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_usuario
+
+REFERENCIA = date(2031, 6, 18)
+OFFSETS = tuple(-i for i in range(13))
+TIPOS = (
+    TipoAsistencia.TRABAJO,
+    TipoAsistencia.FALTA,
+    TipoAsistencia.VACACION,
+    TipoAsistencia.TRABAJO,
+    TipoAsistencia.PERMISO_SIN_GOCE,
+)
+
+
+def _seed_empleados(db) -> list:
+    """Tres empleados (semanal, quincenal, sin periodo) con asistencias, préstamos y comisiones de un año."""
+    cliente, _ = seed_cliente_vehiculo(db)
+    venta = Venta(id_cliente=cliente.id_cliente, total=Decimal("1000.00"), estado="PAGADA")
+    db.add(venta)
+    empleados = []
+    for n, (periodo, salario) in enumerate((("SEMANAL", "3500.00"), ("QUINCENAL", "9000.00"), (None, "12000.00"))):
+        usuario, _ = seed_usuario(db, "TECNICO")
+        usuario.periodo_pago = periodo
+        usuario.salario_base = Decimal(salario)
+        usuario.bono_puntualidad = Decimal("300.00") if n != 2 else None
+        usuario.dias_por_semana = 6 if n == 0 else None
+        usuario.horas_por_dia = Decimal("8")
+        empleados.append(usuario)
+        for dia in range(0, 400, 3):
+            db.add(
+                Asistencia(
+                    id_usuario=usuario.id_usuario,
+                    fecha=REFERENCIA - timedelta(days=dia),
+                    tipo=TIPOS[(dia + n) % len(TIPOS)],
+                    turno_completo=dia % 2 == 0,
+                    horas_trabajadas=Decimal("5.50"),
+                    aplica_bono_puntualidad=dia % 4 != 0,
+                )
+            )
+        for dia in range(0, 400, 11):
+            db.add(
+                ComisionDevengada(
+                    id_usuario=usuario.id_usuario,
+                    id_venta=venta.id_venta,
+                    tipo_base="MANO_OBRA",
+                    base_monto=Decimal("500.00"),
+                    porcentaje=Decimal("10.00"),
+                    monto_comision=Decimal("50.25") + n,
+                    fecha_venta=REFERENCIA - timedelta(days=dia),
+                )
+            )
+        for monto, periodo_desc, estado, descontado in (
+            ("2000.00", "SEMANAL", "ACTIVO", "500.00"),
+            ("600.00", "QUINCENAL", "ACTIVO", "600.00"),
+            ("900.00", "MENSUAL", "ACTIVO", None),
+            ("700.00", "SEMANAL", "LIQUIDADO", None),
+        ):
+            prestamo = PrestamoEmpleado(
+                id_usuario=usuario.id_usuario,
+                monto_total=Decimal(monto),
+                descuento_por_periodo=Decimal("150.00"),
+                periodo_descuento=periodo_desc,
+                fecha_inicio=REFERENCIA - timedelta(days=90),
+                estado=estado,
+            )
+            db.add(prestamo)
+            db.flush()
+            if descontado:
+                db.add(
+                    DescuentoPrestamo(
+                        id_prestamo=prestamo.id,
+                        monto_descontado=Decimal(descontado),
+                        fecha_periodo=REFERENCIA - timedelta(days=30),
+                    )
+                )
+    db.flush()
+    return empleados
+
+
+def _resumen_por_empleado(db, usuario, **kwargs) -> tuple[dict, Decimal, Decimal]:
+    """Cálculo previo del endpoint: calcular_nomina + préstamos uno a uno + SUM de comisiones."""
+    nomina = calcular_nomina(db, usuario.id_usuario, **kwargs)
+    dias_vista = dias_vista_periodo(nomina)
+    descuento = Decimal("0")
+    prestamos = db.query(PrestamoEmpleado).filter(
+        PrestamoEmpleado.id_usuario == usuario.id_usuario, PrestamoEmpleado.estado == "ACTIVO"
+    )
+    for p in prestamos:
+        if _saldo_pendiente(p, db) > 0:
+            dias_prestamo = {"SEMANAL": 7, "QUINCENAL": 15, "MENSUAL": 30}[p.periodo_descuento]
+            descuento += Decimal(str(p.descuento_por_periodo)) * (Decimal(dias_vista) / Decimal(dias_prestamo))
+    suma = (
+        db.query(func.coalesce(func.sum(ComisionDevengada.monto_comision), 0))
+        .filter(
+            ComisionDevengada.id_usuario == usuario.id_usuario,
+            ComisionDevengada.fecha_venta >= date.fromisoformat(nomina["periodo_inicio"]),
+            ComisionDevengada.fecha_venta <= date.fromisoformat(nomina["periodo_fin"]),
+        )
+        .scalar()
+    )
+    return nomina, descuento, Decimal(str(suma))
+
+
+@pytest.mark.integration
+def test_lote_igual_a_calculo_por_empleado(db_session_transactional):
+    db = db_session_transactional
+    empleados = _seed_empleados(db)
+
+    por_periodo = calcular_resumenes_nomina(db, empleados, fecha_referencia=REFERENCIA, offsets_periodos=OFFSETS)
+
+    for offset, resumenes in zip(OFFSETS, por_periodo):
+        for u in empleados:
+            nomina, descuento, comisiones = _resumen_por_empleado(
+                db, u, fecha_referencia=REFERENCIA, offset_periodos=offset
+            )
+            resumen = resumenes[u.id_usuario]
+            assert resumen.nomina == nomina, (offset, u.periodo_pago)
+            assert resumen.total_descuento == descuento
+            assert resumen.comisiones == comisiones
+
+    inicio, fin = REFERENCIA - timedelta(days=40), REFERENCIA - timedelta(days=3)
+    (personalizado,) = calcular_resumenes_nomina(db, empleados, fecha_inicio=inicio, fecha_fin=fin)
+    for u in empleados:
+        nomina, descuento, comisiones = _resumen_por_empleado(db, u, fecha_inicio=inicio, fecha_fin=fin)
+        assert personalizado[u.id_usuario].nomina == nomina
+        assert personalizado[u.id_usuario].total_descuento == descuento
+        assert personalizado[u.id_usuario].comisiones == comisiones
+
+
+@pytest.mark.integration
+def test_lote_consultas_constantes_para_trece_periodos(db_session_transactional):
+    db = db_session_transactional
+    empleados = _seed_empleados(db)
+
+    n = contar_sentencias(
+        db, lambda: calcular_resumenes_nomina(db, empleados, fecha_referencia=REFERENCIA, offsets_periodos=OFFSETS)
+    )
+    assert n == 3
+
+
+@pytest.mark.integration
+def test_api_resumen_y_tendencia_nominas(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    empleados = _seed_empleados(db)
+    _, token = seed_usuario(db, "ADMIN")
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"fecha_referencia": REFERENCIA.isoformat(), "offset_periodos": -2}
+
+    r = client_transactional_db.get("/api/prestamos-empleados/admin/resumen-nominas", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    resumen = r.json()
+    filas = {f["id_usuario"]: f for f in resumen["empleados"]}
+    for u in empleados:
+        nomina, descuento, comisiones = _resumen_por_empleado(db, u, fecha_referencia=REFERENCIA, offset_periodos=-2)
+        fila = filas[u.id_usuario]
+        assert fila["salario_proporcional"] == nomina["salario_proporcional"]
+        assert fila["total_descuento_este_periodo"] == float(descuento)
+        assert fila["comisiones_periodo"] == float(comisiones)
+
+    r = client_transactional_db.get(
+        "/api/prestamos-empleados/admin/tendencia-nominas",
+        params={"fecha_referencia": REFERENCIA.isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    serie = r.json()["periodos"]
+    assert [p["offset_periodos"] for p in serie] == list(OFFSETS[:12])
+    assert serie[2]["periodo_inicio"] == resumen["periodo_inicio"]
+    assert serie[2]["total_bruto_general"] == resumen["total_bruto_general"]
+    assert serie[2]["total_neto_general"] == resumen["total_neto_general"]
@@ -0,0 +1,280 @@
+"""
+Tests de notificaciones salientes: enviar orden, recuperar contraseña y crear cita encolan sin
+enviar en la petición; el despachador envía contra servidores SMTP / HTTP locales falsos, reintenta
+errores transitorios con espera, reutiliza el token de Graph y marca FALLIDA los definitivos.
+"""
+
+from __future__ import annotations
+
+import email
+import json
+import socketserver
+import threading
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import settings
+from app.models.cliente import Cliente
+from app.models.notificacion_saliente import NotificacionSaliente
+from app.models.orden_compra import DetalleOrdenCompra, EstadoOrdenCompra, OrdenCompra
+from app.models.proveedor import Proveedor
+from app.services import email_service
+from app.services.notificaciones_service import DespachadorNotificaciones, encolar_email, espera_reintento
+from app.utils.envio_externo import cerrar_cliente_http
+from tests.semillas import seed_usuario
+
+
+class _SMTPFalso(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo: acepta todo y guarda cada mensaje (DATA) en server.mensajes."""
+
+    def _responder(self, linea: str) -> None:
+        self.wfile.write(f"{linea}\r\n".encode())
+
+    def handle(self):
+        self._responder("220 smtp falso")
+        datos = None
+        for linea in self.rfile:
+            if datos is not None:
+                if linea == b".\r\n":
+                    self.server.mensajes.append(b"".join(datos).decode("utf-8", errors="replace"))
+                    datos = None
+                    self._responder("250 recibido")
+                else:
+                    datos.append(linea)
+                continue
+            comando = linea[:4].upper()
+            if comando == b"DATA":
+                datos = []
+                self._responder("354 terminar con .")
+            elif comando == b"QUIT":
+                self._responder("221 adios")
+                return
+            else:  # EHLO, MAIL, RCPT, RSET, NOOP
+                self._responder("250 ok")
+
+
+class _HTTPFalso(BaseHTTPRequestHandler):
+    """Token de Graph, sendMail y WhatsApp; las respuestas de WhatsApp salen de server.respuestas_whatsapp."""
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, datos: dict) -> None:
+        cuerpo = json.dumps(datos).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.peticiones.append((self.path, dict(self.headers), cuerpo))
+        if self.path.endswith("/oauth2/v2.0/token"):
+            self._json(200, {"access_token": f"tok-{len(self.server.peticiones)}", "expires_in": 3600})
+        elif self.path.endswith("/sendMail"):
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.endswith("/messages"):
+            status = self.server.respuestas_whatsapp.pop(0) if self.server.respuestas_whatsapp else 200
+            self._json(status, {"error": {"message": f"status {status}"}} if status >= 400 else {"messages": []})
+        else:
+            self._json(404, {})
+
+
+def _servir(servidor):
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    return servidor
+
+
+@pytest.fixture
+def smtp_falso(monkeypatch):
+    servidor = _servir(socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPFalso))
+    servidor.mensajes = []
+    for nombre, valor in {
+        "AZURE_TENANT_ID": None,
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": servidor.server_address[1],
+        "SMTP_USER": None,
+        "SMTP_PASSWORD": None,
+        "SMTP_FROM_EMAIL": "taller@medina.test",
+        "SMTP_USE_TLS": False,
+    }.items():
+        monkeypatch.setattr(settings, nombre, valor)
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def http_falso(monkeypatch):
+    servidor = _servir(ThreadingHTTPServer(("127.0.0.1", 0), _HTTPFalso))
+    servidor.peticiones = []
+    servidor.respuestas_whatsapp = []
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    for nombre, valor in {
+        "AZURE_TENANT_ID": "tenant",
+        "AZURE_CLIENT_ID": "cliente",
+        "AZURE_CLIENT_SECRET": "secreto",
+        "AZURE_SEND_AS_EMAIL": "taller@medina.test",
+        "AZURE_LOGIN_URL": base,
+        "AZURE_GRAPH_URL": base,
+        "WHATSAPP_ENABLED": True,
+        "WHATSAPP_PHONE_NUMBER_ID": "555",
+        "WHATSAPP_ACCESS_TOKEN": "wa-token",
+        "WHATSAPP_API_URL": base,
+    }.items():
+        monkeypatch.setattr(settings, nombre, valor)
+    email_service._olvidar_token_graph()
+    yield servidor
+    email_service._olvidar_token_graph()
+    cerrar_cliente_http()
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _despachador() -> DespachadorNotificaciones:
+    return DespachadorNotificaciones(intervalo_segundos=1, tamano_lote=10, hilos=4, plazo_segundos=60)
+
+
+@pytest.mark.integration
+def test_recuperar_contrasena_encola_y_envia_por_smtp(client_transactional_db, db_session_transactional, smtp_falso):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "CAJA")
+
+    r = client_transactional_db.post("/api/auth/olvide-contrasena", json={"email": usuario.email})
+    assert r.status_code == 200
+    assert smtp_falso.mensajes == []  # la petición no envía
+    n = db.query(NotificacionSaliente).filter(NotificacionSaliente.destino == usuario.email).one()
+    assert (n.estado, n.referencia_tipo) == ("PENDIENTE", "PASSWORD_RESET")
+
+    assert _despachador().procesar_pendientes(db) == 1
+    db.refresh(n)
+    assert (n.estado, n.intentos) == ("ENVIADA", 1)
+    [mensaje] = [email.message_from_string(m) for m in smtp_falso.mensajes]
+    assert mensaje["Message-ID"] == f"<{n.clave_idempotencia}@medina.test>"
+    assert "restablecer-contrasena?token=" in mensaje.get_payload()[0].get_payload(decode=True).decode()
+    assert n.contenido == "{}"  # el enlace no queda guardado tras enviarse
+
+    # Ni un ADMIN consulta el estado de un correo de recuperación
+    _, token_admin = seed_usuario(db, "ADMIN")
+    r = client_transactional_db.get(
+        f"/api/notificaciones/envios/{n.id}", headers={"Authorization": f"Bearer {token_admin}"}
+    )
+    assert r.status_code == 404
+
+    # Misma clave: no se encola otro aviso
+    assert encolar_email(db, usuario.email, "x", "y", clave=n.clave_idempotencia).id == n.id
+
+
+@pytest.mark.integration
+def test_enviar_orden_responde_sin_esperar_y_reintenta(client_transactional_db, db_session_transactional, http_falso):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    headers = {"Authorization": f"Bearer {token}"}
+    prov = Proveedor(nombre=f"Prov notif {uuid.uuid4().hex[:6]}", email="prov@medina.test", telefono="8681234567")
+    db.add(prov)
+    db.flush()
+    oc = OrdenCompra(
+        numero=f"OC-N-{uuid.uuid4().hex[:6]}",
+        id_proveedor=prov.id_proveedor,
+        id_usuario=usuario.id_usuario,
+        estado=EstadoOrdenCompra.BORRADOR,
+        total_estimado=Decimal("150"),
+    )
+    db.add(oc)
+    db.flush()
+    db.add(
+        DetalleOrdenCompra(
+            id_orden_compra=oc.id_orden_compra,
+            codigo_nuevo="FLT-1",
+            nombre_nuevo="Filtro notif",
+            cantidad_solicitada=Decimal("3"),
+            precio_unitario_estimado=Decimal("50.00"),
+        )
+    )
+    db.flush()
+    http_falso.respuestas_whatsapp = [503]
+
+    r = client_transactional_db.post(f"/api/ordenes-compra/{oc.id_orden_compra}/enviar", headers=headers)
+    assert r.status_code == 200, r.text
+    datos = r.json()
+    assert (datos["estado"], datos["email_encolado"], datos["whatsapp_encolado"]) == ("ENVIADA", True, True)
+    assert {n["estado"] for n in datos["notificaciones"]} == {"PENDIENTE"}
+    assert http_falso.peticiones == []
+    ids = {n["canal"]: n["id_notificacion"] for n in datos["notificaciones"]}
+
+    t0 = datetime.utcnow() + timedelta(seconds=1)
+    despachador = _despachador()
+    assert despachador.procesar_pendientes(db, ahora=t0) == 2
+    envio_email = client_transactional_db.get(f"/api/notificaciones/envios/{ids['EMAIL']}", headers=headers).json()
+    whatsapp = client_transactional_db.get(f"/api/notificaciones/envios/{ids['WHATSAPP']}", headers=headers).json()
+    assert envio_email["estado"] == "ENVIADA"
+    assert (whatsapp["estado"], whatsapp["intentos"], whatsapp["ultimo_error"]) == ("PENDIENTE", 1, "status 503")
+
+    assert despachador.procesar_pendientes(db, ahora=t0) == 0  # aún en espera
+    assert despachador.procesar_pendientes(db, ahora=t0 + espera_reintento(1)) == 1
+    whatsapp = client_transactional_db.get(f"/api/notificaciones/envios/{ids['WHATSAPP']}", headers=headers).json()
+    assert (whatsapp["estado"], whatsapp["intentos"]) == ("ENVIADA", 2)
+
+    envios_whatsapp = [h for p, h, _ in http_falso.peticiones if p.endswith("/messages")]
+    assert len(envios_whatsapp) == 2
+    assert {h["Idempotency-Key"] for h in envios_whatsapp} == {f"orden_compra.{oc.id_orden_compra}.envio.whatsapp"}
+
+    # Segundo email: reutiliza el token de Graph cacheado
+    encolar_email(db, "otro@medina.test", "Aviso", "Cuerpo", clave=f"prueba.{uuid.uuid4().hex}")
+    assert despachador.procesar_pendientes(db, ahora=t0 + timedelta(hours=1)) == 1
+    rutas = [p for p, _, _ in http_falso.peticiones]
+    assert sum(p.endswith("/oauth2/v2.0/token") for p in rutas) == 1
+    assert sum(p.endswith("/sendMail") for p in rutas) == 2
+
+
+@pytest.mark.integration
+def test_error_definitivo_falla_sin_reintentar_y_toma_exclusiva(
+    client_transactional_db, db_session_transactional, http_falso
+):
+    db = db_session_transactional
+    _, token = seed_usuario(db, "CAJA")
+    _, token_otro = seed_usuario(db, "TECNICO")
+    cliente = Cliente(nombre=f"Cliente notif {uuid.uuid4().hex[:6]}", telefono="8687654321")
+    db.add(cliente)
+    db.flush()
+    http_falso.respuestas_whatsapp = [400]
+
+    cita = client_transactional_db.post(
+        "/api/citas/",
+        json={
+            "id_cliente": cliente.id_cliente,
+            "fecha_hora": (datetime.now() + timedelta(days=2)).replace(microsecond=0).isoformat(),
+            "tipo": "REVISION",
+            "motivo": "Afinación",
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert cita.status_code == 201, cita.text
+    assert cita.json()["whatsapp_encolado"] is True
+    id_notificacion = cita.json()["notificacion_whatsapp"]["id_notificacion"]
+    url = f"/api/notificaciones/envios/{id_notificacion}"
+    assert client_transactional_db.get(url, headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    # Otro usuario no ve el teléfono de destino
+    assert client_transactional_db.get(url, headers={"Authorization": f"Bearer {token_otro}"}).status_code == 404
+
+    t0 = datetime.utcnow() + timedelta(seconds=1)
+    uno, otro = _despachador(), _despachador()
+    tomadas = uno._tomar(db, t0)
+    assert [e.id for e in tomadas] == [id_notificacion]
+    assert otro._tomar(db, t0) == []  # ya es de `uno` hasta que venza su plazo
+
+    n = db.get(NotificacionSaliente, id_notificacion)
+    db.expire(n)
+    assert n.estado == "ENVIANDO"
+    # Plazo vencido sin confirmar (proceso caído): otro despachador la retoma y el 400 es definitivo
+    assert otro.procesar_pendientes(db, ahora=t0 + timedelta(seconds=61)) == 1
+    db.refresh(n)
+    assert (n.estado, n.intentos, n.ultimo_error, n.contenido) == ("FALLIDA", 2, "status 400", "{}")
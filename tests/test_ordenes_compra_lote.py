@@ -0,0 +1,147 @@
+"""
+Tests del serializador por lote de órdenes de compra: el listado cuesta las mismas consultas
+con 2 o con muchas órdenes y líneas, y los dicts conservan nombres de repuesto, vehículo y pagos.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.catalogo_vehiculo import CatalogoVehiculo
+from app.models.orden_compra import DetalleOrdenCompra, EstadoOrdenCompra, OrdenCompra
+from app.models.pago_orden_compra import PagoOrdenCompra
+from app.models.proveedor import Proveedor
+from app.models.repuesto import Repuesto
+from tests.semillas import contar_sentencias, seed_usuario
+
+
+def _seed_repuestos(db, n: int) -> list[Repuesto]:
+    repuestos = [
+        Repuesto(
+            codigo=f"OCL-{uuid.uuid4().hex[:8]}",
+            nombre=f"Repuesto lote {i}",
+            stock_actual=Decimal("0"),
+            precio_compra=Decimal("50"),
+            precio_venta=Decimal("80"),
+        )
+        for i in range(n)
+    ]
+    db.add_all(repuestos)
+    db.flush()
+    return repuestos
+
+
+def _seed_orden(db, proveedor, usuario, repuestos, estado=EstadoOrdenCompra.ENVIADA, **kwargs) -> OrdenCompra:
+    oc = OrdenCompra(
+        numero=f"OC-L-{uuid.uuid4().hex[:8]}",
+        id_proveedor=proveedor.id_proveedor,
+        id_usuario=usuario.id_usuario,
+        estado=estado,
+        total_estimado=Decimal("100") * len(repuestos),
+        **kwargs,
+    )
+    db.add(oc)
+    db.flush()
+    recibida = estado == EstadoOrdenCompra.RECIBIDA
+    for rep in repuestos:
+        db.add(
+            DetalleOrdenCompra(
+                id_orden_compra=oc.id_orden_compra,
+                id_repuesto=rep.id_repuesto,
+                cantidad_solicitada=Decimal("2"),
+                cantidad_recibida=Decimal("2") if recibida else Decimal("0"),
+                precio_unitario_estimado=Decimal("50.00"),
+            )
+        )
+    db.flush()
+    return oc
+
+
+def _listar(client, token, proveedor):
+    r = client.get(
+        "/api/ordenes-compra/",
+        params={"id_proveedor": proveedor.id_proveedor, "limit": 200},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["ordenes"]
+
+
+@pytest.mark.integration
+def test_listado_con_consultas_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    proveedor = Proveedor(nombre=f"Prov lote {uuid.uuid4().hex[:6]}")
+    db.add(proveedor)
+    db.flush()
+    repuestos = _seed_repuestos(db, 12)
+    _seed_orden(db, proveedor, usuario, repuestos[:1])
+    _seed_orden(db, proveedor, usuario, repuestos[1:2], estado=EstadoOrdenCompra.RECIBIDA)
+
+    pocas = contar_sentencias(db, lambda: _listar(client_transactional_db, token, proveedor))
+    for i in range(8):
+        estado = EstadoOrdenCompra.RECIBIDA if i % 2 else EstadoOrdenCompra.BORRADOR
+        _seed_orden(db, proveedor, usuario, repuestos[i : i + 4], estado=estado)
+    muchas = contar_sentencias(db, lambda: _listar(client_transactional_db, token, proveedor))
+
+    assert len(_listar(client_transactional_db, token, proveedor)) == 10
+    assert muchas == pocas
+
+
+@pytest.mark.integration
+def test_dict_conserva_repuestos_vehiculo_y_pagos(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    proveedor = Proveedor(nombre=f"Prov lote {uuid.uuid4().hex[:6]}", email="prov@test.com")
+    catalogo = CatalogoVehiculo(anio=2019, marca="Toyota", modelo="Hilux", motor="2.7")
+    db.add_all([proveedor, catalogo])
+    db.flush()
+    repuestos = _seed_repuestos(db, 2)
+    oc = _seed_orden(
+        db, proveedor, usuario, repuestos, estado=EstadoOrdenCompra.RECIBIDA, id_catalogo_vehiculo=catalogo.id
+    )
+    db.add(
+        DetalleOrdenCompra(
+            id_orden_compra=oc.id_orden_compra,
+            codigo_nuevo="NUEVO-1",
+            nombre_nuevo="Balata nueva",
+            cantidad_solicitada=Decimal("1"),
+            cantidad_recibida=Decimal("1"),
+            precio_unitario_estimado=Decimal("30.00"),
+        )
+    )
+    for monto, fecha in (("40.00", datetime(2026, 5, 1, 12)), ("60.00", datetime(2026, 5, 2, 12))):
+        db.add(
+            PagoOrdenCompra(
+                id_orden_compra=oc.id_orden_compra,
+                id_usuario=usuario.id_usuario,
+                monto=Decimal(monto),
+                metodo="TRANSFERENCIA",
+                fecha=fecha,
+            )
+        )
+    db.flush()
+
+    item = _listar(client_transactional_db, token, proveedor)[0]
+    r = client_transactional_db.get(
+        f"/api/ordenes-compra/{oc.id_orden_compra}", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200, r.text
+    assert r.json() == item
+
+    assert [(d["nombre_repuesto"], d["codigo_repuesto"]) for d in item["detalles"]] == [
+        (repuestos[0].nombre, repuestos[0].codigo),
+        (repuestos[1].nombre, repuestos[1].codigo),
+        ("Balata nueva", "NUEVO-1"),
+    ]
+    assert item["nombre_proveedor"] == proveedor.nombre
+    assert item["email_proveedor"] == "prov@test.com"
+    assert item["vehiculo_info"] == "Toyota Hilux 2019 2.7"
+    assert item["total_a_pagar"] == 230.0
+    assert item["total_pagado"] == 100.0
+    assert item["saldo_pendiente"] == 130.0
+    assert [p["monto"] for p in item["pagos"]] == [60.0, 40.0]
@@ -19,6 +19,8 @@ from app.services.ot_acciones_service import (
     ALLOW_TECNICO_SELF_ASSIGN,
     asegurar_accion_ot_permitida,
     evaluar_accion_ot,
+    evaluar_acciones_ot,
+    evaluar_acciones_ot_lote,
 )
 from app.utils.jwt import create_access_token
 from app.utils.security import hash_password
@@ -154,6 +156,20 @@ def test_pausar_refaccion_no_implementado():
     assert ev.codigo_bloqueo == "NO_IMPLEMENTADO"
 
 
+def test_lote_igual_a_evaluacion_por_orden_sin_bd():
+    ordenes = [
+        _orden_base(id=1),
+        _orden_con_items(id=2, estado=EstadoOrden.EN_PROCESO, tecnico_id=99),
+        _orden_con_items(id=3, estado=EstadoOrden.ESPERANDO_AUTORIZACION, requiere_autorizacion=True),
+    ]
+    usuario = _usuario("TECNICO", uid=99)
+    acciones = ["iniciar_ot", "finalizar_ot", "marcar_cotizacion_enviada", "pausar_refaccion"]
+    lote = evaluar_acciones_ot_lote(_FakeSession(), ordenes, usuario, acciones)
+    assert list(lote) == [1, 2, 3]
+    for orden in ordenes:
+        assert lote[orden.id] == evaluar_acciones_ot(_FakeSession(), orden, usuario, acciones)
+
+
 @pytest.mark.integration
 def test_a0_iniciar_coherente_con_evaluador(client_transactional_db, db_session_transactional):
     from app.models.cliente import Cliente
@@ -331,3 +347,121 @@ def test_detalle_ot_incluye_acciones(client_transactional_db, db_session_transac
     assert "finalizar_ot" in nombres
     fin = next(a for a in data["acciones"] if a["accion"] == "finalizar_ot")
     assert fin["permitida"] is True
+
+
+@pytest.mark.integration
+def test_lote_paridad_con_evaluacion_por_orden(db_session_transactional):
+    """evaluar_acciones_ot_lote == evaluar_acciones_ot por orden (stock, ventas, saldos)."""
+    from app.models.caja_turno import CajaTurno
+    from app.models.cliente import Cliente
+    from app.models.detalle_orden import DetalleRepuestoOrden
+    from app.models.pago import Pago
+    from app.models.repuesto import Repuesto
+    from app.models.vehiculo import Vehiculo
+    from app.models.venta import Venta
+
+    db = db_session_transactional
+    uid = uuid.uuid4().hex[:8]
+    admin = Usuario(
+        nombre="Admin Lote",
+        email=f"adm_lote_{uid}@test.medina",
+        password_hash=hash_password("OpsSecret!9"),
+        rol="ADMIN",
+        activo=True,
+    )
+    db.add(admin)
+    db.flush()
+    turno = CajaTurno(id_usuario=admin.id_usuario, monto_apertura=Decimal("0"), estado="ABIERTO")
+    db.add(turno)
+    cliente = Cliente(nombre=f"Cli {uid}", telefono=f"644{int(uid[:7], 16) % 10_000_000:07d}")
+    db.add(cliente)
+    db.flush()
+    vehiculo = Vehiculo(id_cliente=cliente.id_cliente, marca="Ford", modelo="Fiesta", anio=2017)
+    db.add(vehiculo)
+    repuesto = Repuesto(
+        codigo=f"LOTE-{uid}",
+        nombre="Filtro lote",
+        stock_actual=Decimal("2"),
+        precio_compra=Decimal("10"),
+        precio_venta=Decimal("20"),
+    )
+    db.add(repuesto)
+    db.flush()
+
+    def _ot(estado, **kwargs):
+        ot = OrdenTrabajo(
+            numero_orden=f"OT-L-{uuid.uuid4().hex[:8]}",
+            vehiculo_id=vehiculo.id_vehiculo,
+            cliente_id=cliente.id_cliente,
+            tecnico_id=admin.id_usuario,
+            estado=estado,
+            fecha_ingreso=datetime.utcnow(),
+            total=Decimal("500"),
+            subtotal_servicios=Decimal("0"),
+            subtotal_repuestos=Decimal("500"),
+            descuento=Decimal("0"),
+            **kwargs,
+        )
+        db.add(ot)
+        db.flush()
+        return ot
+
+    def _detalle(ot, cantidad):
+        db.add(
+            DetalleRepuestoOrden(
+                orden_trabajo_id=ot.id,
+                repuesto_id=repuesto.id_repuesto,
+                cantidad=Decimal(cantidad),
+                precio_unitario=Decimal("20"),
+                subtotal=Decimal("20"),
+            )
+        )
+
+    def _venta(ot, total, pagado, estado="PENDIENTE"):
+        venta = Venta(
+            id_cliente=cliente.id_cliente,
+            id_vehiculo=vehiculo.id_vehiculo,
+            id_orden=ot.id,
+            total=Decimal(total),
+            estado=estado,
+        )
+        db.add(venta)
+        db.flush()
+        if pagado:
+            db.add(
+                Pago(
+                    id_venta=venta.id_venta,
+                    id_usuario=admin.id_usuario,
+                    id_turno=turno.id_turno,
+                    monto=Decimal(pagado),
+                    metodo="EFECTIVO",
+                )
+            )
+        return venta
+
+    ot_stock_ok = _ot(EstadoOrden.PENDIENTE)
+    _detalle(ot_stock_ok, "1")
+    ot_sin_stock = _ot(EstadoOrden.PENDIENTE)
+    _detalle(ot_sin_stock, "5")
+    ot_sin_venta = _ot(EstadoOrden.COMPLETADA)
+    ot_pagada = _ot(EstadoOrden.COMPLETADA)
+    _venta(ot_pagada, "500", "500", estado="PAGADA")
+    ot_con_saldo = _ot(EstadoOrden.COMPLETADA)
+    _venta(ot_con_saldo, "500", "100")
+    ot_cancelada = _ot(EstadoOrden.CANCELADA)
+    _venta(ot_cancelada, "300", None)
+    db.flush()
+
+    ordenes = [ot_stock_ok, ot_sin_stock, ot_sin_venta, ot_pagada, ot_con_saldo, ot_cancelada]
+    for orden in ordenes:
+        db.refresh(orden)
+    lote = evaluar_acciones_ot_lote(db, ordenes, admin)
+    for orden in ordenes:
+        assert lote[orden.id] == evaluar_acciones_ot(db, orden, admin), orden.numero_orden
+
+    codigos = {a.accion: a.codigo_bloqueo for a in lote[ot_sin_stock.id]}
+    assert codigos["iniciar_ot"] == "STOCK_INSUFICIENTE"
+    entregar = {o: next(a for a in lote[o.id] if a.accion == "entregar_vehiculo") for o in ordenes}
+    assert entregar[ot_pagada].permitida is True
+    assert entregar[ot_con_saldo].codigo_bloqueo == "VENTA_SIN_PAGAR"
+    assert entregar[ot_sin_venta].codigo_bloqueo == "SIN_VENTA"
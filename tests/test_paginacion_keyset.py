@@ -0,0 +1,229 @@
+"""
+Tests de paginación keyset (?cursor=) en listados grandes: recorrido completo sin huecos ni
+repetidos (con empates en la columna de orden), mismo orden que skip/limit, total solo en la
+primera página, filas con la columna de orden en NULL incluidas y eager loads aplicados solo a
+los ids de la página.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.auditoria import Auditoria
+from app.models.cita import Cita, EstadoCita, TipoCita
+from app.models.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from app.models.repuesto import Repuesto
+from app.utils.paginacion import codificar_cursor, decodificar_cursor, paginar
+from tests.semillas import seed_cliente_vehiculo, seed_ot_completada, seed_usuario
+
+N = 23
+LIMIT = 5
+# Mismo instante para todas las filas: el desempate por id es lo que evita huecos/repetidos
+INSTANTE = datetime(2026, 3, 4, 10, 30, 0)
+
+
+def _recorrer(client, token, ruta, clave, params) -> tuple[list[dict], list[dict]]:
+    headers = {"Authorization": f"Bearer {token}"}
+    paginas = []
+    cursor = ""
+    while cursor is not None:
+        r = client.get(ruta, params={**params, "limit": LIMIT, "cursor": cursor}, headers=headers)
+        assert r.status_code == 200, r.text
+        paginas.append(r.json())
+        cursor = paginas[-1]["siguiente_cursor"]
+    items = [item for p in paginas for item in p[clave]]
+    return items, paginas
+
+
+def _sembrar_movimientos(db, usuario, _cliente, _vehiculo) -> dict:
+    repuesto = Repuesto(
+        codigo=f"KEY-{uuid.uuid4().hex[:8]}",
+        nombre="Bujía keyset",
+        stock_actual=Decimal("100"),
+        precio_compra=Decimal("10"),
+        precio_venta=Decimal("20"),
+    )
+    db.add(repuesto)
+    db.flush()
+    for i in range(N):
+        db.add(
+            MovimientoInventario(
+                id_repuesto=repuesto.id_repuesto,
+                tipo_movimiento=TipoMovimiento.ENTRADA,
+                cantidad=Decimal("1"),
+                stock_anterior=Decimal(i),
+                stock_nuevo=Decimal(i + 1),
+                id_usuario=usuario.id_usuario,
+                fecha_movimiento=INSTANTE - timedelta(minutes=i % 4),
+            )
+        )
+    return {"id_repuesto": repuesto.id_repuesto}
+
+
+def _sembrar_repuestos(db, *_):
+    prefijo = f"KR{uuid.uuid4().hex[:6]}"
+    for i in range(N):
+        db.add(
+            Repuesto(
+                codigo=f"{prefijo}-{i % 7}-{i:02d}",
+                nombre="Repuesto keyset",
+                stock_actual=Decimal("1"),
+                precio_compra=Decimal("10"),
+                precio_venta=Decimal("20"),
+            )
+        )
+    return {"buscar": prefijo}
+
+
+def _sembrar_citas(db, _usuario, cliente, vehiculo):
+    for i in range(N):
+        db.add(
+            Cita(
+                id_cliente=cliente.id_cliente,
+                id_vehiculo=vehiculo.id_vehiculo,
+                fecha_hora=INSTANTE + timedelta(days=i % 3),
+                tipo=TipoCita.REVISION,
+                estado=EstadoCita.CONFIRMADA,
+            )
+        )
+    return {"id_cliente": cliente.id_cliente, "orden": "desc"}
+
+
+def _sembrar_ordenes(db, _usuario, cliente, vehiculo):
+    for i in range(N):
+        seed_ot_completada(db, cliente, vehiculo).fecha_ingreso = INSTANTE - timedelta(hours=i % 5)
+    return {"cliente_id": cliente.id_cliente}
+
+
+def _sembrar_auditoria(db, usuario, *_):
+    modulo = f"KEYSET_{uuid.uuid4().hex[:6]}"
+    for i in range(N):
+        db.add(Auditoria(id_usuario=usuario.id_usuario, modulo=modulo, accion="CREAR", id_referencia=i, fecha=INSTANTE))
+    return {"modulo": modulo}
+
+
+LISTADOS = [
+    ("/api/inventario/movimientos/", "movimientos", "id_movimiento", _sembrar_movimientos),
+    ("/api/repuestos/", "repuestos", "id_repuesto", _sembrar_repuestos),
+    ("/api/citas/", "citas", "id_cita", _sembrar_citas),
+    ("/api/ordenes-trabajo/", "ordenes", "id", _sembrar_ordenes),
+    ("/api/auditoria", "registros", "id_auditoria", _sembrar_auditoria),
+]
+
+
+def test_cursor_ida_y_vuelta_e_invalido():
+    valores = [INSTANTE, Decimal("1.50"), "ABC-1", 42]
+    assert decodificar_cursor(codificar_cursor(valores), 4) == valores
+    for malo in ("no-es-base64!", codificar_cursor([1]), "e30"):
+        with pytest.raises(Exception) as exc:
+            decodificar_cursor(malo, 2)
+        assert getattr(exc.value, "status_code", None) == 400
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("ruta,clave,id_item,sembrar", LISTADOS, ids=[lst[0] for lst in LISTADOS])
+def test_recorrido_por_cursor_igual_a_skip_limit(
+    ruta, clave, id_item, sembrar, client_transactional_db, db_session_transactional
+):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    params = sembrar(db, usuario, cliente, vehiculo)
+    db.flush()
+
+    items, paginas = _recorrer(client_transactional_db, token, ruta, clave, params)
+    completo = client_transactional_db.get(
+        ruta, params={**params, "limit": 100}, headers={"Authorization": f"Bearer {token}"}
+    ).json()
+
+    ids = [i[id_item] for i in items]
+    assert len(ids) == N == len(set(ids))
+    assert ids == [i[id_item] for i in completo[clave]]
+    assert completo["total"] == N and completo["total_paginas"] == 1
+    assert paginas[0]["total"] == N
+    assert all(p["total"] is None for p in paginas[1:])
+    assert [len(p[clave]) for p in paginas] == [5, 5, 5, 5, 3]
+
+
+@pytest.mark.integration
+def test_cursor_no_pierde_filas_con_fecha_nula(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    params = _sembrar_movimientos(db, usuario, None, None)
+    db.flush()
+    # Movimientos antiguos sin fecha: suficientes para que un cursor caiga sobre una fila NULL
+    ids_nulos = [
+        m.id_movimiento
+        for m in db.query(MovimientoInventario)
+        .filter(MovimientoInventario.id_repuesto == params["id_repuesto"])
+        .order_by(MovimientoInventario.id_movimiento)
+        .limit(8)
+    ]
+    db.query(MovimientoInventario).filter(MovimientoInventario.id_movimiento.in_(ids_nulos)).update(
+        {MovimientoInventario.fecha_movimiento: None}, synchronize_session=False
+    )
+    db.flush()
+
+    query = db.query(MovimientoInventario).filter(MovimientoInventario.id_repuesto == params["id_repuesto"])
+    orden = [(MovimientoInventario.fecha_movimiento, True), (MovimientoInventario.id_movimiento, True)]
+    ids, cursor = [], ""
+    while cursor is not None:
+        pagina = paginar(query, orden, skip=0, limit=LIMIT, cursor=cursor)
+        ids += [m.id_movimiento for m in pagina.items]
+        cursor = pagina.siguiente_cursor
+    completo = paginar(query, orden, skip=0, limit=100)
+
+    assert len(ids) == N == len(set(ids))
+    assert ids == [m.id_movimiento for m in completo.items]
+    assert ids[-8:] == sorted(ids_nulos, reverse=True)  # NULL al final en orden descendente
+
+
+@pytest.mark.integration
+def test_paginas_siguientes_sin_count_y_por_keyset(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    params = _sembrar_movimientos(db, usuario, None, None)
+    db.flush()
+    headers = {"Authorization": f"Bearer {token}"}
+    primera = client_transactional_db.get(
+        "/api/inventario/movimientos/", params={**params, "limit": LIMIT, "cursor": ""}, headers=headers
+    ).json()
+
+    sentencias = []
+    conn = db.connection()
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement.upper())
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        r = client_transactional_db.get(
+            "/api/inventario/movimientos/",
+            params={**params, "limit": LIMIT, "cursor": primera["siguiente_cursor"]},
+            headers=headers,
+        )
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+
+    assert r.status_code == 200
+    movimientos = [s for s in sentencias if "MOVIMIENTOS_INVENTARIO" in s]
+    assert not [s for s in movimientos if "COUNT(" in s]
+    assert "FECHA_MOVIMIENTO <" in movimientos[0]
+    # Ids de la página (sin joins) + carga de esos ids con repuesto/usuario
+    assert len(movimientos) == 2
+    assert "JOIN" not in movimientos[0] and "JOIN" in movimientos[1]
+
+
+@pytest.mark.integration
+def test_cursor_invalido_400(client_transactional_db, db_session_transactional):
+    _, token = seed_usuario(db_session_transactional, "ADMIN")
+    r = client_transactional_db.get(
+        "/api/repuestos/", params={"cursor": "basura"}, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Cursor de paginación inválido"
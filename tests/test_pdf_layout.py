@@ -0,0 +1,87 @@
+"""
+Tests del layout de PDFs: wrap con medición memoizada y «Página X de Y» en una sola pasada.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from app.routers.ordenes_trabajo import cotizacion
+from app.utils.pdf_layout import CanvasTotalPaginasDiferido, ancho_texto, partir_lineas
+from tests.semillas import orden_cotizacion
+
+
+def _paginas(pdf: bytes) -> int:
+    return pdf.count(b"/Type /Page\n")
+
+
+def test_partir_lineas_respeta_ancho_y_conserva_palabras():
+    texto = "Sustitución de balatas delanteras y rectificado de discos con revisión de calipers " * 4
+    lineas = partir_lineas(texto, 150, "Helvetica", 8)
+    assert len(lineas) > 1
+    assert all(stringWidth(ln, "Helvetica", 8) <= 150 for ln in lineas)
+    assert " ".join(lineas).split() == texto.split()
+    assert partir_lineas("   ", 150) == [""]
+
+
+def test_partir_lineas_corta_palabras_mas_anchas_que_la_columna():
+    palabra = "SUPERCALIFRAGILISTICOEXPIALIDOSO" * 2
+    lineas = partir_lineas(f"x {palabra} y", 60, "Helvetica", 9)
+    assert "".join(lineas[1:-1]) == palabra
+    assert all(stringWidth(ln, "Helvetica", 9) <= 60 for ln in lineas)
+
+
+def test_ancho_texto_memoiza_por_token_fuente_y_tamano():
+    ancho_texto.cache_clear()
+    for _ in range(3):
+        partir_lineas("balata balata balata disco disco", 40, "Helvetica", 8)
+    info = ancho_texto.cache_info()
+    assert info.misses == 3  # "balata", "disco" y el espacio
+    assert info.hits > info.misses
+
+
+def test_canvas_diferido_dibuja_total_en_cada_pagina():
+    pies = []
+
+    class _Canvas(CanvasTotalPaginasDiferido):
+        def dibujar_pie(self, pagina, total):
+            pies.append((pagina, total))
+            self.drawString(72, 30, f"{pagina}/{total}")
+
+    buf = BytesIO()
+    c = _Canvas(buf, pagesize=letter)
+    for i in range(3):
+        c.drawString(72, 700, f"contenido {i}")
+        if i < 2:
+            c.showPage()
+    c.save()
+
+    assert pies == [(1, 3), (2, 3), (3, 3)]
+    assert _paginas(buf.getvalue()) == 3
+
+
+def test_canvas_diferido_exige_dibujar_pie():
+    with pytest.raises(TypeError):
+        CanvasTotalPaginasDiferido(BytesIO())
+
+
+def test_cotizacion_se_dibuja_una_sola_vez(monkeypatch):
+    encabezados = []
+    original = cotizacion._draw_header_compacto
+    monkeypatch.setattr(cotizacion, "_draw_header_compacto", lambda *a, **k: encabezados.append(1) or original(*a, **k))
+    pies = []
+    monkeypatch.setattr(
+        cotizacion._CotizacionPaginationCanvas, "dibujar_pie", lambda self, pagina, total: pies.append((pagina, total))
+    )
+    fila = {"descripcion": "Servicio de prueba", "cantidad": 1, "precio_unitario": 100, "subtotal": 100}
+
+    pdf = cotizacion._generar_pdf_cotizacion(orden_cotizacion(servicios=[fila] * 60))
+
+    assert len(encabezados) == 1
+    n = _paginas(pdf)
+    assert n > 1
+    assert pies == [(i, n) for i in range(1, n + 1)]
@@ -0,0 +1,70 @@
+"""
+Tests del registro de recursos PDF: el logo se decodifica y comprime una sola vez por proceso,
+dibujar_imagen() produce exactamente el mismo PDF que Canvas.drawImage y los generadores siguen
+funcionando sin logo.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from app.routers.ordenes_trabajo.cotizacion import _generar_pdf_cotizacion
+from app.routers.ventas.ticket import _generar_pdf_ticket
+from app.utils import pdf_recursos
+from tests.semillas import orden_cotizacion
+
+_VENTA = {
+    "id_venta": 7,
+    "fecha": "2026-01-02T10:00:00",
+    "cliente": {"nombre": "Cliente Ticket", "telefono": "8680000000"},
+    "vehiculo": {"marca": "Nissan", "modelo": "Sentra", "anio": 2020},
+    "servicios": [{"descripcion": "Afinación", "precio_unitario": 800, "subtotal": 800}],
+    "partes": [{"descripcion": "Filtro", "cantidad": 1, "precio_unitario": 150, "subtotal": 150}],
+    "total": 950,
+}
+
+
+def _pdf(dibujar) -> bytes:
+    buf = BytesIO()
+    p = canvas.Canvas(buf, invariant=1)
+    for _ in range(2):  # dos páginas: la segunda reutiliza el XObject
+        dibujar(p)
+        p.showPage()
+    p.save()
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("mask", [None, "auto"])
+def test_dibujar_imagen_igual_a_draw_image(mask):
+    imagen = pdf_recursos.logo(mask)
+    assert imagen is not None
+    caja = (30, 600, 3.4 * inch, 0.6 * inch)
+
+    esperado = _pdf(lambda p: p.drawImage(imagen.lector, *caja[:2], width=caja[2], height=caja[3], mask=mask))
+    obtenido = _pdf(lambda p: pdf_recursos.dibujar_imagen(p, imagen, *caja))
+
+    assert obtenido == esperado
+    assert obtenido.count(b"/Subtype /Image") == (2 if mask == "auto" else 1)  # + SMask con alfa
+
+
+def test_generadores_no_vuelven_a_leer_el_logo(monkeypatch):
+    pdf_recursos.precargar_recursos_pdf()
+
+    def _sin_lectura(*args, **kwargs):
+        raise AssertionError("el logo debe venir del registro")
+
+    monkeypatch.setattr(pdf_recursos, "ImageReader", _sin_lectura)
+    for pdf in (_generar_pdf_ticket(_VENTA, "venta"), _generar_pdf_cotizacion(orden_cotizacion())):
+        assert pdf.startswith(b"%PDF") and b"/Subtype /Image" in pdf
+
+
+def test_sin_logo_se_omite_la_imagen(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_recursos, "LOGO_PATH", tmp_path / "no_existe.png")
+
+    assert pdf_recursos.logo() is None
+    pdf = _generar_pdf_ticket(_VENTA, "venta")
+    assert pdf.startswith(b"%PDF") and b"/Subtype /Image" not in pdf
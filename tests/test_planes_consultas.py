@@ -0,0 +1,175 @@
+"""
+Regresión de planes de consulta para los endpoints más usados.
+
+Cada endpoint se llama sobre datos sembrados; se capturan los SELECT que emite y se
+corre EXPLAIN (MySQL) o EXPLAIN QUERY PLAN (SQLite) sobre cada uno. El test falla si
+alguna consulta recorre completa una tabla caliente sin índice utilizable:
+- MySQL: fila con type=ALL, aunque possible_keys liste índices (el optimizador los descartó).
+- SQLite: paso "SCAN <tabla>" sin "USING INDEX" ni "USING COVERING INDEX".
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.cita import Cita, EstadoCita, TipoCita
+from app.models.movimiento_inventario import TipoMovimiento
+from app.models.repuesto import Repuesto
+from app.schemas.movimiento_inventario import MovimientoInventarioCreate
+from app.services.inventario_service import InventarioService
+from tests.semillas import seed_cliente_vehiculo, seed_turno, seed_usuario, seed_venta_ot_con_abono
+
+TABLAS_CALIENTES = frozenset({"movimientos_inventario", "pagos", "ventas", "citas"})
+
+HOY = datetime.utcnow().date()
+RANGO = {"fecha_desde": (HOY - timedelta(days=30)).isoformat(), "fecha_hasta": HOY.isoformat()}
+
+# (endpoint, parámetros); {id_*} se completa con los datos sembrados
+ENDPOINTS = [
+    ("/api/dashboard", {"secciones": "operativa,finanzas", "periodo": "mes"}),
+    ("/api/operaciones/resumen", {}),
+    ("/api/ventas/", {"estado": "PENDIENTE", **RANGO}),
+    ("/api/ventas/{id_venta}", {}),
+    ("/api/ventas/estadisticas/resumen", RANGO),
+    ("/api/ventas/reportes/utilidad", RANGO),
+    ("/api/ventas/reportes/ingresos-detalle", RANGO),
+    ("/api/ventas/reportes/cuentas-por-cobrar", {}),
+    ("/api/citas/", {"estado": "CONFIRMADA", **RANGO}),
+    ("/api/citas/", {"estado": "CONFIRMADA", "cursor": "", **RANGO}),
+    ("/api/citas/dashboard/proximas", {}),
+    ("/api/caja/turno-actual", {}),
+    ("/api/caja/corte-diario", {}),
+    ("/api/inventario/movimientos/", {"tipo_movimiento": "SALIDA", **RANGO}),
+    ("/api/inventario/movimientos/", {"tipo_movimiento": "SALIDA", "cursor": "", **RANGO}),
+    ("/api/inventario/movimientos/repuesto/{id_repuesto}", {}),
+    ("/api/devoluciones/", RANGO),
+    ("/api/ordenes-trabajo/", {}),
+    ("/api/ordenes-trabajo/{id_orden}", {}),
+    ("/api/clientes/{id_cliente}/historial", {}),
+    ("/api/clientes/{id_cliente}/historial/ventas", {"cursor": ""}),
+    ("/api/vehiculos/{id_vehiculo}/historial", {}),
+    ("/api/vehiculos/{id_vehiculo}/historial/ordenes_trabajo", {"cursor": ""}),
+    ("/api/inventario/reportes/productos-mas-vendidos", RANGO),
+]
+
+_ALIAS = re.compile(r"\b(\w+) AS (\w+)\b", re.IGNORECASE)
+_SCAN_SQLITE = re.compile(r"^SCAN (\w+)(?: AS (\w+))?$")
+
+
+def _tablas_por_alias(sql: str) -> dict[str, str]:
+    return {alias: tabla for tabla, alias in _ALIAS.findall(sql)}
+
+
+def _recorridos_sqlite(conn, sql: str, params) -> set[str]:
+    alias = _tablas_por_alias(sql)
+    tablas = set()
+    for fila in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all():
+        m = _SCAN_SQLITE.match(fila[-1])
+        if m:
+            nombre = m.group(1)
+            tablas.add(alias.get(nombre, nombre))
+    return tablas
+
+
+def _recorridos_mysql(conn, sql: str, params) -> set[str]:
+    alias = _tablas_por_alias(sql)
+    tablas = set()
+    for fila in conn.exec_driver_sql("EXPLAIN " + sql, params).mappings().all():
+        if fila.get("type") == "ALL" and fila.get("table"):
+            tablas.add(alias.get(fila["table"], fila["table"]))
+    return tablas
+
+
+def recorridos_completos(conn, sentencias) -> list[tuple[str, str]]:
+    """(tabla, sql) de cada recorrido completo de tabla caliente en las sentencias capturadas."""
+    explicar = _recorridos_sqlite if conn.dialect.name == "sqlite" else _recorridos_mysql
+    hallazgos = []
+    for sql, params in sentencias:
+        for tabla in explicar(conn, sql, params) & TABLAS_CALIENTES:
+            hallazgos.append((tabla, " ".join(sql.split())[:300]))
+    return hallazgos
+
+
+def _capturar_selects(db, fn) -> list[tuple[str, object]]:
+    conn = db.connection()
+    sentencias = []
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            sentencias.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        fn()
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+    return sentencias
+
+
+def _sembrar(db) -> tuple[str, dict]:
+    usuario, token = seed_usuario(db, "ADMIN")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "800.00", "300.00")
+    repuesto = Repuesto(
+        codigo=f"PLN-{uuid.uuid4().hex[:8]}",
+        nombre="Filtro planes",
+        stock_actual=Decimal("20"),
+        precio_compra=Decimal("30"),
+        precio_venta=Decimal("60"),
+    )
+    db.add(repuesto)
+    db.flush()
+    InventarioService.registrar_movimiento(
+        db,
+        MovimientoInventarioCreate(
+            id_repuesto=repuesto.id_repuesto,
+            tipo_movimiento=TipoMovimiento.SALIDA,
+            cantidad=Decimal("2"),
+            precio_unitario=None,
+            id_venta=venta.id_venta,
+        ),
+        usuario.id_usuario,
+        autocommit=False,
+    )
+    db.add(
+        Cita(
+            id_cliente=cliente.id_cliente,
+            id_vehiculo=vehiculo.id_vehiculo,
+            fecha_hora=datetime.utcnow() + timedelta(days=1),
+            tipo=TipoCita.REVISION,
+            estado=EstadoCita.CONFIRMADA,
+        )
+    )
+    db.flush()
+    ids = {
+        "id_venta": venta.id_venta,
+        "id_orden": venta.id_orden,
+        "id_cliente": cliente.id_cliente,
+        "id_vehiculo": vehiculo.id_vehiculo,
+        "id_repuesto": repuesto.id_repuesto,
+    }
+    return token, ids
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("ruta,params", ENDPOINTS, ids=[e[0] for e in ENDPOINTS])
+def test_endpoint_sin_recorridos_completos(ruta, params, client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    token, ids = _sembrar(db)
+    url = ruta.format(**ids)
+
+    def _llamar():
+        r = client_transactional_db.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 200, r.text
+
+    sentencias = _capturar_selects(db, _llamar)
+    assert sentencias, f"{url} no emitió consultas"
+    hallazgos = recorridos_completos(db.connection(), sentencias)
+    assert not hallazgos, f"{url}: recorrido completo en " + "; ".join(f"{t}: {sql}" for t, sql in hallazgos)
@@ -0,0 +1,126 @@
+"""
+Tests de total_pagado / saldo materializados en ventas: se mantienen en la misma transacción
+que cada pago (alta, cambio de monto o de venta, baja) y al cambiar el total; cobro y cuentas
+por cobrar los leen sin sumar pagos; el auditor detecta y corrige desfases.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, update
+
+from app.models.pago import Pago
+from app.models.venta import Venta
+from app.services.saldos_venta_service import auditar_saldos
+from tests.semillas import seed_cliente_vehiculo, seed_turno, seed_usuario, seed_venta_ot_con_abono
+
+
+def _pago(usuario, turno, venta, monto: str) -> Pago:
+    return Pago(
+        id_venta=venta.id_venta,
+        id_usuario=usuario.id_usuario,
+        id_turno=turno.id_turno,
+        monto=Decimal(monto),
+        metodo="EFECTIVO",
+        fecha=datetime.utcnow(),
+    )
+
+
+@pytest.mark.integration
+def test_saldo_se_mantiene_en_altas_cambios_y_bajas(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+    otra = Venta(id_cliente=cliente.id_cliente, total=Decimal("300.00"), estado="PENDIENTE")
+    db.add(otra)
+    db.flush()
+    assert (otra.total_pagado, otra.saldo) == (Decimal("0"), Decimal("300.00"))
+    assert (venta.total_pagado, venta.saldo) == (Decimal("250.00"), Decimal("750.00"))
+
+    pago = _pago(usuario, turno, venta, "100.00")
+    db.add(pago)
+    db.flush()
+    assert (venta.total_pagado, venta.saldo) == (Decimal("350.00"), Decimal("650.00"))
+
+    pago.monto = Decimal("400.00")
+    db.flush()
+    assert venta.saldo == Decimal("350.00")
+
+    pago.id_venta = otra.id_venta  # movido a otra venta: sale de una y entra en la otra
+    db.flush()
+    assert (venta.total_pagado, otra.total_pagado, otra.saldo) == (Decimal("250.00"), Decimal("400.00"), 0)
+
+    otra.total = Decimal("500.00")
+    db.flush()
+    assert otra.saldo == Decimal("100.00")
+
+    db.delete(pago)
+    db.flush()
+    assert (otra.total_pagado, otra.saldo) == (0, Decimal("500.00"))
+    assert auditar_saldos(db, ids_venta=[venta.id_venta, otra.id_venta]) == []
+
+
+@pytest.mark.integration
+def test_cobro_y_cuentas_por_cobrar_leen_el_saldo(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+    liquidada = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "80.00", "80.00")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    sentencias = []
+    conn = db.connection()
+
+    def _registrar(conn_, cursor, statement, parameters, context, executemany):
+        sentencias.append(" ".join(statement.split()).upper())
+
+    event.listen(conn, "before_cursor_execute", _registrar)
+    try:
+        excede = client_transactional_db.post(
+            "/api/pagos/", json={"id_venta": venta.id_venta, "monto": 800, "metodo": "EFECTIVO"}, headers=headers
+        )
+        cobro = client_transactional_db.post(
+            "/api/pagos/", json={"id_venta": venta.id_venta, "monto": 500, "metodo": "EFECTIVO"}, headers=headers
+        )
+        cxc = client_transactional_db.get("/api/ventas/reportes/cuentas-por-cobrar", headers=headers)
+        detalle = client_transactional_db.get(f"/api/ventas/{venta.id_venta}", headers=headers)
+    finally:
+        event.remove(conn, "before_cursor_execute", _registrar)
+
+    assert excede.status_code == 400
+    assert cobro.status_code == 201, cobro.text
+    assert cobro.json()["total_pagado"] == 750.0
+    assert [(i["id_venta"], i["saldo_pendiente"]) for i in cxc.json()["items"]] == [(venta.id_venta, 250.0)]
+    assert liquidada.id_venta not in {i["id_venta"] for i in cxc.json()["items"]}
+    assert detalle.json()["saldo_pendiente"] == 250.0
+    assert not [s for s in sentencias if "SUM(PAGOS.MONTO)" in s]
+    db.refresh(venta)
+    assert (venta.total_pagado, venta.saldo) == (Decimal("750.00"), Decimal("250.00"))
+
+
+@pytest.mark.integration
+def test_auditor_detecta_y_corrige_desfases(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "CAJA")
+    turno = seed_turno(db, usuario.id_usuario)
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    venta = seed_venta_ot_con_abono(db, usuario, turno, cliente, vehiculo, "1000.00", "250.00")
+    tabla = Venta.__table__
+    db.execute(update(tabla).where(tabla.c.id_venta == venta.id_venta).values(total_pagado=0, saldo=1000))
+
+    desfases = auditar_saldos(db, ids_venta=[venta.id_venta])
+    assert sorted((d.columna, d.almacenado, d.calculado) for d in desfases) == [
+        ("saldo", Decimal("1000"), Decimal("750.00")),
+        ("total_pagado", Decimal("0"), Decimal("250.00")),
+    ]
+
+    auditar_saldos(db, corregir=True, ids_venta=[venta.id_venta])
+    assert auditar_saldos(db, ids_venta=[venta.id_venta]) == []
+    assert venta.saldo == Decimal("750.00")
@@ -0,0 +1,105 @@
+"""
+Tests del middleware de logging ASGI: métricas SQL por petición, Server-Timing, log JSON y detector N+1.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import get_db
+from app.middleware.logging import LoggingMiddleware, normalizar_sentencia
+from tests.semillas import RANGO_EXPORTACION, seed_ventas_exportacion
+
+_EXPORTACIONES = ("ventas", "clientes", "utilidad", "cuentas-por-cobrar", "productos-vendidos", "caja")
+
+
+def _registros(caplog) -> list[dict]:
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == "app.middleware.logging"]
+
+
+def test_normalizar_sentencia_agrupa_parametros_y_listas_in():
+    a = normalizar_sentencia("SELECT * FROM pagos\n WHERE id_venta IN (%(id_1_1)s, %(id_1_2)s) LIMIT 10")
+    b = normalizar_sentencia("SELECT * FROM pagos WHERE id_venta IN (%(id_1_1)s)  LIMIT 50")
+    assert a == b == "SELECT * FROM pagos WHERE id_venta IN (?) LIMIT ?"
+    assert normalizar_sentencia("SELECT a FROM t WHERE x = ?") != normalizar_sentencia("SELECT b FROM t WHERE x = ?")
+
+
+@pytest.mark.integration
+def test_server_timing_y_log_json_con_metricas_sql(
+    client_transactional_db, db_session_transactional, caplog, monkeypatch
+):
+    monkeypatch.setattr(settings, "TELEMETRIA_SERVER_TIMING", True)
+    token, _, _, _ = seed_ventas_exportacion(db_session_transactional, 2)
+    caplog.set_level(logging.INFO, logger="app.middleware.logging")
+
+    r = client_transactional_db.get(
+        "/api/exportaciones/ventas", params=RANGO_EXPORTACION, headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert r.status_code == 200, r.text
+    m = re.search(r'db;dur=([\d.]+);desc="(\d+) sentencias', r.headers["server-timing"])
+    assert m and int(m.group(2)) > 0
+    assert "x-process-time" in r.headers
+    (registro,) = _registros(caplog)
+    assert registro["endpoint"] == "/api/exportaciones/ventas"
+    assert registro["status"] == 200
+    assert registro["db_sentencias"] >= int(m.group(2))
+    assert registro["bytes_respuesta"] == len(r.content)
+    assert "n_mas_uno" not in registro
+
+    # Apagado (predeterminado sin DEBUG_MODE): sin tiempos ni conteos de BD en la respuesta
+    monkeypatch.setattr(settings, "TELEMETRIA_SERVER_TIMING", False)
+    r = client_transactional_db.get(
+        "/api/exportaciones/ventas", params=RANGO_EXPORTACION, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200 and "server-timing" not in r.headers
+
+
+@pytest.mark.integration
+def test_detector_n_mas_uno_marca_sentencias_repetidas(db_session_transactional, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "TELEMETRIA_N_MAS_UNO_UMBRAL", 3)
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/por-fila")
+    def por_fila(n: int, db=Depends(get_db)):
+        return [db.execute(text("SELECT :i + 1"), {"i": i}).scalar() for i in range(n)]
+
+    app.dependency_overrides[get_db] = lambda: db_session_transactional
+    caplog.set_level(logging.INFO, logger="app.middleware.logging")
+    client = TestClient(app)
+
+    assert client.get("/por-fila", params={"n": 3}).status_code == 200
+    assert client.get("/por-fila", params={"n": 5}).status_code == 200
+
+    corto, largo = _registros(caplog)
+    assert "n_mas_uno" not in corto
+    assert largo["db_sentencias"] == 5
+    assert largo["n_mas_uno"] == [{"sentencia": "SELECT ? + ?", "veces": 5}]
+    niveles = [r.levelno for r in caplog.records if r.name == "app.middleware.logging"]
+    assert niveles == [logging.INFO, logging.WARNING]
+
+
+@pytest.mark.integration
+def test_exportaciones_sin_n_mas_uno(client_transactional_db, db_session_transactional, caplog, monkeypatch):
+    """Con más filas que el umbral, ninguna exportación repite una sentencia por fila."""
+    monkeypatch.setattr(settings, "TELEMETRIA_N_MAS_UNO_UMBRAL", 3)
+    token, _, _, _ = seed_ventas_exportacion(db_session_transactional, 5)
+    caplog.set_level(logging.INFO, logger="app.middleware.logging")
+
+    for nombre in _EXPORTACIONES:
+        r = client_transactional_db.get(
+            f"/api/exportaciones/{nombre}", params=RANGO_EXPORTACION, headers={"Authorization": f"Bearer {token}"}
+        )
+        assert r.status_code == 200, f"{nombre}: {r.text}"
+
+    sospechas = {reg["endpoint"]: reg["n_mas_uno"] for reg in _registros(caplog) if "n_mas_uno" in reg}
+    assert sospechas == {}
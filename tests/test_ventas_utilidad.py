@@ -0,0 +1,190 @@
+"""
+Tests del libro de costos por venta (ventas_utilidad) y de sus consumidores.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.detalle_venta import DetalleVenta
+from app.models.movimiento_inventario import TipoMovimiento
+from app.models.repuesto import Repuesto
+from app.models.venta import Venta
+from app.models.venta_utilidad import VentaUtilidad
+from app.schemas.movimiento_inventario import MovimientoInventarioCreate
+from app.services.inventario_service import InventarioService
+from app.services.utilidad_ventas_service import recalcular_ventas, resumen_utilidad
+from app.services.ventas_service import VentasService
+from tests.semillas import contar_sentencias, seed_cliente_vehiculo, seed_ot_completada, seed_usuario
+
+FECHA = datetime(2032, 5, 10, 18, 0, 0)
+DIA = "2032-05-10"
+
+
+def _seed_repuesto(db, precio_compra: str = "50.00") -> Repuesto:
+    repuesto = Repuesto(
+        codigo=f"UTL-{uuid.uuid4().hex[:8]}",
+        nombre="Balata utilidad",
+        stock_actual=Decimal("100"),
+        precio_compra=Decimal(precio_compra),
+        precio_venta=Decimal("90.00"),
+    )
+    db.add(repuesto)
+    db.flush()
+    return repuesto
+
+
+def _salida(db, usuario, repuesto, cantidad: str, **kwargs):
+    return InventarioService.registrar_movimiento(
+        db,
+        MovimientoInventarioCreate(
+            id_repuesto=repuesto.id_repuesto,
+            tipo_movimiento=TipoMovimiento.SALIDA,
+            cantidad=Decimal(cantidad),
+            precio_unitario=None,
+            **kwargs,
+        ),
+        usuario.id_usuario,
+        autocommit=False,
+    )
+
+
+def _venta_mostrador(db, cliente, total: str) -> Venta:
+    venta = Venta(id_cliente=cliente.id_cliente, total=Decimal(total), estado="PENDIENTE", fecha=FECHA)
+    db.add(venta)
+    db.flush()
+    return venta
+
+
+def _costo_libro(db, id_venta):
+    fila = db.get(VentaUtilidad, id_venta)
+    return None if fila is None else Decimal(fila.costo)
+
+
+@pytest.mark.integration
+def test_salidas_de_mostrador_incrementan_libro(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    cliente, _ = seed_cliente_vehiculo(db)
+    repuesto = _seed_repuesto(db)
+    venta = _venta_mostrador(db, cliente, "400.00")
+
+    _salida(db, usuario, repuesto, "2", id_venta=venta.id_venta, referencia=f"Venta#{venta.id_venta}")
+    assert _costo_libro(db, venta.id_venta) == Decimal("100.00")
+    _salida(db, usuario, repuesto, "1", id_venta=venta.id_venta, referencia=f"Venta#{venta.id_venta}")
+    assert _costo_libro(db, venta.id_venta) == Decimal("150.00")
+
+    resumen = resumen_utilidad(db, DIA, DIA)
+    assert resumen["total_ingresos"] == Decimal("400.00")
+    assert resumen["total_costo"] == Decimal("150.00")
+    assert resumen["cantidad_ventas"] == 1
+
+
+@pytest.mark.integration
+def test_venta_desde_ot_toma_salidas_previas_y_cancelacion_registra_merma(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    cliente, vehiculo = seed_cliente_vehiculo(db)
+    repuesto = _seed_repuesto(db, "40.00")
+    ot = seed_ot_completada(db, cliente, vehiculo)
+
+    # Salida al iniciar la OT, antes de que exista la venta
+    _salida(db, usuario, repuesto, "3", referencia=ot.numero_orden)
+    r = VentasService.crear_venta_desde_orden(db, ot.id, False, usuario.id_usuario)
+    venta = db.get(Venta, r["id_venta"])
+    venta.fecha = FECHA
+    db.flush()
+    assert _costo_libro(db, venta.id_venta) == Decimal("120.00")
+
+    # Repuesto agregado a la OT después de crear la venta
+    _salida(db, usuario, repuesto, "1", referencia=ot.numero_orden)
+    assert _costo_libro(db, venta.id_venta) == Decimal("160.00")
+
+    db.add(
+        DetalleVenta(
+            id_venta=venta.id_venta,
+            tipo="PRODUCTO",
+            id_item=repuesto.id_repuesto,
+            descripcion="Balata extra",
+            cantidad=Decimal("1"),
+            precio_unitario=Decimal("90.00"),
+            subtotal=Decimal("90.00"),
+        )
+    )
+    db.flush()
+    det = db.query(DetalleVenta).filter(DetalleVenta.id_venta == venta.id_venta, DetalleVenta.tipo == "PRODUCTO").one()
+    VentasService.cancelar_venta(
+        db,
+        venta.id_venta,
+        "Cliente desistió de la compra",
+        usuario.id_usuario,
+        productos=[
+            {"id_detalle": det.id_detalle, "cantidad_reutilizable": 0, "cantidad_mer": 1, "motivo_mer": "Dañada"}
+        ],
+    )
+    fila = db.get(VentaUtilidad, venta.id_venta)
+    db.refresh(fila)
+    assert Decimal(fila.perdidas_mer) == Decimal("40.00")
+
+    resumen = resumen_utilidad(db, DIA, DIA)
+    assert resumen["cantidad_ventas"] == 0
+    assert resumen["total_costo"] == Decimal("0")
+    assert resumen["perdidas_mer"] == Decimal("40.00")
+
+
+@pytest.mark.integration
+def test_reporte_utilidad_lee_libro_en_consultas_constantes(client_transactional_db, db_session_transactional):
+    db = db_session_transactional
+    usuario, token = seed_usuario(db, "ADMIN")
+    cliente, _ = seed_cliente_vehiculo(db)
+    repuesto = _seed_repuesto(db)
+
+    def _reporte():
+        r = client_transactional_db.get(
+            "/api/ventas/reportes/utilidad",
+            params={"fecha_desde": DIA, "fecha_hasta": DIA},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    ventas = []
+    for _ in range(2):
+        venta = _venta_mostrador(db, cliente, "300.00")
+        _salida(db, usuario, repuesto, "1", id_venta=venta.id_venta)
+        ventas.append(venta)
+    n_pocas = contar_sentencias(db, _reporte)
+
+    for _ in range(6):
+        venta = _venta_mostrador(db, cliente, "300.00")
+        _salida(db, usuario, repuesto, "1", id_venta=venta.id_venta)
+        ventas.append(venta)
+    datos = {}
+    n_muchas = contar_sentencias(db, lambda: datos.update(_reporte()))
+    assert n_muchas == n_pocas
+
+    assert datos["cantidad_ventas"] == 8
+    assert datos["total_ingresos"] == 2400.0
+    assert datos["total_costo"] == 400.0
+    assert {d["id_venta"]: d["utilidad"] for d in datos["detalle"]} == {v.id_venta: 250.0 for v in ventas}
+
+
+@pytest.mark.integration
+def test_recalcular_ventas_es_idempotente(db_session_transactional):
+    db = db_session_transactional
+    usuario, _ = seed_usuario(db, "ADMIN")
+    cliente, _ = seed_cliente_vehiculo(db)
+    repuesto = _seed_repuesto(db)
+    venta = _venta_mostrador(db, cliente, "200.00")
+    _salida(db, usuario, repuesto, "2", id_venta=venta.id_venta)
+
+    db.query(VentaUtilidad).filter(VentaUtilidad.id_venta == venta.id_venta).delete(synchronize_session=False)
+    db.expire_all()
+    assert _costo_libro(db, venta.id_venta) is None
+    assert recalcular_ventas(db, [venta.id_venta]) == 1
+    assert recalcular_ventas(db, [venta.id_venta]) == 1
+    assert _costo_libro(db, venta.id_venta) == Decimal("100.00")